@@ -771,8 +771,9 @@ if not __CCC:
 
 def validate_polynomial(data, poly):
 
-    expanded, targets, _, _ = _get_expanded_data(data)
-    expanded_sums = np.array(tuple(v.sum() for v in poly(expanded)))
+    poly = np.poly1d(poly)
+    power_sums, targets = _get_power_sums(data, poly.order)
+    expanded_sums = power_sums.dot(poly.coeffs[::-1])
     slope, intercept, _, p_value, stderr = linregress(expanded_sums, targets)
 
     try:
@@ -915,6 +916,24 @@ def get_calibration_optimization_function(degree=5, include_intercept=False):
     return poly_with_intercept if include_intercept else poly
 
 
+def get_calibration_power_sums_function(degree=5, include_intercept=False):
+    """The same function as `get_calibration_optimization_function`
+    but on colonies' power sums, see `_get_power_sums`.
+
+    Since the sum of a polynomial over a colony's pixels is a linear
+    combination of the colony's power sums, no pixel values are needed
+    while fitting.
+    """
+
+    def poly(x, c1, cn):
+        return c1 * x[:, 1] + cn * x[:, degree]
+
+    def poly_with_intercept(x, m, c1, cn):
+        return m * x[:, 0] + c1 * x[:, 1] + cn * x[:, degree]
+
+    return poly_with_intercept if include_intercept else poly
+
+
 def get_calibration_polynomial(coefficients_array):
 
     return np.poly1d(coefficients_array)
@@ -953,6 +972,38 @@ def _get_expanded_data(data_store):
     return x, y, x_min, x_max
 
 
+def _get_power_sums(data_store, degree):
+    """Sums of count times value to the powers 0 to `degree` of the
+    compressed pixel values of each colony.
+
+    Returns the power sums as a (colonies, degree + 1) array and the
+    target values.
+    """
+
+    measures = min(len(data_store[k]) for k in
+                   (CalibrationEntry.target_value,
+                    CalibrationEntry.source_values,
+                    CalibrationEntry.source_value_counts))
+
+    values = data_store[CalibrationEntry.source_values][:measures]
+    counts = data_store[CalibrationEntry.source_value_counts][:measures]
+    targets = np.array(data_store[CalibrationEntry.target_value][:measures], dtype=np.float64)
+
+    if not measures:
+        return np.zeros((0, degree + 1)), targets
+
+    colony_sizes = [len(colony_values) for colony_values in values]
+    labels = np.repeat(np.arange(measures), colony_sizes)
+    all_values = np.hstack(values).astype(np.float64)
+    all_counts = np.hstack(counts).astype(np.float64)
+
+    power_sums = np.array([
+        np.bincount(labels, weights=all_counts * all_values ** power, minlength=measures)
+        for power in range(degree + 1)]).T
+
+    return power_sums, targets
+
+
 def _expand_compressed_vector(values, counts, dtype):
 
     return np.hstack((np.repeat(value, count)
@@ -970,9 +1021,9 @@ def poly_as_text(poly):
 
 def calculate_polynomial(data_store, degree=5):
 
-    x, y, _, _ = _get_expanded_data(data_store)
+    x, y = _get_power_sums(data_store, degree)
 
-    poly = get_calibration_optimization_function(degree)
+    poly = get_calibration_power_sums_function(degree)
 
     p0 = np.zeros((2,), np.float)
 
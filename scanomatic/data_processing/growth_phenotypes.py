@@ -1,35 +1,56 @@
 from enum import Enum
 import numpy as np
 from scipy.optimize import leastsq
-from itertools import izip
-from scipy.stats import linregress
 from scanomatic.io.logger import Logger
 
 _logger = Logger("Growth Phenotypes")
 
 
-def _linreg_helper(X, Y):
-    return linregress(X, Y)[0::4]
+def get_derivative(curve_strided, times_strided):
 
+    derivative_values_log2, derivative_errors = get_plate_derivative(curve_strided[np.newaxis], times_strided)
+    return derivative_values_log2[0], derivative_errors[0]
 
-def get_derivative(curve_strided, times_strided):
 
-    linreg_values = []
+def get_plate_derivative(plate_strided, times_strided):
+    """Derivatives for all curves of a plate in one vectorized pass.
+
+    Each window is a linear regression on the log2 values, equivalent
+    to `scipy.stats.linregress` on its finite values. Windows with
+    more than one non-finite value get `np.nan` slope and error.
 
-    log2_strided_curve = np.log2(curve_strided)
-    filters = np.isfinite(log2_strided_curve)
-    min_size = curve_strided.shape[-1] - 1
+    Args:
+        plate_strided: Linear regression strided plate, (curves, windows, regression size)
+        times_strided: Linear regression strided times, (windows, regression size)
 
-    for times, value_segment, filt in izip(times_strided, log2_strided_curve, filters):
+    Returns:
+        Tuple of derivative values and their errors, both (curves, windows)
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        log2_strided_plate = np.log2(plate_strided)
 
-        if filt.sum() >= min_size:
-            linreg_values.append(_linreg_helper(times[filt], value_segment[filt]))
-        else:
-            linreg_values.append((np.nan, np.nan))
+    filt = np.isfinite(log2_strided_plate)
+    size = filt.sum(axis=-1)
+    times = np.where(filt, times_strided, 0)
+    log2_strided_plate = np.where(filt, log2_strided_plate, 0)
 
-    derivative_values_log2, derivative_errors = np.array(linreg_values).T
+    with np.errstate(divide='ignore', invalid='ignore'):
 
-    return derivative_values_log2, derivative_errors
+        times_dev = np.where(filt, times - (times.sum(axis=-1) / size)[..., np.newaxis], 0)
+        values_dev = np.where(filt, log2_strided_plate - (log2_strided_plate.sum(axis=-1) / size)[..., np.newaxis], 0)
+
+        ssxm = np.square(times_dev).sum(axis=-1) / size
+        ssym = np.square(values_dev).sum(axis=-1) / size
+        ssxym = (times_dev * values_dev).sum(axis=-1) / size
+
+        r_den = np.sqrt(ssxm * ssym)
+        r = np.where(r_den == 0, 0, np.clip(ssxym / r_den, -1, 1))
+
+        derivative_values_log2 = ssxym / ssxm
+        derivative_errors = np.where(size == 2, 0, np.sqrt((1 - np.square(r)) * ssym / ssxm / (size - 2)))
+
+    valid = size >= plate_strided.shape[-1] - 1
+    return np.where(valid, derivative_values_log2, np.nan), np.where(valid, derivative_errors, np.nan)
 
 
 def get_preprocessed_data_for_phenotypes(curve, curve_strided, flat_times, times_strided, index_for_48h,
@@ -48,81 +69,297 @@ def get_preprocessed_data_for_phenotypes(curve, curve_strided, flat_times, times
         'flat_times': flat_times}
 
 
+def get_plate_preprocessed_data_for_phenotypes(plate, plate_strided, flat_times, times_strided, index_for_48h,
+                                               position_offset, derivatives=None):
+    """Plate version of `get_preprocessed_data_for_phenotypes`.
+
+    The returned data is what the `Phenotypes.calculate_plate` kernels
+    expect, with the first two dimensions of all arrays being the rows and
+    columns of the plate.
+
+    Args:
+        plate: Smooth growth data (rows, columns, times)
+        plate_strided: Linear regression strided plate as given by
+            `Phenotyper._get_plate_linear_regression_strided`
+        flat_times: The times
+        times_strided: Linear regression strided times
+        index_for_48h: Index of the time closest to 48h
+        position_offset: Half size of the linear regression
+        derivatives: Optional, already calculated derivative values and
+            errors for the plate, each (rows, columns, windows). If
+            supplied the `plate_strided` isn't used.
+
+    Returns: dict
+    """
+    shape = plate.shape[:2]
+    if derivatives is None:
+        derivatives = get_plate_derivative(plate_strided, times_strided)
+    derivative_values_log2, derivative_errors = derivatives
+
+    return {
+        'curve_smooth_growth_data': np.ma.masked_invalid(plate),
+        'index48h': index_for_48h,
+        'chapman_richards_fit': get_plate_fit_r_square(flat_times, np.log2(plate)),
+        'derivative_values_log2': np.ma.masked_invalid(derivative_values_log2.reshape(shape + (-1,))),
+        'derivative_errors': np.ma.masked_invalid(derivative_errors.reshape(shape + (-1,))),
+        'linregress_extent': position_offset,
+        'flat_times': flat_times}
+
+
+def _as_plate(curve):
+    """Views a single curve as a plate with one position."""
+    return np.ma.masked_invalid(curve).reshape((1, 1) + np.shape(curve))
+
+
+def _take_plate_index(values, index):
+    """Picks one value per curve along the last axis, `np.nan` if index is outside"""
+    values = np.asarray(values, dtype=np.float)
+    index = np.broadcast_to(index, values.shape[:-1])
+    inside = (index >= 0) & (index < values.shape[-1])
+    picked = values.reshape(-1, values.shape[-1])[
+        np.arange(index.size), np.where(inside, index, 0).ravel()].reshape(index.shape)
+    return np.where(inside, picked, np.nan)
+
+
+def _plate_segment_average(segment):
+
+    has_values = (segment.filled(0) != 0).any(axis=-1)
+    return np.where(has_values, segment.mean(axis=-1).filled(np.nan), np.nan)
+
+
+def _plate_moving_average(curve_smooth_growth_data):
+
+    values = curve_smooth_growth_data.filled(np.nan)
+    return np.ma.masked_invalid((values[..., :-2] + values[..., 1:-1] + values[..., 2:]) / 3.)
+
+
+#
+# Plate kernels
+#
+# All take arrays with the plate's rows and columns as first dimensions
+# and return (rows, columns) arrays.
+#
+
+
+def plate_initial_value(curve_smooth_growth_data, **kwargs):
+    return curve_smooth_growth_data[..., 0].filled(np.nan)
+
+
+def plate_curve_first_two_average(curve_smooth_growth_data, **kwargs):
+    return _plate_segment_average(curve_smooth_growth_data[..., :2])
+
+
+def plate_curve_baseline(curve_smooth_growth_data, **kwargs):
+    return _plate_segment_average(curve_smooth_growth_data[..., :3])
+
+
+def plate_curve_end_average(curve_smooth_growth_data, **kwargs):
+    return _plate_segment_average(curve_smooth_growth_data[..., -3:])
+
+
+def plate_curve_low_point(curve_smooth_growth_data, **kwargs):
+    has_values = (curve_smooth_growth_data.filled(0) != 0).any(axis=-1)
+    return np.where(has_values, _plate_moving_average(curve_smooth_growth_data).min(axis=-1).filled(np.nan), np.nan)
+
+
+def plate_curve_low_point_time(curve_smooth_growth_data, flat_times, **kwargs):
+    if curve_smooth_growth_data.shape[-1] < 3:
+        return np.ones(curve_smooth_growth_data.shape[:-1]) * np.nan
+    return flat_times[_plate_moving_average(curve_smooth_growth_data).argmin(axis=-1) + 1]
+
+
+def plate_curve_monotonicity(curve_smooth_growth_data, **kwargs):
+
+    size = curve_smooth_growth_data.shape[-1]
+    valid = ~np.ma.getmaskarray(curve_smooth_growth_data)
+    values = curve_smooth_growth_data.filled(np.nan)
+
+    # Index of the closest valid value before each position
+    previous = np.maximum.accumulate(np.where(valid, np.arange(size), -1), axis=-1)
+    previous = np.concatenate((-np.ones(previous.shape[:-1] + (1,), dtype=previous.dtype), previous[..., :-1]), axis=-1)
+    has_previous = valid & (previous >= 0)
+
+    previous_values = values.reshape(-1, size)[
+        np.arange(values.size // size)[:, None], np.where(has_previous, previous, 0).reshape(-1, size)].reshape(
+        values.shape)
+
+    with np.errstate(invalid='ignore'):
+        increases = has_previous & (values > previous_values)
+
+    return increases.sum(axis=-1).astype(float) / (size - 1)
+
+
+def plate_growth_yield(curve_smooth_growth_data, **kwargs):
+    return plate_curve_end_average(curve_smooth_growth_data) - plate_curve_baseline(curve_smooth_growth_data)
+
+
+def plate_growth_curve_doublings(curve_smooth_growth_data, **kwargs):
+    return np.log2(plate_curve_end_average(curve_smooth_growth_data)) - \
+           np.log2(plate_curve_baseline(curve_smooth_growth_data))
+
+
+def plate_residual_growth(curve_smooth_growth_data, derivative_values_log2, **kwargs):
+    return plate_curve_end_average(curve_smooth_growth_data) - \
+           plate_population_size_at_generation_time(
+               curve_smooth_growth_data=curve_smooth_growth_data,
+               index=_get_plate_generation_time_index(derivative_values_log2, 0),
+               **kwargs)
+
+
+def plate_residual_growth_as_population_doublings(curve_smooth_growth_data, derivative_values_log2, **kwargs):
+    return np.log2(plate_curve_end_average(curve_smooth_growth_data)) - \
+           np.log2(plate_population_size_at_generation_time(
+               curve_smooth_growth_data=curve_smooth_growth_data,
+               index=_get_plate_generation_time_index(derivative_values_log2, 0),
+               **kwargs))
+
+
+def plate_growth_48h(curve_smooth_growth_data, index48h, **kwargs):
+    if index48h < 0 or index48h >= curve_smooth_growth_data.shape[-1]:
+        _logger.warning("Faulty index {0} for 48h size (max {1})".format(
+            index48h, curve_smooth_growth_data.shape[-1] - 1))
+        return np.ones(curve_smooth_growth_data.shape[:-1]) * np.nan
+    return curve_smooth_growth_data[..., index48h].filled(np.nan)
+
+
+def plate_generation_time(derivative_values_log2, index, **kwargs):
+    index = np.broadcast_to(index, derivative_values_log2.shape[:-1])
+    if (index < 0).any():
+        _logger.warning("No GT for {0} curves because no finite slopes in data".format((index < 0).sum()))
+    if (index >= derivative_values_log2.shape[-1]).any():
+        _logger.warning("Faulty index {0} for GT (max {1})".format(
+            index.max(), derivative_values_log2.shape[-1] - 1))
+    return 1.0 / _take_plate_index(derivative_values_log2.filled(np.nan), index)
+
+
+def plate_generation_time_error(derivative_errors, index, **kwargs):
+    index = np.broadcast_to(index, derivative_errors.shape[:-1])
+    if (index < 0).any():
+        _logger.warning("No GT Error for {0} curves because no finite slopes in data".format((index < 0).sum()))
+    if (index >= derivative_errors.shape[-1]).any():
+        _logger.warning("Faulty index {0} for GT error (max {1})".format(
+            index.max(), derivative_errors.shape[-1] - 1))
+    return _take_plate_index(derivative_errors.filled(np.nan), index)
+
+
+def plate_generation_time_when(flat_times, index, linregress_extent, **kwargs):
+    pos = np.asarray(index) + linregress_extent
+    if (pos < 0).any():
+        _logger.warning("No GT When for {0} curves because no finite slopes in data".format((pos < 0).sum()))
+    if (pos >= flat_times.size).any():
+        _logger.warning("Faulty index {0} for GT when (max {1})".format(pos.max(), flat_times.size - 1))
+    inside = (pos >= 0) & (pos < flat_times.size)
+    return np.where(inside, flat_times[np.where(inside, pos, 0)], np.nan)
+
+
+def plate_population_size_at_generation_time(curve_smooth_growth_data, index, linregress_extent, **kwargs):
+
+    size = curve_smooth_growth_data.shape[-1]
+    pos = np.asarray(index) + linregress_extent
+    if (pos < 0).any():
+        _logger.warning("No GT Pop Size for {0} curves because no finite slopes in data".format((pos < 0).sum()))
+
+    window = pos[..., None] + np.arange(-linregress_extent, linregress_extent + 1)
+    inside = (window >= 0) & (window < size)
+    window_values = curve_smooth_growth_data.reshape(-1, size)[
+        np.arange(pos.size)[:, None], np.where(inside, window, 0).reshape(pos.size, -1)].reshape(window.shape)
+
+    window_values = np.ma.masked_where(~inside | np.ma.getmaskarray(window_values), window_values)
+    return np.where(pos >= 0, np.ma.median(window_values, axis=-1).filled(np.nan), np.nan)
+
+
+def plate_growth_lag(index, flat_times, derivative_values_log2, curve_smooth_growth_data, **kwargs):
+
+    index = np.asarray(index)
+    growth_delta = np.log2(plate_population_size_at_generation_time(
+        curve_smooth_growth_data=curve_smooth_growth_data, index=index, **kwargs)) - \
+        np.log2(plate_curve_baseline(curve_smooth_growth_data))
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        has_lag = (index >= 0) & (growth_delta > 0)
+        lag = np.maximum(0.0, growth_delta / _take_plate_index(derivative_values_log2.filled(np.nan), index))
+
+    return np.where(has_lag, np.interp(np.where(has_lag, lag, 0), np.arange(flat_times.size), flat_times), np.nan)
+
+
+def get_plate_fit_r_square(x_data, y_data):
+    """Chapman-Richards fits for all curves of a plate.
+
+    Args:
+        x_data: The times
+        y_data: Log2 growth data (rows, columns, times)
+
+    Returns:
+        Tuple of fit (rows, columns) and parameters (rows, columns, 5).
+        Curves without data get `np.nan` for both.
+    """
+    fits = np.ones(y_data.shape[:-1], dtype=np.float) * np.nan
+    params = np.ones(y_data.shape[:-1] + (5,), dtype=np.float) * np.nan
+
+    for pos in zip(*np.where(np.isfinite(y_data).any(axis=-1))):
+        fits[pos], params[pos] = get_fit_r_square(x_data, y_data[pos])
+
+    return fits, params
+
+
+#
+# Per curve phenotypes
+#
+
+
 def initial_value(curve_smooth_growth_data, *args, **kwargs):
-    return curve_smooth_growth_data[0]
+    return plate_initial_value(_as_plate(curve_smooth_growth_data))[0, 0]
 
 
 def curve_first_two_average(curve_smooth_growth_data, *args, **kwargs):
-    if curve_smooth_growth_data[:2].any():
-        return curve_smooth_growth_data[:2].mean()
-    else:
-        return np.nan
+    return plate_curve_first_two_average(_as_plate(curve_smooth_growth_data))[0, 0]
 
 
 def curve_baseline(curve_smooth_growth_data, *args, **kwargs):
-    if curve_smooth_growth_data[:3].any():
-        return curve_smooth_growth_data[:3].mean()
-    else:
-        return np.nan
+    return plate_curve_baseline(_as_plate(curve_smooth_growth_data))[0, 0]
 
 
 def curve_low_point(curve_smooth_growth_data, *args, **kwargs):
-    if curve_smooth_growth_data.any():
-        return np.ma.masked_invalid(np.convolve(curve_smooth_growth_data, np.ones(3) / 3., mode='valid')).min()
-    else:
-        return np.nan
+    return plate_curve_low_point(_as_plate(curve_smooth_growth_data))[0, 0]
 
 
 def curve_low_point_time(curve_smooth_growth_data, flat_times, *args, **kwargs):
-    # TODO: If a keeper make the convoloution be precalc and not done twice (se above func)
-    try:
-        return flat_times[
-            np.ma.masked_invalid(np.convolve(curve_smooth_growth_data, np.ones(3) / 3., mode='valid')).argmin() + 1]
-    except ValueError:
-        return np.nan
+    return plate_curve_low_point_time(_as_plate(curve_smooth_growth_data), flat_times)[0, 0]
 
 
 def curve_end_average(curve_smooth_growth_data, *args, **kwargs):
-    if curve_smooth_growth_data[-3:].any():
-        return curve_smooth_growth_data[-3:].mean()
-    else:
-        return np.nan
+    return plate_curve_end_average(_as_plate(curve_smooth_growth_data))[0, 0]
 
 
 def curve_monotonicity(curve_smooth_growth_data, *args, **kwargs):
-    return (np.diff(curve_smooth_growth_data[curve_smooth_growth_data.mask == np.False_]) > 0).astype(float).sum() / \
-           (curve_smooth_growth_data.size - 1)
+    return plate_curve_monotonicity(_as_plate(curve_smooth_growth_data))[0, 0]
 
 
 def growth_yield(curve_smooth_growth_data, *args, **kwargs):
-    return curve_end_average(curve_smooth_growth_data) - curve_baseline(curve_smooth_growth_data)
+    return plate_growth_yield(_as_plate(curve_smooth_growth_data))[0, 0]
 
 
 def growth_curve_doublings(curve_smooth_growth_data, *args, **kwargs):
-    return np.log2(curve_end_average(curve_smooth_growth_data)) - np.log2(curve_baseline(curve_smooth_growth_data))
+    return plate_growth_curve_doublings(_as_plate(curve_smooth_growth_data))[0, 0]
 
 
-def residual_growth(curve_smooth_growth_data, *args, **kwargs):
-    return curve_end_average(curve_smooth_growth_data) - \
-           population_size_at_generation_time(
-               curve_smooth_growth_data=curve_smooth_growth_data,
-               index=_get_generation_time_index(kwargs['derivative_values_log2'], 0),
-               **kwargs)
+def residual_growth(curve_smooth_growth_data, derivative_values_log2, linregress_extent, *args, **kwargs):
+    return plate_residual_growth(
+        curve_smooth_growth_data=_as_plate(curve_smooth_growth_data),
+        derivative_values_log2=_as_plate(derivative_values_log2),
+        linregress_extent=linregress_extent)[0, 0]
 
 
-def residual_growth_as_population_doublings(curve_smooth_growth_data, *args, **kwargs):
-    return np.log2(curve_end_average(curve_smooth_growth_data)) - \
-           np.log2(population_size_at_generation_time(
-               curve_smooth_growth_data=curve_smooth_growth_data,
-               index=_get_generation_time_index(kwargs['derivative_values_log2'], 0),
-               **kwargs))
+def residual_growth_as_population_doublings(curve_smooth_growth_data, derivative_values_log2, linregress_extent,
+                                            *args, **kwargs):
+    return plate_residual_growth_as_population_doublings(
+        curve_smooth_growth_data=_as_plate(curve_smooth_growth_data),
+        derivative_values_log2=_as_plate(derivative_values_log2),
+        linregress_extent=linregress_extent)[0, 0]
 
 
 def growth_48h(curve_smooth_growth_data, index48h, *args, **kwargs):
-    if index48h < 0 or index48h >= curve_smooth_growth_data.size:
-        _logger.warning("Faulty index {0} for 48h size (max {1})".format(index48h, curve_smooth_growth_data.size - 1))
-        return np.nan
-    return curve_smooth_growth_data[index48h]
+    return plate_growth_48h(_as_plate(curve_smooth_growth_data), index48h)[0, 0]
 
 
 def get_chapman_richards_4parameter_extended_curve(x_data, b0, b1, b2, b3, d):
@@ -206,64 +443,29 @@ def get_chapman_richards_residuals(cr_params, x_data, y_data):
 
 
 def generation_time(derivative_values_log2, index, **kwargs):
-    if index < 0:
-        _logger.warning("No GT because no finite slopes in data")
-        return np.nan
-    elif index >= derivative_values_log2.size:
-        _logger.warning("Faulty index {0} for GT (max {1})".format(index, derivative_values_log2.size - 1))
-        return np.nan
-    return 1.0 / derivative_values_log2[index]
+    return plate_generation_time(_as_plate(derivative_values_log2), np.array([[index]]))[0, 0]
 
 
 def generation_time_error(derivative_errors, index, **kwargs):
-    if index < 0:
-        _logger.warning("No GT Error because no finite slopes in data")
-        return np.nan
-    elif index >= derivative_errors.size:
-        _logger.warning("Faulty index {0} for GT error (max {1})".format(index, derivative_errors.size - 1))
-        return np.nan
-
-    return derivative_errors[index]
+    return plate_generation_time_error(_as_plate(derivative_errors), np.array([[index]]))[0, 0]
 
 
 def generation_time_when(flat_times, index, linregress_extent, **kwargs):
-    pos = index + linregress_extent
-    if pos < 0:
-        _logger.warning("No GT When because no finite slopes in data")
-        return np.nan
-    elif pos >= flat_times.size:
-        _logger.warning("Faulty index {0} for GT when (max {1})".format(pos, flat_times.size - 1))
-        return np.nan
-
-    return flat_times[pos]
+    return plate_generation_time_when(flat_times, np.array([[index]]), linregress_extent)[0, 0]
 
 
 def population_size_at_generation_time(curve_smooth_growth_data, index, linregress_extent, **kwargs):
-    pos = index + linregress_extent
-    if pos < 0:
-        _logger.warning("No GT Pop Size because no finite slopes in data")
-        return np.nan
-
-    return np.ma.median(
-        curve_smooth_growth_data[
-            max(0, pos - linregress_extent):
-            min(pos + linregress_extent + 1, curve_smooth_growth_data.size)])
+    return plate_population_size_at_generation_time(
+        _as_plate(curve_smooth_growth_data), np.array([[index]]), linregress_extent)[0, 0]
 
 
-def growth_lag(index, flat_times, derivative_values_log2, **kwargs):
-
-    if index < 0:
-        return np.nan
-
-    growth_delta = np.log2(population_size_at_generation_time(index=index, **kwargs)) - \
-                   np.log2(curve_baseline(**kwargs))
-
-    if growth_delta > 0:
-
-        return np.interp(max(0.0, growth_delta / derivative_values_log2[index]), np.arange(flat_times.size),
-                         flat_times)
-
-    return np.nan
+def growth_lag(index, flat_times, derivative_values_log2, curve_smooth_growth_data, linregress_extent, **kwargs):
+    return plate_growth_lag(
+        index=np.array([[index]]),
+        flat_times=flat_times,
+        derivative_values_log2=_as_plate(derivative_values_log2),
+        curve_smooth_growth_data=_as_plate(curve_smooth_growth_data),
+        linregress_extent=linregress_extent)[0, 0]
 
 
 def growth_velocity_vector(derivative_values_log2, **kwargs):
@@ -279,11 +481,17 @@ _generation_time_indices = None
 _kwargs = None
 
 
+def _get_plate_generation_time_index(log2_masked_derivative_data, rank):
+    """Index of the `rank`:th steepest slope per curve, -1 if not enough finite slopes"""
+    size = log2_masked_derivative_data.shape[-1]
+    finites = size - np.ma.getmaskarray(log2_masked_derivative_data).sum(axis=-1)
+    order = log2_masked_derivative_data.argsort(axis=-1)
+    index = order.reshape(-1, size)[np.arange(finites.size), np.clip(finites - (rank + 1), 0, size - 1).ravel()]
+    return np.where(finites > np.abs(rank), index.reshape(finites.shape), -1)
+
+
 def _get_generation_time_index(log2_masked_derivative_data, rank):
-    finites = log2_masked_derivative_data.size - log2_masked_derivative_data.mask.sum()
-    if finites > np.abs(rank):
-        return log2_masked_derivative_data.argsort()[:finites][-(rank + 1)]
-    return -1
+    return _get_plate_generation_time_index(_as_plate(log2_masked_derivative_data), rank)[0, 0]
 
 
 class Phenotypes(Enum):
@@ -520,3 +728,106 @@ class Phenotypes(Enum):
 
         elif self is Phenotypes.Monotonicity:
             return curve_monotonicity(**kwargs)
+
+    def calculate_plate(self, **kwargs):
+        """Calculates the phenotype for all curves on a plate at once.
+
+        Args:
+            kwargs: Plate data as given by `get_plate_preprocessed_data_for_phenotypes`
+
+        Returns:
+            `numpy.ndarray` (rows, columns) of phenotype values. For
+            `Phenotypes.GrowthVelocityVector` the array has the derivatives
+            as a third dimension.
+        """
+        if self is Phenotypes.InitialValue:
+            return plate_initial_value(**kwargs)
+
+        elif self is Phenotypes.ExperimentBaseLine:
+            return plate_curve_baseline(**kwargs)
+
+        elif self is Phenotypes.ExperimentEndAverage:
+            return plate_curve_end_average(**kwargs)
+
+        elif self is Phenotypes.ExperimentFirstTwoAverage:
+            return plate_curve_first_two_average(**kwargs)
+
+        elif self is Phenotypes.ColonySize48h:
+            return plate_growth_48h(**kwargs)
+
+        elif self is Phenotypes.GenerationTime48h:
+            return plate_generation_time(index=kwargs['index48h'], **kwargs)
+
+        elif self is Phenotypes.ExperimentGrowthYield:
+            return plate_growth_yield(**kwargs)
+
+        elif self is Phenotypes.ExperimentPopulationDoublings:
+            return plate_growth_curve_doublings(**kwargs)
+
+        elif self is Phenotypes.ResidualGrowth:
+            return plate_residual_growth(**kwargs)
+
+        elif self is Phenotypes.ResidualGrowthAsPopulationDoublings:
+            return plate_residual_growth_as_population_doublings(**kwargs)
+
+        elif self is Phenotypes.ExperimentLowPoint:
+            return plate_curve_low_point(**kwargs)
+
+        elif self is Phenotypes.ExperimentLowPointWhen:
+            return plate_curve_low_point_time(**kwargs)
+
+        elif self is Phenotypes.ChapmanRichardsFit:
+            return kwargs['chapman_richards_fit'][0]
+
+        elif self is Phenotypes.ChapmanRichardsParam1:
+            return kwargs['chapman_richards_fit'][1][..., 0]
+
+        elif self is Phenotypes.ChapmanRichardsParam2:
+            return kwargs['chapman_richards_fit'][1][..., 1]
+
+        elif self is Phenotypes.ChapmanRichardsParam3:
+            return kwargs['chapman_richards_fit'][1][..., 2]
+
+        elif self is Phenotypes.ChapmanRichardsParam4:
+            return kwargs['chapman_richards_fit'][1][..., 3]
+
+        elif self is Phenotypes.ChapmanRichardsParamXtra:
+            return kwargs['chapman_richards_fit'][1][..., 4]
+
+        elif self is Phenotypes.GenerationTime:
+            return plate_generation_time(
+                index=_get_plate_generation_time_index(kwargs['derivative_values_log2'], 0), **kwargs)
+
+        elif self is Phenotypes.GenerationTime2:
+            return plate_generation_time(
+                index=_get_plate_generation_time_index(kwargs['derivative_values_log2'], 1), **kwargs)
+
+        elif self is Phenotypes.GenerationTimeWhen:
+            return plate_generation_time_when(
+                index=_get_plate_generation_time_index(kwargs['derivative_values_log2'], 0), **kwargs)
+
+        elif self is Phenotypes.GenerationTime2When:
+            return plate_generation_time_when(
+                index=_get_plate_generation_time_index(kwargs['derivative_values_log2'], 1), **kwargs)
+
+        elif self is Phenotypes.GenerationTimeStErrOfEstimate:
+            return plate_generation_time_error(
+                index=_get_plate_generation_time_index(kwargs['derivative_values_log2'], 0), **kwargs)
+
+        elif self is Phenotypes.GenerationTime2StErrOfEstimate:
+            return plate_generation_time_error(
+                index=_get_plate_generation_time_index(kwargs['derivative_values_log2'], 1), **kwargs)
+
+        elif self is Phenotypes.GenerationTimePopulationSize:
+            return plate_population_size_at_generation_time(
+                index=_get_plate_generation_time_index(kwargs['derivative_values_log2'], 0), **kwargs)
+
+        elif self is Phenotypes.GrowthLag:
+            return plate_growth_lag(
+                index=_get_plate_generation_time_index(kwargs['derivative_values_log2'], 0), **kwargs)
+
+        elif self is Phenotypes.GrowthVelocityVector:
+            return kwargs['derivative_values_log2'].filled(np.nan)
+
+        elif self is Phenotypes.Monotonicity:
+            return plate_curve_monotonicity(**kwargs)
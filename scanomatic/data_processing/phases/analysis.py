@@ -6,7 +6,8 @@ from scipy.stats import linregress
 from scanomatic.data_processing import growth_phenotypes
 
 from scanomatic.data_processing.phases.segmentation import CurvePhases, DEFAULT_THRESHOLDS, segment, \
-    get_data_needed_for_segmentation, is_detected_non_linear, is_detected_linear, is_undetermined
+    get_data_needed_for_segmentation, is_detected_non_linear, is_detected_linear, is_undetermined, \
+    get_data_needed_for_plate_segmentation, segment_plate
 
 
 class CurvePhasePhenotypes(Enum):
@@ -245,3 +246,38 @@ def get_phase_analysis(phenotyper_object, plate, pos, thresholds=None, experimen
 
     # TODO: ensure it isn't unintentionally smoothed dydt that is uses for values, good for location though
     return model.phases, _phenotype_phases(model, experiment_doublings)
+
+
+def get_plate_phase_analysis(phenotyper_object, plate, positions, thresholds=None, experiment_doublings=None):
+    """Same as `get_phase_analysis` for several positions on a plate
+
+    The curves are segmented together, see `segment_plate`.
+
+    Args:
+        phenotyper_object (scanomatic.data_processing.Phenotyper):
+            The projects phenotyer
+        plate (int):
+            Plate index, zero-based
+        positions (list[Tuple[int]]):
+            Row and column of the positions considered
+        thresholds (dict):
+            Set of thresholds to be used.
+        experiment_doublings (list[float]):
+            Optional population doublings of each position
+
+    Returns (list[tuple]): The phases and the phases phenotypes of each position
+    """
+    if thresholds is None:
+        thresholds = DEFAULT_THRESHOLDS
+
+    models = get_data_needed_for_plate_segmentation(phenotyper_object, plate, positions, thresholds)
+    segment_plate(models, thresholds)
+
+    if experiment_doublings is None:
+
+        plate_doublings = phenotyper_object.get_phenotype(
+            growth_phenotypes.Phenotypes.ExperimentPopulationDoublings)[plate]
+        experiment_doublings = [plate_doublings[pos] for pos in positions]
+
+    return [(model.phases, _phenotype_phases(model, doublings))
+            for model, doublings in zip(models, experiment_doublings)]
@@ -176,6 +176,43 @@ def segment(segmentation_model, thresholds=None):
 
     yield None
 
+    for _ in _segment_non_flat(segmentation_model, extensions, thresholds):
+        yield None
+
+
+def segment_plate(segmentation_models, thresholds=None):
+    """Segments many curves of the same length into their CurvePhases
+
+    Gives the same phases as running `segment` on each model, but
+    the linearity extensions and the flat segments are detected for
+    all curves at once.
+
+    Args:
+        segmentation_models (list[scanomatic.models.phases_models.SegmentationModel]):
+            Data models as made by `get_data_needed_for_plate_segmentation`
+        thresholds:
+            The thresholds dictionary to be used.
+    """
+
+    if thresholds is None:
+        thresholds = DEFAULT_THRESHOLDS
+
+    if not segmentation_models:
+        return
+
+    # IMPORTANT, should be before having set flat so that there are no edge conditions.
+    extensions = get_plate_linear_non_flat_extensions(segmentation_models, thresholds)
+
+    # Mark all flats
+    _set_plate_flat_segments(segmentation_models, thresholds)
+
+    for segmentation_model, model_extensions in izip(segmentation_models, extensions):
+        for _ in _segment_non_flat(segmentation_model, model_extensions, thresholds):
+            pass
+
+
+def _segment_non_flat(segmentation_model, extensions, thresholds):
+
     set_nonflat_linearity_segments(segmentation_model, extensions, thresholds)
 
     segmentation_model.phases[
@@ -274,6 +311,82 @@ def get_data_needed_for_segmentation(phenotyper_object, plate, pos, thresholds,
     return model
 
 
+def get_data_needed_for_plate_segmentation(phenotyper_object, plate, positions, thresholds):
+    """Builds segmentation models for several curves on a plate
+
+    The derivatives and their signs are calculated for all curves at
+    once, giving the same models as `get_data_needed_for_segmentation`.
+
+    Args:
+        phenotyper_object (scanomatic.data_processing.Phenotyper):
+            The projects phenotyer
+        plate (int):
+            Plate index, zero-based
+        positions (list[Tuple[int]]):
+            Row and column of the positions considered
+        thresholds (dict):
+            Set of thresholds to be used.
+    Returns (list[scanomatic.models.settings_models.SegmentationModel]):
+        Data containers with information needed for segmentation
+    """
+    positions = [tuple(pos) for pos in positions]
+    if not positions:
+        return []
+
+    index = tuple(np.array(positions).T)
+    times = phenotyper_object.times
+
+    log2_curves = np.ma.masked_invalid(np.log2(phenotyper_object.smooth_growth_data[plate][index]))
+
+    # Smoothing kernel for derivatives
+    gauss = signal.gaussian(7, 3)
+    gauss /= gauss.sum()
+
+    # Some center weighted smoothing of derivative, we only care for general shape
+    # Direct convolution so that non-finite values don't spread across the curve
+    derivatives = phenotyper_object.get_derivative(plate, index)
+    dydt = signal.convolve(derivatives, gauss[np.newaxis], mode='valid', method='direct')
+    d_offset = (times.size - dydt.shape[1]) / 2
+    dydts = np.ma.masked_invalid(_pad_with_edge_values(dydt, d_offset))
+
+    # Smoothing in kernel shape because only want reliable trends
+    d2yd2t = signal.convolve(dydt, np.array([[1., 0., -1.]]), mode='valid', method='direct')
+    d2yd2t = signal.convolve(d2yd2t, gauss[np.newaxis], mode='valid', method='direct')
+    d2_offset = (times.size - d2yd2t.shape[1]) / 2
+    d2yd2ts = np.ma.masked_invalid(_pad_with_edge_values(d2yd2t, d2_offset))
+
+    # Determine second derivative signs
+    d2yd2t_signs = np.sign(d2yd2ts.filled(0))
+    has_d2yd2t = ~np.ma.getmaskarray(d2yd2ts).all(axis=1)
+    if has_d2yd2t.any():
+        d2yd2t_std = d2yd2ts[has_d2yd2t].std(axis=1).filled(np.nan)
+        d2yd2t_signs[has_d2yd2t] = np.where(
+            (np.abs(d2yd2ts[has_d2yd2t]) <
+             thresholds[Thresholds.SecondDerivativeSigmaAsNotZero] * d2yd2t_std[:, np.newaxis]).data,
+            0, d2yd2t_signs[has_d2yd2t])
+
+    # Determine first derivative signs for flatness questions
+    dydt_signs = np.sign(dydts.filled(0))
+    dydt_signs[(np.abs(dydts) < thresholds[Thresholds.FlatlineSlopRequirement]).data] = 0
+
+    models = []
+    for i, pos in enumerate(positions):
+
+        model = SegmentationModel(
+            plate=plate, pos=pos, log2_curve=log2_curves[i], times=times, dydt=dydts[i], d2yd2t=d2yd2ts[i],
+            dydt_signs=dydt_signs[i], d2yd2t_signs=d2yd2t_signs[i], offset=0)
+
+        model.phases = np.ones_like(model.log2_curve).astype(np.int) * CurvePhases.Undetermined.value
+        models.append(model)
+
+    return models
+
+
+def _pad_with_edge_values(data, width):
+
+    return np.hstack((np.repeat(data[:, :1], width, axis=1), data, np.repeat(data[:, -1:], width, axis=1)))
+
+
 def get_curve_classification_in_steps(phenotyper, plate, position, thresholds=None):
     if thresholds is None:
         thresholds = DEFAULT_THRESHOLDS
@@ -367,6 +480,17 @@ def _set_flat_segments(model, thresholds):
             model.phases[left: right] = CurvePhases.Flat.value
 
 
+def _set_plate_flat_segments(models, thresholds):
+
+    flats = _bridge_plate_canditates(np.array([model.dydt_signs == 0 for model in models]))
+    lengths = _get_plate_candidate_lengths(flats)
+    flats &= lengths >= thresholds[Thresholds.PhaseMinimumLength]
+
+    for model, model_flats in izip(models, flats):
+        model.phases[...] = CurvePhases.UndeterminedNonFlat.value
+        model.phases[model_flats] = CurvePhases.Flat.value
+
+
 def get_tangent_proximity(model, loc, thresholds):
 
     # Getting back the sign and values for linear model
@@ -593,6 +717,30 @@ def _bridge_canditates(candidates, structure=(True, True, True, True, True)):
     return binary_closing(candidates.astype(bool), structure=structure) | candidates.astype(bool)
 
 
+def _bridge_plate_canditates(candidates, structure=(True, True, True, True, True)):
+    """Same as `_bridge_canditates` for each vector along the last axis"""
+    candidates = candidates.astype(bool)
+    shape = candidates.shape
+    candidates = candidates.reshape(-1, shape[-1])
+    return (binary_closing(candidates, structure=np.array(structure, ndmin=2)) | candidates).reshape(shape)
+
+
+def _get_plate_candidate_lengths(candidates):
+    """Length of the stretch of candidates that each position is part of
+
+    Args:
+        candidates (numpy.ndarray): Boolean array, stretches are
+            along the last axis
+
+    Returns (numpy.ndarray): Stretch lengths, zero for non-candidates
+    """
+    size = candidates.shape[-1]
+    positions = np.arange(size)
+    lefts = np.maximum.accumulate(np.where(candidates, -1, positions), axis=-1)
+    rights = np.minimum.accumulate(np.where(candidates, size, positions)[..., ::-1], axis=-1)[..., ::-1]
+    return np.where(candidates, rights - lefts - 1, 0)
+
+
 def classifier_nonlinear(model, thresholds, filt, test_edge):
     """ Classifies non-linear segments
 
@@ -826,6 +974,63 @@ def get_linear_non_flat_extension_per_position(model, thresholds):
     return extension_lengths, extension_borders
 
 
+def get_plate_linear_non_flat_extensions(models, thresholds, max_elements=2 ** 22):
+    """Same extension lengths as `get_linear_non_flat_extension_per_position`
+    but for several models at once.
+
+    The tangents at every position of the curves are compared to the
+    curves as a (curves, positions, times) array, processing as many
+    curves at a time as `max_elements` allows.
+
+    Args:
+        models (list[scanomatic.models.phases_models.SegmentationModel]):
+            Data containers for curves of equal length
+        thresholds (dict):
+            Set of thresholds to use
+        max_elements (int):
+            Maximum size of the intermediate arrays
+
+    Returns (numpy.ndarray): Extension lengths, one row per model
+    """
+    times = models[0].times
+    size = times.size
+    chunk = max(1, max_elements // (size * size))
+    time_deltas = times[np.newaxis, np.newaxis] - times[np.newaxis, :, np.newaxis]
+    diagonal = np.arange(size)
+
+    extension_lengths = np.zeros((len(models), size), dtype=np.int)
+
+    for start in range(0, len(models), chunk):
+
+        chunk_models = models[start: start + chunk]
+
+        filt = np.array([np.ma.filled(model.phases != CurvePhases.Flat.value, False) for model in chunk_models])
+        log2_curves = np.array([np.ma.getdata(model.log2_curve) for model in chunk_models])
+        curves_mask = np.array([np.ma.getmaskarray(model.log2_curve) for model in chunk_models])
+        slopes_mask = np.array([np.ma.getmaskarray(model.dydt) for model in chunk_models])
+
+        loc_slopes = np.array([np.ma.getdata(model.dydt) for model in chunk_models])[..., np.newaxis]
+        loc_values = log2_curves[..., np.newaxis]
+
+        # Tangents at all positions
+        tangents = time_deltas * loc_slopes + loc_values
+
+        with np.errstate(invalid='ignore'):
+            candidates = (np.abs(log2_curves[:, np.newaxis] - tangents) <
+                          np.abs(thresholds[Thresholds.LinearModelExtension] * loc_slopes))
+
+        # Masked curve values are never close to a tangent and masked positions have no tangent
+        candidates &= (filt & ~curves_mask)[:, np.newaxis]
+        candidates &= (filt & ~curves_mask & ~slopes_mask)[..., np.newaxis]
+
+        candidates = _bridge_plate_canditates(candidates)
+
+        # Only the stretch including the position itself counts
+        extension_lengths[start: start + chunk] = _get_plate_candidate_lengths(candidates)[:, diagonal, diagonal]
+
+    return extension_lengths
+
+
 def get_barad_dur_towers(extension_lengths, filt, thresholds):
 
     peaks = np.hstack(([0], signal.convolve(extension_lengths, [-1, 2, -1], mode='valid'), [0]))
@@ -1,8 +1,11 @@
 import csv
 import glob
 import os
+import shutil
+import tempfile
 
 from collections import deque
+from functools import partial
 from itertools import izip, product, chain
 from types import StringTypes
 import cPickle as pickle
@@ -26,13 +29,15 @@ import scanomatic.io.xml.reader as xml_reader_module
 import scanomatic.io.logger as logger
 import scanomatic.io.paths as paths
 import scanomatic.io.image_data as image_data
-from scanomatic.data_processing.growth_phenotypes import Phenotypes, get_preprocessed_data_for_phenotypes, \
-    get_derivative, get_chapman_richards_4parameter_extended_curve
+from scanomatic.data_processing.growth_phenotypes import Phenotypes, get_plate_preprocessed_data_for_phenotypes, \
+    get_plate_derivative, get_chapman_richards_4parameter_extended_curve
 from scanomatic.data_processing.phases.features import extract_phenotypes, \
     CurvePhaseMetaPhenotypes, VectorPhenotypes
-from scanomatic.data_processing.phases.analysis import get_phase_analysis
+from scanomatic.data_processing.phases.analysis import get_plate_phase_analysis
+from scanomatic.data_processing.phenotyper_state import StateFile, save_state_file
 from scanomatic.data_processing.phenotypes import PhenotypeDataType, infer_phenotype_from_name
 from scanomatic.generics.phenotype_filter import FilterArray, Filter
+from scanomatic.generics.worker_pool import get_process_pool
 from scanomatic.io.meta_data import MetaData2 as MetaData
 from scanomatic.data_processing.strain_selector import StrainSelector
 from scanomatic.data_processing.norm import Offsets, get_normalized_data, get_reference_positions, norm_by_log2_diff, \
@@ -215,21 +220,21 @@ def path_has_saved_project_state(directory_path, require_phenotypes=True):
 
     _p = paths.Paths()
 
-    if require_phenotypes:
+    state_file_path = os.path.join(directory_path, _p.phenotyper_state)
+    if os.path.isfile(state_file_path):
+        if not require_phenotypes:
+            return True
         try:
-            unpickle_with_unpickler(np.load, os.path.join(directory_path, _p.phenotypes_raw_npy))
-        except IOError:
+            with StateFile(state_file_path) as state_file:
+                return 'phenotypes/plates' in state_file
+        except (IOError, ValueError, KeyError):
             return False
 
-    try:
-        unpickle_with_unpickler(np.load, os.path.join(directory_path,  _p.phenotypes_input_data))
-        unpickle_with_unpickler(np.load, os.path.join(directory_path, _p.phenotype_times))
-        unpickle_with_unpickler(np.load, os.path.join(directory_path, _p.phenotypes_input_smooth))
-        unpickle_with_unpickler(np.load, os.path.join(directory_path, _p.phenotypes_extraction_params))
-    except IOError:
+    if require_phenotypes and not os.path.isfile(os.path.join(directory_path, _p.phenotypes_raw_npy)):
         return False
 
-    return True
+    return all(os.path.isfile(os.path.join(directory_path, path)) for path in (
+        _p.phenotypes_input_data, _p.phenotype_times, _p.phenotypes_input_smooth, _p.phenotypes_extraction_params))
 
 
 def get_project_dates(directory_path):
@@ -240,13 +245,18 @@ def get_project_dates(directory_path):
 
     analysis_date = None
     _p = paths.Paths()
-    image_data_files = glob.glob(os.path.join(directory_path, _p.image_analysis_img_data.format("*")))
+    image_data_files = [
+        path for pattern in (_p.image_analysis_img_data, _p.image_analysis_plate_data)
+        for path in glob.glob(os.path.join(directory_path, pattern.format("*")))]
     if image_data_files:
         analysis_date = max(most_recent(os.stat(p)) for p in image_data_files)
     try:
-        phenotype_date = most_recent(os.stat(os.path.join(directory_path, _p.phenotypes_raw_npy)))
+        phenotype_date = most_recent(os.stat(os.path.join(directory_path, _p.phenotyper_state)))
     except OSError:
-        phenotype_date = None
+        try:
+            phenotype_date = most_recent(os.stat(os.path.join(directory_path, _p.phenotypes_raw_npy)))
+        except OSError:
+            phenotype_date = None
 
     state_date = phenotype_date
 
@@ -271,7 +281,7 @@ def remove_state_from_path(directory_path):
     for path in (_p.phenotypes_input_data, _p.phenotype_times, _p.phenotypes_input_smooth,
                  _p.phenotypes_extraction_params, _p.phenotypes_filter, _p.phenotypes_filter_undo,
                  _p.phenotypes_meta_data, _p.normalized_phenotypes, _p.vector_phenotypes_raw,
-                 _p.vector_meta_phenotypes_raw, _p.phenotypes_reference_offsets):
+                 _p.vector_meta_phenotypes_raw, _p.phenotypes_reference_offsets, _p.phenotyper_state):
 
         file_path = os.path.join(directory_path, path)
         try:
@@ -285,6 +295,21 @@ def remove_state_from_path(directory_path):
         _logger.info("Removed {0} pre-existing phenotype state files".format(n))
 
 
+def convert_legacy_state(directory_path):
+    """Converts a state saved as separate numpy files to a state file.
+
+    The legacy files are removed once the state file is saved.
+
+    Args:
+        directory_path: The directory of the saved state
+
+    Returns (str): Path to the state file
+    """
+    phenotyper = Phenotyper._load_legacy_state(directory_path, False)
+    phenotyper.save_state(directory_path, ask_if_overwrite=False)
+    return os.path.join(directory_path, paths.Paths().phenotyper_state)
+
+
 class Smoothing(Enum):
     Keep = 0
     """:type : Smoothing"""
@@ -294,6 +319,8 @@ class Smoothing(Enum):
     """:type : Smoothing"""
     PolynomialWeightedMulti = 3
     """:type : Smoothing"""
+    PolynomialWeightedMultiBatched = 4
+    """:type : Smoothing"""
 
 
 class SaveData(Enum):
@@ -357,6 +384,87 @@ class NormState(Enum):
 # TODO: Phenotypes should possibly not be indexed based on enum value either and use dict like the undo/filter
 
 
+def _load_state_array(path, mmap=False):
+    """Loads an array saved in a phenotyper state.
+
+    Args:
+        path: Path to the saved array
+        mmap: Optional, if the array should be memory mapped (copy on
+            write). Arrays holding python objects, such as plates of
+            different shapes, can't be memory mapped and are read in full.
+            Default is `False`.
+
+    Returns: numpy.ndarray
+    """
+    if mmap:
+        with open(path, 'rb') as fh:
+            try:
+                version = np.lib.format.read_magic(fh)
+                if version == (1, 0):
+                    _, _, dtype = np.lib.format.read_array_header_1_0(fh)
+                else:
+                    _, _, dtype = np.lib.format.read_array_header_2_0(fh)
+            except ValueError:
+                dtype = None
+
+        if dtype is not None and not dtype.hasobject:
+            return np.load(path, mmap_mode='c')
+
+    return unpickle_with_unpickler(np.load, path)
+
+
+def _save_state_array(path, data):
+    """Saves an array by replacing the file so memory maps of the old file stay valid."""
+    temp_path = path + ".tmp"
+    with open(temp_path, 'wb') as fh:
+        np.save(fh, data)
+
+    try:
+        os.rename(temp_path, path)
+    except OSError:
+        os.remove(path)
+        os.rename(temp_path, path)
+
+
+def _is_empty_growth_data(data):
+    """If growth data is a placeholder for no data, memory mapped data is not read."""
+
+    if not isinstance(data, np.ndarray):
+        return False
+    elif data.size == 0:
+        return True
+    elif data.dtype == np.object:
+        return all(plate is None for plate in data)
+
+    return not isinstance(data, np.memmap) and not data.any()
+
+
+class _LazyStateData(object):
+    """Phenotyper attribute that can be pending loading from a saved state.
+
+    Any access to the attribute, including assigning it, first runs the
+    state loader registered for `loader_key` in `_lazy_loaders` if there is
+    one pending.
+    """
+    def __init__(self, name, loader_key):
+
+        self._name = name
+        self._loader_key = loader_key
+
+    def __get__(self, instance, owner):
+
+        if instance is None:
+            return self
+
+        instance._load_lazy_state(self._loader_key)
+        return instance.__dict__.get(self._name)
+
+    def __set__(self, instance, value):
+
+        instance._load_lazy_state(self._loader_key)
+        instance.__dict__[self._name] = value
+
+
 class Phenotyper(mock_numpy_interface.NumpyArrayInterface):
     """The Phenotyper class is a class for producing phenotypes
     based on growth curves as well as storing and easy displaying them.
@@ -388,6 +496,16 @@ class Phenotyper(mock_numpy_interface.NumpyArrayInterface):
 
     UNDO_HISTORY_LENGTH = 50
 
+    _smooth_growth_data = _LazyStateData('_smooth_growth_data', 'smooth_growth_data')
+    _phenotypes = _LazyStateData('_phenotypes', 'phenotypes')
+    _vector_phenotypes = _LazyStateData('_vector_phenotypes', 'phenotypes')
+    _vector_meta_phenotypes = _LazyStateData('_vector_meta_phenotypes', 'phenotypes')
+    _normalized_phenotypes = _LazyStateData('_normalized_phenotypes', 'phenotypes')
+    _phenotype_filter = _LazyStateData('_phenotype_filter', 'phenotypes')
+    _phenotype_filter_undo = _LazyStateData('_phenotype_filter_undo', 'phenotypes')
+    _reference_surface_positions = _LazyStateData('_reference_surface_positions', 'phenotypes')
+    _meta_data = _LazyStateData('_meta_data', 'meta_data')
+
     def __init__(self, raw_growth_data, times_data=None,
                  median_kernel_size=5,
                  gaussian_filter_sigma=1.5,
@@ -399,9 +517,18 @@ class Phenotyper(mock_numpy_interface.NumpyArrayInterface):
 
         self._logger = logger.Logger("Phenotyper")
         self._paths = paths.Paths()
+        self._lazy_loaders = {}
+
+        if isinstance(raw_growth_data, xml_reader_module.XML_Reader):
+
+            if times_data is None:
+                times_data = raw_growth_data.get_scan_times()
+
+            raw_growth_data = raw_growth_data.get_growth_data()
 
         self._raw_growth_data = raw_growth_data
         self._smooth_growth_data = None
+        self._derivatives = None
 
         self._phenotypes = phenotypes
         self._vector_phenotypes = None
@@ -413,11 +540,6 @@ class Phenotyper(mock_numpy_interface.NumpyArrayInterface):
         self._phenotypes_inclusion = phenotypes_inclusion
         self._base_name = base_name
 
-        if isinstance(raw_growth_data, xml_reader_module.XML_Reader):
-
-            if times_data is None:
-                times_data = raw_growth_data.get_scan_times()
-
         self.times = times_data
 
         assert self._times_data is not None, "A data series needs its times"
@@ -546,6 +668,9 @@ class Phenotyper(mock_numpy_interface.NumpyArrayInterface):
 
         Optional Parameters can be passed as keywords and will be
         used in instantiating the class.
+
+        The xml-file is read in a single pass and the blob pixel sums
+        are used as growth data, or the only measure of slimmed files.
         """
 
         xml = xml_reader_module.XML_Reader(path)
@@ -555,7 +680,7 @@ class Phenotyper(mock_numpy_interface.NumpyArrayInterface):
         return cls(xml, base_name=path, run_extraction=True, **kwargs)
 
     @classmethod
-    def LoadFromState(cls, directory_path):
+    def LoadFromState(cls, directory_path, lazy=False):
         """Creates an instance based on previously saved phenotyper state
         in specified directory.
 
@@ -564,43 +689,98 @@ class Phenotyper(mock_numpy_interface.NumpyArrayInterface):
             directory_path (str):
                 Path to the directory holding the relevant files
 
+            lazy (bool):
+                Optional, if `True` the smooth growth data, the phenotypes
+                (including filters, normalized phenotypes and reference
+                offsets) and the meta-data are first read when used.
+                The raw and smooth growth data are also memory mapped.
+                Default is `False`.
+
         Returns:
 
             Phenotyper instance
         """
-        _p = paths.Paths()
+        state_file_path = os.path.join(directory_path, paths.Paths().phenotyper_state)
+        if os.path.isfile(state_file_path):
+            return cls._load_state_file(state_file_path, directory_path, lazy)
 
-        raw_growth_data = unpickle_with_unpickler(np.load, os.path.join(directory_path,  _p.phenotypes_input_data))
+        return cls._load_legacy_state(directory_path, lazy)
 
-        times = unpickle_with_unpickler(np.load, os.path.join(directory_path, _p.phenotype_times))
+    @classmethod
+    def _load_state_file(cls, state_file_path, directory_path, lazy):
+
+        with StateFile(state_file_path) as state_file:
+            phenotyper = cls(state_file.get_raw_growth_data(mmap=lazy), state_file.times, run_extraction=False,
+                             base_name=directory_path)
+            settings = state_file.settings
+
+        if settings:
+            phenotyper._median_kernel_size = int(settings['median_kernel_size'])
+            phenotyper._gaussian_filter_sigma = float(settings['gaussian_filter_sigma'])
+            phenotyper._linear_regression_size = int(settings['linear_regression_size'])
+            phenotyper._no_growth_monotonicity_threshold = float(settings['no_growth_monotonicity_threshold'])
+            phenotyper._no_growth_pop_doublings_threshold = float(settings['no_growth_pop_doublings_threshold'])
+            phenotyper.set_phenotype_inclusion_level(
+                PhenotypeDataType[settings['phenotypes_inclusion'] or 'Trusted'])
+
+        loaders = (
+            ('smooth_growth_data', partial(phenotyper._load_state_file_smooth_growth_data, state_file_path, lazy)),
+            ('phenotypes', partial(phenotyper._load_state_file_phenotypes, state_file_path)),
+            ('meta_data', partial(phenotyper._load_state_file_meta_data, state_file_path)))
+
+        if lazy:
+            phenotyper._lazy_loaders.update(loaders)
+        else:
+            for _, loader in loaders:
+                loader()
 
-        phenotyper = cls(raw_growth_data, times, run_extraction=False, base_name=directory_path)
+        return phenotyper
 
-        try:
-            phenotypes = unpickle_with_unpickler(np.load, os.path.join(directory_path, _p.phenotypes_raw_npy))
-        except (IOError, ValueError):
-            phenotyper._logger.warning(
-                "Could not load Phenotypes, probably too old extraction, please rerun!")
-            phenotypes = None
+    def _load_state_file_smooth_growth_data(self, state_file_path, mmap):
 
-        try:
-            vector_phenotypes = unpickle_with_unpickler(
-                np.load, os.path.join(directory_path, _p.vector_phenotypes_raw))
-        except (IOError, ValueError):
-            phenotyper._logger.warning(
-                "Could not load Vector Phenotypes, probably too old extraction, please rerun!")
-            vector_phenotypes = None
+        with StateFile(state_file_path) as state_file:
+            self.set('smooth_growth_data', state_file.get_smooth_growth_data(mmap=mmap))
 
-        try:
-            vector_meta_phenotypes = unpickle_with_unpickler(
-                np.load, os.path.join(directory_path, _p.vector_meta_phenotypes_raw))
-        except (IOError, ValueError):
-            phenotyper._logger.warning(
-                "Could not load Vector Meta Phenotypes, probably too old extraction, please rerun!")
-            vector_meta_phenotypes = None
+    def _load_state_file_phenotypes(self, state_file_path):
+
+        def as_settable(data):
+            return np.array([]) if data is None else data
+
+        with StateFile(state_file_path) as state_file:
+
+            self.set('phenotypes', as_settable(state_file.get_phenotypes()))
+            self.set('vector_phenotypes', as_settable(state_file.get_vector_phenotypes()))
+            self.set('vector_meta_phenotypes', as_settable(state_file.get_vector_meta_phenotypes()))
+            self.set('phenotype_filter', as_settable(state_file.get_phenotype_filters()))
+
+            reference_offsets = state_file.get_reference_offsets()
+            if reference_offsets is not None:
+                self.set('reference_offsets', reference_offsets)
 
-        smooth_growth_data = unpickle_with_unpickler(
-            np.load, os.path.join(directory_path, _p.phenotypes_input_smooth))
+            self.set('normalized_phenotypes', as_settable(state_file.get_normalized_phenotypes()))
+
+            phenotype_filter_undo = state_file.get_phenotype_filter_undo()
+            if phenotype_filter_undo is not None:
+                self.set('phenotype_filter_undo', phenotype_filter_undo)
+
+    def _load_state_file_meta_data(self, state_file_path):
+
+        with StateFile(state_file_path) as state_file:
+            meta_data = state_file.get_meta_data()
+
+        if meta_data is not None:
+            self.set('meta_data', meta_data)
+
+    @classmethod
+    def _load_legacy_state(cls, directory_path, lazy):
+
+        _p = paths.Paths()
+
+        raw_growth_data = _load_state_array(os.path.join(directory_path,  _p.phenotypes_input_data), mmap=lazy)
+
+        times = unpickle_with_unpickler(np.load, os.path.join(directory_path, _p.phenotype_times))
+
+        phenotyper = cls(raw_growth_data, times, run_extraction=False, base_name=directory_path)
 
         try:
             extraction_params = unpickle_with_unpickler(
@@ -642,47 +822,97 @@ class Phenotyper(mock_numpy_interface.NumpyArrayInterface):
                 phenotyper._gaussian_filter_sigma = float(gauss_sigma)
                 phenotyper._linear_regression_size = int(linear_reg_size)
 
-        phenotyper.set('smooth_growth_data', smooth_growth_data)
-        phenotyper.set('phenotypes', phenotypes)
-        phenotyper.set('vector_phenotypes', vector_phenotypes)
-        phenotyper.set('vector_meta_phenotypes', vector_meta_phenotypes)
+        loaders = (
+            ('smooth_growth_data', partial(phenotyper._load_state_smooth_growth_data, directory_path, lazy)),
+            ('phenotypes', partial(phenotyper._load_state_phenotypes, directory_path)),
+            ('meta_data', partial(phenotyper._load_state_meta_data, directory_path)))
+
+        if lazy:
+            phenotyper._lazy_loaders.update(loaders)
+        else:
+            for _, loader in loaders:
+                loader()
+
+        return phenotyper
+
+    def _load_lazy_state(self, loader_key):
+
+        loader = self.__dict__.get('_lazy_loaders', {}).pop(loader_key, None)
+        if loader is not None:
+            loader()
+
+    def _load_state_smooth_growth_data(self, directory_path, mmap):
+
+        self.set('smooth_growth_data', _load_state_array(
+            os.path.join(directory_path, self._paths.phenotypes_input_smooth), mmap=mmap))
+
+    def _load_state_phenotypes(self, directory_path):
+
+        _p = self._paths
+
+        try:
+            phenotypes = unpickle_with_unpickler(np.load, os.path.join(directory_path, _p.phenotypes_raw_npy))
+        except (IOError, ValueError):
+            self._logger.warning(
+                "Could not load Phenotypes, probably too old extraction, please rerun!")
+            phenotypes = None
+
+        try:
+            vector_phenotypes = unpickle_with_unpickler(
+                np.load, os.path.join(directory_path, _p.vector_phenotypes_raw))
+        except (IOError, ValueError):
+            self._logger.warning(
+                "Could not load Vector Phenotypes, probably too old extraction, please rerun!")
+            vector_phenotypes = None
+
+        try:
+            vector_meta_phenotypes = unpickle_with_unpickler(
+                np.load, os.path.join(directory_path, _p.vector_meta_phenotypes_raw))
+        except (IOError, ValueError):
+            self._logger.warning(
+                "Could not load Vector Meta Phenotypes, probably too old extraction, please rerun!")
+            vector_meta_phenotypes = None
+
+        self.set('phenotypes', phenotypes)
+        self.set('vector_phenotypes', vector_phenotypes)
+        self.set('vector_meta_phenotypes', vector_meta_phenotypes)
 
         filter_path = os.path.join(directory_path, _p.phenotypes_filter)
         if os.path.isfile(filter_path):
-            phenotyper._logger.info("Loading previous filter {0}".format(filter_path))
+            self._logger.info("Loading previous filter {0}".format(filter_path))
             try:
-                phenotyper.set("phenotype_filter", unpickle_with_unpickler(np.load, filter_path))
+                self.set("phenotype_filter", unpickle_with_unpickler(np.load, filter_path))
             except (ValueError, IOError):
-                phenotyper._logger.warning(
+                self._logger.warning(
                     "Could not load QC Filter, probably too old extraction, please rerun!")
 
         offsets_path = os.path.join(directory_path, _p.phenotypes_reference_offsets)
         if os.path.isfile(offsets_path):
-            phenotyper.set("reference_offsets", unpickle_with_unpickler(np.load, offsets_path))
+            self.set("reference_offsets", unpickle_with_unpickler(np.load, offsets_path))
 
         normalized_phenotypes = os.path.join(directory_path, _p.normalized_phenotypes)
         if os.path.isfile(normalized_phenotypes):
             try:
-                phenotyper.set("normalized_phenotypes", unpickle_with_unpickler(np.load, normalized_phenotypes))
+                self.set("normalized_phenotypes", unpickle_with_unpickler(np.load, normalized_phenotypes))
             except (ValueError, IOError):
-                phenotyper._logger.warning(
+                self._logger.warning(
                     "Could not load Normalized Phenotypes, probably too old extraction, please rerun!")
 
         filter_undo_path = os.path.join(directory_path, _p.phenotypes_filter_undo)
         if os.path.isfile(filter_undo_path):
             try:
-                phenotyper.set("phenotype_filter_undo", unpickle(filter_undo_path))
+                self.set("phenotype_filter_undo", unpickle(filter_undo_path))
             except EOFError:
-                phenotyper._logger.warning("Could not load saved undo, file corrupt!")
+                self._logger.warning("Could not load saved undo, file corrupt!")
 
-        meta_data_path = os.path.join(directory_path, _p.phenotypes_meta_data)
+    def _load_state_meta_data(self, directory_path):
+
+        meta_data_path = os.path.join(directory_path, self._paths.phenotypes_meta_data)
         if os.path.isfile(meta_data_path):
             try:
-                phenotyper.set("meta_data", unpickle(meta_data_path))
+                self.set("meta_data", unpickle(meta_data_path))
             except EOFError:
-                phenotyper._logger.warning("Could not load saved meta-data, file corrupt!")
-
-        return phenotyper
+                self._logger.warning("Could not load saved meta-data, file corrupt!")
 
     @classmethod
     def LoadFromImageData(cls, path='.', phenotype_inclusion=None):
@@ -848,14 +1078,14 @@ class Phenotyper(mock_numpy_interface.NumpyArrayInterface):
         return StrainSelector(self, tuple((zip(*s) if plates is None or i in plates else tuple())
                                           for i, s in enumerate(selection)))
 
-    def iterate_extraction(self, keep_filter=False):
+    def iterate_extraction(self, keep_filter=False, workers=1):
 
         self._logger.info(
             "Iteration started, will extract {0} phenotypes".format(
                 self.get_number_of_phenotypes()))
 
         if not self.has_smooth_growth_data:
-            self._smoothen()
+            self._smoothen(workers=workers)
             self._logger.info("Smoothed")
             yield 0
         else:
@@ -863,7 +1093,7 @@ class Phenotyper(mock_numpy_interface.NumpyArrayInterface):
 
         self.wipe_extracted_phenotypes(keep_filter)
 
-        for x in self._calculate_phenotypes():
+        for x in self._calculate_phenotypes(workers=workers):
             self._logger.debug("Phenotype extraction iteration")
             yield x
 
@@ -901,7 +1131,8 @@ class Phenotyper(mock_numpy_interface.NumpyArrayInterface):
                 self._logger.info("Removing filter undo history")
             self._phenotype_filter_undo = None
 
-    def extract_phenotypes(self, keep_filter=False, smoothing=Smoothing.PolynomialWeightedMulti, smoothing_coeffs={}):
+    def extract_phenotypes(self, keep_filter=False, smoothing=Smoothing.PolynomialWeightedMulti, smoothing_coeffs={},
+                           workers=1):
         """Extract phenotypes given the current inclusion level
 
         Args:
@@ -917,11 +1148,23 @@ class Phenotyper(mock_numpy_interface.NumpyArrayInterface):
                 Or `Smoothing.Polynomial` for polynomial smoothing, or
                 `Smoothing.PolynomialWeightedMulti` if fancy weighting of
                 all relevant polynomials should be used.
+                `Smoothing.PolynomialWeightedMultiBatched` gives the same
+                result as `Smoothing.PolynomialWeightedMulti` but solves
+                all curves of a plate at once, which is much faster.
             smoothing_coeffs:
                 Optional dict of key-value parameters for the smoothing
                 to override default values.
+            workers:
+                Optional number of processes to use. Default is to
+                do all work in the current process. With more workers
+                the plates are split into chunks of rows that are
+                processed in parallel. `Smoothing.Polynomial` and
+                `Smoothing.PolynomialWeightedMultiBatched` smoothing
+                always run in the current process.
 
         See Also:
+            Phenotyper.iterate_phenotype_extraction:
+                The same extraction, reporting progress.
             Phenotyper.set_phenotype_inclusion_level:
                 How to change what phenotypes are extracted
             Phenotyper.get_phenotype:
@@ -929,6 +1172,17 @@ class Phenotyper(mock_numpy_interface.NumpyArrayInterface):
             Phenotyper.normalize_phenotypes:
                 Normalize phenotypes.
         """
+        for _ in self.iterate_phenotype_extraction(
+                keep_filter=keep_filter, smoothing=smoothing, smoothing_coeffs=smoothing_coeffs, workers=workers):
+            pass
+
+    def iterate_phenotype_extraction(self, keep_filter=False, smoothing=Smoothing.PolynomialWeightedMulti,
+                                     smoothing_coeffs={}, workers=1):
+        """Extract phenotypes yielding the fraction of curves done.
+
+        Takes the same arguments as `Phenotyper.extract_phenotypes`.
+        Phenotypes are only complete once the iteration is exhausted.
+        """
         self.wipe_extracted_phenotypes(keep_filter)
 
         self._logger.info("Selecting smoothing.")
@@ -936,16 +1190,22 @@ class Phenotyper(mock_numpy_interface.NumpyArrayInterface):
         if not self.has_smooth_growth_data and smoothing is Smoothing.Keep:
             self._logger.warning(
                 "There was no previous smooth data but setting was to keep previous, will run default.")
-            self._poly_smoothen_raw_growth_weighted(**smoothing_coeffs)
+            self._poly_smoothen_raw_growth_weighted(workers=workers, **smoothing_coeffs)
         elif smoothing is Smoothing.MedianGauss:
-            self._smoothen()
-        elif smoothing is Smoothing.Polynomial:
-            self._poly_smoothen_raw_growth(**smoothing_coeffs)
+            self._smoothen(workers=workers)
         elif smoothing is Smoothing.PolynomialWeightedMulti:
-            self._poly_smoothen_raw_growth_weighted(**smoothing_coeffs)
+            self._poly_smoothen_raw_growth_weighted(workers=workers, **smoothing_coeffs)
+        elif smoothing in (Smoothing.Polynomial, Smoothing.PolynomialWeightedMultiBatched):
+            if workers > 1:
+                self._logger.info("{0} smoothing runs in the current process, workers only used for phenotypes".format(
+                    smoothing.name))
+            if smoothing is Smoothing.Polynomial:
+                self._poly_smoothen_raw_growth(**smoothing_coeffs)
+            else:
+                self._poly_smoothen_raw_growth_weighted_batched(**smoothing_coeffs)
 
-        for _ in self._calculate_phenotypes():
-            pass
+        for progress in self._calculate_phenotypes(workers=workers):
+            yield progress
 
         self._init_remove_filter_and_undo_actions()
 
@@ -995,80 +1255,117 @@ class Phenotyper(mock_numpy_interface.NumpyArrayInterface):
             smooth_data.append(smooth_plate.reshape(plate.shape))
 
         self._smooth_growth_data = np.array(smooth_data)
+        self._derivatives = None
 
         self._logger.info("Completed Polynomial smoothing")
 
     def _poly_smoothen_raw_growth_weighted(self, power=3, time_delta=5.1, gauss_sigma=1.5, apply_median=True,
-                                           edge_condition=EdgeCondition.Reflect):
+                                           edge_condition=EdgeCondition.Reflect, workers=1):
 
         assert power > 1, "Power must be 2 or greater"
 
         self._logger.info(
             "Starting Weighted Multi-Polynomial smoothing"
-            " (Power {0}; Time delta {1}h; Gauss sigma {2}h; {3}; {4}".format(
+            " (Power {0}; Time delta {1}h; Gauss sigma {2}h; {3}; {4}{5}".format(
                 power, time_delta, gauss_sigma, "Median filter" if apply_median else "No median filter",
-                edge_condition
+                edge_condition, "; {0} workers".format(workers) if workers > 1 else ""
         ))
 
-        median_kernel = np.ones((1, self._median_kernel_size))
-        smooth_data = []
+        times, _, left_filt, right_filt = self._get_weighted_poly_smoothing_times(time_delta, edge_condition)
+        self._logger.info("Data with edge condition has length {0}, ({1} {2})".format(
+            times.size, left_filt.sum(), right_filt.sum()))
+
+        smoothing_coeffs = {
+            'power': power, 'time_delta': time_delta, 'gauss_sigma': gauss_sigma, 'apply_median': apply_median,
+            'edge_condition': edge_condition}
+
+        smooth_data = [None if plate is None else np.empty(plate.shape, dtype=np.float)
+                       for plate in self._raw_growth_data]
+
+        tasks = self._get_row_tasks(self._raw_growth_data, workers)
+        if workers > 1:
+            results = self._iterate_tasks_in_pool(
+                workers, self._raw_growth_data, partial(_poly_smoothen_rows_weighted_in_worker, smoothing_coeffs),
+                tasks)
+        else:
+            results = (self._poly_smoothen_rows_weighted(*task, **smoothing_coeffs) for task in tasks)
+
+        for (id_plate, row_start, row_stop), smooth_rows in izip(tasks, results):
+
+            smooth_data[id_plate][row_start: row_stop] = smooth_rows
+
+            if row_stop == smooth_data[id_plate].shape[0]:
+                self._logger.info("Plate {0} data polynomial smoothed ({1} curves, {2} data-points per curve)".format(
+                    id_plate + 1, np.prod(smooth_data[id_plate].shape[:2]), smooth_data[id_plate].shape[-1]))
+
+        for id_plate, plate in enumerate(smooth_data):
+            if plate is None:
+                self._logger.info("Plate {0} has no data".format(id_plate + 1))
+
+        self._smooth_growth_data = np.array(smooth_data)
+        self._derivatives = None
+
+        self._logger.info("Completed Weighted Multi-Polynomial smoothing")
+
+    def _get_weighted_poly_smoothing_times(self, time_delta, edge_condition):
+        """The edge condition extended times and the local polynomial windows
+
+        Returns:
+            times, window filter and the filters of the times mirrored
+            on the left and on the right.
+        """
         times = self.times
         left_filt, right_filt = get_edge_condition_timed_filter(times, time_delta, edge_condition)
-        left = left_filt.sum()
-        right = right_filt.sum()
 
         times = filter_edge_condition(times, left_filt, right_filt, edge_condition,
                                       extrapolate_values=True,
                                       logger=self._logger)
 
-        self._logger.info("Data with edge condition has length {0}, ({1} {2})".format(times.size, left, right))
         time_diffs = np.subtract.outer(times, times)
         filt = (time_diffs < time_delta) & (time_diffs > -time_delta)
+        return times, filt, left_filt, right_filt
 
-        for id_plate, plate in enumerate(self._raw_growth_data):
-            if plate is None:
-                smooth_data.append(None)
-                self._logger.info("Plate {0} has no data".format(id_plate + 1))
-                continue
+    def _poly_smoothen_rows_weighted(self, plate_id, row_start, row_stop, power=3, time_delta=5.1, gauss_sigma=1.5,
+                                     apply_median=True, edge_condition=EdgeCondition.Reflect):
 
-            log2_data = np.log2(plate).reshape(np.prod(plate.shape[:2]), plate.shape[-1])
-            epsilon = np.finfo(log2_data.dtype).eps
+        median_kernel = np.ones((1, self._median_kernel_size))
+        times, filt, left_filt, right_filt = self._get_weighted_poly_smoothing_times(time_delta, edge_condition)
+        left = left_filt.sum()
+        right = right_filt.sum()
 
-            if apply_median:
-                log2_data[...] = median_filter(log2_data, footprint=median_kernel, mode='reflect')
+        rows = self._raw_growth_data[plate_id][row_start: row_stop]
+        log2_data = np.log2(rows).reshape(np.prod(rows.shape[:2]), rows.shape[-1])
+        epsilon = np.finfo(log2_data.dtype).eps
 
-            smooth_plate = [None] * log2_data.shape[0]
-            for id_curve, log2_curve in enumerate(log2_data):
+        if apply_median:
+            log2_data[...] = median_filter(log2_data, footprint=median_kernel, mode='reflect')
 
-                log2_curve = filter_edge_condition(
-                    log2_curve, left_filt, right_filt, edge_condition, logger=self._logger)
+        smooth_rows = [None] * log2_data.shape[0]
+        for id_curve, log2_curve in enumerate(log2_data):
 
-                p, r, r0 = zip(*self._poly_estimate_raw_growth_curve(times, log2_curve, power, filt))
+            log2_curve = filter_edge_condition(
+                log2_curve, left_filt, right_filt, edge_condition, logger=self._logger)
 
-                if any(r0val < epsilon for r0val in r0):
+            p, r, r0 = zip(*self._poly_estimate_raw_growth_curve(times, log2_curve, power, filt))
+            row, column = np.unravel_index(id_curve, rows.shape[:2])
 
-                    self._logger.warning(
-                        "Curve {0} has long stretches of (near) identical data and is probably corrupt".format(
-                            np.unravel_index(id_curve, plate.shape[:2])
-                        ))
+            if any(r0val < epsilon for r0val in r0):
 
-                if any(rval == 0 for rval in r):
-                    self._logger.warning(
-                        "Curve {0} is probably overfitted somewhere because polynomial residual was 0".format(
-                            np.unravel_index(id_curve, plate.shape[:2])
+                self._logger.warning(
+                    "Curve {0} has long stretches of (near) identical data and is probably corrupt".format(
+                        (row_start + row, column)
                     ))
 
-                smooth_plate[id_curve] = tuple(self._multi_poly_smooth(
-                    times, p, np.array(r), np.array(r0), filt, gauss_sigma))[left: -right if right else None]
-
-            self._logger.info("Plate {0} data polynomial smoothed ({1} curves, {2} data-points per curve)".format(
-                id_plate + 1, len(smooth_plate), len(smooth_plate[0])))
-
-            smooth_data.append(np.array(smooth_plate).reshape(plate.shape))
+            if any(rval == 0 for rval in r):
+                self._logger.warning(
+                    "Curve {0} is probably overfitted somewhere because polynomial residual was 0".format(
+                        (row_start + row, column)
+                ))
 
-        self._smooth_growth_data = np.array(smooth_data)
+            smooth_rows[id_curve] = tuple(self._multi_poly_smooth(
+                times, p, np.array(r), np.array(r0), filt, gauss_sigma))[left: -right if right else None]
 
-        self._logger.info("Completed Weighted Multi-Polynomial smoothing")
+        return np.array(smooth_rows).reshape(rows.shape)
 
     @staticmethod
     def _multi_poly_smooth(times, polys, r, r0, filt, gauss_sigma):
@@ -1118,6 +1415,195 @@ class Phenotyper(mock_numpy_interface.NumpyArrayInterface):
 
                     yield np.poly1d(p),  0, 1
 
+    def _poly_smoothen_raw_growth_weighted_batched(self, power=3, time_delta=5.1, gauss_sigma=1.5, apply_median=True,
+                                                   edge_condition=EdgeCondition.Reflect):
+        """Same smoothing as `Phenotyper._poly_smoothen_raw_growth_weighted`
+        but all curves of a plate are fitted together.
+
+        For each time window the local polynomials of every curve on the plate
+        are solved as one stack of normal equations instead of one
+        `np.polyfit` per curve and time point.
+        """
+        assert power > 1, "Power must be 2 or greater"
+
+        self._logger.info(
+            "Starting Batched Weighted Multi-Polynomial smoothing"
+            " (Power {0}; Time delta {1}h; Gauss sigma {2}h; {3}; {4}".format(
+                power, time_delta, gauss_sigma, "Median filter" if apply_median else "No median filter",
+                edge_condition
+        ))
+
+        median_kernel = np.ones((1, self._median_kernel_size))
+        smooth_data = []
+        times = self.times
+        left_filt, right_filt = get_edge_condition_timed_filter(times, time_delta, edge_condition)
+        left = left_filt.sum()
+        right = right_filt.sum()
+
+        times = filter_edge_condition(times, left_filt, right_filt, edge_condition,
+                                      extrapolate_values=True,
+                                      logger=self._logger)
+
+        self._logger.info("Data with edge condition has length {0}, ({1} {2})".format(times.size, left, right))
+        time_diffs = np.subtract.outer(times, times)
+        filt = (time_diffs < time_delta) & (time_diffs > -time_delta)
+
+        for id_plate, plate in enumerate(self._raw_growth_data):
+            if plate is None:
+                smooth_data.append(None)
+                self._logger.info("Plate {0} has no data".format(id_plate + 1))
+                continue
+
+            log2_data = np.log2(plate).reshape(np.prod(plate.shape[:2]), plate.shape[-1])
+            epsilon = np.finfo(log2_data.dtype).eps
+
+            if apply_median:
+                log2_data[...] = median_filter(log2_data, footprint=median_kernel, mode='reflect')
+
+            log2_data = np.array([
+                filter_edge_condition(log2_curve, left_filt, right_filt, edge_condition, logger=self._logger)
+                for log2_curve in log2_data])
+
+            coeffs, r, r0 = self._batch_poly_estimate_raw_growth_curves(times, log2_data, power, filt, time_delta)
+
+            with np.errstate(invalid='ignore'):
+                corrupt = (r0 < epsilon).any(axis=1)
+                overfitted = (r == 0).any(axis=1)
+
+            for id_curve in np.where(corrupt)[0]:
+                self._logger.warning(
+                    "Curve {0} has long stretches of (near) identical data and is probably corrupt".format(
+                        np.unravel_index(id_curve, plate.shape[:2])
+                    ))
+
+            for id_curve in np.where(overfitted)[0]:
+                self._logger.warning(
+                    "Curve {0} is probably overfitted somewhere because polynomial residual was 0".format(
+                        np.unravel_index(id_curve, plate.shape[:2])
+                    ))
+
+            smooth_plate = self._batch_multi_poly_smooth(
+                times, coeffs, r, r0, filt, gauss_sigma, time_delta)[:, left: -right if right else None]
+
+            self._logger.info("Plate {0} data polynomial smoothed ({1} curves, {2} data-points per curve)".format(
+                id_plate + 1, smooth_plate.shape[0], smooth_plate.shape[1]))
+
+            smooth_data.append(smooth_plate.reshape(plate.shape))
+
+        self._smooth_growth_data = np.array(smooth_data)
+        self._derivatives = None
+
+        self._logger.info("Completed Batched Weighted Multi-Polynomial smoothing")
+
+    @staticmethod
+    def _batch_poly_estimate_raw_growth_curves(times, log2_data, power, filt, time_delta):
+        """Fits the local polynomials of all curves for every time window.
+
+        Polynomials are expressed in the window-local coordinate
+        `(t - times[window]) / time_delta` to keep the normal equations
+        well conditioned.
+
+        Args:
+            times: The (edge condition extended) times
+            log2_data: 2D array (curves, times) of log2 population sizes
+            power: The polynomial power
+            filt: 2D boolean array of which times belong to each window
+            time_delta: The half width of windows
+
+        Returns:
+            coefficients (curves, times, power + 1) lowest order first,
+            mean squared residuals (curves, times) and
+            data variance (curves, times).
+            Windows without any finite data have `np.nan` residuals and
+            variance. Windows with too few data for a residual get
+            residual 0 and variance 1, just as the per curve estimate.
+        """
+        n_curves = log2_data.shape[0]
+        n_coeffs = power + 1
+        orders = np.arange(n_coeffs)
+        finites = np.isfinite(log2_data)
+
+        coeffs = np.zeros((n_curves, times.size, n_coeffs), dtype=np.float)
+        r = np.zeros((n_curves, times.size), dtype=np.float) * np.nan
+        r0 = np.zeros((n_curves, times.size), dtype=np.float) * np.nan
+
+        for id_window, f in enumerate(filt):
+
+            idx = np.where(f)[0]
+            vandermonde = np.power.outer((times[idx] - times[id_window]) / time_delta, orders)
+            weights = finites[:, idx].astype(np.float)
+            y = np.where(finites[:, idx], log2_data[:, idx], 0)
+            n = weights.sum(axis=1)
+
+            solvable = n >= n_coeffs
+            if solvable.any():
+
+                lhs = np.einsum('nk,ka,kb->nab', weights[solvable], vandermonde, vandermonde)
+                rhs = np.einsum('nk,ka->na', weights[solvable] * y[solvable], vandermonde)
+                coeffs[solvable, id_window] = np.linalg.solve(lhs, rhs)
+
+                w = weights[solvable]
+                y_s = y[solvable]
+                n_s = n[solvable]
+                residuals = (np.square(y_s - np.dot(coeffs[solvable, id_window], vandermonde.T)) * w).sum(axis=1)
+                means = (y_s * w).sum(axis=1) / n_s
+                variance = (np.square(y_s - means[:, None]) * w).sum(axis=1) / n_s
+                over_determined = n_s > n_coeffs
+
+                r[solvable, id_window] = np.where(over_determined, residuals / n_s, 0)
+                r0[solvable, id_window] = np.where(over_determined, variance, 1)
+
+            for id_curve in np.where((n > 0) & ~solvable)[0]:
+
+                # Too few points to solve uniquely, use polyfit's solution
+                # and express it in the window-local coordinate.
+                f2 = finites[id_curve, idx]
+                p = np.poly1d(np.polyfit(times[idx][f2], log2_data[id_curve, idx][f2], power))
+                p = p(np.poly1d([time_delta, times[id_window]]))
+                coeffs[id_curve, id_window, :p.order + 1] = p.coeffs[::-1]
+                r[id_curve, id_window] = 0
+                r0[id_curve, id_window] = 1
+
+        return coeffs, r, r0
+
+    @staticmethod
+    def _batch_multi_poly_smooth(times, coeffs, r, r0, filt, gauss_sigma, time_delta):
+        """Weighted mean of all local polynomials covering each time window.
+
+        Batched counterpart of `Phenotyper._multi_poly_smooth` operating on
+        the output of `Phenotyper._batch_poly_estimate_raw_growth_curves`.
+
+        Returns:
+            2D array (curves, times) of smoothed population sizes,
+            times not covered by any fitted polynomial are `np.nan`.
+        """
+        n_curves = coeffs.shape[0]
+        included = np.isfinite(r)
+        smooth = np.zeros((n_curves, times.size), dtype=np.float) * np.nan
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+
+            quality = 1 - r / r0
+
+            for id_window, f in enumerate(filt):
+
+                idx = np.where(f)[0]
+                f2 = included[:, idx]
+                t = (times[idx] * f2).sum(axis=1) / f2.sum(axis=1)
+
+                w = norm.pdf(times[idx][None, :], loc=t[:, None], scale=gauss_sigma) * quality[:, idx]
+
+                x = (t[:, None] - times[idx][None, :]) / time_delta
+                c = coeffs[:, idx]
+                values = c[..., -1]
+                for order in range(c.shape[-1] - 2, -1, -1):
+                    values = values * x + c[..., order]
+
+                w = np.where(f2, w, 0)
+                smooth[:, id_window] = (w * np.where(f2, np.power(2, values), 0)).sum(axis=1) / w.sum(axis=1)
+
+        return smooth
+
     @staticmethod
     def _poly_smoothen_raw_growth_curve(times, log2_data, power, filt):
 
@@ -1136,10 +1622,40 @@ class Phenotyper(mock_numpy_interface.NumpyArrayInterface):
             else:
                 yield np.power(2, np.poly1d(p)(t))
 
-    def _smoothen(self):
+    def _smoothen(self, workers=1):
+
+        if self._raw_growth_data.dtype == np.object:
+            # Plates may be read-only memory maps of the image data
+            smooth_growth_data = np.empty(self._raw_growth_data.shape, dtype=np.object)
+            for id_plate, plate in enumerate(self._raw_growth_data):
+                smooth_growth_data[id_plate] = None if plate is None else np.array(plate)
+            self.set("smooth_growth_data", smooth_growth_data)
+        else:
+            self.set("smooth_growth_data", self._raw_growth_data.copy())
+        self._logger.info("Smoothing Started{0}".format(
+            " using {0} workers".format(workers) if workers > 1 else ""))
+
+        tasks = self._get_row_tasks(self._raw_growth_data, workers)
+        if workers > 1:
+            results = self._iterate_tasks_in_pool(workers, self._raw_growth_data, _smoothen_rows_in_worker, tasks)
+        else:
+            results = (self._smoothen_rows(*task) for task in tasks)
+
+        for (plate_id, row_start, row_stop), smooth_rows in izip(tasks, results):
+
+            self._smooth_growth_data[plate_id][row_start: row_stop] = smooth_rows
+
+            if row_stop == self._smooth_growth_data[plate_id].shape[0]:
+                self._logger.info("Smoothing of plate {0} done".format(plate_id + 1))
+
+        for plate_id, plate in enumerate(self._smooth_growth_data):
+            if plate is None:
+                self._logger.info("Plate {0} has no data, skipping".format(plate_id + 1))
+
+        self._logger.info("Smoothing Done")
+
+    def _smoothen_rows(self, plate_id, row_start, row_stop):
 
-        self.set("smooth_growth_data", self._raw_growth_data.copy())
-        self._logger.info("Smoothing Started")
         median_kernel = np.ones((1, self._median_kernel_size))
         times = self.times
 
@@ -1149,53 +1665,106 @@ class Phenotyper(mock_numpy_interface.NumpyArrayInterface):
             'sigma':
                 self._gaussian_filter_sigma / 3.0 if self._gaussian_filter_sigma == 5 else self._gaussian_filter_sigma}
 
-        for plate_id, plate in enumerate(self._smooth_growth_data):
+        rows = np.array(self._raw_growth_data[plate_id][row_start: row_stop])
+        rows_as_flat = rows.reshape(rows.shape[0] * rows.shape[1], rows.shape[2])
 
-            if plate is None:
-                self._logger.info("Plate {0} has no data, skipping".format(plate_id + 1))
-                continue
+        rows_as_flat[...] = median_filter(
+            rows_as_flat, footprint=median_kernel, mode='reflect')
 
-            plate_as_flat = np.lib.stride_tricks.as_strided(
-                plate,
-                shape=(plate.shape[0] * plate.shape[1], plate.shape[2]),
-                strides=(plate.strides[1], plate.strides[2]))
+        rows_as_flat[...] = tuple(
+            merge_convolve(v, times, func_kwargs=gauss_kwargs) for v in rows_as_flat
+        )
 
-            plate_as_flat[...] = median_filter(
-                plate_as_flat, footprint=median_kernel, mode='reflect')
+        return rows
 
-            plate_as_flat[...] = tuple(
-                merge_convolve(v, times, func_kwargs=gauss_kwargs) for v in plate_as_flat
-            )
+    @staticmethod
+    def _get_row_tasks(plates, workers):
+        """Splits the plates into chunks of rows.
 
-            self._logger.info("Smoothing of plate {0} done".format(plate_id + 1))
+        Serial work uses one row per task, parallel work aims for a few
+        tasks per worker so that plates can be worked on concurrently.
 
-        self._logger.info("Smoothing Done")
+        Returns:
+            List of (plate index, first row, exclusive last row)
+        """
+        if workers > 1:
+            total_rows = sum(plate.shape[0] for plate in plates if plate is not None)
+            rows_per_task = max(1, int(np.ceil(total_rows / (4.0 * workers))))
+        else:
+            rows_per_task = 1
+
+        return [(id_plate, row, min(row + rows_per_task, plate.shape[0]))
+                for id_plate, plate in enumerate(plates) if plate is not None
+                for row in range(0, plate.shape[0], rows_per_task)]
 
-    def _calculate_phenotypes(self):
+    def _get_worker_settings(self):
+
+        return {
+            'median_kernel_size': self._median_kernel_size,
+            'gaussian_filter_sigma': self._gaussian_filter_sigma,
+            'linear_regression_size': self._linear_regression_size,
+            'no_growth_monotonocity_threshold': self._no_growth_monotonicity_threshold,
+            'no_growth_pop_doublings_threshold': self._no_growth_pop_doublings_threshold,
+            'phenotypes_inclusion': self._phenotypes_inclusion,
+        }
+
+    def _iterate_tasks_in_pool(self, workers, plates, func, tasks):
+        """Runs tasks on a process pool, yielding results in task order.
+
+        The plates are shared with the workers as memory-mapped files
+        in a temporary directory rather than being pickled. Plates that
+        are memory mapped files already are shared as they are.
+
+        Args:
+            workers: Number of processes
+            plates: The plate data the workers should use
+            func: Module level function taking a task
+            tasks: Tasks as returned by `Phenotyper._get_row_tasks`
+        """
+        directory = tempfile.mkdtemp(prefix="scanomatic_phenotyper_")
+        pool = None
+        try:
+            plate_paths = []
+            for id_plate, plate in enumerate(plates):
+                if plate is None:
+                    plate_paths.append(None)
+                elif _is_memory_mapped_file(plate):
+                    plate_paths.append(plate.filename)
+                else:
+                    plate_paths.append(os.path.join(directory, "plate_{0}.npy".format(id_plate)))
+                    np.save(plate_paths[-1], np.asarray(plate))
+
+            pool = get_process_pool(workers, initializer=_init_phenotyper_worker,
+                                    initargs=(plate_paths, self._times_data, self._get_worker_settings()))
+
+            for result in pool.imap(func, tasks):
+                yield result
+
+            pool.close()
+
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def _calculate_phenotypes(self, workers=1):
 
         if self._times_data.shape[0] - (self._linear_regression_size - 1) <= 0:
             self._logger.error(
                 "Refusing phenotype extractions since number of scans are less than used in the linear regression")
             return
 
-        times_strided = self.times_strided
-
-        flat_times = self._times_data
-
-        index_for_48h = np.abs(np.subtract.outer(self._times_data, [48])).argmin()
-
         all_phenotypes = []
         all_vector_phenotypes = []
         all_vector_meta_phenotypes = []
 
-        regression_size = self._linear_regression_size
-        position_offset = (regression_size - 1) / 2
         phenotypes_count = self.get_number_of_phenotypes()
 
         total_curves = float(self.number_of_curves)
 
-        self._logger.info("Phenotypes (N={0}), extraction started for {1} curves".format(
-            phenotypes_count, int(total_curves)))
+        self._logger.info("Phenotypes (N={0}), extraction started for {1} curves{2}".format(
+            phenotypes_count, int(total_curves), " using {0} workers".format(workers) if workers > 1 else ""))
 
         curves_in_completed_plates = 0
         phenotypes_inclusion = self._phenotypes_inclusion
@@ -1204,6 +1773,15 @@ class Phenotyper(mock_numpy_interface.NumpyArrayInterface):
             self._logger.warning("Will extract phenotypes beyond those that are trusted, this is not recommended!" +
                                  " It is your responsibility to verify the validity of those phenotypes!")
 
+        tasks = self._get_row_tasks(self._smooth_growth_data, workers)
+        if workers > 1:
+            results = self._iterate_tasks_in_pool(
+                workers, self._smooth_growth_data, _calculate_rows_phenotypes_in_worker, tasks)
+        else:
+            results = (self._calculate_rows_phenotypes(*task) for task in tasks)
+
+        results = izip(tasks, results)
+
         for id_plate, plate in enumerate(self._smooth_growth_data):
 
             if plate is None:
@@ -1212,8 +1790,6 @@ class Phenotyper(mock_numpy_interface.NumpyArrayInterface):
                 all_vector_meta_phenotypes.append(None)
                 continue
 
-            plate_flat_regression_strided = self._get_plate_linear_regression_strided(plate)
-
             phenotypes = {
                 p: np.zeros(plate.shape[:2], dtype=np.float) * np.nan
                 for p in Phenotypes if phenotypes_inclusion(p)}
@@ -1231,61 +1807,25 @@ class Phenotyper(mock_numpy_interface.NumpyArrayInterface):
             all_vector_phenotypes.append(vector_phenotypes)
             all_vector_meta_phenotypes.append(vector_meta_phenotypes)
 
-            for pos_index, pos_data in enumerate(plate_flat_regression_strided):
-
-                id1 = pos_index % plate.shape[1]
-                id0 = pos_index / plate.shape[1]
-
-                curve_data = get_preprocessed_data_for_phenotypes(
-                    curve=plate[id0, id1],
-                    curve_strided=pos_data,
-                    flat_times=flat_times,
-                    times_strided=times_strided,
-                    index_for_48h=index_for_48h,
-                    position_offset=position_offset)
-
-                curve_has_data = True
+            row_stop = 0
+            while row_stop < plate.shape[0]:
 
-                if curve_data['curve_smooth_growth_data'].mask.all():
-
-                    self._logger.warning("Position ({0}, {1}) on plate {2} seems void of data".format(
-                        id0, id1, id_plate + 1
-                    ))
-                    curve_has_data = False
-
-                else:
-
-                    for phenotype in Phenotypes:
-
-                        if not phenotypes_inclusion(phenotype):
-                            continue
+                (_, row_start, row_stop), (rows_phenotypes, rows_vector_phenotypes) = next(results)
 
-                        if PhenotypeDataType.Scalar(phenotype):
-                            phenotypes[phenotype][id0, id1] = phenotype(**curve_data)
+                for phenotype, data in rows_phenotypes.iteritems():
+                    phenotypes[phenotype][row_start: row_stop] = data
 
-                if curve_has_data and (
-                            phenotypes_inclusion(VectorPhenotypes.PhasesClassifications) or
-                            phenotypes_inclusion(VectorPhenotypes.PhasesPhenotypes)):
+                for phenotype, data in rows_vector_phenotypes.iteritems():
+                    vector_phenotypes[phenotype][row_start: row_stop] = data
 
-                    phases, phases_phenotypes = get_phase_analysis(
-                        self, id_plate, (id0, id1),
-                        experiment_doublings=phenotypes[Phenotypes.ExperimentPopulationDoublings][id0, id1])
+                self._logger.debug("Done plate {0} rows {1}-{2}".format(id_plate, row_start, row_stop - 1))
 
-                    if phenotypes_inclusion(VectorPhenotypes.PhasesClassifications):
-                        vector_phenotypes[VectorPhenotypes.PhasesClassifications][id0, id1] = phases
-                    if phenotypes_inclusion(VectorPhenotypes.PhasesPhenotypes):
-                        vector_phenotypes[VectorPhenotypes.PhasesPhenotypes][id0, id1] = phases_phenotypes
-
-                if id1 == 0:
-
-                    self._logger.debug("Done plate {0} pos {1} {2}".format(id_plate, id0, id1))
-
-                    self._logger.info("Plate {1} growth phenotypes {0:.1f}% done".format(
-                        100.0 * (pos_index + 1.0) / plate_size,
-                        id_plate + 1,
-                    ))
+                self._logger.info("Plate {1} growth phenotypes {0:.1f}% done".format(
+                    100.0 * row_stop * plate.shape[1] / plate_size,
+                    id_plate + 1,
+                ))
 
-                    yield (curves_in_completed_plates + pos_index + 1.0) / total_curves
+                yield (curves_in_completed_plates + row_stop * plate.shape[1]) / total_curves
 
             for phenotype in CurvePhaseMetaPhenotypes:
 
@@ -1305,7 +1845,7 @@ class Phenotyper(mock_numpy_interface.NumpyArrayInterface):
                 vector_meta_phenotypes[phenotype] = phenotype_data.astype(np.float)
 
             self._logger.info("Plate {0} Done".format(id_plate + 1))
-            curves_in_completed_plates += 0 if plate is None else plate_flat_regression_strided.shape[0]
+            curves_in_completed_plates += plate_size
 
         self._phenotypes = np.array(all_phenotypes)
         self._vector_phenotypes = np.array(all_vector_phenotypes)
@@ -1313,6 +1853,73 @@ class Phenotyper(mock_numpy_interface.NumpyArrayInterface):
         self._normalized_phenotypes = None
         self._logger.info("Phenotype Extraction Done")
 
+    def _calculate_rows_phenotypes(self, id_plate, row_start, row_stop):
+        """Calculates the phenotypes of a chunk of rows on a plate.
+
+        Returns:
+            Tuple of dicts of scalar and vector phenotypes, each phenotype
+            having data only for the rows requested.
+        """
+        times_strided = self.times_strided
+        flat_times = self._times_data
+        index_for_48h = np.abs(np.subtract.outer(self._times_data, [48])).argmin()
+        position_offset = (self._linear_regression_size - 1) / 2
+        phenotypes_inclusion = self._phenotypes_inclusion
+
+        plate = self._smooth_growth_data[id_plate]
+        rows = plate[row_start: row_stop]
+        derivative_values_log2, derivative_errors = self._get_plate_derivatives(id_plate)
+
+        phenotypes = {
+            p: np.zeros(rows.shape[:2], dtype=np.float) * np.nan
+            for p in Phenotypes if phenotypes_inclusion(p)}
+
+        vector_phenotypes = {
+            p: np.zeros(rows.shape[:2], dtype=np.object) * np.nan
+            for p in VectorPhenotypes if phenotypes_inclusion(p)}
+
+        plate_data = get_plate_preprocessed_data_for_phenotypes(
+            plate=rows,
+            plate_strided=None,
+            flat_times=flat_times,
+            times_strided=times_strided,
+            index_for_48h=index_for_48h,
+            position_offset=position_offset,
+            derivatives=(derivative_values_log2[row_start: row_stop], derivative_errors[row_start: row_stop]))
+
+        void = np.ma.getmaskarray(plate_data['curve_smooth_growth_data']).all(axis=-1)
+
+        for id0, id1 in izip(*np.where(void)):
+            self._logger.warning("Position ({0}, {1}) on plate {2} seems void of data".format(
+                row_start + id0, id1, id_plate + 1
+            ))
+
+        for phenotype in Phenotypes:
+
+            if not phenotypes_inclusion(phenotype):
+                continue
+
+            if PhenotypeDataType.Scalar(phenotype):
+                phenotypes[phenotype][...] = phenotype.calculate_plate(**plate_data)
+                phenotypes[phenotype][void] = np.nan
+
+        if (phenotypes_inclusion(VectorPhenotypes.PhasesClassifications) or
+                phenotypes_inclusion(VectorPhenotypes.PhasesPhenotypes)):
+
+            positions = zip(*np.where(~void))
+            phase_analysis = get_plate_phase_analysis(
+                self, id_plate, [(row_start + id0, id1) for id0, id1 in positions],
+                experiment_doublings=[phenotypes[Phenotypes.ExperimentPopulationDoublings][pos] for pos in positions])
+
+            for (id0, id1), (phases, phases_phenotypes) in izip(positions, phase_analysis):
+
+                if phenotypes_inclusion(VectorPhenotypes.PhasesClassifications):
+                    vector_phenotypes[VectorPhenotypes.PhasesClassifications][id0, id1] = phases
+                if phenotypes_inclusion(VectorPhenotypes.PhasesPhenotypes):
+                    vector_phenotypes[VectorPhenotypes.PhasesPhenotypes][id0, id1] = phases_phenotypes
+
+        return phenotypes, vector_phenotypes
+
     def _get_plate_linear_regression_strided(self, plate):
 
         if plate is None:
@@ -1504,7 +2111,14 @@ class Phenotyper(mock_numpy_interface.NumpyArrayInterface):
     @property
     def generation_times(self):
 
-        return self.get_phenotype(Phenotypes.GenerationTime)
+        if Phenotypes.GenerationTime in self:
+            return self.get_phenotype(Phenotypes.GenerationTime)
+
+        return tuple(
+            None if derivatives is None else
+            np.ma.masked_invalid(Phenotypes.GenerationTime.calculate_plate(
+                derivative_values_log2=np.ma.masked_invalid(derivatives[0])))
+            for derivatives in (self._get_plate_derivatives(plate) for plate in self.enumerate_plates))
 
     def get_reference_median(self, phenotype):
         """ Getting reference position medians per plate.
@@ -1698,9 +2312,38 @@ class Phenotyper(mock_numpy_interface.NumpyArrayInterface):
 
     def get_derivative(self, plate, position):
 
-        return get_derivative(
-            self._get_plate_linear_regression_strided(
-                self.smooth_growth_data[plate][position].reshape(1, 1, self.times.size))[0], self.times_strided)[0]
+        return self._get_plate_derivatives(plate)[0][position].copy()
+
+    def _get_plate_derivatives(self, plate):
+        """Log2 derivatives and their errors for an entire plate.
+
+        The derivatives of all curves on the plate are calculated in one go
+        and then cached until the smooth growth data changes.
+
+        Args:
+            plate (int): Plate index
+
+        Returns (tuple):
+            Derivative values and their standard errors, each array being
+            (rows, columns, number of linear regressions) or `None` if
+            the plate has no data.
+        """
+        if self._derivatives is None:
+            self._derivatives = {}
+
+        if plate not in self._derivatives:
+
+            data = self._smooth_growth_data[plate]
+            if data is None:
+                self._derivatives[plate] = None
+            else:
+                data = np.ascontiguousarray(data)
+                shape = data.shape[:2] + (-1,)
+                values, errors = get_plate_derivative(
+                    self._get_plate_linear_regression_strided(data), self.times_strided)
+                self._derivatives[plate] = values.reshape(shape), errors.reshape(shape)
+
+        return self._derivatives[plate]
 
     def get_chapman_richards_data(self, plate, position):
         """Get the chapman ritchard model information
@@ -1844,11 +2487,13 @@ class Phenotyper(mock_numpy_interface.NumpyArrayInterface):
 
         elif data_type == 'smooth_growth_data':
 
-            if isinstance(data, np.ndarray) and (data.size == 0 or not data.any()):
+            if _is_empty_growth_data(data):
                 self._smooth_growth_data = None
             else:
                 self._smooth_growth_data = data
 
+            self._derivatives = None
+
         elif data_type == "phenotype_filter_undo":
 
             if isinstance(data, tuple) and all(isinstance(q, deque) for q in data):
@@ -2339,6 +2984,67 @@ class Phenotyper(mock_numpy_interface.NumpyArrayInterface):
     def save_state(self, dir_path, ask_if_overwrite=True):
         """Save the `Phenotyper` instance's state for future work.
 
+        The state is saved as a single file, see
+        `scanomatic.data_processing.phenotyper_state`. State files of
+        the legacy format in the directory are outdated by the saved
+        state and are removed.
+
+        Args:
+            dir_path: Directory where state should be saved
+            ask_if_overwrite: Optional, default is `True`
+        """
+        if not os.path.isdir(dir_path):
+            os.makedirs(dir_path)
+
+        p = os.path.join(dir_path, self._paths.phenotyper_state)
+        if ask_if_overwrite and os.path.isfile(p) and not self._do_ask_overwrite(p):
+            return
+
+        save_state_file(
+            p, self._times_data, self._raw_growth_data,
+            smooth_growth_data=self._smooth_growth_data,
+            phenotypes=self._phenotypes,
+            vector_phenotypes=self._vector_phenotypes,
+            vector_meta_phenotypes=self._vector_meta_phenotypes,
+            normalized_phenotypes=self._normalized_phenotypes,
+            phenotype_filter=self._phenotype_filter,
+            phenotype_filter_undo=self._phenotype_filter_undo,
+            reference_offsets=self._reference_surface_positions,
+            meta_data=self._meta_data,
+            settings={
+                'median_kernel_size': self._median_kernel_size,
+                'gaussian_filter_sigma': self._gaussian_filter_sigma,
+                'linear_regression_size': self._linear_regression_size,
+                'phenotypes_inclusion':
+                    None if self._phenotypes_inclusion is None else self._phenotypes_inclusion.name,
+                'no_growth_monotonicity_threshold': self._no_growth_monotonicity_threshold,
+                'no_growth_pop_doublings_threshold': self._no_growth_pop_doublings_threshold})
+
+        self._remove_legacy_state(dir_path)
+
+        self._logger.info("State saved to '{0}'".format(dir_path))
+
+    def _remove_legacy_state(self, dir_path):
+
+        _p = self._paths
+        for name in (_p.phenotypes_raw_npy, _p.phenotypes_input_data, _p.phenotype_times, _p.phenotypes_input_smooth,
+                     _p.phenotypes_extraction_params, _p.phenotypes_filter, _p.phenotypes_filter_undo,
+                     _p.phenotypes_meta_data, _p.normalized_phenotypes, _p.vector_phenotypes_raw,
+                     _p.vector_meta_phenotypes_raw, _p.phenotypes_reference_offsets):
+
+            path = os.path.join(dir_path, name)
+            if os.path.isfile(path):
+                try:
+                    os.remove(path)
+                except OSError:
+                    self._logger.warning("Could not remove outdated legacy state file '{0}'".format(path))
+
+    def save_legacy_state(self, dir_path, ask_if_overwrite=True):
+        """Save the state as separate numpy files like older versions did.
+
+        Use `Phenotyper.save_state` unless the state needs to be read
+        by an older version.
+
         Args:
             dir_path: Directory where state should be saved
             ask_if_overwrite: Optional, default is `True`
@@ -2364,11 +3070,11 @@ class Phenotyper(mock_numpy_interface.NumpyArrayInterface):
 
         p = os.path.join(dir_path, self._paths.phenotypes_input_data)
         if not ask_if_overwrite or not os.path.isfile(p) or self._do_ask_overwrite(p):
-            np.save(p, self._raw_growth_data)
+            _save_state_array(p, self._raw_growth_data)
 
         p = os.path.join(dir_path, self._paths.phenotypes_input_smooth)
         if not ask_if_overwrite or not os.path.isfile(p) or self._do_ask_overwrite(p):
-            np.save(p, self._smooth_growth_data)
+            _save_state_array(p, self._smooth_growth_data)
 
         p = os.path.join(dir_path, self._paths.phenotypes_filter)
         if not ask_if_overwrite or not os.path.isfile(p) or self._do_ask_overwrite(p):
@@ -2602,3 +3308,60 @@ class Phenotyper(mock_numpy_interface.NumpyArrayInterface):
                     f(self, plate, pos, **extra_keyword_args[idf])
 
                 yield plate, pos
+
+
+#
+#   PROCESS POOL WORKERS
+#
+
+_worker_phenotyper = None
+
+
+def _is_memory_mapped_file(plate):
+    """If a plate is an entire memory mapped numpy file, such as the image data store"""
+
+    if not isinstance(plate, np.memmap) or not plate.filename or not plate.flags.c_contiguous:
+        return False
+
+    try:
+        data = np.load(plate.filename, mmap_mode='r')
+    except (IOError, ValueError):
+        return False
+
+    if isinstance(data, np.lib.npyio.NpzFile):
+        # Plates mapped from a state file are members of the archive
+        data.close()
+        return False
+
+    return data.shape == plate.shape
+
+
+def _init_phenotyper_worker(plate_paths, times, settings):
+    """Sets up a `Phenotyper` in a pool worker process using memory-mapped plates
+
+    The plates are used both as raw and smooth growth data since each
+    type of task only needs one of them.
+    """
+    global _worker_phenotyper
+
+    plates = np.empty((len(plate_paths),), dtype=np.object)
+    for id_plate, path in enumerate(plate_paths):
+        plates[id_plate] = None if path is None else np.load(path, mmap_mode='r')
+
+    _worker_phenotyper = Phenotyper(plates, times, **settings)
+    _worker_phenotyper._smooth_growth_data = plates
+
+
+def _smoothen_rows_in_worker(task):
+
+    return _worker_phenotyper._smoothen_rows(*task)
+
+
+def _poly_smoothen_rows_weighted_in_worker(smoothing_coeffs, task):
+
+    return _worker_phenotyper._poly_smoothen_rows_weighted(*task, **smoothing_coeffs)
+
+
+def _calculate_rows_phenotypes_in_worker(task):
+
+    return _worker_phenotyper._calculate_rows_phenotypes(*task)
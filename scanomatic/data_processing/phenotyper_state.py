@@ -0,0 +1,519 @@
+"""Single file storage of `Phenotyper` states.
+
+The state file is a zip-archive of `.npy`-members, the same as made by
+`numpy.savez`. Each plate and phenotype has its own typed member, so any
+part of the state can be read without reading the rest. The members are:
+
+    version                             Format version
+    settings                            JSON of the extraction settings
+    times                               The times of the measurements
+    plates                              Number of plates
+    stacked                             If growth data is one 4D array
+    raw/{plate}                         Raw growth data (rows, columns, times)
+    smooth/{plate}                      Smooth growth data
+    {group}/plates                      Which plates have data in the group
+    {group}/{plate}/{phenotype}         (rows, columns) phenotype data
+
+where group is one of `phenotypes`, `normalized`, `vector_meta` and `filter`.
+Vector phenotypes are stored in the `vector` group, phases classifications
+as padded masked arrays and phases phenotypes as a table with one row per
+phase. The reference offsets are one boolean array, the filter undo is
+JSON and the meta-data is kept pickled since it wraps arbitrary user files.
+
+Masked arrays are stored as two members, `{name}.data` and `{name}.mask`.
+
+Members are stored uncompressed so the growth data can be memory mapped
+directly from the archive.
+"""
+import json
+import os
+import struct
+import zipfile
+import cPickle as pickle
+from collections import deque
+
+import numpy as np
+
+from scanomatic.data_processing.phases.analysis import CurvePhasePhenotypes
+from scanomatic.data_processing.phases.features import VectorPhenotypes
+from scanomatic.data_processing.phases.segmentation import CurvePhases
+from scanomatic.data_processing.phenotypes import infer_phenotype_from_name
+
+STATE_FORMAT_VERSION = 1
+
+_PLATE_DICT_GROUPS = ('phenotypes', 'normalized', 'vector_meta', 'filter')
+
+
+def _put(arrays, key, value):
+
+    if isinstance(value, np.ma.MaskedArray):
+        arrays[key + '.data'] = value.data
+        arrays[key + '.mask'] = np.ma.getmaskarray(value)
+    else:
+        arrays[key] = value
+
+
+def _put_plate_dicts(arrays, group, data):
+
+    if data is None:
+        return
+
+    arrays[group + '/plates'] = np.array([isinstance(plate, dict) for plate in data], dtype=np.bool)
+
+    for id_plate, plate in enumerate(data):
+        if isinstance(plate, dict):
+            for phenotype, value in plate.iteritems():
+                _put(arrays, "{0}/{1}/{2}".format(group, id_plate, phenotype.name), value)
+
+
+def _put_phases_classifications(arrays, key, plate):
+
+    defined = np.array([isinstance(curve, np.ndarray) for curve in plate.ravel()]).reshape(plate.shape)
+    lengths = np.array([curve.size if is_defined else 0
+                        for curve, is_defined in zip(plate.ravel(), defined.ravel())]).reshape(plate.shape)
+    curves = [curve for curve in plate.ravel() if isinstance(curve, np.ndarray)]
+
+    data = np.zeros(plate.shape + (lengths.max() if lengths.size else 0,),
+                    dtype=curves[0].dtype if curves else np.int)
+    mask = np.ones(data.shape, dtype=np.bool)
+    for (id1, id2), length in np.ndenumerate(lengths):
+        if defined[id1, id2]:
+            data[id1, id2, :length] = np.ma.getdata(plate[id1, id2])
+            mask[id1, id2, :length] = np.ma.getmaskarray(plate[id1, id2])
+
+    arrays[key + '.defined'] = defined
+    arrays[key + '.lengths'] = lengths
+    arrays[key + '.data'] = data
+    arrays[key + '.mask'] = mask
+
+
+def _put_phases_phenotypes(arrays, key, plate):
+
+    columns = tuple(CurvePhasePhenotypes)
+    defined = np.array([isinstance(curve, (list, tuple)) for curve in plate.ravel()]).reshape(plate.shape)
+    positions = []
+    phases = []
+    measured = []
+    values = []
+
+    for id_position, curve in enumerate(plate.ravel()):
+        if not isinstance(curve, (list, tuple)):
+            continue
+        for phase, phase_phenotypes in curve:
+            positions.append(id_position)
+            phases.append(phase.value)
+            measured.append(phase_phenotypes is not None)
+            values.append([None if phase_phenotypes is None else phase_phenotypes.get(column, None)
+                           for column in columns])
+
+    present = np.array([[value is not None for value in row] for row in values], dtype=np.bool).reshape(
+        -1, len(columns))
+
+    arrays[key + '.defined'] = defined
+    arrays[key + '.columns'] = np.array([column.name for column in columns])
+    arrays[key + '.positions'] = np.array(positions, dtype=np.int)
+    arrays[key + '.phases'] = np.array(phases, dtype=np.int)
+    arrays[key + '.measured'] = np.array(measured, dtype=np.bool)
+    arrays[key + '.values'] = np.array(
+        [[np.nan if value is None else value for value in row] for row in values], dtype=np.float).reshape(
+        -1, len(columns))
+    arrays[key + '.present'] = present
+
+
+def _put_vector_phenotypes(arrays, data):
+
+    if data is None:
+        return
+
+    arrays['vector/plates'] = np.array([isinstance(plate, dict) for plate in data], dtype=np.bool)
+
+    for id_plate, plate in enumerate(data):
+        if not isinstance(plate, dict):
+            continue
+
+        for phenotype, value in plate.iteritems():
+            key = "vector/{0}/{1}".format(id_plate, phenotype.name)
+            if phenotype is VectorPhenotypes.PhasesClassifications:
+                _put_phases_classifications(arrays, key, value)
+            elif phenotype is VectorPhenotypes.PhasesPhenotypes:
+                _put_phases_phenotypes(arrays, key, value)
+            else:
+                arrays[key] = value
+
+
+def _as_json_compatible(value):
+
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    elif isinstance(value, (list, tuple)):
+        return [_as_json_compatible(item) for item in value]
+    elif isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _as_tuples(value):
+
+    if isinstance(value, list):
+        return tuple(_as_tuples(item) for item in value)
+    return value
+
+
+def _encode_undo(phenotype_filter_undo):
+
+    return json.dumps([
+        [[_as_json_compatible(positions), None if phenotype is None else phenotype.name,
+          _as_json_compatible(previous_state)] for positions, phenotype, previous_state in plate]
+        for plate in phenotype_filter_undo])
+
+
+def _decode_undo(encoded):
+
+    return tuple(
+        deque((_as_tuples(positions), None if phenotype is None else infer_phenotype_from_name(phenotype),
+               np.array(previous_state, dtype=np.int8) if isinstance(previous_state, list) else previous_state)
+              for positions, phenotype, previous_state in plate)
+        for plate in json.loads(encoded))
+
+
+def save_state_file(path, times, raw_growth_data, smooth_growth_data=None, phenotypes=None,
+                    vector_phenotypes=None, vector_meta_phenotypes=None, normalized_phenotypes=None,
+                    phenotype_filter=None, phenotype_filter_undo=None, reference_offsets=None, meta_data=None,
+                    settings=None):
+    """Saves a phenotyper state as a single file.
+
+    The file is first written to a temporary path and then moved into
+    place so that readers never see a partially written state.
+
+    Args:
+        path: Path to the state file
+        times: The times of the measurements
+        raw_growth_data: The raw growth data, either 4D array or array of plates
+        smooth_growth_data: Optional, the smooth growth data
+        phenotypes: Optional, array of plate dicts of phenotypes
+        vector_phenotypes: Optional, array of plate dicts of vector phenotypes
+        vector_meta_phenotypes: Optional, array of plate dicts of phases meta phenotypes
+        normalized_phenotypes: Optional, array of plate dicts of normalized phenotypes
+        phenotype_filter: Optional, array of plate dicts of position marks
+        phenotype_filter_undo: Optional, tuple of plate deques of undo actions
+        reference_offsets: Optional, the reference surface offsets per plate
+        meta_data: Optional, the `scanomatic.io.meta_data.MetaData2`
+        settings: Optional, dict of extraction settings
+    """
+    arrays = {
+        'version': np.array(STATE_FORMAT_VERSION),
+        'settings': np.array(json.dumps(settings if settings else {})),
+        'times': np.asarray(times, dtype=np.float),
+        'plates': np.array(len(raw_growth_data)),
+        'stacked': np.array(isinstance(raw_growth_data, np.ndarray) and raw_growth_data.dtype != np.object),
+    }
+
+    for group, data in (('raw', raw_growth_data), ('smooth', smooth_growth_data)):
+        if data is None:
+            continue
+        for id_plate, plate in enumerate(data):
+            if plate is not None:
+                arrays["{0}/{1}".format(group, id_plate)] = np.asarray(plate)
+
+    for group, data in zip(_PLATE_DICT_GROUPS,
+                           (phenotypes, normalized_phenotypes, vector_meta_phenotypes, phenotype_filter)):
+        _put_plate_dicts(arrays, group, data)
+
+    _put_vector_phenotypes(arrays, vector_phenotypes)
+
+    if reference_offsets is not None:
+        arrays['offsets'] = np.array([np.asarray(offset) for offset in reference_offsets])
+
+    if phenotype_filter_undo is not None:
+        arrays['undo'] = np.array(_encode_undo(phenotype_filter_undo))
+
+    if meta_data is not None:
+        arrays['meta_data'] = np.frombuffer(pickle.dumps(meta_data, pickle.HIGHEST_PROTOCOL), dtype=np.uint8)
+
+    temp_path = path + ".tmp"
+    with open(temp_path, 'wb') as fh:
+        np.savez(fh, **arrays)
+
+    try:
+        os.rename(temp_path, path)
+    except OSError:
+        os.remove(path)
+        os.rename(temp_path, path)
+
+
+class StateFile(object):
+    """Reader of phenotyper state files.
+
+    Members are only read from the file when requested, so single plates
+    or single phenotypes can be read cheaply.
+
+    Usage:
+
+        with StateFile(path) as state_file:
+            generation_times = state_file.get_phenotype(Phenotypes.GenerationTime, 0)
+    """
+    def __init__(self, path):
+
+        self._path = path
+        self._data = np.load(path)
+        self._files = set(self._data.files)
+
+        version = int(self._data['version'])
+        if version > STATE_FORMAT_VERSION:
+            self.close()
+            raise ValueError("State file format version {0} is newer than supported ({1})".format(
+                version, STATE_FORMAT_VERSION))
+
+    def __enter__(self):
+
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+
+        self.close()
+
+    def __contains__(self, key):
+
+        return key in self._files or key + '.data' in self._files
+
+    def close(self):
+
+        self._data.close()
+
+    def _get(self, key):
+
+        if key + '.data' in self._files:
+            return np.ma.masked_array(self._data[key + '.data'], mask=self._data[key + '.mask'])
+        return self._data[key]
+
+    def _get_memory_mapped(self, key):
+        """Copy-on-write memory map of a member, `None` if it can't be mapped."""
+
+        info = self._data.zip.getinfo(key + '.npy')
+        if info.compress_type != zipfile.ZIP_STORED:
+            return None
+
+        with open(self._path, 'rb') as fh:
+
+            fh.seek(info.header_offset)
+            header = struct.unpack(zipfile.structFileHeader, fh.read(zipfile.sizeFileHeader))
+            fh.seek(header[zipfile._FH_FILENAME_LENGTH] + header[zipfile._FH_EXTRA_FIELD_LENGTH], os.SEEK_CUR)
+
+            version = np.lib.format.read_magic(fh)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(fh)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(fh)
+            offset = fh.tell()
+
+        if dtype.hasobject or not np.prod(shape):
+            return None
+
+        return np.memmap(self._path, dtype=dtype, mode='c', shape=shape, order='F' if fortran_order else 'C',
+                         offset=offset)
+
+    @property
+    def version(self):
+
+        return int(self._data['version'])
+
+    @property
+    def settings(self):
+
+        return json.loads(str(self._data['settings']))
+
+    @property
+    def times(self):
+
+        return self._data['times']
+
+    @property
+    def number_of_plates(self):
+
+        return int(self._data['plates'])
+
+    def _get_plates(self, group, plate, mmap):
+
+        if plate is not None:
+            key = "{0}/{1}".format(group, plate)
+            if key not in self._files:
+                return None
+            data = self._get_memory_mapped(key) if mmap else None
+            return self._data[key] if data is None else data
+
+        plates = [self._get_plates(group, id_plate, mmap) for id_plate in range(self.number_of_plates)]
+        if bool(self._data['stacked']) and all(p is not None for p in plates) and \
+                not any(isinstance(p, np.memmap) for p in plates):
+            return np.array(plates)
+
+        data = np.empty((len(plates),), dtype=np.object)
+        data[:] = plates
+        return data
+
+    def get_raw_growth_data(self, plate=None, mmap=False):
+        """The raw growth data of one or all plates
+
+        Args:
+            plate: Optional plate index, if omitted all plates are returned.
+            mmap: Optional, if plates should be memory mapped copy-on-write
+                instead of read. Memory mapped plates are never stacked
+                into one array. Default is `False`.
+        """
+        return self._get_plates('raw', plate, mmap)
+
+    def get_smooth_growth_data(self, plate=None, mmap=False):
+        """The smooth growth data of one or all plates, `None` if not saved
+
+        Args:
+            plate: Optional plate index, if omitted all plates are returned.
+            mmap: Optional, if plates should be memory mapped, see
+                `StateFile.get_raw_growth_data`.
+        """
+        if plate is None and not any(key.startswith('smooth/') for key in self._files):
+            return None
+        return self._get_plates('smooth', plate, mmap)
+
+    def _has_group(self, group):
+
+        return group + '/plates' in self._files
+
+    def _get_plate_dict(self, group, plate):
+
+        if not self._data[group + '/plates'][plate]:
+            return None
+
+        prefix = "{0}/{1}/".format(group, plate)
+        names = set(key[len(prefix):].rsplit('.', 1)[0] if key.endswith(('.data', '.mask')) else key[len(prefix):]
+                    for key in self._files if key.startswith(prefix))
+        return {infer_phenotype_from_name(name): self._get(prefix + name) for name in names}
+
+    def _get_plate_dicts(self, group):
+
+        if not self._has_group(group):
+            return None
+
+        data = np.empty((self.number_of_plates,), dtype=np.object)
+        data[:] = [self._get_plate_dict(group, id_plate) for id_plate in range(self.number_of_plates)]
+        return data
+
+    def get_phenotype(self, phenotype, plate, normalized=False):
+        """Reads the data of a single phenotype on a plate.
+
+        Args:
+            phenotype: The phenotype
+            plate: The plate index
+            normalized: Optional, if normalized phenotype should be read
+
+        Returns: numpy.ndarray or `None` if not saved
+        """
+        key = "{0}/{1}/{2}".format('normalized' if normalized else 'phenotypes', plate, phenotype.name)
+        return self._get(key) if key in self else None
+
+    def get_phenotype_filter(self, phenotype, plate):
+        """Reads the position marks of a single phenotype on a plate.
+
+        Args:
+            phenotype: The phenotype
+            plate: The plate index
+
+        Returns: numpy.ndarray or `None` if not saved
+        """
+        key = "filter/{0}/{1}".format(plate, phenotype.name)
+        return self._get(key) if key in self else None
+
+    def get_phenotypes(self):
+
+        return self._get_plate_dicts('phenotypes')
+
+    def get_normalized_phenotypes(self):
+
+        return self._get_plate_dicts('normalized')
+
+    def get_vector_meta_phenotypes(self):
+
+        return self._get_plate_dicts('vector_meta')
+
+    def get_phenotype_filters(self):
+
+        return self._get_plate_dicts('filter')
+
+    def _get_phases_classifications(self, key):
+
+        defined = self._data[key + '.defined']
+        lengths = self._data[key + '.lengths']
+        data = self._data[key + '.data']
+        mask = self._data[key + '.mask']
+
+        plate = np.zeros(defined.shape, dtype=np.object) * np.nan
+        for (id1, id2), length in np.ndenumerate(lengths):
+            if defined[id1, id2]:
+                plate[id1, id2] = np.ma.masked_array(data[id1, id2, :length], mask=mask[id1, id2, :length])
+        return plate
+
+    def _get_phases_phenotypes(self, key):
+
+        defined = self._data[key + '.defined']
+        columns = tuple(CurvePhasePhenotypes[name] for name in self._data[key + '.columns'])
+        positions = self._data[key + '.positions']
+        phases = self._data[key + '.phases']
+        values = self._data[key + '.values']
+        present = self._data[key + '.present']
+        measured = self._data[key + '.measured']
+
+        curves = [[] if is_defined else np.nan for is_defined in defined.ravel()]
+        for id_position, phase, is_measured, row, row_present in zip(positions, phases, measured, values, present):
+            curves[id_position].append(
+                (CurvePhases(phase),
+                 {column: value for column, value, is_present in zip(columns, row, row_present) if is_present}
+                 if is_measured else None))
+
+        plate = np.empty(defined.size, dtype=np.object)
+        for id_position, curve in enumerate(curves):
+            plate[id_position] = curve
+        return plate.reshape(defined.shape)
+
+    def get_vector_phenotypes(self, plate=None):
+        """Reads the vector phenotypes of one or all plates.
+
+        Args:
+            plate: Optional plate index, if omitted all plates are returned.
+
+        Returns:
+            dict of vector phenotypes for the plate, or array of such for all plates.
+            `None` if not saved.
+        """
+        if not self._has_group('vector'):
+            return None
+
+        if plate is None:
+            data = np.empty((self.number_of_plates,), dtype=np.object)
+            data[:] = [self.get_vector_phenotypes(id_plate) for id_plate in range(self.number_of_plates)]
+            return data
+
+        if not self._data['vector/plates'][plate]:
+            return None
+
+        vector_phenotypes = {}
+        prefix = "vector/{0}/".format(plate)
+        for name in set(key[len(prefix):].split('.')[0] for key in self._files if key.startswith(prefix)):
+            phenotype = infer_phenotype_from_name(name)
+            if phenotype is VectorPhenotypes.PhasesClassifications:
+                vector_phenotypes[phenotype] = self._get_phases_classifications(prefix + name)
+            elif phenotype is VectorPhenotypes.PhasesPhenotypes:
+                vector_phenotypes[phenotype] = self._get_phases_phenotypes(prefix + name)
+            else:
+                vector_phenotypes[phenotype] = self._data[prefix + name]
+
+        return vector_phenotypes
+
+    def get_reference_offsets(self):
+
+        return list(self._data['offsets']) if 'offsets' in self._files else None
+
+    def get_phenotype_filter_undo(self):
+
+        return _decode_undo(str(self._data['undo'])) if 'undo' in self._files else None
+
+    def get_meta_data(self):
+
+        return pickle.loads(self._data['meta_data'].tostring()) if 'meta_data' in self._files else None
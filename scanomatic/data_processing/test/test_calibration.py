@@ -1,6 +1,7 @@
 import numpy as np
 import pytest
 from collections import namedtuple
+from scipy.optimize import curve_fit
 from scanomatic.data_processing import calibration
 
 data = calibration.load_data_file()
@@ -15,6 +16,20 @@ def ccc():
     del calibration.__CCC[_ccc[calibration.CellCountCalibration.identifier]]
 
 
+@pytest.fixture(scope='module')
+def synthetic_data():
+
+    np.random.seed(2)
+    values = [np.arange(np.random.randint(1, 10), np.random.randint(20, 60)) for _ in range(50)]
+    counts = [np.random.randint(1, 300, v.size) for v in values]
+    targets = [(c * (40 * v + 3e-5 * v ** 5)).sum() * np.random.normal(1, 0.02) for c, v in zip(counts, values)]
+    return {
+        calibration.CalibrationEntry.source_values: [v.tolist() for v in values],
+        calibration.CalibrationEntry.source_value_counts: [c.tolist() for c in counts],
+        calibration.CalibrationEntry.target_value: targets,
+    }
+
+
 def test_load_data():
 
     assert calibration.load_data_file() is not None
@@ -82,6 +97,36 @@ def test_calibration_opt_func():
     assert poly([2], 0, 1)[0] == 16
 
 
+def test_power_sums_same_as_expanded(synthetic_data):
+
+    power_sums, targets = calibration._get_power_sums(synthetic_data, 5)
+    exp_vals, exp_targets, _, _ = calibration._get_expanded_data(synthetic_data)
+    expanded_sums = np.array(
+        tuple(tuple((v.astype(np.float) ** power).sum() for power in range(6)) for v in exp_vals))
+    np.testing.assert_allclose(power_sums, expanded_sums)
+    np.testing.assert_allclose(targets, exp_targets.astype(np.float))
+
+
+def test_calibration_power_sums_func():
+
+    poly = calibration.get_calibration_power_sums_function(2)
+    assert poly(np.array([[1, 2, 4]]), 1, 1)[0] == 6
+    poly = calibration.get_calibration_power_sums_function(4, include_intercept=True)
+    assert poly(np.array([[3, 2, 4, 8, 16]]), 1, 1, 2)[0] == 37
+
+
+def test_calculate_polynomial_on_power_sums_same_as_expanded(synthetic_data):
+
+    poly = calibration.calculate_polynomial(synthetic_data)
+
+    exp_vals, exp_targets, _, _ = calibration._get_expanded_data(synthetic_data)
+    (c1, cn), _ = curve_fit(
+        calibration.get_calibration_optimization_function(5), exp_vals, exp_targets, p0=np.zeros((2,)))
+    np.testing.assert_allclose(poly, [cn, 0, 0, 0, c1, 0], rtol=1e-6)
+    assert calibration.validate_polynomial(
+        synthetic_data, calibration.get_calibration_polynomial(poly)) is calibration.CalibrationValidation.OK
+
+
 @pytest.mark.skip("There is no data to test on yet")
 def test_calculate_polynomial():
     degree = 4
@@ -0,0 +1,284 @@
+import numpy as np
+import pytest
+from scipy.stats import linregress
+
+from scanomatic.data_processing import growth_phenotypes
+from scanomatic.data_processing.growth_phenotypes import Phenotypes
+
+
+@pytest.fixture(scope='module')
+def plate_data():
+
+    times = np.arange(60) / 3.
+    slopes = np.array([[0.1, 0.2, 0.3], [0.4, 0.5, 0.6]])
+    plate = np.power(2, 17 + slopes[..., None] * times)
+    plate[1, 2, ::2] = np.nan
+
+    linear_regression_size = 5
+    plate_strided = np.lib.stride_tricks.as_strided(
+        plate,
+        shape=(6, times.size - (linear_regression_size - 1), linear_regression_size),
+        strides=(plate.strides[1], plate.strides[2], plate.strides[2]))
+    times_strided = np.lib.stride_tricks.as_strided(
+        times,
+        shape=(times.size - (linear_regression_size - 1), linear_regression_size),
+        strides=(times.strides[0], times.strides[0]))
+
+    return slopes, growth_phenotypes.get_plate_preprocessed_data_for_phenotypes(
+        plate, plate_strided, times, times_strided, 10, 2)
+
+
+def test_plate_generation_time(plate_data):
+
+    slopes, data = plate_data
+    generation_time = Phenotypes.GenerationTime.calculate_plate(**data)
+    assert generation_time.shape == slopes.shape
+    np.testing.assert_allclose(generation_time[:1], 1 / slopes[:1])
+    assert np.isnan(generation_time[1, 2])
+
+
+def test_plate_monotonicity(plate_data):
+
+    _, data = plate_data
+    np.testing.assert_allclose(Phenotypes.Monotonicity.calculate_plate(**data)[:1], 1)
+
+
+def test_plate_doublings(plate_data):
+
+    slopes, data = plate_data
+    times = data['flat_times']
+    expected = slopes * (times[-3:].mean() - times[:3].mean())
+    doublings = Phenotypes.ExperimentPopulationDoublings.calculate_plate(**data)
+    np.testing.assert_allclose(doublings[:1], expected[:1], rtol=1e-3)
+
+
+#
+# Reference per-curve implementations, as they were before the plate kernels
+#
+
+
+def _reference_derivative(curve_strided, times_strided):
+
+    linreg_values = []
+    log2_strided_curve = np.log2(curve_strided)
+    min_size = curve_strided.shape[-1] - 1
+
+    for times, value_segment in zip(times_strided, log2_strided_curve):
+        filt = np.isfinite(value_segment)
+        if filt.sum() >= min_size:
+            linreg_values.append(linregress(times[filt], value_segment[filt])[0::4])
+        else:
+            linreg_values.append((np.nan, np.nan))
+
+    return np.array(linreg_values).T
+
+
+def _reference_preprocessed_data(curve, curve_strided, flat_times, times_strided, index_for_48h, position_offset):
+
+    derivative_values_log2, derivative_errors = _reference_derivative(curve_strided, times_strided)
+    return {
+        'curve_smooth_growth_data': np.ma.masked_invalid(curve),
+        'index48h': index_for_48h,
+        'derivative_values_log2': np.ma.masked_invalid(derivative_values_log2),
+        'derivative_errors': np.ma.masked_invalid(derivative_errors),
+        'linregress_extent': position_offset,
+        'flat_times': flat_times}
+
+
+def _reference_generation_time_index(log2_masked_derivative_data, rank):
+    finites = log2_masked_derivative_data.size - log2_masked_derivative_data.mask.sum()
+    if finites > np.abs(rank):
+        return log2_masked_derivative_data.argsort()[:finites][-(rank + 1)]
+    return -1
+
+
+def _reference_baseline(curve_smooth_growth_data, **kwargs):
+    if curve_smooth_growth_data[:3].any():
+        return curve_smooth_growth_data[:3].mean()
+    return np.nan
+
+
+def _reference_end_average(curve_smooth_growth_data, **kwargs):
+    if curve_smooth_growth_data[-3:].any():
+        return curve_smooth_growth_data[-3:].mean()
+    return np.nan
+
+
+def _reference_first_two_average(curve_smooth_growth_data, **kwargs):
+    if curve_smooth_growth_data[:2].any():
+        return curve_smooth_growth_data[:2].mean()
+    return np.nan
+
+
+def _reference_low_point(curve_smooth_growth_data, **kwargs):
+    if curve_smooth_growth_data.any():
+        return np.ma.masked_invalid(np.convolve(curve_smooth_growth_data, np.ones(3) / 3., mode='valid')).min()
+    return np.nan
+
+
+def _reference_low_point_time(curve_smooth_growth_data, flat_times, **kwargs):
+    try:
+        return flat_times[
+            np.ma.masked_invalid(np.convolve(curve_smooth_growth_data, np.ones(3) / 3., mode='valid')).argmin() + 1]
+    except ValueError:
+        return np.nan
+
+
+def _reference_monotonicity(curve_smooth_growth_data, **kwargs):
+    return (np.diff(curve_smooth_growth_data[curve_smooth_growth_data.mask == np.False_]) > 0).astype(float).sum() / \
+        (curve_smooth_growth_data.size - 1)
+
+
+def _reference_growth_48h(curve_smooth_growth_data, index48h, **kwargs):
+    if index48h < 0 or index48h >= curve_smooth_growth_data.size:
+        return np.nan
+    return curve_smooth_growth_data[index48h]
+
+
+def _reference_generation_time(derivative_values_log2, index, **kwargs):
+    if index < 0 or index >= derivative_values_log2.size:
+        return np.nan
+    return 1.0 / derivative_values_log2[index]
+
+
+def _reference_generation_time_error(derivative_errors, index, **kwargs):
+    if index < 0 or index >= derivative_errors.size:
+        return np.nan
+    return derivative_errors[index]
+
+
+def _reference_generation_time_when(flat_times, index, linregress_extent, **kwargs):
+    pos = index + linregress_extent
+    if pos < 0 or pos >= flat_times.size:
+        return np.nan
+    return flat_times[pos]
+
+
+def _reference_population_size_at_generation_time(curve_smooth_growth_data, index, linregress_extent, **kwargs):
+    pos = index + linregress_extent
+    if pos < 0:
+        return np.nan
+    return np.ma.median(
+        curve_smooth_growth_data[
+            max(0, pos - linregress_extent): min(pos + linregress_extent + 1, curve_smooth_growth_data.size)])
+
+
+def _reference_growth_lag(index, flat_times, derivative_values_log2, **kwargs):
+    if index < 0:
+        return np.nan
+
+    growth_delta = np.log2(_reference_population_size_at_generation_time(index=index, **kwargs)) - \
+        np.log2(_reference_baseline(**kwargs))
+
+    if growth_delta > 0:
+        return np.interp(max(0.0, growth_delta / derivative_values_log2[index]), np.arange(flat_times.size),
+                         flat_times)
+    return np.nan
+
+
+def _with_index(function, rank):
+
+    def _calculate(**kwargs):
+        return function(index=_reference_generation_time_index(kwargs['derivative_values_log2'], rank), **kwargs)
+
+    return _calculate
+
+
+def _reference_residual_growth(**kwargs):
+    return _reference_end_average(**kwargs) - _with_index(_reference_population_size_at_generation_time, 0)(**kwargs)
+
+
+def _reference_residual_doublings(**kwargs):
+    return np.log2(_reference_end_average(**kwargs)) - \
+        np.log2(_with_index(_reference_population_size_at_generation_time, 0)(**kwargs))
+
+
+_REFERENCE_PHENOTYPES = {
+    Phenotypes.InitialValue: lambda curve_smooth_growth_data, **kwargs: curve_smooth_growth_data[0],
+    Phenotypes.ExperimentFirstTwoAverage: _reference_first_two_average,
+    Phenotypes.ExperimentBaseLine: _reference_baseline,
+    Phenotypes.ExperimentLowPoint: _reference_low_point,
+    Phenotypes.ExperimentLowPointWhen: _reference_low_point_time,
+    Phenotypes.ExperimentEndAverage: _reference_end_average,
+    Phenotypes.ExperimentGrowthYield: lambda **kwargs: _reference_end_average(**kwargs) - _reference_baseline(**kwargs),
+    Phenotypes.ExperimentPopulationDoublings:
+        lambda **kwargs: np.log2(_reference_end_average(**kwargs)) - np.log2(_reference_baseline(**kwargs)),
+    Phenotypes.GrowthLag: _with_index(_reference_growth_lag, 0),
+    Phenotypes.GenerationTime48h: lambda **kwargs: _reference_generation_time(index=kwargs['index48h'], **kwargs),
+    Phenotypes.ColonySize48h: _reference_growth_48h,
+    Phenotypes.GenerationTime: _with_index(_reference_generation_time, 0),
+    Phenotypes.GenerationTimeStErrOfEstimate: _with_index(_reference_generation_time_error, 0),
+    Phenotypes.GenerationTimeWhen: _with_index(_reference_generation_time_when, 0),
+    Phenotypes.GenerationTimePopulationSize: _with_index(_reference_population_size_at_generation_time, 0),
+    Phenotypes.GenerationTime2: _with_index(_reference_generation_time, 1),
+    Phenotypes.GenerationTime2StErrOfEstimate: _with_index(_reference_generation_time_error, 1),
+    Phenotypes.GenerationTime2When: _with_index(_reference_generation_time_when, 1),
+    Phenotypes.ResidualGrowth: _reference_residual_growth,
+    Phenotypes.ResidualGrowthAsPopulationDoublings: _reference_residual_doublings,
+    Phenotypes.Monotonicity: _reference_monotonicity,
+}
+
+
+@pytest.fixture(scope='module')
+def reference_plate():
+
+    np.random.seed(1)
+    times = np.arange(40) / 3.
+    plate = np.power(2, 17 + np.random.random((2, 3, times.size)).cumsum(axis=2) * 0.3)
+    plate[0, 1, 7] = np.nan
+    plate[1, 0, :3] = np.nan
+    plate[1, 2, ::2] = np.nan
+
+    size = 5
+    plate_strided = np.lib.stride_tricks.as_strided(
+        plate,
+        shape=(6, times.size - (size - 1), size),
+        strides=(plate.strides[1], plate.strides[2], plate.strides[2]))
+    times_strided = np.lib.stride_tricks.as_strided(
+        times, shape=(times.size - (size - 1), size), strides=(times.strides[0], times.strides[0]))
+
+    return plate, plate_strided, times, times_strided, 20, 2
+
+
+@pytest.mark.parametrize('phenotype', sorted(_REFERENCE_PHENOTYPES, key=lambda p: p.value))
+def test_plate_phenotype_matches_reference(reference_plate, phenotype):
+
+    plate, plate_strided, times, times_strided, index48h, position_offset = reference_plate
+    plate_values = phenotype.calculate_plate(**growth_phenotypes.get_plate_preprocessed_data_for_phenotypes(
+        plate, plate_strided, times, times_strided, index48h, position_offset))
+
+    for id_curve, pos in enumerate(np.ndindex(plate.shape[:2])):
+        expected = _REFERENCE_PHENOTYPES[phenotype](**_reference_preprocessed_data(
+            plate[pos], plate_strided[id_curve], times, times_strided, index48h, position_offset))
+        np.testing.assert_allclose(plate_values[pos], np.ma.filled(expected, np.nan), rtol=1e-10)
+
+
+def test_plate_derivative_matches_linregress():
+
+    np.random.seed(42)
+    times = np.arange(30) / 3.
+    plate = np.power(2, 17 + np.random.random((4, times.size)).cumsum(axis=1))
+    plate[1, 5] = np.nan
+    plate[2, 10:12] = np.nan
+    plate[3] = np.nan
+
+    size = 5
+    plate_strided = np.lib.stride_tricks.as_strided(
+        plate,
+        shape=(plate.shape[0], times.size - (size - 1), size),
+        strides=(plate.strides[0], plate.strides[1], plate.strides[1]))
+    times_strided = np.lib.stride_tricks.as_strided(
+        times, shape=(times.size - (size - 1), size), strides=(times.strides[0], times.strides[0]))
+
+    values, errors = growth_phenotypes.get_plate_derivative(plate_strided, times_strided)
+
+    for id_curve, curve_strided in enumerate(np.log2(plate_strided)):
+        for id_window, (window_times, window) in enumerate(zip(times_strided, curve_strided)):
+            filt = np.isfinite(window)
+            if filt.sum() < size - 1:
+                assert np.isnan(values[id_curve, id_window])
+                assert np.isnan(errors[id_curve, id_window])
+            else:
+                slope, _, _, _, stderr = linregress(window_times[filt], window[filt])
+                np.testing.assert_allclose(values[id_curve, id_window], slope)
+                np.testing.assert_allclose(errors[id_curve, id_window], stderr, atol=1e-12)
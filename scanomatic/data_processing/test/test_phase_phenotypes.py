@@ -1,7 +1,10 @@
 import pytest
 from scanomatic.data_processing.phases.analysis import _locate_segment, get_data_needed_for_segmentation,\
     DEFAULT_THRESHOLDS, segment, _phenotype_phases, CurvePhasePhenotypes, assign_linear_phase_phenotypes, \
-    assign_common_phase_phenotypes, assign_non_linear_phase_phenotypes
+    assign_common_phase_phenotypes, assign_non_linear_phase_phenotypes, get_data_needed_for_plate_segmentation, \
+    segment_plate
+from scanomatic.data_processing.phases.segmentation import get_plate_linear_non_flat_extensions, \
+    get_linear_non_flat_extension_per_position
 
 from scanomatic.data_processing.phenotyper import Phenotyper
 import numpy as np
@@ -274,3 +277,30 @@ def test_segments():
 
         assert model.phases is not None, "Failed phases on curve " + i
         assert len(model.phases) > 0, "Zero length phases on curve " + i
+
+
+def test_plate_segmentation_same_as_per_curve():
+
+    phenotyper_object = build_test_phenotyper()
+    positions = [(0, i) for i in range(phenotyper_object.number_of_curves)]
+
+    plate_models = get_data_needed_for_plate_segmentation(phenotyper_object, 0, positions, DEFAULT_THRESHOLDS)
+    extensions = get_plate_linear_non_flat_extensions(plate_models, DEFAULT_THRESHOLDS, max_elements=10 ** 4)
+    segment_plate(plate_models, DEFAULT_THRESHOLDS)
+
+    for (_, i), plate_model, plate_extensions in zip(positions, plate_models, extensions):
+
+        model = build_model(phenotyper_object, i)
+        for key in ('log2_curve', 'dydt', 'd2yd2t', 'dydt_signs', 'd2yd2t_signs'):
+            np.testing.assert_array_equal(
+                np.ma.getmaskarray(getattr(plate_model, key)), np.ma.getmaskarray(getattr(model, key)))
+            np.testing.assert_array_equal(
+                np.ma.filled(getattr(plate_model, key), 0), np.ma.filled(getattr(model, key), 0))
+
+        np.testing.assert_array_equal(
+            plate_extensions, get_linear_non_flat_extension_per_position(model, DEFAULT_THRESHOLDS)[0])
+
+        for _ in segment(model, DEFAULT_THRESHOLDS):
+            pass
+
+        np.testing.assert_array_equal(np.ma.filled(plate_model.phases, 0), np.ma.filled(model.phases, 0))
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from scanomatic.data_processing.phenotyper import Phenotyper
+
+
+@pytest.fixture(scope='module')
+def phenotyper_object():
+
+    np.random.seed(42)
+    times = np.arange(60) / 3.
+    data = np.array([[
+        np.power(2, 17 + (3 + np.random.random()) / (1 + np.exp(-(times - 5 - 10 * np.random.random()))) +
+                 np.random.normal(0, 0.05, times.size))
+        for _ in range(4)] for _ in range(3)], ndmin=4)
+
+    data[0, 0, 0, 10:20] = np.nan
+    data[0, 1, 1, ::2] = np.nan
+    data[0, 2, 2, 40:] = np.nan
+    data[0, 2, 3] = np.nan
+
+    return Phenotyper(data, times)
+
+
+def test_batched_weighted_smoothing_matches_per_curve(phenotyper_object):
+
+    phenotyper_object._poly_smoothen_raw_growth_weighted()
+    expected = phenotyper_object.smooth_growth_data[0].copy()
+
+    phenotyper_object._poly_smoothen_raw_growth_weighted_batched()
+    result = phenotyper_object.smooth_growth_data[0]
+
+    assert result.shape == expected.shape
+    compare = np.isfinite(expected) & (expected > 0)
+    assert np.isfinite(result[compare]).all()
+    np.testing.assert_allclose(result[compare], expected[compare], rtol=1e-5)
+
+
+def test_batched_smoothing_gives_nan_without_data(phenotyper_object):
+
+    phenotyper_object._poly_smoothen_raw_growth_weighted_batched()
+    result = phenotyper_object.smooth_growth_data[0]
+
+    assert np.isnan(result[2, 3]).all()
+    assert np.isfinite(result[0, 0]).all()
+
+
+def test_derivatives_follow_smooth_data(phenotyper_object):
+
+    phenotyper_object._poly_smoothen_raw_growth_weighted()
+    derivative = phenotyper_object.get_derivative(0, (1, 1))
+    assert derivative.size == phenotyper_object.times.size - 4
+
+    phenotyper_object.set('smooth_growth_data', phenotyper_object.raw_growth_data.copy())
+    assert not np.allclose(phenotyper_object.get_derivative(0, (1, 1)), derivative, equal_nan=True)
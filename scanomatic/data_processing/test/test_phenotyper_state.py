@@ -0,0 +1,129 @@
+import os
+
+import numpy as np
+import pytest
+
+from scanomatic.data_processing.phenotyper import Phenotyper, Smoothing, convert_legacy_state
+from scanomatic.data_processing.phenotyper_state import StateFile
+from scanomatic.data_processing.growth_phenotypes import Phenotypes
+from scanomatic.data_processing.phases.features import VectorPhenotypes
+from scanomatic.io.paths import Paths
+
+
+@pytest.fixture(scope='module')
+def phenotyper(tmpdir_factory):
+
+    np.random.seed(3)
+    times = np.arange(60) / 3.
+    plates = np.array([[[
+        np.power(2, 17 + (3 + np.random.random()) / (1 + np.exp(-(times - 5 - 10 * np.random.random()))) +
+                 np.random.normal(0, 0.05, times.size))
+        for _ in range(3)] for _ in range(2)] for _ in range(2)])
+
+    phenotyper = Phenotyper(plates, times)
+    phenotyper.extract_phenotypes(smoothing=Smoothing.MedianGauss)
+    phenotyper.add_position_mark(0, (1, 2), Phenotypes.GenerationTime)
+    return phenotyper
+
+
+@pytest.fixture(scope='module')
+def state_path(tmpdir_factory, phenotyper):
+
+    path = str(tmpdir_factory.mktemp('state'))
+    phenotyper.save_state(path, ask_if_overwrite=False)
+    return path
+
+
+@pytest.fixture(scope='module')
+def legacy_state_path(tmpdir_factory, phenotyper):
+
+    path = str(tmpdir_factory.mktemp('legacy_state'))
+    phenotyper.save_legacy_state(path, ask_if_overwrite=False)
+    return path
+
+
+def test_lazy_state_defers_loading(state_path):
+
+    phenotyper = Phenotyper.LoadFromState(state_path, lazy=True)
+    assert set(phenotyper._lazy_loaders) == {'smooth_growth_data', 'phenotypes', 'meta_data'}
+
+    phenotyper.get_phenotype(Phenotypes.GenerationTime)
+    assert set(phenotyper._lazy_loaders) == {'smooth_growth_data', 'meta_data'}
+
+
+def test_lazy_state_same_as_eager(state_path):
+
+    eager = Phenotyper.LoadFromState(state_path)
+    lazy = Phenotyper.LoadFromState(state_path, lazy=True)
+
+    for lazy_plate, eager_plate in zip(lazy.smooth_growth_data, eager.smooth_growth_data):
+        np.testing.assert_equal(lazy_plate, eager_plate)
+    np.testing.assert_equal(
+        lazy.get_phenotype(Phenotypes.GenerationTime, filtered=False),
+        eager.get_phenotype(Phenotypes.GenerationTime, filtered=False))
+    np.testing.assert_equal(lazy.get_curve_phases(1, 1, 2), eager.get_curve_phases(1, 1, 2))
+
+
+def test_lazy_state_can_be_saved_over_itself(state_path):
+
+    phenotyper = Phenotyper.LoadFromState(state_path, lazy=True)
+    raw = [np.array(plate) for plate in phenotyper.raw_growth_data]
+    phenotyper.save_state(state_path, ask_if_overwrite=False)
+
+    for id_plate, plate in enumerate(raw):
+        np.testing.assert_equal(phenotyper.raw_growth_data[id_plate], plate)
+        np.testing.assert_equal(Phenotyper.LoadFromState(state_path).raw_growth_data[id_plate], plate)
+
+
+def test_lazy_state_is_memory_mapped(state_path):
+
+    phenotyper = Phenotyper.LoadFromState(state_path, lazy=True)
+    assert all(isinstance(plate, np.memmap) for plate in phenotyper.raw_growth_data)
+    assert all(isinstance(plate, np.memmap) for plate in phenotyper.smooth_growth_data)
+
+
+def test_lazy_state_extraction_with_workers(state_path):
+
+    eager = Phenotyper.LoadFromState(state_path)
+    lazy = Phenotyper.LoadFromState(state_path, lazy=True)
+    lazy.extract_phenotypes(smoothing=Smoothing.Keep, workers=2)
+
+    np.testing.assert_allclose(
+        lazy.get_phenotype(Phenotypes.GenerationTime, filtered=False)[1],
+        eager.get_phenotype(Phenotypes.GenerationTime, filtered=False)[1])
+
+
+def test_lazy_legacy_state_is_memory_mapped(legacy_state_path):
+
+    phenotyper = Phenotyper.LoadFromState(legacy_state_path, lazy=True)
+    assert isinstance(phenotyper.raw_growth_data, np.memmap)
+
+
+def test_converted_legacy_state_same_as_saved(tmpdir, phenotyper):
+
+    path = str(tmpdir)
+    phenotyper.save_legacy_state(path, ask_if_overwrite=False)
+    state_file_path = convert_legacy_state(path)
+    converted = Phenotyper.LoadFromState(path)
+
+    with StateFile(state_file_path) as state_file:
+        np.testing.assert_equal(state_file.get_raw_growth_data(1), phenotyper.raw_growth_data[1])
+        np.testing.assert_equal(
+            state_file.get_phenotype(Phenotypes.GenerationTime, 0),
+            phenotyper.get_phenotype(Phenotypes.GenerationTime, filtered=False)[0])
+        assert state_file.get_phenotype_filter(Phenotypes.GenerationTime, 0)[1, 2]
+
+    np.testing.assert_equal(converted.get_curve_phases(1, 1, 2), phenotyper.get_curve_phases(1, 1, 2))
+    np.testing.assert_equal(
+        converted._vector_phenotypes[1][VectorPhenotypes.PhasesPhenotypes][1, 2],
+        phenotyper._vector_phenotypes[1][VectorPhenotypes.PhasesPhenotypes][1, 2])
+    assert list(converted._phenotype_filter_undo[0]) == list(phenotyper._phenotype_filter_undo[0])
+
+
+def test_saved_state_removes_legacy_state(tmpdir, phenotyper):
+
+    path = str(tmpdir)
+    phenotyper.save_legacy_state(path, ask_if_overwrite=False)
+    phenotyper.save_state(path, ask_if_overwrite=False)
+
+    assert os.listdir(path) == [Paths().phenotyper_state]
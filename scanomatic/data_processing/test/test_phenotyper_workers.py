@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from scanomatic.data_processing.phenotyper import Phenotyper, Smoothing
+from scanomatic.data_processing.growth_phenotypes import Phenotypes
+
+
+def build_test_phenotyper():
+
+    np.random.seed(7)
+    times = np.arange(90) / 3.
+    plates = np.array([[[
+        np.power(2, 17 + (3 + np.random.random()) / (1 + np.exp(-(times - 5 - 10 * np.random.random()))) +
+                 np.random.normal(0, 0.05, times.size))
+        for _ in range(4)] for _ in range(3)] for _ in range(2)])
+
+    return Phenotyper(plates, times)
+
+
+@pytest.fixture(scope='module')
+def serial_and_parallel():
+
+    serial = build_test_phenotyper()
+    serial.extract_phenotypes(smoothing=Smoothing.MedianGauss)
+    parallel = build_test_phenotyper()
+    parallel.extract_phenotypes(smoothing=Smoothing.MedianGauss, workers=2)
+    return serial, parallel
+
+
+def test_workers_give_same_smooth_data(serial_and_parallel):
+
+    serial, parallel = serial_and_parallel
+    for plate_serial, plate_parallel in zip(serial.smooth_growth_data, parallel.smooth_growth_data):
+        np.testing.assert_allclose(plate_parallel, plate_serial)
+
+
+def test_workers_give_same_phenotypes(serial_and_parallel):
+
+    serial, parallel = serial_and_parallel
+    assert Phenotypes.GenerationTime in parallel
+    for phenotype in serial.analysed_phenotypes:
+        for plate_serial, plate_parallel in zip(
+                serial.get_phenotype(phenotype, filtered=False), parallel.get_phenotype(phenotype, filtered=False)):
+            np.testing.assert_allclose(plate_parallel, plate_serial)
+
+
+def test_workers_give_same_phases(serial_and_parallel):
+
+    serial, parallel = serial_and_parallel
+    for id_plate, shape in enumerate(serial.plate_shapes):
+        for id0 in range(shape[0]):
+            for id1 in range(shape[1]):
+                np.testing.assert_array_equal(
+                    parallel.get_curve_phases(id_plate, id0, id1), serial.get_curve_phases(id_plate, id0, id1))
+                np.testing.assert_equal(
+                    parallel.get_curve_phase_data(id_plate, id0, id1), serial.get_curve_phase_data(id_plate, id0, id1))
+
+
+def test_workers_give_same_polynomial_smooth_data():
+
+    serial = build_test_phenotyper()
+    serial.extract_phenotypes(smoothing=Smoothing.PolynomialWeightedMulti)
+    parallel = build_test_phenotyper()
+    parallel.extract_phenotypes(smoothing=Smoothing.PolynomialWeightedMulti, workers=2)
+    for plate_serial, plate_parallel in zip(serial.smooth_growth_data, parallel.smooth_growth_data):
+        np.testing.assert_allclose(plate_parallel, plate_serial)
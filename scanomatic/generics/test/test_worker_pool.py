@@ -0,0 +1,30 @@
+from multiprocessing import Process, Queue
+
+from scanomatic.generics.worker_pool import get_process_pool
+
+
+def _double(value):
+
+    return 2 * value
+
+
+def _map_in_pool(queue):
+
+    pool = get_process_pool(2)
+    try:
+        queue.put(pool.map(_double, range(4)))
+    finally:
+        pool.close()
+        pool.join()
+
+
+def test_pool_in_daemonic_process():
+
+    queue = Queue()
+    process = Process(target=_map_in_pool, args=(queue,))
+    process.daemon = True
+    process.start()
+    result = queue.get(timeout=10)
+    process.join()
+
+    assert result == [0, 2, 4, 6]
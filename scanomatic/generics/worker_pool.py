@@ -0,0 +1,24 @@
+from multiprocessing import Pool, current_process
+
+
+def get_process_pool(workers, initializer=None, initargs=()):
+    """Process pool that may also be started from a server job.
+
+    Server jobs run as daemonic processes and multiprocessing refuses
+    daemonic processes to have children, this lets them start a pool
+    anyway. Callers are responsible for terminating the pool.
+
+    Args:
+        workers: Number of processes
+        initializer: Optional function to run when each process starts
+        initargs: Arguments to the initializer
+
+    Returns: multiprocessing.pool.Pool
+    """
+    process = current_process()
+    daemonic = process.daemon
+    process.daemon = False
+    try:
+        return Pool(workers, initializer=initializer, initargs=initargs)
+    finally:
+        process.daemon = daemonic
@@ -2,6 +2,7 @@ import os
 import numpy as np
 from time import sleep
 from threading import Thread
+from multiprocessing.pool import ThreadPool
 from subprocess import call
 
 #
@@ -12,11 +13,55 @@ import grid_array
 from image_grayscale import is_valid_grayscale
 from grayscale import getGrayscale
 from image_basics import load_image_to_numpy
+from scanomatic.io.fixtures import FixtureSettings
 from scanomatic.io.logger import Logger
-from scanomatic.models.analysis_model import IMAGE_ROTATIONS
+from scanomatic.generics.worker_pool import get_process_pool
+from scanomatic.models.analysis_model import IMAGE_ROTATIONS, WORKER_MODES
 from scanomatic.models.factories.analysis_factories import AnalysisFeaturesFactory
 from scanomatic.io.paths import Paths
 
+#
+# METHODS
+#
+
+
+def load_analysis_image(path, compilation_path, logger=None):
+    """Loads an image as a grayscale portrait array for analysis.
+
+    If the image can't be found at `path`, it is looked for next to the
+    compilation.
+
+    :param path: The path to the image
+    :param compilation_path: The path of the project compilation
+    :param logger: Optional logger for reporting fallbacks
+     :type logger: scanomatic.io.logger.Logger
+    :return: The image or `None` if it could not be loaded
+    :rtype: numpy.ndarray
+    """
+    try:
+
+        im = load_image_to_numpy(path, IMAGE_ROTATIONS.Portrait, dtype=np.uint8)
+
+    except (TypeError, IOError):
+
+        alt_path = os.path.join(os.path.dirname(compilation_path), os.path.basename(path))
+
+        if logger is not None:
+            logger.warning("Failed to load image at '{0}', trying '{1}'.".format(path, alt_path))
+        try:
+
+            im = load_image_to_numpy(alt_path, IMAGE_ROTATIONS.Portrait, dtype=np.uint8)
+
+        except (TypeError, IOError):
+
+            return None
+
+    if im.ndim == 3:
+        im = np.dot(im[..., :3], [0.299, 0.587, 0.144])
+
+    return im
+
+
 #
 # CLASS Project_Image
 #
@@ -67,6 +112,7 @@ class ProjectImage(object):
 
         self._grid_arrays = self._new_grid_arrays
         self._plate_image_inclusion = self.image_inclusions
+        self._gridding_history = None
 
         """:type : dict[int|scanomatic.image_analysis.grid_array.GridArray]"""
         self.features = _get_init_features(self._grid_arrays)
@@ -201,6 +247,8 @@ class ProjectImage(object):
         if self._im_loaded:
 
             threads = set()
+            detected_plates = []
+            gridding_history = self._get_gridding_history(image_model)
 
             self._logger.info("Setting grids for plates {0} using image index {1}".format(
                 plate_indices, image_model.image.index))
@@ -241,15 +289,26 @@ class ProjectImage(object):
 
                 else:
 
+                    if gridding_history is not None:
+                        plate_history = gridding_history.get_gridding_history(
+                            index, tuple(self._analysis_model.pinning_matrices[index]))
+                    else:
+                        plate_history = None
+
                     t = Thread(target=self._grid_arrays[index].detect_grid,
-                               args=(im,), kwargs=dict(analysis_directory=self._analysis_model.output_directory))
+                               args=(im,), kwargs=dict(analysis_directory=self._analysis_model.output_directory,
+                                                       gridding_history=plate_history))
                     t.start()
                     threads.add(t)
+                    detected_plates.append(index)
 
             while threads:
                 threads = set(t for t in threads if t.is_alive())
                 sleep(0.01)
 
+            if gridding_history is not None:
+                self._update_gridding_history(gridding_history, detected_plates)
+
             self._logger.info("Producing grid images for plates {0} based on image {1} and compilation '{2}'".format(
                 plate_indices, image_model.image.path, self._analysis_model.compilation))
 
@@ -264,31 +323,58 @@ class ProjectImage(object):
 
         return True
 
-    def load_image(self, path):
+    def _get_gridding_history(self, image_model):
+        """The gridding history of the fixture if the grid model says
+        gridding should be warm started from it.
 
-        if path == self._im_path_as_requested:
-            self._logger.info("Image was already loaded")
-            return
+        :type image_model: scanomatic.models.compile_project_model.CompileImageAnalysisModel
+        :rtype : scanomatic.io.grid_history.GriddingHistory
+        """
+        if not self._analysis_model.grid_model.warm_start or not image_model.fixture.name:
+            return None
 
-        try:
+        if self._gridding_history is None:
+            self._gridding_history = FixtureSettings(image_model.fixture.name).history
+            self._gridding_history.load()
 
-            self.im = load_image_to_numpy(path, IMAGE_ROTATIONS.Portrait, dtype=np.uint8)
-            self._im_loaded = True
+        return self._gridding_history
 
-        except (TypeError, IOError):
+    def _update_gridding_history(self, gridding_history, plate_indices):
+
+        warm_started = 0
+        for index in plate_indices:
+
+            grid_array = self._grid_arrays[index]
+            if not grid_array.valid_grid or grid_array.grid_parameters is None:
+                continue
+
+            if grid_array.warm_started:
+                warm_started += 1
 
-            alt_path = os.path.join(os.path.dirname(self._analysis_model.compilation),
-                                    os.path.basename(path))
+            center, spacings = grid_array.grid_parameters
+            gridding_history.set_gridding_parameters(
+                self._analysis_model.compilation, tuple(self._analysis_model.pinning_matrices[index]), index,
+                center, spacings)
 
-            self._logger.warning("Failed to load image at '{0}', trying '{1}'.".format(path, alt_path))
-            try:
+        self._logger.info("{0} of {1} plates were gridded from the gridding history".format(
+            warm_started, len(plate_indices)))
 
-                self.im = load_image_to_numpy(alt_path, IMAGE_ROTATIONS.Portrait, dtype=np.uint8)
-                self._im_loaded = True
+    def load_image(self, path):
 
-            except (TypeError, IOError):
+        if path == self._im_path_as_requested:
+            self._logger.info("Image was already loaded")
+            return
 
-                self._im_loaded = False
+        self.set_image(path, load_analysis_image(path, self._analysis_model.compilation, self._logger))
+
+    def set_image(self, path, im):
+        """Sets an already loaded image as the current image
+
+        :param path: The path the image was requested as
+        :param im: The grayscale image, `None` if loading failed
+        """
+        self.im = im
+        self._im_loaded = im is not None
 
         if self._im_loaded:
             self._logger.info("Image loaded")
@@ -297,11 +383,6 @@ class ProjectImage(object):
             self._logger.error("Failed to load image")
 
         self.validate_rotation()
-        self._convert_to_grayscale()
-
-    def _convert_to_grayscale(self):
-        if self.im.ndim == 3:
-            self.im = np.dot(self.im[..., :3], [0.299, 0.587, 0.144])
 
     def validate_rotation(self):
 
@@ -388,13 +469,51 @@ class ProjectImage(object):
         for grid_array in self._grid_arrays.itervalues():
             grid_array.clear_features()
 
-    def analyse(self, image_model):
+    def _analyse_plate_sections(self, plate_sections, image_model):
+        """Analyses the plates, concurrently if the model has several workers.
+
+        Plates each get a thread of their own, while their grid cells are
+        analysed in blocks on a pool shared by all plates. Depending on the
+        model's worker mode the pool has threads or processes.
+
+        :type plate_sections: list[(scanomatic.image_analysis.grid_array.GridArray, numpy.ndarray)]
+        :type image_model: scanomatic.models.compile_project_model.CompileImageAnalysisModel
+        """
+        workers = self._analysis_model.workers
+
+        if workers <= 1 or not plate_sections:
+            for grid_arr, im in plate_sections:
+                grid_arr.analyse(im, image_model)
+            return
+
+        if self._analysis_model.worker_mode is WORKER_MODES.Processes:
+            cell_pool = get_process_pool(workers)
+        else:
+            cell_pool = ThreadPool(workers)
+
+        plate_pool = ThreadPool(len(plate_sections))
+        try:
+            results = [plate_pool.apply_async(grid_arr.analyse, (im, image_model), {'pool': cell_pool})
+                       for grid_arr, im in plate_sections]
+            for result in results:
+                result.get()
+        finally:
+            plate_pool.close()
+            cell_pool.close()
+            plate_pool.join()
+            cell_pool.join()
+
+    def analyse(self, image_model, im=None):
 
         """
 
         :type image_model: scanomatic.models.compile_project_model.CompileImageAnalysisModel
+        :param im: Optional image already loaded with `load_analysis_image`
         """
-        self.load_image(image_model.image.path)
+        if im is not None:
+            self.set_image(image_model.image.path, im)
+        else:
+            self.load_image(image_model.image.path)
         self._logger.info("Image loaded")
         if self._im_loaded is False:
             self.clear_features()
@@ -410,7 +529,7 @@ class ProjectImage(object):
 
         self.features.index = image_model.image.index
         grid_arrays_processed = set()
-        # threads = set()
+        plate_sections = []
         for plate in image_model.fixture.plates:
 
             if plate.index in self._grid_arrays:
@@ -425,19 +544,10 @@ class ProjectImage(object):
                     self.set_grid_plates([plate.index], image_model)
 
                 grid_arrays_processed.add(plate.index)
-                im = self.get_im_section(plate)
-                grid_arr = self._grid_arrays[plate.index]
-                """:type: scanomatic.image_analysis.grid_array.GridArray"""
-                grid_arr.analyse(im, image_model)
-                """
-                t = Thread(target=grid_arr.analyse, args=(im, image_model))
-                t.start()
-                threads.add(t)
-
-        while threads:
-            threads = set(t for t in threads if t.is_alive())
-            sleep(0.01)
-        """
+                plate_sections.append((self._grid_arrays[plate.index], self.get_im_section(plate)))
+
+        self._analyse_plate_sections(plate_sections, image_model)
+
         for index, grid_array in self._grid_arrays.iteritems():
             if index not in grid_arrays_processed:
                 grid_array.clear_features()
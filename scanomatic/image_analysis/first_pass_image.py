@@ -230,7 +230,13 @@ class FixtureImage(object):
             pattern_image_path=self["reference"].get_marker_path(),
             scale=scale_factor)
 
-        x_positions_correct_scale, y_positions_correct_scale = im_analysis.find_pattern(markings=markings)
+        x_positions_correct_scale, y_positions_correct_scale = im_analysis.find_pattern_near(
+            self._get_expected_marker_positions(markings), markings=markings)
+
+        if x_positions_correct_scale is None or y_positions_correct_scale is None:
+
+            _logger.info("Markers not found near expected positions, searching entire image")
+            x_positions_correct_scale, y_positions_correct_scale = im_analysis.find_pattern(markings=markings)
 
         self["current"].model.orientation_marks_x = x_positions_correct_scale
         self["current"].model.orientation_marks_y = y_positions_correct_scale
@@ -241,6 +247,21 @@ class FixtureImage(object):
 
         _logger.debug("Marker Detection complete (acc {0} s)".format(time.time() - t))
 
+    def _get_expected_marker_positions(self, markings):
+        """The marker positions of the current fixture model, which
+        before detection are those of the reference.
+
+        :return: The x and y positions or `None` if they aren't known
+            for all markings.
+        """
+        x_positions = self["current"].model.orientation_marks_x
+        y_positions = self["current"].model.orientation_marks_y
+
+        if x_positions is None or y_positions is None or not len(x_positions) == len(y_positions) == markings:
+            return None
+
+        return x_positions, y_positions
+
     def _get_image_in_correct_scale(self, target_dpi):
 
         if self._original_dpi != target_dpi:
@@ -7,6 +7,8 @@ except ImportError:
 
 from scipy import ndimage
 
+from scanomatic.models.analysis_model import THRESHOLD_METHODS
+
 #
 # FUNCTIONS
 #
@@ -54,6 +56,70 @@ def get_adaptive_threshold(im, threshold_filter=None, segments=60,
     return ndimage.gaussian_filter(segmented_image, sigma=sigma)
 
 
+def _get_tile_interpolation_weights(length, tiles):
+    """Weights for linear interpolation from tile centers to each pixel
+
+    Pixels outside the outermost tile centers get the value of the
+    outermost tile.
+
+    :return: Array with shape (length, tiles)
+    """
+    edges = np.linspace(0, length, tiles + 1)
+    centers = (edges[:-1] + edges[1:]) / 2.0 - 0.5
+    positions = np.interp(np.arange(length), centers, np.arange(tiles))
+    lower = np.floor(positions).astype(np.int)
+    upper = np.minimum(lower + 1, tiles - 1)
+    fraction = positions - lower
+
+    weights = np.zeros((length, tiles))
+    weights[np.arange(length), lower] += 1 - fraction
+    weights[np.arange(length), upper] += fraction
+    return weights
+
+
+def get_tiled_threshold(im, threshold_filter=None, tiles=10, sigma=None, *args, **kwargs):
+    """Gives a 2D surface of threshold based on local measures in a
+    regular grid of tiles.
+
+    Each tile gets a threshold from the threshold filter (or its mean
+    if it has no variation). The surface is the bilinear interpolation
+    between tile centers, optionally gaussian smoothed. As opposed to
+    `get_adaptive_threshold`, the surface is deterministic and each
+    pixel is only visited once.
+
+    :param im: The image
+    :param threshold_filter: Function giving the threshold of a tile,
+        default is otsu.
+    :param tiles: Number of tiles along each dimension, either one
+        number or one per dimension.
+    :param sigma: Optional gaussian smoothing of the surface.
+    :return: Threshold surface of same shape as the image
+    """
+    if threshold_filter is None:
+        threshold_filter = ski_filter.threshold_otsu
+    if np.isscalar(tiles):
+        tiles = (tiles, tiles)
+
+    tiles = tuple(int(max(1, min(n, length))) for n, length in zip(tiles, im.shape))
+    row_edges, column_edges = (np.linspace(0, length, n + 1).astype(np.int) for n, length in zip(tiles, im.shape))
+
+    tile_thresholds = np.zeros(tiles)
+    for row, column in np.ndindex(tiles):
+
+        i_slice = im[row_edges[row]: row_edges[row + 1], column_edges[column]: column_edges[column + 1]]
+        if i_slice.std() != 0:
+            tile_thresholds[row, column] = threshold_filter(i_slice, *args, **kwargs)
+        else:
+            tile_thresholds[row, column] = i_slice.mean()
+
+    surface = _get_tile_interpolation_weights(im.shape[0], tiles[0]).dot(tile_thresholds).dot(
+        _get_tile_interpolation_weights(im.shape[1], tiles[1]).T)
+
+    if sigma:
+        return ndimage.gaussian_filter(surface, sigma=sigma)
+    return surface
+
+
 def _get_sectioned_image(im):
     """Sections image in proximity regions for points of interests"""
 
@@ -432,17 +498,141 @@ def get_valid_parameters(center, spacing, expected_center, expected_spacing,
     return tuple(center), tuple(spacing), values_adjusted
 
 
+def _get_grid_positions(center, spacing, length):
+
+    return center + (np.arange(length) - length / 2.0 + 0.5) * spacing
+
+
+def _get_profile_scores(profile, positions):
+    """Mean of the profile at the positions along the last axis, zero outside the profile"""
+
+    return np.interp(positions, np.arange(profile.size), profile, left=0, right=0).mean(axis=-1)
+
+
+def _get_dimension_profile(density, dimension, center, spacings, grid_shape):
+    """Mean density along a dimension sampled at the grid positions of the other dimension"""
+
+    other = 1 - dimension
+    positions = np.round(_get_grid_positions(center[other], spacings[other], grid_shape[other])).astype(np.int)
+    return density.take(positions.clip(0, density.shape[other] - 1), axis=other).mean(axis=other)
+
+
+def _refine_dimension(profile, center, spacing, length, search_fraction, spacing_tolerance):
+    """Searches offsets of the center and scalings of the spacing for the
+    positions with the highest profile score"""
+
+    offsets = np.arange(-search_fraction * spacing, search_fraction * spacing + 0.25, 0.5)
+    candidate_spacings = spacing * np.linspace(1 - spacing_tolerance, 1 + spacing_tolerance, 9)
+    positions = (center + offsets)[:, None, None] + \
+        (np.arange(length) - length / 2.0 + 0.5)[None, None, :] * candidate_spacings[None, :, None]
+
+    best_offset, best_spacing = np.unravel_index(_get_profile_scores(profile, positions).argmax(),
+                                                 (offsets.size, candidate_spacings.size))
+    return center + offsets[best_offset], candidate_spacings[best_spacing]
+
+
+def get_grid_from_history(im, center, spacings, grid_shape, search_fraction=0.5, spacing_tolerance=0.02,
+                          min_hit_fraction=0.5, iterations=2):
+    """Refines a grid from a previously detected center and spacings.
+
+    The colonies are found with a tiled threshold and the grid is
+    refined by a local search, one dimension at a time, for the center
+    offset and spacing that places most grid positions on colonies.
+    The refined grid positions are then replaced by nearby observed
+    colonies as in the full detection.
+
+    The refinement is rejected if too few grid positions are on
+    colonies or if moving the grid one grid cell in either direction
+    would place more positions on colonies.
+
+    :param im: The plate image
+    :param center: The center of the previous grid
+    :param spacings: The spacings of the previous grid
+    :param grid_shape: The shape of the grid
+    :param search_fraction: How far from the previous center to search
+        as a fraction of the spacing.
+    :param spacing_tolerance: Relative change allowed for the spacings.
+    :param min_hit_fraction: Fraction of the grid positions that need
+        to be on colonies.
+    :param iterations: Number of times each dimension is refined.
+    :return: The grid, center and spacings, or `None` if the refined
+        grid was rejected.
+    """
+    foreground = im < get_tiled_threshold(im)
+    density = ndimage.uniform_filter(
+        foreground.astype(np.float), size=max(1, int(round(min(spacings) / 4.0))))
+
+    refined_center = list(center)
+    refined_spacings = list(spacings)
+    for _ in range(iterations):
+        for dimension in range(2):
+            profile = _get_dimension_profile(density, dimension, refined_center, refined_spacings, grid_shape)
+            refined_center[dimension], refined_spacings[dimension] = _refine_dimension(
+                profile, center[dimension], spacings[dimension], grid_shape[dimension],
+                search_fraction, spacing_tolerance)
+
+    for dimension in range(2):
+        profile = _get_dimension_profile(density, dimension, refined_center, refined_spacings, grid_shape)
+        positions = _get_grid_positions(refined_center[dimension], refined_spacings[dimension], grid_shape[dimension])
+        score = _get_profile_scores(profile, positions)
+        if any(_get_profile_scores(profile, positions + shift) >= score
+               for shift in (-refined_spacings[dimension], refined_spacings[dimension])):
+            return None
+
+    dim1_positions, dim2_positions = (
+        np.round(_get_grid_positions(refined_center[dimension], refined_spacings[dimension], grid_shape[dimension])
+                 ).astype(np.int).clip(0, im.shape[dimension] - 1) for dimension in range(2))
+    if (density[np.ix_(dim1_positions, dim2_positions)] > 0.5).mean() < min_hit_fraction:
+        return None
+
+    dx, dy = refined_spacings
+    grid = build_grid_from_center(None, None, refined_center, dx, dy, grid_shape)
+
+    labeled, _ = ndimage.label(foreground)
+    max_size = max(refined_spacings)
+    observed = np.array([((dim1.start + dim1.stop - 1) / 2.0, (dim2.start + dim2.stop - 1) / 2.0)
+                         for dim1, dim2 in ndimage.find_objects(labeled)
+                         if 40 <= (dim1.stop - dim1.start) * (dim2.stop - dim2.start) <= max_size ** 2])
+    if observed.size:
+        _replace_nearest_ideal_with_observed(grid, observed, refined_spacings)
+
+    return grid, tuple(refined_center), tuple(refined_spacings)
+
+
+def _replace_nearest_ideal_with_observed(ideal_grid, observed, spacings, max_sq_dist=105):
+    """Moves each grid position to the closest observed position in its
+    grid cell if close enough.
+
+    Unlike `replace_ideal_with_observed` the ideal grid is not adjusted
+    to the observed positions, so it should already fit the image well.
+    """
+    observed = observed.T
+    indices = np.round((observed - ideal_grid[:, :1, 0]) / np.array(spacings).reshape(2, 1)).astype(np.int)
+    inside = ((indices >= 0) & (indices < np.array(ideal_grid.shape[1:]).reshape(2, 1))).all(axis=0)
+    observed = observed[:, inside]
+    indices = indices[:, inside]
+
+    sq_distances = ((observed - ideal_grid[:, indices[0], indices[1]]) ** 2).sum(axis=0)
+    # The closest observation is assigned last, so it is the one kept
+    order = np.argsort(sq_distances)[::-1]
+    order = order[sq_distances[order] < max_sq_dist]
+    ideal_grid[:, indices[0, order], indices[1, order]] = observed[:, order]
+
+
 def get_grid(im, expected_spacing=(105, 105), grid_shape=(16, 24),
              x_data=None, y_data=None,
              expected_center=(100, 100), run_dev=False, dev_reduce_grid_data_fraction=None,
-             validate_parameters=False, grid_correction=None):
+             validate_parameters=False, grid_correction=None, threshold_method=THRESHOLD_METHODS.Sectioned):
     """Detects grid candidates and constructs a grid"""
 
     adjusted_values = True
     center = expected_center
     spacings = expected_spacing
 
-    adaptive_threshold = get_adaptive_threshold(im, threshold_filter=None, segments=100, sigma=30)
+    if threshold_method is THRESHOLD_METHODS.Tiled:
+        adaptive_threshold = get_tiled_threshold(im, threshold_filter=None, tiles=10)
+    else:
+        adaptive_threshold = get_adaptive_threshold(im, threshold_filter=None, segments=100, sigma=30)
 
     im_filtered = get_denoise_segments(im < adaptive_threshold, iterations=3)
     del adaptive_threshold
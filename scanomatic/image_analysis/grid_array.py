@@ -4,6 +4,8 @@
 
 import numpy as np
 import os
+import shutil
+import tempfile
 
 
 #
@@ -11,12 +13,12 @@ import os
 #
 
 import grid
-from grid_cell import GridCell
+from grid_cell import GridCell, analyse_grid_cells
 import scanomatic.io.paths as paths
 import scanomatic.io.logger as logger
 from scanomatic.io.pickler import unpickle_with_unpickler
 import image_basics
-from scanomatic.models.analysis_model import IMAGE_ROTATIONS
+from scanomatic.models.analysis_model import IMAGE_ROTATIONS, WORKER_MODES
 from scanomatic.image_analysis.grayscale import getGrayscale
 from scanomatic.models.factories.analysis_factories import AnalysisFeaturesFactory
 from scanomatic.data_processing.calibration import load_calibration
@@ -36,12 +38,13 @@ def _analyse_grid_cell(grid_cell, im, transpose_polynomial, image_index, semapho
     """
     save_extra_data = grid_cell.save_extra_data
 
-    grid_cell.source = _get_image_slice(im, grid_cell).astype(np.float64)
+    grid_cell.source = _get_image_slice(im, grid_cell)
     if grid_cell.source is None:
         GridArray._LOGGER.error("Tried to analyse grid cell that doesn't have any area")
         if semaphore is not None:
             semaphore.release()
         return
+    grid_cell.source = grid_cell.source.astype(np.float64)
 
     grid_cell.image_index = image_index
 
@@ -71,6 +74,74 @@ def _analyse_grid_cell(grid_cell, im, transpose_polynomial, image_index, semapho
         semaphore.release()
 
 
+def _analyse_grid_cells(grid_cells, im, transposed_im, transpose_polynomial, image_index, analysis_job_model=None):
+    """Analyses grid cells, quantifying all but extra monitored together.
+
+    :param im: The plate image
+    :param transposed_im: The plate image with the grayscale transposition applied
+    """
+    batch = []
+
+    for grid_cell in grid_cells:
+
+        if grid_cell.save_extra_data:
+            GridArray._LOGGER.info("Starting analysis of extra monitored position {0}".format(grid_cell.position))
+            _analyse_grid_cell(grid_cell, im, transpose_polynomial, image_index, None, analysis_job_model)
+            continue
+
+        grid_cell.source = _get_image_slice(transposed_im, grid_cell)
+        if grid_cell.source is None:
+            GridArray._LOGGER.error("Tried to analyse grid cell that doesn't have any area")
+            continue
+
+        grid_cell.image_index = image_index
+
+        if not grid_cell.ready:
+            grid_cell.attach_analysis(
+                blob=True, background=True, cell=True,
+                run_detect=False)
+
+        batch.append(grid_cell)
+
+    analyse_grid_cells(batch, remember_filter=True)
+
+
+def _analyse_grid_cells_in_process(task):
+    """Analyses a block of grid cells in a pool process.
+
+    The plate images are read from memory-mapped files.
+
+    :rtype : list[scanomatic.image_analysis.grid_cell.GridCell]
+    """
+    grid_cells, im_path, transposed_im_path, transpose_polynomial, image_index, analysis_job_model = task
+
+    _analyse_grid_cells(
+        grid_cells, np.load(im_path, mmap_mode='r'), np.load(transposed_im_path, mmap_mode='r'),
+        transpose_polynomial, image_index, analysis_job_model)
+
+    return grid_cells
+
+
+def _get_transposed_image(im, transpose_polynomial):
+
+    transposed_im = im.astype(np.float64)
+    if transpose_polynomial is not None:
+        transposed_im[...] = transpose_polynomial(transposed_im)
+    return transposed_im
+
+
+def _get_grid_cell_blocks(grid_cells, blocks):
+    """Splits grid cells into blocks of neighbouring rows.
+
+    :type grid_cells: dict[tuple|scanomatic.image_analysis.grid_cell.GridCell]
+    :type blocks: int
+    :rtype : list[list[scanomatic.image_analysis.grid_cell.GridCell]]
+    """
+    ordered = [grid_cells[position] for position in sorted(grid_cells)]
+    size = max(1, int(np.ceil(len(ordered) / float(blocks))))
+    return [ordered[start: start + size] for start in xrange(0, len(ordered), size)]
+
+
 def _set_image_transposition(grid_cell, transpose_polynomial):
 
     grid_cell.source[...] = transpose_polynomial(grid_cell.source)
@@ -194,6 +265,8 @@ class GridArray(object):
         self._grid = None
         self._valid_grid = False
         self._grid_cell_corners = None
+        self._grid_parameters = None
+        self._warm_started = False
 
         self._features = AnalysisFeaturesFactory.create(index=self._identifier[-1], shape=tuple(pinning), data=set())
         self._first_analysis = True
@@ -215,6 +288,17 @@ class GridArray(object):
     def grid_cell_size(self):
         return self._grid_cell_size
 
+    @property
+    def grid_parameters(self):
+        """The center and spacings of the last detected grid, `None` if
+        the grid wasn't detected"""
+        return self._grid_parameters
+
+    @property
+    def warm_started(self):
+        """If the last grid was detected by refining the gridding history"""
+        return self._warm_started
+
     @property
     def grid(self):
 
@@ -247,6 +331,9 @@ class GridArray(object):
         self._LOGGER.info("Setting manual re-gridding for plate {0} using offset {1} on reference grid {2}".format(
             self.index + 1, offset, grid))
 
+        self._grid_parameters = None
+        self._warm_started = False
+
         if not offset:
             return self.detect_grid(im, analysis_directory=analysis_directory, grid_correction=offset)
 
@@ -313,7 +400,28 @@ class GridArray(object):
                                  self._paths.grid_size_pattern.format(self.index + 1)), self._grid_cell_size)
         return True
 
-    def detect_grid(self, im, analysis_directory=None, grid_correction=None):
+    def detect_grid(self, im, analysis_directory=None, grid_correction=None, threshold_method=None,
+                    gridding_history=None):
+        """Detects the grid of the plate image
+
+        If there's a gridding history, the grid is first refined from
+        its median center and spacings. Full detection is only done if
+        that grid is rejected.
+
+        :param im: The plate image
+        :param analysis_directory: Optional directory to save the grid to
+        :param grid_correction: Optional offset of the grid in grid cells
+        :param threshold_method: Optional method of the adaptive threshold
+            used to find colonies, default is from the grid model of the
+            analysis model.
+        :type threshold_method: scanomatic.models.analysis_model.THRESHOLD_METHODS
+        :param gridding_history: Optional previous grid centers and
+            spacings of this plate position and pinning, as given by
+            `scanomatic.io.grid_history.GriddingHistory.get_gridding_history`
+        :return: If a valid grid was detected
+        """
+        if threshold_method is None:
+            threshold_method = self._analysis_model.grid_model.threshold_method
 
         self._LOGGER.info("Detecting grid on plate {0} using grid correction {1}".format(
             self.index + 1, grid_correction))
@@ -327,7 +435,16 @@ class GridArray(object):
 
         self._init_grid_cells(_get_grid_to_im_axis_mapping(self._pinning_matrix, im))
 
-        spacings = self._calculate_grid_and_get_spacings(im, grid_correction=grid_correction)
+        self._grid_parameters = None
+        self._warm_started = False
+        spacings = None
+
+        if gridding_history is not None and not grid_correction:
+            spacings = self._warm_start_grid_and_get_spacings(im, gridding_history)
+
+        if spacings is None:
+            spacings = self._calculate_grid_and_get_spacings(
+                im, grid_correction=grid_correction, threshold_method=threshold_method)
 
         if self._grid is None or not self._valid_grid or np.isnan(spacings).any():
 
@@ -361,24 +478,53 @@ class GridArray(object):
 
         return True
 
-    def _calculate_grid_and_get_spacings(self, im, grid_correction=None):
+    def _calculate_grid_and_get_spacings(self, im, grid_correction=None, threshold_method=None):
 
         validate_parameters = False
         expected_spacings = self._guess_grid_cell_size
         expected_center = tuple([s / 2.0 for s in im.shape])
 
-        draft_grid, _, _, _, spacings, adjusted_values = grid.get_grid(
+        draft_grid, _, _, center, spacings, adjusted_values = grid.get_grid(
             im,
             expected_spacing=expected_spacings,
             expected_center=expected_center,
             validate_parameters=validate_parameters,
             grid_shape=self._pinning_matrix,
-            grid_correction=grid_correction)
+            grid_correction=grid_correction,
+            threshold_method=threshold_method)
 
         dx, dy = spacings
 
         self._grid, _, self._valid_grid = grid.get_validated_grid(
             im, draft_grid, dy, dx, adjusted_values)
+        self._grid_parameters = tuple(center), tuple(spacings)
+
+        return spacings
+
+    def _warm_start_grid_and_get_spacings(self, im, gridding_history):
+
+        gridding_history = np.asarray(gridding_history, dtype=np.float)
+        center = np.median(gridding_history[:, :2], axis=0)
+        spacings = np.median(gridding_history[:, 2:], axis=0)
+
+        refined = grid.get_grid_from_history(im, center, spacings, self._pinning_matrix)
+        if refined is None:
+            self._LOGGER.info("Gridding history didn't fit plate {0}, detecting grid from scratch".format(
+                self.index + 1))
+            return None
+
+        draft_grid, center, spacings = refined
+        dx, dy = spacings
+        draft_grid, _, valid_grid = grid.get_validated_grid(im, draft_grid, dy, dx, False)
+        if not valid_grid:
+            self._LOGGER.info("Grid from gridding history outside plate {0}, detecting grid from scratch".format(
+                self.index + 1))
+            return None
+
+        self._grid = draft_grid
+        self._valid_grid = True
+        self._grid_parameters = tuple(center), tuple(spacings)
+        self._warm_started = True
 
         return spacings
 
@@ -435,11 +581,15 @@ class GridArray(object):
         for grid_cell in self._grid_cells.itervalues():
             grid_cell.clear_features()
 
-    def analyse(self, im, image_model):
+    def analyse(self, im, image_model, pool=None):
 
         """
 
         :type image_model: scanomatic.models.compile_project_model.CompileImageAnalysisModel
+        :param pool: Optional pool, if supplied blocks of grid cells
+            are analysed concurrently on it. It should be a process pool
+            if the analysis model's worker mode is processes.
+         :type pool: multiprocessing.pool.Pool
         """
 
         index = image_model.image.index
@@ -462,11 +612,52 @@ class GridArray(object):
                 return
 
         m = self._analysis_model
+        transposed_im = _get_transposed_image(im, transpose_polynomial)
 
-        for grid_cell in self._grid_cells.itervalues():
+        if pool is None:
 
-            if grid_cell.save_extra_data:
-                self._LOGGER.info("Starting analysis of extra monitored position {0}".format(grid_cell.position))
-            _analyse_grid_cell(grid_cell, im, transpose_polynomial, index, None, m)
+            _analyse_grid_cells(self._grid_cells.itervalues(), im, transposed_im, transpose_polynomial, index, m)
+
+        elif m.worker_mode is WORKER_MODES.Processes:
+
+            self._analyse_in_processes(pool, im, transposed_im, transpose_polynomial, index)
+
+        else:
+
+            # Each cell only writes to its own features, so blocks may finish in any order
+            pool.map(
+                lambda grid_cells: _analyse_grid_cells(
+                    grid_cells, im, transposed_im, transpose_polynomial, index, m),
+                _get_grid_cell_blocks(self._grid_cells, 4 * m.workers))
 
         self._LOGGER.info("Plate {0} completed".format(self._identifier))
+
+    def _analyse_in_processes(self, pool, im, transposed_im, transpose_polynomial, image_index):
+        """Analyses blocks of grid cells on a process pool.
+
+        The grid cells are sent to the processes together with their
+        detection history and the analysed copies are merged back.
+        The plate images are shared as memory-mapped files.
+
+        :type pool: multiprocessing.pool.Pool
+        """
+        m = self._analysis_model
+        blocks = _get_grid_cell_blocks(self._grid_cells, 4 * m.workers)
+        directory = tempfile.mkdtemp(prefix="scanomatic_grid_array_")
+
+        try:
+            im_path = os.path.join(directory, "image.npy")
+            np.save(im_path, im)
+            transposed_im_path = os.path.join(directory, "transposed_image.npy")
+            np.save(transposed_im_path, transposed_im)
+
+            analysed_blocks = pool.map(
+                _analyse_grid_cells_in_process,
+                [(block, im_path, transposed_im_path, transpose_polynomial, image_index, m) for block in blocks])
+
+            for block, analysed_block in zip(blocks, analysed_blocks):
+                for grid_cell, analysed_grid_cell in zip(block, analysed_block):
+                    grid_cell.set_analysis_from(analysed_grid_cell)
+
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
@@ -15,11 +15,116 @@ import os
 #
 
 import grid_cell_extra as grid_cell_extra
-from scanomatic.models.analysis_model import VALUES, COMPARTMENTS
+from scanomatic.models.analysis_model import VALUES, COMPARTMENTS, MEASURES
 from scanomatic.models.factories.analysis_factories import AnalysisFeaturesFactory
 from scanomatic.io.paths import Paths
 from scanomatic.io.logger import Logger
 from scanomatic.generics.maths import mid50_mean as iqr_mean
+#
+# FUNCTIONS
+#
+
+
+def analyse_grid_cells(grid_cells, detect=True, remember_filter=True):
+    """Analyses several grid cells, quantifying them all at once.
+
+    Gives the same features as running `GridCell.analyse` on each of
+    the grid cells, but background subtraction, calibration and the
+    measures are calculated for all cells together.
+
+    :type grid_cells: list[GridCell]
+    """
+
+    if detect:
+        for grid_cell in grid_cells:
+            grid_cell.detect(remember_filter=remember_filter)
+
+    quantifiable = {}
+    for grid_cell in grid_cells:
+
+        if grid_cell.get_item(COMPARTMENTS.Background).filter_array.sum() == 0:
+            grid_cell.clear_features()
+        else:
+            quantifiable.setdefault(id(grid_cell.polynomial_coeffs), []).append(grid_cell)
+
+    for same_calibration_cells in quantifiable.itervalues():
+        _quantify_grid_cells(same_calibration_cells)
+
+
+def _get_labeled_background_subtraction(grid_cells, values, labels):
+
+    background = np.hstack([grid_cell.get_item(COMPARTMENTS.Background).filter_array.ravel()
+                            for grid_cell in grid_cells])
+
+    bg_sub = grid_cell_extra.get_labeled_measures(values, labels, background, len(grid_cells))[MEASURES.IQR_Mean]
+
+    for id_cell in np.where(~np.isfinite(bg_sub))[0]:
+
+        bg_sub[id_cell] = values[(labels == id_cell) & background].mean()
+        GridCell._logger.warning("{0} caused background mean ({1}) due to inf".format(
+            grid_cells[id_cell].identifier, bg_sub[id_cell]))
+
+    return bg_sub
+
+
+def _quantify_grid_cells(grid_cells):
+    """Quantifies detected grid cells sharing calibration polynomial.
+
+    :type grid_cells: list[GridCell]
+    """
+
+    sizes = [grid_cell.source.size for grid_cell in grid_cells]
+    labels = np.repeat(np.arange(len(grid_cells)), sizes)
+    values = np.hstack([grid_cell.source.ravel() for grid_cell in grid_cells]).astype(np.float64)
+
+    values -= _get_labeled_background_subtraction(grid_cells, values, labels)[labels]
+    values[values < GridCell.MIN_THRESHOLD] = GridCell.MIN_THRESHOLD
+
+    polynomial_coeffs = grid_cells[0].polynomial_coeffs
+    if polynomial_coeffs is not None:
+        values = np.polyval(polynomial_coeffs, values)
+
+    overshooting = np.bincount(labels, weights=values > GridCell.MAX_THRESHOLD, minlength=len(grid_cells))
+    start = 0
+    for grid_cell, size, cell_overshooting in zip(grid_cells, sizes, overshooting):
+
+        grid_cell.source = values[start: start + size].reshape(grid_cell.source.shape)
+        grid_cell._update_adjustment_warning(int(cell_overshooting))
+        grid_cell.push_source_data_to_cell_items()
+        start += size
+
+    shapes = [grid_cell.source.shape for grid_cell in grid_cells]
+
+    for compartment in COMPARTMENTS:
+
+        items = [grid_cell.get_item(compartment) for grid_cell in grid_cells]
+        if not any(items):
+            continue
+
+        for item, grid_cell in zip(items, grid_cells):
+            if item:
+                item.set_data_source(grid_cell.source)
+
+        filter_array = np.hstack([
+            item.filter_array.ravel() if item and item.filter_array is not None else np.zeros(size, dtype=np.bool)
+            for item, size in zip(items, sizes)])
+
+        measures = grid_cell_extra.get_labeled_measures(values, labels, filter_array, len(grid_cells), shapes)
+        centroids = measures[MEASURES.Centroid]
+
+        for id_cell, item in enumerate(items):
+
+            if not item or item.filter_array is None:
+                continue
+
+            item.set_features(
+                measures[MEASURES.Count][id_cell],
+                measures[MEASURES.Sum][id_cell],
+                measures[MEASURES.Median][id_cell],
+                (measures[MEASURES.IQR][0][id_cell], measures[MEASURES.IQR][1][id_cell]),
+                measures[MEASURES.IQR_Mean][id_cell],
+                (centroids[0][id_cell], centroids[1][id_cell]))
+
 #
 # CLASS: Grid_Cell
 #
@@ -75,6 +180,35 @@ class GridCell(object):
 
         return self.__str__()
 
+    @property
+    def identifier(self):
+
+        return self._identifier
+
+    @property
+    def polynomial_coeffs(self):
+
+        return self._polynomial_coeffs
+
+    def set_analysis_from(self, grid_cell):
+        """Takes over the analysis of a copy of this grid cell.
+
+        Used when the copy was analysed in another process. The features
+        object and the calibration polynomial are kept since they are
+        shared with the grid array and other grid cells.
+
+        :type grid_cell: GridCell
+        """
+        features = self.features
+        polynomial_coeffs = self._polynomial_coeffs
+
+        self.__dict__.update(grid_cell.__dict__)
+
+        features.data = grid_cell.features.data
+        features.shape = grid_cell.features.shape
+        self.features = features
+        self._polynomial_coeffs = polynomial_coeffs
+
     def set_grid_coordinates(self, grid_cell_corners):
 
         flipped_long_axis_position = grid_cell_corners.shape[2] - self.position[0] - 1
@@ -110,13 +244,15 @@ class GridCell(object):
 
     def _set_max_value_filter(self):
 
-        max_detect_filter = self.source > self.MAX_THRESHOLD
+        self._update_adjustment_warning((self.source > self.MAX_THRESHOLD).sum())
+
+    def _update_adjustment_warning(self, overshooting):
 
-        if self._adjustment_warning != max_detect_filter.any():
+        if self._adjustment_warning != (overshooting > 0):
             self._adjustment_warning = not self._adjustment_warning
             if self._adjustment_warning:
                 self._logger.warning("{0} got {1} pixel-values overshooting {2}.".format(
-                    self._identifier, max_detect_filter.sum(), self.MAX_THRESHOLD) +
+                    self._identifier, overshooting, self.MAX_THRESHOLD) +
                                      " Further warnings for this colony suppressed.")
             else:
                 self._logger.info("{0} no longer have pixels that reach {1} depth.".format(
@@ -149,6 +149,82 @@ def get_array_subtraction(array_one, array_two, offset, output=None):
             array_one[o1_low: o1_high, o2_low: o2_high] - \
             array_two[b1_low: b1_high, b2_low: b2_high]
 
+
+def _get_segment_sums(values, starts, ends):
+    """Sums of `values[start: end]` for each segment.
+
+    Each segment is summed in order, so its sum doesn't depend on which
+    other segments are summed with it.
+    """
+
+    sums = np.add.reduceat(np.append(values, 0), np.vstack((starts, ends)).T.ravel())[::2]
+    sums[ends <= starts] = 0
+    return sums
+
+
+def get_labeled_measures(values, labels, filter_array, labels_count, shapes=None):
+    """Calculates the cell item measures for many filters at once.
+
+    Equivalent to what each `CellItem.do_analysis` calculates, but using
+    labeled reductions over the pixels of all cells.
+
+    @values         Flat array of the pixel values of all cells
+
+    @labels         Flat array of which cell each pixel belongs to, ordered
+                    by label
+
+    @filter_array   Flat boolean array of which pixels are in the filters
+
+    @labels_count   Number of cells
+
+    @shapes         Optional shapes of the cells, needed for centroids
+
+    Returns a dict of measure arrays with one value per cell. Median,
+    IQR and IQR_Mean are only meaningful where count is positive.
+    """
+
+    filtered_labels = labels[filter_array]
+    filtered_values = values[filter_array]
+
+    count = np.bincount(filtered_labels, minlength=labels_count)
+    starts = np.cumsum(count) - count
+    measures = {
+        MEASURES.Count: count,
+        MEASURES.Sum: _get_segment_sums(filtered_values, starts, starts + count)}
+
+    # Each cell's filtered values as a row, padded with inf and sorted
+    sorted_values = np.empty((labels_count, max(count.max(), 1)))
+    sorted_values.fill(np.inf)
+    sorted_values[filtered_labels, np.arange(filtered_labels.size) - starts[filtered_labels]] = filtered_values
+    sorted_values.sort(axis=1)
+    rows = np.arange(labels_count)
+
+    measures[MEASURES.Median] = (sorted_values[rows, count // 2] + sorted_values[rows, (count - 1) // 2]) / 2.
+
+    quartile = np.floor(count * 0.25).astype(np.int)
+    measures[MEASURES.IQR] = (
+        sorted_values[rows, quartile], sorted_values[rows, np.where(quartile > 0, count - quartile, 0)])
+
+    flank = (count - count // 2) // 2
+    row_starts = rows * sorted_values.shape[1]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        measures[MEASURES.IQR_Mean] = np.where(
+            flank > 0,
+            _get_segment_sums(sorted_values.ravel(), row_starts + flank, row_starts + count - flank) /
+            (count - 2 * flank),
+            np.nan)
+
+        if shapes is not None:
+            positions = np.hstack([np.arange(np.prod(shape)) for shape in shapes])
+            widths = np.repeat([shape[1] for shape in shapes], [np.prod(shape) for shape in shapes])
+            measures[MEASURES.Centroid] = (
+                np.bincount(filtered_labels, weights=(positions // widths)[filter_array],
+                            minlength=labels_count) / count,
+                np.bincount(filtered_labels, weights=(positions % widths)[filter_array],
+                            minlength=labels_count) / count)
+
+    return measures
+
 #
 # CLASSES Cell_Item
 #
@@ -232,67 +308,103 @@ class CellItem(object):
 
         """
 
-        feature_data = self.features.data
-        """:type : dict[scanomatic.models.analysis_model.MEASUERS|object]"""
-
         if self.filter_array is None or len(self._features_key_list) == 0:
 
             return
 
-        feature_array = None
-        feature_data[MEASURES.Count] = self.filter_array.sum()
+        count = self.filter_array.sum()
+        total = self.grid_array[np.where(self.filter_array)].sum()
+        median = None
+        iqr = None
+        iqr_mean_value = None
+        centroid = None
 
-        feature_data[MEASURES.Sum] = self.grid_array[np.where(self.filter_array)].sum()
+        if not (count == total or count == 0):
 
-        if feature_data[MEASURES.Count] == feature_data[MEASURES.Sum] or feature_data[MEASURES.Count] == 0:
+            if (MEASURES.Median in self._features_key_list or
+                        MEASURES.IQR in self._features_key_list or
+                        MEASURES.IQR_Mean in self._features_key_list):
 
-            if feature_data[MEASURES.Count] == 0:
+                feature_array = self.grid_array[np.where(self.filter_array)]
 
-                print "GCdissect", self._identifier, "No blob"
+                if MEASURES.Median in self._features_key_list:
+                    median = np.median(feature_array)
 
-            else:
+                if MEASURES.IQR in self._features_key_list or MEASURES.IQR_Mean in self._features_key_list:
+                    iqr = quantiles_stable(feature_array)
+                    # mquantiles(feature_array, prob=[0.25, 0.75])
 
-                print "GCdissect", self._identifier, "No background"
+                    try:
 
-            feature_data.clear()
+                        iqr_mean_value = iqr_mean(feature_array)
+                        # tmean(feature_array, feature_data['IQR'])
 
-        else:
+                    except:
 
-            feature_data[MEASURES.Mean] = feature_data[MEASURES.Sum] / \
-                feature_data[MEASURES.Count]
+                        iqr_mean_value = None
+                        iqr = None
 
-            if (MEASURES.Median in self._features_key_list or
-                        MEASURES.IQR in self._features_key_list or
-                        MEASURES.IQR_Mean in self._features_key_list):
+            if MEASURES.Centroid in self._features_key_list:
 
-                feature_array = self.grid_array[np.where(self.filter_array)]
+                try:
 
-            if MEASURES.Median in self._features_key_list:
-                feature_data[MEASURES.Median] = np.median(feature_array)
+                    centroid = center_of_mass(self.filter_array)
 
-            if MEASURES.IQR in self._features_key_list or MEASURES.IQR_Mean in self._features_key_list:
-                feature_data[MEASURES.IQR] = quantiles_stable(feature_array)
-                # mquantiles(feature_array, prob=[0.25, 0.75])
+                except:
 
-                try:
+                    centroid = None
 
-                    feature_data[MEASURES.IQR_Mean] = iqr_mean(feature_array)
-                    # tmean(feature_array, feature_data['IQR'])
+        self.set_features(count, total, median, iqr, iqr_mean_value, centroid)
 
-                except:
+    def set_features(self, count, total, median=None, iqr=None, iqr_mean_value=None, centroid=None):
+        """Updates the features-dict from measures calculated elsewhere.
 
-                    feature_data[MEASURES.IQR_Mean] = None
-                    feature_data[MEASURES.IQR] = None
+        Measures not used by the cell item are ignored.
 
-            if MEASURES.Centroid in self._features_key_list:
+        @count          Number of pixels in the filter
 
-                try:
+        @total          Sum of pixel values in the filter
 
-                    feature_data[MEASURES.Centroid] = center_of_mass(self.filter_array)
+        @median         Median pixel value
 
-                except:
+        @iqr            The (lower, upper) quartile pixel values
+
+        @iqr_mean_value Mean of the pixel values within the quartiles
+
+        @centroid       Center of mass of the filter
+        """
 
-                    feature_data[MEASURES.Centroid] = None
+        feature_data = self.features.data
+        """:type : dict[scanomatic.models.analysis_model.MEASUERS|object]"""
+
+        feature_data[MEASURES.Count] = count
+        feature_data[MEASURES.Sum] = total
+
+        if count == total or count == 0:
+
+            if count == 0:
+
+                print "GCdissect", self._identifier, "No blob"
+
+            else:
+
+                print "GCdissect", self._identifier, "No background"
+
+            feature_data.clear()
+
+        else:
+
+            feature_data[MEASURES.Mean] = total / count
+
+            if MEASURES.Median in self._features_key_list:
+                feature_data[MEASURES.Median] = median
+
+            if MEASURES.IQR in self._features_key_list or MEASURES.IQR_Mean in self._features_key_list:
+                feature_data[MEASURES.IQR] = iqr
+                feature_data[MEASURES.IQR_Mean] = iqr_mean_value
+
+            if MEASURES.Centroid in self._features_key_list:
+                feature_data[MEASURES.Centroid] = centroid
 
             if MEASURES.Perimeter in self._features_key_list:
                 feature_data[MEASURES.Perimeter] = None
@@ -362,12 +474,7 @@ class Blob(CellItem):
 
                 blob_detect = BlobDetectionTypes.DEFAULT
 
-        if blob_detect is BlobDetectionTypes.THRESHOLD:
-            self.detect_function = self.threshold
-        elif blob_detect is BlobDetectionTypes.ITERATIVE:
-            self.detect_function = self.iterative_threshold_detect
-        else:
-            self.detect_function = self.default_detect
+        self._blob_detect = blob_detect
 
         self.old_trash = None
         self.trash_array = None
@@ -389,6 +496,17 @@ class Blob(CellItem):
 
         self._debug_ticker = 0
 
+    @property
+    def detect_function(self):
+
+        # Looked up rather than stored so that blobs can be pickled
+        if self._blob_detect is BlobDetectionTypes.THRESHOLD:
+            return self.threshold
+        elif self._blob_detect is BlobDetectionTypes.ITERATIVE:
+            return self.iterative_threshold_detect
+        else:
+            return self.default_detect
+
     #
     # SET functions
     #
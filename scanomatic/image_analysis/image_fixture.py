@@ -10,6 +10,27 @@ from image_basics import load_image_to_numpy
 import scanomatic.io.logger as logger
 import image_basics
 
+#
+# GLOBALS
+#
+
+# Decimation of the coarse image used when markers have no expected positions
+_COARSE_STEP = 4
+# Least convolution value, relative to a perfect match, of a marker found near its expected position
+_MIN_MARKER_MATCH = 0.5
+
+#
+# FUNCTIONS
+#
+
+
+def _get_convolution(image, marker, threshold):
+
+    t_img = (image > threshold).astype(np.int8) * 2 - 1
+    t_mrk = (marker > 0) * 2 - 1
+
+    return fftconvolve(t_img, t_mrk, mode='same')
+
 #
 # CLASSES
 #
@@ -163,16 +184,13 @@ class FixtureImage(object):
 
     def get_convolution(self, threshold=127):
 
-        t_img = (self._img > threshold).astype(np.int8) * 2 - 1
         marker = self._pattern_img
 
         if len(marker.shape) == 3:
 
             marker = marker[:, :, 0]
 
-        t_mrk = (marker > 0) * 2 - 1
-
-        return fftconvolve(t_img, t_mrk, mode='same')
+        return _get_convolution(self._img, marker, threshold)
 
     @staticmethod
     def get_best_location(conv_img, stencil_size, refine_hit_gauss_weight_size_fraction=2.0,
@@ -240,6 +258,97 @@ class FixtureImage(object):
 
         return m_locations
 
+    def get_location_near(self, position, search_radius, img_threshold=127,
+                          refine_hit_gauss_weight_size_fraction=3.5):
+        """Locates a marking within a search radius of a position on the
+        CURRENT IMAGE.
+
+        Only a window around the position is convolved. The window is large
+        enough for the convolution and refinement of hits inside the search
+        radius to be the same as for the full image.
+
+        :return: The location or `None` if no good enough match was found
+        """
+        position = np.asarray(position, dtype=float)
+        stencil_size = np.array(self._pattern_img.shape)
+        lower = np.maximum(0, np.floor(position - stencil_size - search_radius)).astype(int)
+        upper = np.minimum(self._img.shape, np.ceil(position + stencil_size + search_radius + 1)).astype(int)
+
+        if (upper - lower <= stencil_size).any():
+            return None
+
+        conv_img = _get_convolution(
+            self._img[lower[0]: upper[0], lower[1]: upper[1]], self._pattern_img, img_threshold)
+
+        if conv_img.max() < _MIN_MARKER_MATCH * self._pattern_img.size:
+            return None
+
+        hit, _ = self.get_best_location(conv_img, self._pattern_img.shape, refine_hit_gauss_weight_size_fraction)
+
+        if hit is None or np.abs(hit + lower - position).max() > search_radius:
+            return None
+
+        return hit + lower
+
+    def get_coarse_locations(self, markings, img_threshold=127):
+        """Locates markings on a decimated version of the CURRENT IMAGE
+
+        :return: The coarse locations, scaled to the CURRENT IMAGE
+        """
+        pattern_img = self._pattern_img[::_COARSE_STEP, ::_COARSE_STEP]
+        coarse_conv = _get_convolution(self._img[::_COARSE_STEP, ::_COARSE_STEP], pattern_img, img_threshold)
+
+        return [location * _COARSE_STEP if location is not None else None for location in
+                self.get_best_locations(coarse_conv, pattern_img.shape, markings)]
+
+    def find_pattern_near(self, expected_positions, markings=3, img_threshold=127, search_radius=None):
+        """Finds markings by refining expected positions only in windows
+        around them.
+
+        If no expected positions are supplied, they are found on a coarse
+        version of the image. Both expected and returned positions are
+        scaled to match the ORIGINAL IMAGE size.
+
+        :param expected_positions: The expected x and y positions,
+            e.g. the positions of the fixture reference, or `None`
+        :param search_radius: How far from the expected positions to
+            search, on the CURRENT IMAGE. Default is the larger side of
+            the pattern.
+        :return: The x and y positions or `None, None` if a marking wasn't
+            found near its expected position.
+        """
+        if not self.get_loaded():
+            return None, None
+
+        if search_radius is None:
+            search_radius = max(self._pattern_img.shape)
+
+        if expected_positions is None or any(p is None for p in expected_positions):
+            locations = self.get_coarse_locations(markings, img_threshold=img_threshold)
+            search_radius = min(search_radius, 4 * _COARSE_STEP)
+        else:
+            x_positions, y_positions = expected_positions
+            locations = [np.array((y, x)) / self._conversion_factor for x, y in zip(x_positions, y_positions)]
+
+        if len(locations) != markings or any(location is None for location in locations):
+            return None, None
+
+        hits = []
+        for location in locations:
+
+            hit = self.get_location_near(location, search_radius, img_threshold=img_threshold)
+            if hit is None:
+                return None, None
+
+            for other in hits:
+                if (np.abs(other - hit) < self._pattern_img.shape).all():
+                    return None, None
+
+            hits.append(hit)
+
+        hits = np.array(hits) * self._conversion_factor
+        return hits[:, 1], hits[:, 0]
+
     def find_pattern(self, markings=3, img_threshold=127):
         """This function returns the image positions as numpy arrays that
         are scaled to match the ORIGINAL IMAGE size"""
@@ -0,0 +1,132 @@
+import time
+from collections import deque
+from threading import Thread, Condition
+
+from scanomatic.io.logger import Logger
+
+
+class ImagePrefetcher(object):
+    """Loads upcoming images on a background thread.
+
+    Images are loaded in the order of `paths`. The loader runs ahead of
+    the consumer by at most `depth` images and stops early if the loaded
+    images use more than `max_memory` bytes, though one image is always
+    allowed so the consumer never starves.
+    """
+    def __init__(self, paths, loader, depth=2, max_memory=None):
+        """
+
+        :param paths: The image paths in the order they will be requested
+        :param loader: Function loading an image from a path
+        :param depth: Maximum number of images loaded ahead
+        :param max_memory: Optional maximum bytes of loaded images
+        """
+        self._logger = Logger("Image Prefetcher")
+        self._pending = deque(paths)
+        self._loader = loader
+        self._depth = depth
+        self._max_memory = max_memory
+
+        self._loaded = deque()
+        self._memory = 0
+        self._loading = None
+        self._stopping = False
+        self._condition = Condition()
+
+        self._thread = Thread(target=self._run, name="Image Prefetch")
+        self._thread.daemon = True
+        self._thread.start()
+
+    @property
+    def loaded(self):
+
+        return len(self._loaded)
+
+    @property
+    def memory(self):
+
+        return self._memory
+
+    def _is_full(self):
+
+        return bool(self._loaded) and (
+            len(self._loaded) >= self._depth or
+            self._max_memory is not None and self._memory >= self._max_memory)
+
+    def _run(self):
+
+        while True:
+
+            with self._condition:
+
+                while not self._stopping and self._is_full():
+                    self._condition.wait()
+
+                if self._stopping or not self._pending:
+                    self._loading = None
+                    self._condition.notify_all()
+                    return
+
+                self._loading = self._pending.popleft()
+
+            path = self._loading
+            start = time.time()
+            # noinspection PyBroadException
+            try:
+                im = self._loader(path)
+            except Exception:
+                self._logger.exception("Could not prefetch '{0}'".format(path))
+                im = None
+            load_time = time.time() - start
+
+            with self._condition:
+                self._loaded.append((path, im, load_time))
+                self._memory += im.nbytes if im is not None else 0
+                self._loading = None
+                self._condition.notify_all()
+
+    def _is_expected(self, path):
+
+        return path == self._loading or path in self._pending or any(p == path for p, _, _ in self._loaded)
+
+    def get(self, path):
+        """Gets the image of a path, waiting for it to be loaded if needed.
+
+        Images loaded ahead of `path` are dropped, so skipping a path
+        doesn't stall the pipeline.
+
+        :param path: The requested path
+        :return: The image (or `None` if not prefetched or failed to load),
+            the seconds spent loading and the seconds spent waiting.
+        :rtype: (numpy.ndarray, float, float)
+        """
+        start = time.time()
+
+        with self._condition:
+
+            while self._is_expected(path):
+
+                while self._loaded:
+
+                    loaded_path, im, load_time = self._loaded.popleft()
+                    self._memory -= im.nbytes if im is not None else 0
+                    self._condition.notify_all()
+
+                    if loaded_path == path:
+                        return im, load_time, time.time() - start
+
+                if self._is_expected(path):
+                    self._condition.wait()
+
+        return None, 0.0, time.time() - start
+
+    def stop(self):
+        """Stops loading and releases loaded images."""
+        with self._condition:
+            self._stopping = True
+            self._pending.clear()
+            self._loaded.clear()
+            self._memory = 0
+            self._condition.notify_all()
+
+        self._thread.join()
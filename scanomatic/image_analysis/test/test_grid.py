@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from scanomatic.image_analysis import grid
+from scanomatic.image_analysis.grid_array import GridArray
+from scanomatic.models.analysis_model import THRESHOLD_METHODS
+from scanomatic.models.factories.analysis_factories import AnalysisModelFactory
+
+
+@pytest.fixture
+def plate_image():
+
+    rows, columns = np.mgrid[:300, :400]
+    im = 150 + 0.1 * columns + np.random.RandomState(42).normal(0, 2, rows.shape)
+    colonies = ((rows % 50 - 25) ** 2 + (columns % 50 - 25) ** 2) < 100
+    im[colonies] -= 80
+    return im, colonies
+
+
+def test_tiled_threshold_is_deterministic(plate_image):
+
+    im, _ = plate_image
+    np.testing.assert_array_equal(grid.get_tiled_threshold(im), grid.get_tiled_threshold(im))
+
+
+def test_tiled_threshold_separates_colonies(plate_image):
+
+    im, colonies = plate_image
+    threshold = grid.get_tiled_threshold(im, tiles=(3, 4))
+
+    assert threshold.shape == im.shape
+    assert ((im < threshold) != colonies).mean() < 0.001
+
+
+def test_tiled_threshold_of_flat_image():
+
+    im = np.ones((20, 30)) * 7
+    np.testing.assert_allclose(grid.get_tiled_threshold(im, tiles=50), 7)
+
+
+@pytest.mark.parametrize("threshold_method", THRESHOLD_METHODS)
+def test_get_grid(plate_image, threshold_method):
+
+    im, _ = plate_image
+    _, _, _, _, spacings, _ = grid.get_grid(
+        im, expected_spacing=(50, 50), grid_shape=(6, 8), expected_center=(150, 200),
+        threshold_method=threshold_method)
+
+    np.testing.assert_allclose(spacings, (50, 50), atol=1)
+
+
+def test_grid_from_history_is_refined(plate_image):
+
+    im, _ = plate_image
+    _, center, spacings = grid.get_grid_from_history(im, (160, 188), (50.5, 49.5), (6, 8))
+
+    np.testing.assert_allclose(center, (150, 200), atol=1)
+    np.testing.assert_allclose(spacings, (50, 50), atol=0.5)
+
+
+def test_grid_from_history_off_by_a_grid_cell_is_rejected(plate_image):
+
+    im, _ = plate_image
+    assert grid.get_grid_from_history(im, (150, 250), (50, 50), (6, 8)) is None
+
+
+def test_grid_array_is_warm_started(plate_image):
+
+    im, _ = plate_image
+    # Plates have a margin around the outermost colonies
+    im = np.pad(im, 20, mode='edge')
+    grid_array = GridArray((None, 0), (6, 8), AnalysisModelFactory.create(output_directory=""))
+
+    assert grid_array.detect_grid(im, gridding_history=[(172, 217, 50, 50), (180, 208, 50.5, 49.5)])
+    assert grid_array.warm_started
+    np.testing.assert_allclose(grid_array.grid_parameters[0], (170, 220), atol=1)
@@ -0,0 +1,124 @@
+from collections import namedtuple
+from multiprocessing.pool import ThreadPool
+
+import numpy as np
+import pytest
+
+from scanomatic.image_analysis.grid_array import (
+    GridArray, _get_grid_cell_blocks, _analyse_grid_cell, _analyse_grid_cells, _get_transposed_image)
+from scanomatic.generics.worker_pool import get_process_pool
+from scanomatic.models.analysis_model import WORKER_MODES
+from scanomatic.models.factories.analysis_factories import AnalysisModelFactory
+
+_CELL_SIZE = 40
+_PINNING = (8, 12)
+
+_Image = namedtuple('_Image', ['index'])
+_Grayscale = namedtuple('_Grayscale', ['values', 'name'])
+_Fixture = namedtuple('_Fixture', ['grayscale'])
+_ImageModel = namedtuple('_ImageModel', ['image', 'fixture'])
+
+
+@pytest.fixture(scope='module')
+def plate_image():
+
+    np.random.seed(1)
+    im = np.random.normal(200, 3, (_PINNING[0] * _CELL_SIZE, _PINNING[1] * _CELL_SIZE))
+    y, x = np.mgrid[:_CELL_SIZE, :_CELL_SIZE]
+    for row, column in np.ndindex(*_PINNING):
+        radius = 5 + np.random.random() * 10
+        cell = im[row * _CELL_SIZE: (row + 1) * _CELL_SIZE, column * _CELL_SIZE: (column + 1) * _CELL_SIZE]
+        cell[(y - _CELL_SIZE / 2) ** 2 + (x - _CELL_SIZE / 2) ** 2 < radius ** 2] -= 100
+    return im
+
+
+def _get_gridded_array(workers, worker_mode=WORKER_MODES.Threads):
+
+    grid_array = GridArray(0, _PINNING, AnalysisModelFactory.create(workers=workers, worker_mode=worker_mode))
+    grid_array._init_grid_cells()
+    rows, columns = np.mgrid[:_PINNING[0], :_PINNING[1]]
+    grid_array._grid = np.array([rows, columns]) * _CELL_SIZE + _CELL_SIZE / 2.
+    grid_array._grid_cell_size = (_CELL_SIZE, _CELL_SIZE)
+    grid_array._set_grid_cell_corners()
+    grid_array._update_grid_cells()
+    return grid_array
+
+
+def test_grid_cell_blocks_cover_all_cells_in_order():
+
+    grid_cells = {(row, column): (row, column) for row, column in np.ndindex(3, 5)}
+    blocks = _get_grid_cell_blocks(grid_cells, 4)
+
+    assert len(blocks) == 4
+    assert sum(blocks, []) == sorted(grid_cells)
+
+
+def test_analysis_in_pool_same_as_serial(plate_image):
+
+    image_model = _ImageModel(_Image(0), _Fixture(_Grayscale(None, None)))
+
+    serial = _get_gridded_array(1)
+    serial.analyse(plate_image, image_model)
+
+    pooled = _get_gridded_array(4)
+    pool = ThreadPool(4)
+    try:
+        pooled.analyse(plate_image, image_model, pool=pool)
+    finally:
+        pool.close()
+
+    for position in np.ndindex(*_PINNING):
+        for compartment, features in serial[position].features.data.iteritems():
+            np.testing.assert_equal(pooled[position].features.data[compartment].data, features.data)
+
+
+def test_analysis_in_processes_same_as_serial(plate_image):
+
+    serial = _get_gridded_array(1)
+    pooled = _get_gridded_array(2, WORKER_MODES.Processes)
+    cell_features = pooled[(0, 0)].features
+    pool = get_process_pool(2)
+
+    try:
+        for image_index, im in enumerate((plate_image, plate_image[::-1, ::-1] * 0.9)):
+
+            image_model = _ImageModel(_Image(image_index), _Fixture(_Grayscale(None, None)))
+            serial.analyse(im, image_model)
+            pooled.analyse(im, image_model, pool=pool)
+
+            for position in np.ndindex(*_PINNING):
+                for compartment, features in serial[position].features.data.iteritems():
+                    np.testing.assert_equal(pooled[position].features.data[compartment].data, features.data)
+    finally:
+        pool.close()
+        pool.join()
+
+    assert pooled[(0, 0)].features is cell_features
+    assert cell_features in pooled.features.data
+
+
+def test_plate_quantification_same_as_per_cell(plate_image):
+
+    def transpose_polynomial(values):
+        return 0.0001 * values ** 2 + 0.9 * values + 2
+
+    per_cell = _get_gridded_array(1)
+    plate = _get_gridded_array(1)
+
+    for image_index, im in enumerate((plate_image, plate_image[::-1, ::-1] * 0.9)):
+
+        for grid_cell in per_cell._grid_cells.itervalues():
+            _analyse_grid_cell(grid_cell, im, transpose_polynomial, image_index)
+
+        _analyse_grid_cells(
+            plate._grid_cells.values(), im, _get_transposed_image(im, transpose_polynomial), transpose_polynomial,
+            image_index)
+
+        for position in np.ndindex(*_PINNING):
+            for compartment, features in per_cell[position].features.data.iteritems():
+                plate_features = plate[position].features.data[compartment].data
+                assert set(plate_features) == set(features.data)
+                for measure, value in features.data.iteritems():
+                    np.testing.assert_allclose(
+                        np.asarray(plate_features[measure], dtype=np.float),
+                        np.asarray(value, dtype=np.float), rtol=1e-9)
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from scanomatic.image_analysis.image_basics import load_image_to_numpy
+from scanomatic.image_analysis.image_fixture import FixtureImage
+from scanomatic.io.paths import Paths
+
+_MARKERS = ((60, 80), (330, 70), (200, 340))
+_SCALE = 0.25
+
+
+@pytest.fixture(scope="module")
+def fixture_image():
+
+    marker = load_image_to_numpy(Paths().marker, dtype=np.uint8)
+    if marker.ndim > 2:
+        marker = marker[:, :, 0]
+
+    im = np.random.RandomState(0).normal(200, 15, (400, 420)).clip(0, 255).astype(np.uint8)
+    im[100: 300, 120: 280] = 60
+    for d0, d1 in _MARKERS:
+        d0 -= marker.shape[0] // 2
+        d1 -= marker.shape[1] // 2
+        im[d0: d0 + marker.shape[0], d1: d1 + marker.shape[1]] = np.where(marker > 0, 230, 20)
+
+    return FixtureImage(image=im, pattern_image_path=Paths().marker, scale=_SCALE)
+
+
+def _get_sorted(positions):
+
+    return sorted(zip(*positions))
+
+
+def test_markers_near_expected_positions_as_full_search(fixture_image):
+
+    expected = [(d1 + 5) / _SCALE for _, d1 in _MARKERS], [(d0 - 8) / _SCALE for d0, _ in _MARKERS]
+
+    np.testing.assert_allclose(
+        _get_sorted(fixture_image.find_pattern_near(expected, markings=3)),
+        _get_sorted(fixture_image.find_pattern(markings=3)))
+
+
+def test_markers_from_coarse_search_as_full_search(fixture_image):
+
+    np.testing.assert_allclose(
+        _get_sorted(fixture_image.find_pattern_near(None, markings=3)),
+        _get_sorted(fixture_image.find_pattern(markings=3)))
+
+
+def test_no_markers_far_from_expected_positions(fixture_image):
+
+    expected = [d1 / _SCALE for _, d1 in _MARKERS], [d0 / _SCALE for d0, _ in _MARKERS]
+    expected[0][0] += 150 / _SCALE
+
+    assert fixture_image.find_pattern_near(expected, markings=3) == (None, None)
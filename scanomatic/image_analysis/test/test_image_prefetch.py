@@ -0,0 +1,60 @@
+import time
+
+import numpy as np
+
+from scanomatic.image_analysis.image_prefetch import ImagePrefetcher
+
+
+def _wait_for(condition, timeout=2.0):
+
+    end = time.time() + timeout
+    while not condition() and time.time() < end:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_prefetcher_gives_images_in_order():
+
+    prefetcher = ImagePrefetcher(range(5), lambda path: np.ones((2, 2)) * path, depth=2)
+    try:
+        for path in range(5):
+            im, _, _ = prefetcher.get(path)
+            np.testing.assert_equal(im, path)
+    finally:
+        prefetcher.stop()
+
+
+def test_prefetcher_respects_depth():
+
+    prefetcher = ImagePrefetcher(range(5), lambda path: np.zeros((2, 2)), depth=2)
+    try:
+        assert _wait_for(lambda: prefetcher.loaded == 2)
+        time.sleep(0.05)
+        assert prefetcher.loaded == 2
+    finally:
+        prefetcher.stop()
+
+
+def test_prefetcher_respects_memory_cap():
+
+    prefetcher = ImagePrefetcher(range(5), lambda path: np.zeros((10,), dtype=np.uint8), depth=5, max_memory=15)
+    try:
+        assert _wait_for(lambda: prefetcher.loaded == 2)
+        time.sleep(0.05)
+        assert prefetcher.loaded == 2
+        assert prefetcher.memory == 20
+    finally:
+        prefetcher.stop()
+
+
+def test_prefetcher_skips_and_ignores_unknown_paths():
+
+    prefetcher = ImagePrefetcher(range(5), lambda path: np.ones((2, 2)) * path, depth=2)
+    try:
+        im, _, _ = prefetcher.get(3)
+        np.testing.assert_equal(im, 3)
+        assert prefetcher.get(1)[0] is None
+        assert prefetcher.get('unknown')[0] is None
+        np.testing.assert_equal(prefetcher.get(4)[0], 4)
+    finally:
+        prefetcher.stop()
@@ -0,0 +1,186 @@
+import glob
+import os
+
+import numpy as np
+
+from scanomatic.io.logger import Logger
+from scanomatic.io.paths import Paths
+
+_logger = Logger("Binary Features")
+
+_SECONDS_PER_HOUR = 60.0 * 60.0
+_PLATE_KEY = "plate_{0}"
+
+
+def _get_path(directory, image_index):
+
+    return os.path.join(directory, Paths().image_analysis_features.format(image_index))
+
+
+def _get_columns(cell_features):
+
+    columns = []
+    for compartment, compartment_features in cell_features.data.iteritems():
+        for measure, value in compartment_features.data.iteritems():
+            if isinstance(value, (tuple, list, np.ndarray)):
+                columns.extend((compartment, measure, component) for component in range(len(value)))
+            else:
+                columns.append((compartment, measure, None))
+
+    return columns
+
+
+def _get_values(cell_features, columns):
+
+    values = []
+    for compartment, measure, component in columns:
+        try:
+            value = cell_features.data[compartment].data[measure]
+            values.append(float(value if component is None else value[component]))
+        except (KeyError, IndexError, TypeError, ValueError):
+            values.append(np.nan)
+
+    return values
+
+
+def get_measure_name(compartment, measure, component=None):
+    """Name of a column of the binary features
+
+    Args:
+        compartment (scanomatic.models.analysis_model.COMPARTMENTS): The compartment
+        measure (scanomatic.models.analysis_model.MEASURES): The measure
+        component (int): Optional, the index of the value for measures
+            with several values, such as `MEASURES.IQR`
+
+    Returns (str): E.g. `"Blob:Sum"` or `"Blob:IQR:0"`
+    """
+    if component is None:
+        return "{0}:{1}".format(compartment.name, measure.name)
+    return "{0}:{1}:{2}".format(compartment.name, measure.name, component)
+
+
+def write_image_features(directory, image_model, features):
+    """Writes all numeric features of an image to a binary file.
+
+    Each plate is stored as an array with shape
+    (rows, columns, measures) indexed by grid cell position in the
+    same way as the analysis xml. Measures with several values are
+    stored as one measure per value. The file is written under a
+    temporary name and then renamed so only complete files exist.
+
+    Args:
+        directory (str): The analysis directory
+        image_model (scanomatic.models.compile_project_model.CompileImageAnalysisModel): The image
+        features (scanomatic.models.analysis_model.AnalysisFeatures): The features of the image
+
+    Returns (bool): If there were features to write
+    """
+    if features is None:
+        return False
+
+    columns = None
+    arrays = {}
+
+    for plate_features in features.data:
+
+        if plate_features is None or not plate_features.data:
+            continue
+
+        if columns is None:
+            columns = _get_columns(next(iter(plate_features.data)))
+
+        plate = np.zeros(tuple(plate_features.shape) + (len(columns),)) * np.nan
+
+        for cell_features in plate_features.data:
+            try:
+                plate[cell_features.index[0], cell_features.index[1]] = _get_values(cell_features, columns)
+            except IndexError:
+                _logger.warning("Colony position {0} outside plate {1} with shape {2}".format(
+                    cell_features.index, plate_features.index, plate_features.shape))
+
+        arrays[_PLATE_KEY.format(plate_features.index)] = plate
+
+    if columns is None:
+        return False
+
+    arrays['measures'] = np.array([get_measure_name(*column) for column in columns])
+    arrays['index'] = image_model.image.index
+    arrays['time'] = image_model.image.time_stamp
+
+    path = _get_path(directory, image_model.image.index)
+    with open(path + ".tmp", 'wb') as fh:
+        np.savez(fh, **arrays)
+    os.rename(path + ".tmp", path)
+
+    return True
+
+
+def remove_image_features(directory):
+    """Removes all binary features files in a directory
+
+    Returns (int): Number of files removed
+    """
+    paths = glob.glob(_get_path(directory, "*"))
+    for path in paths:
+        os.remove(path)
+
+    return len(paths)
+
+
+def iter_image_features(directory):
+    """Streams the binary features of an analysis an image at a time.
+
+    Args:
+        directory (str): The analysis directory
+
+    Returns: Generator of image index, time stamp, measure names and a
+        `dict` of plate index to arrays with shape
+        (rows, columns, measures), ordered by image index
+    """
+    images = []
+    for path in glob.iglob(_get_path(directory, "*")):
+        try:
+            images.append((int(os.path.basename(path).split("_")[1]), path))
+        except (IndexError, ValueError):
+            _logger.warning("File '{0}' has no image index in it, ignoring it".format(path))
+
+    for _, path in sorted(images):
+
+        data = np.load(path)
+        try:
+            plates = {int(key[len(_PLATE_KEY.format("")):]): data[key] for key in data.files
+                      if key.startswith(_PLATE_KEY.format(""))}
+            yield int(data['index']), float(data['time']), list(data['measures']), plates
+        finally:
+            data.close()
+
+
+def read_image_features(directory):
+    """Reads the binary features of an analysis.
+
+    Args:
+        directory (str): The analysis directory
+
+    Returns: tuple of the times in hours, the measure names and a
+        `dict` of plate index to arrays with shape
+        (rows, columns, images, measures)
+    """
+    images = list(iter_image_features(directory))
+
+    measures = []
+    for _, _, image_measures, _ in images:
+        measures.extend(measure for measure in image_measures if measure not in measures)
+
+    data = {}
+    for image, (_, _, image_measures, plates) in enumerate(images):
+
+        columns = [measures.index(measure) for measure in image_measures]
+
+        for plate_index, plate in plates.iteritems():
+
+            if plate_index not in data:
+                data[plate_index] = np.zeros(plate.shape[:2] + (len(images), len(measures))) * np.nan
+
+            data[plate_index][:, :, image, columns] = plate
+
+    return np.array([time_stamp for _, time_stamp, _, _ in images]) / _SECONDS_PER_HOUR, measures, data
@@ -0,0 +1,411 @@
+import fcntl
+import os
+import re
+import struct
+import zlib
+from StringIO import StringIO
+
+import numpy as np
+
+from scanomatic.generics.abstract_model_factory import LinkerConfigParser
+from scanomatic.io.logger import Logger
+from scanomatic.io.paths import Paths
+from scanomatic.models.factories.compile_project_factory import CompileImageAnalysisFactory, CompileImageFactory
+from scanomatic.models.factories.fixture_factories import (
+    FixtureFactory, FixturePlateFactory, GrayScaleAreaModelFactory)
+
+_logger = Logger("Compilation Index")
+
+_INDEX_MAGIC = "SOMCMPI1"
+_INDEX_HEADER = struct.Struct("<8sqdI")
+
+MAX_PLATES = 8
+MAX_MARKERS = 8
+MAX_GRAYSCALE_VALUES = 32
+MAX_SHAPE = 4
+
+_INDEX_DTYPE = np.dtype([
+    ('offset', '<i8'),
+    ('length', '<i8'),
+    ('complete', '?'),
+    ('image_index', '<i8'),
+    ('image_time_stamp', '<f8'),
+    ('image_path', 'S256'),
+    ('fixture_name', 'S64'),
+    ('fixture_path', 'S256'),
+    ('fixture_scale', '<f8'),
+    ('fixture_coordinates_scale', '<f8'),
+    ('fixture_shape_length', '<i1'),
+    ('fixture_shape', '<i8', (MAX_SHAPE,)),
+    ('markers', '<i1'),
+    ('orientation_marks_x', '<f8', (MAX_MARKERS,)),
+    ('orientation_marks_y', '<f8', (MAX_MARKERS,)),
+    ('grayscale_name', 'S64'),
+    ('grayscale_values_length', '<i1'),
+    ('grayscale_values', '<f8', (MAX_GRAYSCALE_VALUES,)),
+    ('grayscale_width', '<f8'),
+    ('grayscale_section_length', '<f8'),
+    ('grayscale_area', '<i8', (4,)),
+    ('plates', '<i1'),
+    ('plate_areas', '<i8', (MAX_PLATES, 5)),
+])
+
+_IMAGE_SECTION = re.compile(r"^\[Image(?: #\d+)?\][ \t]*$", re.M)
+
+
+def _fits(value, size):
+
+    return isinstance(value, str) and len(value) <= size and not value.endswith('\x00')
+
+
+def _is_int_list(values, size):
+
+    return isinstance(values, list) and len(values) <= size and all(type(v) is int for v in values)
+
+
+def _is_float_list(values, size):
+
+    return isinstance(values, list) and len(values) <= size and all(type(v) is float for v in values)
+
+
+def _can_encode(model):
+
+    image = model.image
+    fixture = model.fixture
+    if image is None or fixture is None or fixture.grayscale is None:
+        return False
+
+    grayscale = fixture.grayscale
+    plates = fixture.plates
+    marks_x = fixture.orientation_marks_x
+    marks_y = fixture.orientation_marks_y
+
+    return (
+        type(image.index) is int and type(image.time_stamp) is float and _fits(image.path, 256) and
+        _fits(fixture.name, 64) and _fits(fixture.path, 256) and fixture.orentation_mark_path == "" and
+        type(fixture.scale) is float and type(fixture.coordinates_scale) is float and
+        _is_int_list(fixture.shape, MAX_SHAPE) and
+        _is_float_list(marks_x, MAX_MARKERS) and _is_float_list(marks_y, MAX_MARKERS) and
+        len(marks_x) == len(marks_y) and
+        _fits(grayscale.name, 64) and _is_float_list(grayscale.values, MAX_GRAYSCALE_VALUES) and
+        type(grayscale.width) is float and type(grayscale.section_length) is float and
+        _is_int_list([grayscale.x1, grayscale.x2, grayscale.y1, grayscale.y2], 4) and
+        isinstance(plates, tuple) and len(plates) <= MAX_PLATES and
+        all(_is_int_list([p.index, p.x1, p.x2, p.y1, p.y2], 5) for p in plates))
+
+
+def _encode(model, record):
+
+    image = model.image
+    fixture = model.fixture
+    grayscale = fixture.grayscale
+
+    record['image_index'] = image.index
+    record['image_time_stamp'] = image.time_stamp
+    record['image_path'] = image.path
+    record['fixture_name'] = fixture.name
+    record['fixture_path'] = fixture.path
+    record['fixture_scale'] = fixture.scale
+    record['fixture_coordinates_scale'] = fixture.coordinates_scale
+    record['fixture_shape_length'] = len(fixture.shape)
+    record['fixture_shape'][:len(fixture.shape)] = fixture.shape
+    record['markers'] = len(fixture.orientation_marks_x)
+    record['orientation_marks_x'][:record['markers']] = fixture.orientation_marks_x
+    record['orientation_marks_y'][:record['markers']] = fixture.orientation_marks_y
+    record['grayscale_name'] = grayscale.name
+    record['grayscale_values_length'] = len(grayscale.values)
+    record['grayscale_values'][:len(grayscale.values)] = grayscale.values
+    record['grayscale_width'] = grayscale.width
+    record['grayscale_section_length'] = grayscale.section_length
+    record['grayscale_area'] = (grayscale.x1, grayscale.x2, grayscale.y1, grayscale.y2)
+    record['plates'] = len(fixture.plates)
+    for id_plate, plate in enumerate(fixture.plates):
+        record['plate_areas'][id_plate] = (plate.index, plate.x1, plate.x2, plate.y1, plate.y2)
+
+
+def _decode(record):
+
+    grayscale_area = [int(v) for v in record['grayscale_area']]
+    markers = int(record['markers'])
+
+    return CompileImageAnalysisFactory.create(
+        image=CompileImageFactory.create(
+            index=int(record['image_index']),
+            time_stamp=float(record['image_time_stamp']),
+            path=str(record['image_path'])),
+        fixture=FixtureFactory.create(
+            name=str(record['fixture_name']),
+            path=str(record['fixture_path']),
+            scale=float(record['fixture_scale']),
+            coordinates_scale=float(record['fixture_coordinates_scale']),
+            shape=[int(v) for v in record['fixture_shape'][:record['fixture_shape_length']]],
+            orientation_marks_x=[float(v) for v in record['orientation_marks_x'][:markers]],
+            orientation_marks_y=[float(v) for v in record['orientation_marks_y'][:markers]],
+            grayscale=GrayScaleAreaModelFactory.create(
+                name=str(record['grayscale_name']),
+                values=[float(v) for v in record['grayscale_values'][:record['grayscale_values_length']]],
+                width=float(record['grayscale_width']),
+                section_length=float(record['grayscale_section_length']),
+                x1=grayscale_area[0], x2=grayscale_area[1], y1=grayscale_area[2], y2=grayscale_area[3]),
+            plates=tuple(
+                FixturePlateFactory.create(**dict(zip(('index', 'x1', 'x2', 'y1', 'y2'), (int(v) for v in area))))
+                for area in record['plate_areas'][:record['plates']])))
+
+
+def _parse_section(data):
+
+    with LinkerConfigParser(id=id(data), allow_no_value=True) as conf:
+        conf.readfp(StringIO(data))
+        sections = conf.sections()
+        if not sections:
+            raise ValueError("No image section")
+        return CompileImageAnalysisFactory.serializer.unserialize_section(conf, sections[0])
+
+
+def _get_crc(fh, size):
+
+    fh.seek(0)
+    crc = 0
+    while size > 0:
+        data = fh.read(min(size, 4 * 1024 ** 2))
+        if not data:
+            break
+        crc = zlib.crc32(data, crc)
+        size -= len(data)
+    return crc & 0xffffffff
+
+
+class CompilationIndex(object):
+    """Binary index of the images in a project compilation.
+
+    Each compiled image gets a fixed width record in a sidecar file with
+    the position of its sections in the compilation and the decoded
+    image, fixture, grayscale, marker and plate fields. An image can then
+    be loaded without parsing the compilation. Images with fields that
+    don't fit the records are parsed from just their own sections.
+
+    The compilation is only appended to while compiling, so `update`
+    only parses the new images. If the compilation has otherwise
+    changed, it is indexed anew. If the sidecar file can't be written,
+    the index is only kept in memory.
+    """
+    def __init__(self, path, index_path=None):
+        """
+        :param path: Path to the compilation
+        :param index_path: Optional path for the index, default is the
+            compilation path with an `.index` suffix
+        """
+        self._path = path
+        self._index_path = Paths().project_compilation_index_pattern.format(path) \
+            if index_path is None else index_path
+
+        self._records = np.zeros((0,), dtype=_INDEX_DTYPE)
+        self._indexed_size = 0
+        self._mtime = 0.0
+        self._crc = 0
+
+        self._load()
+
+    def __len__(self):
+
+        return self._records.size
+
+    def __getitem__(self, position):
+        """Loads an image model
+
+        :param position: The position of the image in the compilation
+        :rtype : scanomatic.models.compile_project_model.CompileImageAnalysisModel
+        """
+        record = self._records[position]
+        if record['complete']:
+            return _decode(record)
+
+        with open(self._path, 'rb') as fh:
+            fh.seek(record['offset'])
+            return _parse_section(fh.read(record['length']))
+
+    @property
+    def path(self):
+
+        return self._path
+
+    @property
+    def image_indices(self):
+
+        return self._records['image_index']
+
+    @property
+    def time_stamps(self):
+
+        return self._records['image_time_stamp']
+
+    def get_models(self):
+        """All image models in the order of the compilation.
+
+        :rtype : list[scanomatic.models.compile_project_model.CompileImageAnalysisModel]
+        """
+        return [self[position] for position in range(len(self))]
+
+    def is_current(self):
+
+        try:
+            stat = os.stat(self._path)
+        except OSError:
+            return False
+
+        return stat.st_size == self._indexed_size and stat.st_mtime == self._mtime
+
+    def _load(self):
+
+        try:
+            with open(self._index_path, 'rb') as fh:
+                magic, indexed_size, mtime, crc = _INDEX_HEADER.unpack(fh.read(_INDEX_HEADER.size))
+                records = np.fromfile(fh, dtype=_INDEX_DTYPE)
+        except (IOError, struct.error):
+            return
+
+        if magic != _INDEX_MAGIC:
+            return
+
+        self._records = records[records['offset'] + records['length'] <= indexed_size]
+        self._indexed_size = indexed_size
+        self._mtime = mtime
+        self._crc = crc
+
+    def update(self):
+        """Indexes images added to the compilation.
+
+        Returns (int): Number of new images
+
+        Raises:
+            IOError: If the compilation can't be read
+        """
+        if self.is_current():
+            return 0
+
+        with open(self._path, 'rb') as fh:
+
+            with _IndexLock(self._index_path):
+
+                # Another process may have updated the index
+                self._load()
+                stat = os.fstat(fh.fileno())
+                if stat.st_size < self._indexed_size or _get_crc(fh, self._indexed_size) != self._crc:
+                    _logger.info("Compilation '{0}' has changed, indexing it anew".format(self._path))
+                    self._records = np.zeros((0,), dtype=_INDEX_DTYPE)
+                    self._indexed_size = 0
+                    self._crc = 0
+
+                previous = len(self)
+                fh.seek(self._indexed_size)
+                data = fh.read(stat.st_size - self._indexed_size)
+                self._records = np.hstack((self._records, self._index_sections(data, self._indexed_size)))
+                self._crc = zlib.crc32(data, self._crc) & 0xffffffff
+                self._indexed_size += len(data)
+                self._mtime = stat.st_mtime
+                self._save(previous)
+
+        return len(self) - previous
+
+    @staticmethod
+    def _index_sections(data, offset):
+
+        starts = [match.start() for match in _IMAGE_SECTION.finditer(data)]
+        records = np.zeros((len(starts),), dtype=_INDEX_DTYPE)
+
+        for record, start, end in zip(records, starts, starts[1:] + [len(data)]):
+
+            section = data[start: end]
+            record['offset'] = offset + start
+            record['length'] = len(section)
+            model = _parse_section(section)
+            if model is None:
+                raise ValueError("Could not parse image at {0}".format(offset + start))
+
+            if _can_encode(model):
+                _encode(model, record)
+                record['complete'] = _decode(record) == model
+
+        return records
+
+    def _save(self, previous):
+
+        try:
+            with open(self._index_path, 'r+b' if previous and os.path.isfile(self._index_path) else 'wb') as fh:
+                fh.seek(_INDEX_HEADER.size + previous * _INDEX_DTYPE.itemsize)
+                fh.truncate()
+                self._records[previous:].tofile(fh)
+                fh.seek(0)
+                fh.write(_INDEX_HEADER.pack(_INDEX_MAGIC, self._indexed_size, self._mtime, self._crc))
+        except (IOError, OSError):
+            _logger.debug("Could not save index of '{0}', keeping it in memory".format(self._path))
+
+
+class _IndexLock(object):
+    """Lock on the index file, as both compile jobs and readers update it"""
+    def __init__(self, index_path):
+
+        self._path = index_path
+        self._fh = None
+
+    def __enter__(self):
+
+        try:
+            self._fh = open(self._path, 'ab')
+            fcntl.flock(self._fh, fcntl.LOCK_EX)
+        except IOError:
+            self._fh = None
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+
+        if self._fh is not None:
+            fcntl.flock(self._fh, fcntl.LOCK_UN)
+            self._fh.close()
+
+
+def get_compilation_index(path):
+    """An updated index of a compilation.
+
+    :param path: Path to the compilation
+    :rtype : CompilationIndex
+    :raises IOError: If the compilation can't be read
+    :raises ValueError: If the compilation can't be indexed
+    """
+    compilation_index = CompilationIndex(path)
+    compilation_index.update()
+    return compilation_index
+
+
+def load_compilation(path):
+    """Loads all images of a compilation using its index.
+
+    Falls back on parsing the entire compilation if it can't be indexed.
+
+    :param path: Path to the compilation
+    :rtype : tuple[scanomatic.models.compile_project_model.CompileImageAnalysisModel]
+    """
+    # noinspection PyBroadException
+    try:
+        return tuple(get_compilation_index(path).get_models())
+    except Exception:
+        _logger.warning("Could not use index of compilation '{0}', parsing all of it".format(path))
+
+    return CompileImageAnalysisFactory.serializer.load(path)
+
+
+def load_compiled_image(path, position):
+    """Loads one image of a compilation using its index.
+
+    :param path: Path to the compilation
+    :param position: Position of the image in the compilation
+    :rtype : scanomatic.models.compile_project_model.CompileImageAnalysisModel
+    """
+    # noinspection PyBroadException
+    try:
+        compilation_index = get_compilation_index(path)
+    except Exception:
+        _logger.warning("Could not use index of compilation '{0}', parsing all of it".format(path))
+        return CompileImageAnalysisFactory.serializer.load(path)[position]
+
+    return compilation_index[position]
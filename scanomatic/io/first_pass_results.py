@@ -3,6 +3,7 @@ from scanomatic.models.factories.compile_project_factory import CompileImageAnal
 from scanomatic.models.factories.scanning_factory import ScanningModelFactory
 from scanomatic.io.logger import Logger
 from scanomatic.io.paths import Paths
+from scanomatic.io.compilation_index import load_compilation
 import os
 from glob import glob
 
@@ -74,7 +75,7 @@ class CompilationResults(object):
 
     def _load_compilation(self, path, sort_mode=FIRST_PASS_SORTING.Time):
 
-        images = CompileImageAnalysisFactory.serializer.load(path)
+        images = load_compilation(path)
         self._logger.info("Loaded {0} compiled images".format(len(images)))
 
         self._reindex_plates(images)
@@ -214,6 +215,16 @@ class CompilationResults(object):
         self._used_models = []
         self._current_model = None
 
+    def get_upcoming_image_models(self):
+        """The image models not yet used, in the order `get_next_image_model`
+        will return them.
+
+        :rtype : list[scanomatic.models.compile_project_model.CompileImageAnalysisModel]
+        """
+        if not self._image_models:
+            return []
+        return sorted(self._image_models, key=lambda x: x.image.time_stamp)[::-1]
+
     def get_next_image_model(self):
         """
 
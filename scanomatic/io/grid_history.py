@@ -30,8 +30,8 @@ class GriddingHistory(object):
         self._models_per_plate_pinning.clear()
         history = GridHistoryFactory.serializer.load(self.path)
         for model in history:
-            """:type : scanomatic.models.analysis_model.GridHistoryModel"""
-            self._models_per_plate_pinning[(model.plate, model.pinning)].append(model)
+            """:type : scanomatic.models.fixture_models.GridHistoryModel"""
+            self._models_per_plate_pinning[(model.plate, tuple(model.pinning))][model.project_id] = model
 
     @property
     def path(self):
@@ -44,12 +44,12 @@ class GriddingHistory(object):
 
     def _get_gridding_history(self, plate, pinning_format):
 
-        return [(model.offset_x, model.offset_y, model.delta_x, model.delta_y) for model in
-                self._models_per_plate_pinning[(plate, pinning_format)].values()]
+        return [(model.center_x, model.center_y, model.delta_x, model.delta_y) for model in
+                self._models_per_plate_pinning[(plate, tuple(pinning_format))].values()]
 
     def get_history_model(self, project_id, plate, pinning):
 
-        models = [model for model in self._models_per_plate_pinning[(plate, pinning)]]
+        models = self._models_per_plate_pinning[(plate, tuple(pinning))]
 
         if project_id in models:
             return models[project_id]
@@ -77,7 +77,7 @@ class GriddingHistory(object):
     def set_gridding_parameters(self, project_id, pinning_format, plate,
                                 center, spacings):
 
-        model = GridHistoryFactory.create(project_id=project_id, pinnig=pinning_format,
+        model = GridHistoryFactory.create(project_id=project_id, pinning=tuple(pinning_format),
                                           plate=plate, center=center, delta=spacings)
 
         if GridHistoryFactory.validate(model):
@@ -92,7 +92,7 @@ class GriddingHistory(object):
             return False
 
         self._logger.info("Setting history {0} on fixture {1} for {2} {3}".format(
-            center + spacings, self._name, project_id, plate))
+            tuple(center) + tuple(spacings), self._name, project_id, plate))
 
         self._models_per_plate_pinning[(model.plate, model.pinning)][model.project_id] = model
         return True
@@ -105,11 +105,11 @@ class GriddingHistory(object):
 
     def reset_gridding_history(self, plate):
 
-        for plate_in_history, pin_format in self._models_per_plate_pinning:
+        for plate_in_history, pin_format in self._models_per_plate_pinning.keys():
             if plate == plate_in_history:
-                for model in self._models_per_plate_pinning[(plate_in_history, pin_format)]:
+                for model in self._models_per_plate_pinning[(plate_in_history, pin_format)].values():
                     GridHistoryFactory.serializer.purge(model, self.path)
-            del self._models_per_plate_pinning[(plate_in_history, pin_format)]
+                del self._models_per_plate_pinning[(plate_in_history, pin_format)]
 
     def reset_all_gridding_histories(self):
 
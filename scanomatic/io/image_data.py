@@ -2,6 +2,7 @@ import numpy as np
 import os
 import glob
 import re
+from types import StringTypes
 
 #
 # INTERNAL DEPENDENCIES
@@ -9,6 +10,7 @@ import re
 
 import scanomatic.io.paths as paths
 import scanomatic.io.logger as logger
+import scanomatic.io.xml.reader as xml_reader
 from scanomatic.io.pickler import unpickle_with_unpickler
 #
 #
@@ -40,9 +42,6 @@ class ImageData(object):
     @staticmethod
     def _write_image(path, image_index, features, output_item, output_value):
 
-        path = os.path.join(*ImageData.directory_path_to_data_path_tuple(
-            path, image_index=image_index))
-
         if features is None:
             ImageData._LOGGER.warning("Image {0} had no data".format(image_index))
             return
@@ -87,25 +86,162 @@ class ImageData(object):
                         plate_features.index
                     ))
 
-        ImageData._LOGGER.info("Saved Image Data '{0}' with {1} plates".format(
-            path, len(plates)))
+        times = ImageData._open_store_array(
+            os.path.join(*ImageData.directory_path_to_data_path_tuple(path, times=True)), image_index + 1)
+
+        for plate_index, plate in enumerate(plates):
+
+            if plate is None:
+                continue
+
+            store = ImageData._open_store_array(
+                ImageData.get_plate_data_path(path, plate_index), times.shape[0], shape=plate.shape)
+
+            if store is None:
+                return False
+
+            store[..., image_index] = plate
+            store.flush()
+
+        ImageData._LOGGER.info("Saved Image Data of image {0} with {1} plates in '{2}'".format(
+            image_index, len(plates), path))
 
-        np.save(path, plates)
         return True
 
+    @staticmethod
+    def _open_store_array(path, size, shape=()):
+        """Opens an array of the image data store for writing.
+
+        Arrays are memory mapped with time as the last dimension. Missing
+        arrays are created and arrays with too few time points are grown,
+        all new time points being `NaN`.
+
+        Args:
+
+            path (str): Path to the array file
+
+            size (int): Minimum number of time points
+
+            shape (tuple): Shape of the array, except the time dimension
+
+        Returns:
+
+            numpy memmap or `None` if the existing array has another shape
+
+        """
+        store = np.load(path, mmap_mode='r+') if os.path.isfile(path) else None
+
+        if store is not None:
+            if store.shape[:-1] != tuple(shape):
+                ImageData._LOGGER.critical("Shape mismatch between image data store {0} and data {1}".format(
+                    store.shape, shape))
+                return None
+            elif store.shape[-1] >= size:
+                return store
+
+            size = max(size, 2 * store.shape[-1])
+
+        grown = np.lib.format.open_memmap(
+            path + ".tmp", mode='w+', dtype=np.float, shape=tuple(shape) + (size,))
+        grown[...] = np.nan
+        if store is not None:
+            grown[..., :store.shape[-1]] = store
+        grown.flush()
+        del grown, store
+
+        os.rename(path + ".tmp", path)
+        return np.load(path, mmap_mode='r+')
+
+    @staticmethod
+    def create_store(path, number_of_images):
+        """Sets up an empty image data store in a directory.
+
+        The image data store keeps one memory mapped array per plate
+        with shape (rows, columns, time) and the times of all images
+        in hours. The times are allocated for all images as `NaN` and
+        each plate when it is first written. Any previous plate data is
+        removed.
+
+        Since times are written after the data of their images, the
+        store can be read at any point of an analysis.
+
+        Args:
+
+            path (str): The directory
+
+            number_of_images (int): The number of images to be analysed
+
+        """
+        for plate_path in ImageData.iter_plate_data_paths(path):
+            os.remove(plate_path)
+
+        times = np.lib.format.open_memmap(
+            os.path.join(*ImageData.directory_path_to_data_path_tuple(path, times=True)),
+            mode='w+', dtype=np.float, shape=(max(1, number_of_images),))
+        times[...] = np.nan
+        times.flush()
+
     @staticmethod
     def iter_write_image_from_xml(path, xml_object, output_item, output_value):
+        """Writes the image data of an analysis xml-file to the image data store.
 
-        scans = xml_object.get_scan_times().size
-        plates = max(xml_object.get_data().keys()) + 1
-        data = xml_object.get_data()
+        The xml-file is streamed a scan at a time so it is never held
+        in memory as a whole.
 
-        for scan_id in range(scans):
-            features = [None] * plates
-            for plate_id in range(plates):
-                features[plate_id] = data[plate_id][:, :, scan_id]
+        Args:
+
+            path (str): The directory of the image data store
+
+            xml_object: A `scanomatic.io.xml.reader.XML_Reader` or the
+                path to the xml-file
 
-            ImageData._write_image(path, scan_id, features, output_item=output_item, output_value=output_value)
+            output_item (scanomatic.models.analysis_model.COMPARTMENTS):
+                The compartment to store
+
+            output_value (scanomatic.models.analysis_model.MEASURES):
+                The measure to store
+
+        Returns:
+
+            int, the number of scans written
+
+        """
+        xml_path = xml_object if isinstance(xml_object, StringTypes) else xml_object.get_file_path()
+        times_path = os.path.join(*ImageData.directory_path_to_data_path_tuple(path, times=True))
+        header = {}
+        scans = 0
+
+        for scan_index, time_stamp, plates in xml_reader.iter_scans(xml_path, header=header):
+
+            if not scans:
+                measure_index = xml_reader.get_measure_index(header['measures'], output_item, output_value)
+                if measure_index is None:
+                    ImageData._LOGGER.error("No {0} {1} measure in '{2}'".format(
+                        output_item, output_value, xml_path))
+                    return 0
+                ImageData.create_store(path, xml_reader.get_number_of_scans(header, scan_index + 1))
+
+            times = ImageData._open_store_array(times_path, scan_index + 1)
+
+            for plate_index, plate in plates.iteritems():
+
+                # Image data is indexed by colony position reversed
+                plate = plate[..., measure_index].T
+                store = ImageData._open_store_array(
+                    ImageData.get_plate_data_path(path, plate_index), times.shape[0], shape=plate.shape)
+
+                if store is None:
+                    return scans
+
+                store[..., scan_index] = plate
+                store.flush()
+
+            times[scan_index] = time_stamp / _SECONDS_PER_HOUR
+            times.flush()
+            scans += 1
+
+        ImageData._LOGGER.info("Wrote image data of {0} scans from '{1}'".format(scans, xml_path))
+        return scans
 
     @staticmethod
     def write_times(analysis_model, image_model, overwrite):
@@ -116,19 +252,15 @@ class ImageData(object):
         """
         global _SECONDS_PER_HOUR
 
-        if not overwrite:
-            current_data = ImageData.read_times(analysis_model.output_directory)
-        else:
-            current_data = np.array([], dtype=np.float)
+        if overwrite:
+            ImageData.create_store(analysis_model.output_directory, image_model.image.index + 1)
 
-        if not (image_model.image.index < current_data.size):
-            current_data = np.r_[
-                current_data,
-                [None] * (1 + image_model.image.index - current_data.size)].astype(np.float)
+        times = ImageData._open_store_array(
+            os.path.join(*ImageData.directory_path_to_data_path_tuple(analysis_model.output_directory, times=True)),
+            image_model.image.index + 1)
 
-        current_data[image_model.image.index] = image_model.image.time_stamp / _SECONDS_PER_HOUR
-        np.save(os.path.join(*ImageData.directory_path_to_data_path_tuple(analysis_model.output_directory, times=True)),
-                current_data)
+        times[image_model.image.index] = image_model.image.time_stamp / _SECONDS_PER_HOUR
+        times.flush()
 
     @staticmethod
     def write_times_from_xml(path, xml_object):
@@ -171,6 +303,17 @@ class ImageData(object):
 
         return path_dir, path_basename.format(image_index)
 
+    @staticmethod
+    def get_plate_data_path(directory_path, plate_index):
+
+        return os.path.join(os.path.dirname(os.path.join(*ImageData.directory_path_to_data_path_tuple(
+            directory_path, times=True))), ImageData._PATHS.image_analysis_plate_data.format(plate_index))
+
+    @staticmethod
+    def iter_plate_data_paths(directory_path):
+
+        return glob.iglob(ImageData.get_plate_data_path(directory_path, "*"))
+
     @staticmethod
     def iter_image_paths(path_pattern):
 
@@ -252,11 +395,56 @@ class ImageData(object):
 
         return np.array(new_data)
 
+    @staticmethod
+    def read_image_data_store(path):
+        """Reads the image data store in a directory.
+
+        Only the times that have been written are included. Plates are
+        memory mapped and if the written times are consecutive, they
+        are views of the store without any copying.
+
+        Args:
+
+            path (string):  The path to the directory with the store.
+
+        Returns:
+
+            tuple (numpy array of time points, numpy array of data) or
+            `(None, None)` if there is no store.
+
+        """
+        prefix, suffix = ImageData._PATHS.image_analysis_plate_data.split("{0}")
+        plates = {}
+        for p in ImageData.iter_plate_data_paths(path):
+            try:
+                plates[int(os.path.basename(p)[len(prefix): -len(suffix)])] = np.load(p, mmap_mode='r')
+            except ValueError:
+                ImageData._LOGGER.warning("File '{0}' has no plate index in it, ignoring it".format(p))
+
+        if not plates:
+            return None, None
+
+        times = ImageData.read_times(path)
+        times = times[:min([times.size] + [plate.shape[-1] for plate in plates.itervalues()])]
+        written = np.flatnonzero(np.isfinite(times))
+
+        if written.size and written[-1] - written[0] + 1 == written.size:
+            written = slice(written[0], written[-1] + 1)
+
+        data = np.empty((max(plates) + 1,), dtype=np.object)
+        for plate_index, plate in plates.iteritems():
+            data[plate_index] = plate[..., written]
+
+        return np.array(times[written]), data
+
     @staticmethod
     def read_image_data_and_time(path):
-        """Reads all images data files in a directory and report the
+        """Reads the image data in a directory and report the
         indices used and data restructured per plate.
 
+        Analyses that predate the image data store have one file
+        per image and these are read if there's no store.
+
         Args:
 
             path (string):  The path to the directory with the files.
@@ -266,6 +454,10 @@ class ImageData(object):
             tuple (numpy array of time points, numpy array of data)
 
         """
+        times, data = ImageData.read_image_data_store(path)
+        if data is not None:
+            return times, data
+
         times = ImageData.read_times(path)
 
         data = []
@@ -1,15 +1,25 @@
 import glob
 import numpy as np
 import os
+from collections import OrderedDict
+from threading import Lock
 
 from scanomatic.io.paths import Paths
-from scanomatic.models.factories.compile_project_factory import CompileImageAnalysisFactory
+from scanomatic.io.compilation_index import load_compilation, load_compiled_image
 from scanomatic.io import logger
 from scanomatic.io.pickler import unpickle_with_unpickler
 from scanomatic.image_analysis.image_basics import load_image_to_numpy
 
 _logger = logger.Logger("Image loader")
 
+# Number of images whose plates are kept in memory and number of open colony stacks
+PLATE_IMAGES_CACHE_SIZE = 8
+COLONY_STACKS_CACHE_SIZE = 16
+
+_PLATE_IMAGES = OrderedDict()
+_COLONY_STACKS = OrderedDict()
+_CACHE_LOCK = Lock()
+
 
 def _get_project_compilation(analysis_directory, file_name=None):
 
@@ -66,6 +76,8 @@ def slice_im(plate_im, colony_position, colony_size):
     if (ubound - lbound != colony_size).any():
         ubound += colony_size - (ubound - lbound)
 
+    lbound = lbound.astype(int)
+    ubound = ubound.astype(int)
     return plate_im[lbound[0]: ubound[0], lbound[1]: ubound[1]]
 
 
@@ -78,14 +90,25 @@ def _load_grid_info(analysis_directory, plate):
     return grid, grid_size
 
 
-def load_colony_image(position, compilation_result=None, analysis_directory=None, time_index=None,
-                      compilation_file_name=None, experiment_directory=None, grid=None, grid_size=None):
+def _get_cached(cache, key, cache_size, loader):
 
-    if not compilation_result:
-        compilation_file = _get_project_compilation(analysis_directory, file_name=compilation_file_name)
-        compilation_result = CompileImageAnalysisFactory.serializer.load(compilation_file)[time_index]
-        if not experiment_directory:
-            experiment_directory = os.path.dirname(compilation_file)
+    with _CACHE_LOCK:
+        if key in cache:
+            value = cache.pop(key)
+            cache[key] = value
+            return value
+
+    value = loader()
+
+    with _CACHE_LOCK:
+        cache[key] = value
+        while len(cache) > cache_size:
+            cache.popitem(last=False)
+
+    return value
+
+
+def _load_plate_images(compilation_result, experiment_directory):
 
     try:
         im = load_image_to_numpy(compilation_result.image.path, dtype=np.uint8)
@@ -93,21 +116,157 @@ def load_colony_image(position, compilation_result=None, analysis_directory=None
         im = load_image_to_numpy(os.path.join(experiment_directory, os.path.basename(compilation_result.image.path)),
                                  dtype=np.uint8)
 
+    plate_images = []
+    for plate_model in compilation_result.fixture.plates:
+
+        x = sorted((plate_model.x1, plate_model.x2))
+        y = sorted((plate_model.y1, plate_model.y2))
+
+        y, x = _bound(im.shape, y, x)
+
+        # As gridding is done on plates as seen in the scanner while plate positioning is done on plates
+        # as seen by the scanner the inverse direction of the short dimension is needed and needed after
+        # slicing out the plate
+        plate_images.append(np.ascontiguousarray(im[y[0]: y[1], x[0]: x[1]][:, ::-1]))
+
+    return plate_images
+
+
+def _get_plate_image(compilation_result, plate, experiment_directory):
+
+    key = (compilation_result.image.path,
+           tuple((p.x1, p.x2, p.y1, p.y2) for p in compilation_result.fixture.plates))
+
+    return _get_cached(
+        _PLATE_IMAGES, key, PLATE_IMAGES_CACHE_SIZE,
+        lambda: _load_plate_images(compilation_result, experiment_directory))[plate]
+
+
+def _get_colony_stack(analysis_directory, plate):
+
+    path = os.path.join(analysis_directory, Paths().colony_stack_pattern.format(plate + 1))
+    shapes_path = os.path.join(analysis_directory, Paths().colony_stack_shapes_pattern.format(plate + 1))
+
+    try:
+        key = (path, os.stat(path).st_mtime, os.stat(shapes_path).st_mtime)
+    except OSError:
+        return None
+
+    return _get_cached(
+        _COLONY_STACKS, key, COLONY_STACKS_CACHE_SIZE,
+        lambda: (np.load(path, mmap_mode='r'), np.load(shapes_path)))
+
+
+def _load_colony_image_from_stack(position, analysis_directory, time_index):
+
+    stack = _get_colony_stack(analysis_directory, position[0])
+    if stack is None:
+        return None
+
+    images, shapes = stack
+    colony = position[1], position[2]
+    if time_index >= images.shape[2] or not shapes[colony][time_index].all():
+        return None
+
+    height, width = shapes[colony][time_index]
+    return np.array(images[colony][time_index, :height, :width])
+
+
+def load_colony_image(position, compilation_result=None, analysis_directory=None, time_index=None,
+                      compilation_file_name=None, experiment_directory=None, grid=None, grid_size=None):
+
+    if not compilation_result:
+
+        if time_index is not None and compilation_file_name is None:
+            im = _load_colony_image_from_stack(position, analysis_directory, time_index)
+            if im is not None:
+                return im
+
+        compilation_file = _get_project_compilation(analysis_directory, file_name=compilation_file_name)
+        compilation_result = load_compiled_image(compilation_file, time_index)
+        if not experiment_directory:
+            experiment_directory = os.path.dirname(compilation_file)
+
     if grid is None or grid_size is None:
         grid, grid_size = _load_grid_info(analysis_directory, position[0])
 
-    plate_model = compilation_result.fixture.plates[position[0]]
-    x = sorted((plate_model.x1, plate_model.x2))
-    y = sorted((plate_model.y1, plate_model.y2))
+    im = _get_plate_image(compilation_result, position[0], experiment_directory)
 
-    y, x = _bound(im.shape, y, x)
+    return slice_im(im, grid[:, grid.shape[1] - position[2] - 1, position[1]], grid_size)
 
-    # As gridding is done on plates as seen in the scanner while plate positioning is done on plates
-    # as seen by the scanner the inverse direction of the short dimension is needed and needed after
-    # slicing out the plate
-    im = im[y[0]: y[1], x[0]: x[1]][:, ::-1]
 
-    return slice_im(im, grid[:, grid.shape[1] - position[2] - 1, position[1]], grid_size)
+def write_colony_stacks(analysis_directory, compilation_file_name=None):
+    """Cuts out the images of all colonies at all times.
+
+    For each plate, the colony images are stored in a memory mappable
+    array with shape (outer, inner, time, height, width) and the
+    actual shapes of the images (colonies at plate edges may be
+    cropped) in another. Times are ordered as in the compilation and
+    each scanned image is only loaded once.
+
+    Colony images are cut using the plate positions detected for each
+    image, as the colony image api does.
+
+    :param analysis_directory: Path to the analysis directory
+    :param compilation_file_name: Optional, name of the compilation file
+    :return: Number of plates with colony stacks
+    """
+    compilation_file = _get_project_compilation(analysis_directory, file_name=compilation_file_name)
+    experiment_directory = os.path.dirname(compilation_file)
+    compilation = load_compilation(compilation_file)
+
+    if not compilation:
+        return 0
+
+    plates = [
+        plate for plate in range(len(compilation[-1].fixture.plates)) if
+        os.path.isfile(os.path.join(analysis_directory, Paths().grid_pattern.format(plate + 1)))]
+
+    grids = {}
+    stacks = {}
+    for plate in plates:
+
+        grid, grid_size = _load_grid_info(analysis_directory, plate)
+        grids[plate] = grid, grid_size
+        stacks[plate] = (
+            np.lib.format.open_memmap(
+                os.path.join(analysis_directory, Paths().colony_stack_pattern.format(plate + 1)) + ".tmp",
+                mode='w+', dtype=np.uint8,
+                shape=(grid.shape[2], grid.shape[1], len(compilation)) + tuple(int(v) for v in grid_size)),
+            np.zeros((grid.shape[2], grid.shape[1], len(compilation), 2), dtype=np.int16))
+
+    for time_index, compilation_result in enumerate(compilation):
+
+        try:
+            plate_images = _load_plate_images(compilation_result, experiment_directory)
+        except (IOError, AttributeError, TypeError, IndexError):
+            _logger.warning("Could not load plates of {0}, skipping it".format(compilation_result.image.path))
+            continue
+
+        for plate in plates:
+
+            if plate >= len(plate_images):
+                continue
+
+            grid, grid_size = grids[plate]
+            images, shapes = stacks[plate]
+            for outer, inner in np.ndindex(images.shape[:2]):
+
+                im = slice_im(plate_images[plate], grid[:, grid.shape[1] - inner - 1, outer], grid_size)
+                images[outer, inner, time_index, :im.shape[0], :im.shape[1]] = im
+                shapes[outer, inner, time_index] = im.shape
+
+        _logger.info("Cut colony images of {0}/{1}".format(time_index + 1, len(compilation)))
+
+    for plate in plates:
+
+        images, shapes = stacks[plate]
+        images.flush()
+        path = os.path.join(analysis_directory, Paths().colony_stack_pattern.format(plate + 1))
+        os.rename(path + ".tmp", path)
+        np.save(os.path.join(analysis_directory, Paths().colony_stack_shapes_pattern.format(plate + 1)), shapes)
+
+    return len(plates)
 
 
 def load_colony_images_for_animation(analysis_directory, position, project_compilation=None, positioning="one-time"):
@@ -139,10 +298,20 @@ def load_colony_images_for_animation(analysis_directory, position, project_compi
 
     grid, grid_size = _load_grid_info(analysis_directory, position[0])
 
-    compilation_results = CompileImageAnalysisFactory.serializer.load(project_compilation)
-    compilation_results = sorted(compilation_results, key=lambda e: e.image.index)
+    compilation_results = load_compilation(project_compilation)
+    order = sorted(range(len(compilation_results)), key=lambda i: compilation_results[i].image.index)
+    compilation_results = [compilation_results[i] for i in order]
 
     times = np.array(tuple(entry.image.time_stamp for entry in compilation_results))
+
+    if positioning == 'detected':
+        stack = _get_colony_stack(analysis_directory, position[0])
+        if stack is not None:
+            images, shapes = stack
+            colony = position[1], position[2]
+            if images.shape[2] == len(order) and (shapes[colony] == grid_size).all():
+                return times, images[colony][order].transpose((1, 2, 0)).astype(np.uint16), None
+
     images = np.zeros(tuple(grid_size) + times.shape, dtype=np.uint16)
     im = None
     ref_plate_model = compilation_results[-1].fixture.plates
@@ -0,0 +1,365 @@
+import os
+import struct
+import time
+import zlib
+from collections import OrderedDict
+from threading import Lock
+
+import numpy as np
+
+from scanomatic.io.logger import Logger
+from scanomatic.io.paths import Paths
+
+_logger = Logger("Log Index")
+
+_INDEX_MAGIC = "SOMLOGI1"
+_INDEX_HEADER = struct.Struct("<8sqiI")
+_INDEX_DTYPE = np.dtype([('offset', '<i8'), ('time', '<f8'), ('status', '<i1')])
+_SIGNATURE_SIZE = 1024
+_READ_SIZE = 4 * 1024 ** 2
+_UNKNOWN_STATUS = -1
+
+_CACHED_INDICES = 16
+_INDICES = OrderedDict()
+_INDICES_LOCK = Lock()
+
+
+def get_log_index(path):
+    """Gets an updated index of a log file.
+
+    The most recently used indices are kept in memory.
+
+    Args:
+        path (str): Path to the log file
+
+    Returns (LogIndex): The index
+
+    Raises:
+        IOError: If there's no such log file
+    """
+    path = os.path.abspath(path)
+
+    with _INDICES_LOCK:
+        log_index = _INDICES.pop(path, None)
+        if log_index is None:
+            log_index = LogIndex(path)
+        _INDICES[path] = log_index
+        while len(_INDICES) > _CACHED_INDICES:
+            _INDICES.popitem(last=False)
+
+    log_index.update()
+    return log_index
+
+
+def _get_status_codes():
+
+    return {name: level for level, _, name in Logger._LOGLEVELS}
+
+
+def _get_timestamp(date, clock, hours_cache):
+
+    hour, minute, second = clock.split(":")
+    key = (date, hour)
+    hour_start = hours_cache.get(key)
+
+    if hour_start is None:
+        try:
+            hour_start = time.mktime(tuple(int(v) for v in date.split("-")) + (int(hour), 0, 0, 0, 0, -1))
+        except (ValueError, OverflowError):
+            hour_start = np.nan
+        hours_cache[key] = hour_start
+
+    return hour_start + int(minute) * 60 + int(second)
+
+
+def _get_signature(fh, size):
+
+    fh.seek(0)
+    return zlib.crc32(fh.read(size)) & 0xffffffff
+
+
+def _parse_record(data):
+
+    lines = data.splitlines()
+    groups = Logger.LOG_PARSING_EXPRESSION.match(lines[0]).groups()
+    message = groups[4].strip()
+    for line in lines[1:]:
+        message += '\n{0}'.format(line.rstrip())
+
+    return {
+        'date': groups[0],
+        'time': groups[1],
+        'status': groups[2],
+        'source': groups[3],
+        'message': message
+    }
+
+
+class LogIndex(object):
+    """Index of the records of a log file.
+
+    The start offset, time and status of each record is kept in a
+    sidecar file next to the log. When the log grows, only the new
+    part of it is indexed and if the log is truncated or replaced, it
+    is indexed anew. Records are then read directly from their offsets
+    so getting a page of records doesn't depend on the size of the log.
+
+    If the sidecar file can't be written, the index is only kept in
+    memory.
+    """
+    def __init__(self, path, index_path=None):
+        """
+        :param path: The log file
+        :param index_path: Optional path for the index,
+            default is the log path with an `.index` suffix
+        """
+        self._path = path
+        self._index_path = Paths().log_index_pattern.format(path) if index_path is None else index_path
+        self._lock = Lock()
+        self._status_codes = _get_status_codes()
+
+        self._records = np.zeros((0,), dtype=_INDEX_DTYPE)
+        self._count = 0
+        self._indexed_size = 0
+        self._signature_size = 0
+        self._signature = 0
+        self._saved_count = 0
+        self._filters = {}
+
+        self._load()
+
+    @property
+    def path(self):
+
+        return self._path
+
+    @property
+    def total_records(self):
+
+        return self._count
+
+    @property
+    def times(self):
+
+        return self._records['time'][:self._count]
+
+    def _reset(self):
+
+        self._records = np.zeros((0,), dtype=_INDEX_DTYPE)
+        self._count = 0
+        self._indexed_size = 0
+        self._signature_size = 0
+        self._signature = 0
+        self._saved_count = 0
+        self._filters = {}
+
+    def _load(self):
+
+        try:
+            with open(self._index_path, 'rb') as fh:
+                magic, indexed_size, signature_size, signature = _INDEX_HEADER.unpack(
+                    fh.read(_INDEX_HEADER.size))
+                records = np.fromfile(fh, dtype=_INDEX_DTYPE)
+        except (IOError, struct.error):
+            return
+
+        if magic != _INDEX_MAGIC:
+            return
+
+        # Records may have been appended without the header being updated
+        records = records[records['offset'] < indexed_size]
+
+        self._records = records
+        self._count = self._saved_count = records.size
+        self._indexed_size = indexed_size
+        self._signature_size = signature_size
+        self._signature = signature
+
+    def _save(self):
+
+        try:
+            if self._saved_count == 0 or not os.path.isfile(self._index_path):
+                mode = 'wb'
+                self._saved_count = 0
+            else:
+                mode = 'r+b'
+
+            with open(self._index_path, mode) as fh:
+                fh.seek(_INDEX_HEADER.size + self._saved_count * _INDEX_DTYPE.itemsize)
+                fh.truncate()
+                self._records[self._saved_count: self._count].tofile(fh)
+                fh.seek(0)
+                fh.write(_INDEX_HEADER.pack(_INDEX_MAGIC, self._indexed_size, self._signature_size, self._signature))
+
+            self._saved_count = self._count
+
+        except (IOError, OSError):
+            _logger.debug("Could not save index of '{0}', keeping it in memory".format(self._path))
+
+    def _append(self, records):
+
+        if self._count + len(records) > self._records.size:
+            grown = np.zeros((max(2 * self._records.size, self._count + len(records), 1024),), dtype=_INDEX_DTYPE)
+            grown[:self._count] = self._records[:self._count]
+            self._records = grown
+
+        self._records[self._count: self._count + len(records)] = records
+        self._count += len(records)
+
+    def update(self):
+        """Indexes the records added to the log since last update.
+
+        Only complete lines are indexed.
+
+        Returns (int): Number of new records
+
+        Raises:
+            IOError: If there's no log file
+        """
+        with self._lock:
+
+            with open(self._path, 'rb') as fh:
+
+                size = os.fstat(fh.fileno()).st_size
+
+                if size < self._indexed_size or self._signature_size and \
+                        _get_signature(fh, self._signature_size) != self._signature:
+
+                    _logger.info("Log '{0}' was replaced, indexing it anew".format(self._path))
+                    self._reset()
+
+                if size == self._indexed_size:
+                    return 0
+
+                count = self._count
+                self._indexed_size = self._index_lines(fh, self._indexed_size)
+
+                if self._signature_size < _SIGNATURE_SIZE:
+                    self._signature_size = min(self._indexed_size, _SIGNATURE_SIZE)
+                    self._signature = _get_signature(fh, self._signature_size)
+
+            self._save()
+            return self._count - count
+
+    def _index_lines(self, fh, position):
+
+        pattern = Logger.LOG_PARSING_EXPRESSION
+        status_codes = self._status_codes
+        hours_cache = {}
+        fh.seek(position)
+        remainder = ""
+
+        while True:
+
+            data = fh.read(_READ_SIZE)
+            if not data:
+                return position
+
+            lines = (remainder + data).split("\n")
+            remainder = lines.pop()
+            records = []
+
+            for line in lines:
+
+                match = pattern.match(line)
+                if match:
+                    date, clock, status = match.groups()[:3]
+                    records.append(
+                        (position, _get_timestamp(date, clock, hours_cache),
+                         status_codes.get(status, _UNKNOWN_STATUS)))
+
+                position += len(line) + 1
+
+            self._append(records)
+
+    def _get_selection(self, filter_status):
+
+        if filter_status is None:
+            return None
+
+        codes = tuple(sorted(code for name, code in self._status_codes.iteritems() if name in filter_status))
+        indexed, selection = self._filters.get(codes, (0, np.zeros((0,), dtype=np.intp)))
+
+        if indexed < self._count:
+            selection = np.hstack((
+                selection, indexed + np.flatnonzero(np.in1d(self._records['status'][indexed: self._count], codes))))
+            self._filters[codes] = (self._count, selection)
+
+        return selection
+
+    def _get_record_end(self, index):
+
+        return self._records['offset'][index + 1] if index + 1 < self._count else self._indexed_size
+
+    def _read_records(self, fh, indices):
+
+        if not len(indices):
+            return []
+
+        if indices[-1] - indices[0] == len(indices) - 1:
+
+            # Consecutive records are read in one go
+            offsets = self._records['offset'][indices[0]: indices[-1] + 1]
+            fh.seek(offsets[0])
+            data = fh.read(self._get_record_end(indices[-1]) - offsets[0])
+            bounds = np.hstack((offsets - offsets[0], [len(data)]))
+            return [_parse_record(data[start: end]) for start, end in zip(bounds[:-1], bounds[1:])]
+
+        records = []
+        for index in indices:
+            start = self._records['offset'][index]
+            fh.seek(start)
+            records.append(_parse_record(fh.read(self._get_record_end(index) - start)))
+
+        return records
+
+    def get_records(self, start=0, count=-1, filter_status=None):
+        """Gets a page of records.
+
+        Args:
+            start (int): The first record number, negative values
+                count from the last record.
+            count (int): Maximum number of records, negative values
+                for all records.
+            filter_status (str): Optional, only include records with
+                status levels that are part of this string, e.g.
+                `"WARNING_ERROR"`. Record numbers then only count these
+                records.
+
+        Returns (dict): The records, what record numbers and byte
+            positions they span, the number of records and any lines
+            preceding the first record (if `start` is 0).
+        """
+        with self._lock:
+
+            selection = self._get_selection(filter_status)
+            total = self._count if selection is None else selection.size
+
+            if start < 0:
+                start = max(0, total + start)
+            start = min(start, total)
+            end = total if count < 0 else min(total, start + count)
+
+            indices = np.arange(start, end) if selection is None else selection[start: end]
+
+            with open(self._path, 'rb') as fh:
+
+                records = self._read_records(fh, indices)
+
+                garbage = []
+                if start == 0:
+                    first_record = self._records['offset'][0] if self._count else self._indexed_size
+                    fh.seek(0)
+                    garbage = [line.rstrip() for line in fh.read(first_record).splitlines()]
+
+            return {
+                'file': self._path,
+                'start_record': start,
+                'end_record': end,
+                'total_records': total,
+                'start_position': int(self._records['offset'][indices[0]]) if len(indices) else self._indexed_size,
+                'end_position': int(self._get_record_end(indices[-1])) if len(indices) else self._indexed_size,
+                'end_of_file': end == total,
+                'records': records,
+                'garbage': garbage
+            }
@@ -1,13 +1,18 @@
 # import traceback
+import atexit
 import datetime
+import os
 import sys
 import threading
 import time
+from collections import deque
 from functools import partial
+from weakref import WeakSet
 import warnings
 import re
 
 LOG_RECYCLE_TIME = 60 * 60 * 24
+LOG_WRITER_IDLE_TIME = 1.0
 
 #
 # CLASSES
@@ -354,39 +359,92 @@ class Logger(object):
 
 
 class _ExtendedFileObject(file):
-    # TODO: Regain buffer and release threads while closing
+    """Log file where lines are written by a background thread.
 
-    def __init__(self, path, mode, buffering=None):
+    Lines are queued in order and one writer thread per file writes and
+    flushes everything queued as one batch. The writer stops when there
+    has been nothing to write for `LOG_WRITER_IDLE_TIME` seconds and is
+    restarted by the next write.
+
+    At most `max_queued` lines are held, writing more blocks until the
+    writer catches up. While paused, nothing is written and the oldest
+    lines are dropped if the queue is full.
+
+    A forked child gets a fresh lock and queue on its first use of the
+    file, since the copied lock may have been held by another thread of
+    the parent and lines queued in the parent are written by the parent.
+    """
+    def __init__(self, path, mode, buffering=-1, max_queued=10000):
 
         super(_ExtendedFileObject, self).__init__(path, mode, buffering=buffering)
-        self._semaphor = False
-        self._buffer = []
-        self._flush_buffer = False
-        self._cache = []
+        self._queue = deque()
+        self._max_queued = max_queued
+        self._dropped = 0
+        self._paused = False
+        self._writing = False
+        self._closing = False
+        self._writer = None
+        self._condition = threading.Condition()
+        self._pid = os.getpid()
+        _OPEN_LOG_FILES.add(self)
+
+    def _reset_if_forked(self):
+
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._condition = threading.Condition()
+            self._queue = deque()
+            self._writer = None
+            self._writing = False
 
     def pause(self):
 
-        if -1 not in self._buffer:
-            self._buffer.insert(0, -1)
+        self._reset_if_forked()
+        with self._condition:
+            self._paused = True
+            while self._writing:
+                self._condition.wait()
 
-        while self._semaphor:
-            time.sleep(0.01)
+    def resume(self):
+
+        self._reset_if_forked()
+        with self._condition:
+            self._paused = False
+            self._start_writer()
+            self._condition.notify_all()
 
     def close(self):
+        """Writes all queued lines and closes the file.
+
+        Returns:
+            list: The queued lines if paused, these are not written.
+        """
+        self._reset_if_forked()
+        with self._condition:
+            if self._closing:
+                return []
 
-        if self._buffer and not self._buffer[0] == -1:
-            self.pause()
+            self._closing = True
+            cache = self._get_queued_lines() if self._paused else []
+            writer = self._writer
+            self._condition.notify_all()
+
+        if writer is not None and writer.is_alive():
+            writer.join()
+
+        _OPEN_LOG_FILES.discard(self)
         super(_ExtendedFileObject, self).close()
-        self._flush_buffer = True
-        self.resume()
-        while self._buffer:
-            time.sleep(0.01)
-        return self._cache
+        return cache
 
-    def resume(self):
+    def flush(self):
+
+        self._reset_if_forked()
+        with self._condition:
+            while not self._paused and (self._queue or self._writing) and self._has_writer():
+                self._condition.wait()
 
-        if self._buffer and self._buffer[0] == -1:
-            self._buffer.pop(0)
+            if not self.closed:
+                super(_ExtendedFileObject, self).flush()
 
     def write(self, s):
         self._write((s,))
@@ -400,27 +458,98 @@ class _ExtendedFileObject(file):
 
     def _write(self, obj):
 
-        id = hash(obj)
-        self._buffer.append(id)
-        t = threading.Thread(target=self._write_to_file, args=(id, obj))
-        t.start()
+        self._reset_if_forked()
+        with self._condition:
 
-    def _write_to_file(self, id, obj):
+            for line in obj:
 
-        while self._semaphor and id != self._buffer[0]:
-            time.sleep(0.01)
+                while not self._paused and not self._closing and len(self._queue) >= self._max_queued:
+                    self._condition.wait()
 
-        if self._flush_buffer:
-            for l in obj:
-                self._cache.append(obj)
-            self._buffer.remove(id)
-            return
+                if self._closing:
+                    return
+
+                if len(self._queue) >= self._max_queued:
+                    self._queue.popleft()
+                    self._dropped += 1
+
+                self._queue.append(line)
+
+            self._start_writer()
+            self._condition.notify_all()
+
+    def _has_writer(self):
+
+        return self._writer is not None and self._writer.is_alive()
+
+    def _start_writer(self):
+
+        if not self._has_writer() and self._queue and not self._paused:
+            self._writer = threading.Thread(target=self._write_to_file, name="Log writer {0}".format(self.name))
+            self._writer.daemon = True
+            self._writer.start()
+
+    def _get_queued_lines(self):
+
+        lines = list(self._queue)
+        self._queue.clear()
+        if self._dropped:
+            lines.insert(0, u"{0} log lines were dropped while logging was paused".format(self._dropped))
+            self._dropped = 0
+        return lines
+
+    def _wait_for_lines(self):
+
+        idle_start = time.time()
+
+        while not self._closing and (self._paused or not self._queue):
+
+            if self._paused:
+                self._condition.wait()
+                idle_start = time.time()
+            else:
+                idle_time = time.time() - idle_start
+                if idle_time >= LOG_WRITER_IDLE_TIME:
+                    return False
+                self._condition.wait(LOG_WRITER_IDLE_TIME - idle_time)
+
+        return bool(self._queue) and not self._paused
+
+    def _write_to_file(self):
+
+        while True:
+
+            with self._condition:
+
+                if not self._wait_for_lines():
+                    self._writer = None
+                    self._condition.notify_all()
+                    return
+
+                lines = self._get_queued_lines()
+                self._writing = True
+
+            try:
+                super(_ExtendedFileObject, self).writelines(
+                    [(l if l.endswith(u"\n") else l + u"\n").encode('utf-8') if isinstance(l, unicode) else
+                     (l if l.endswith("\n") else l + "\n") for l in lines])
+                super(_ExtendedFileObject, self).flush()
+            except (IOError, ValueError) as e:
+                sys.__stderr__.write("Could not write to log file {0}: {1}\n".format(self.name, e))
+            finally:
+                with self._condition:
+                    self._writing = False
+                    self._condition.notify_all()
+
+
+def _close_log_files():
+
+    for log_file in list(_OPEN_LOG_FILES):
+        log_file.close()
 
-        self._semaphor = True
-        self._buffer.remove(id)
 
-        super(_ExtendedFileObject, self).writelines([l if l.endswith(u"\n") else l + u"\n" for l in obj])
-        self._semaphor = False
+_OPEN_LOG_FILES = WeakSet()
+atexit.register(_close_log_files)
 
 
 def parse_log_file(path, seek=0, max_records=-1, filter_status=None):
@@ -103,6 +103,7 @@ class Paths(SingeltonOneInit):
         self.log_server = os.path.join(self.log, "server.log")
         self.log_scanner_out = os.path.join(self.log, "scanner_{0}.stdout")
         self.log_scanner_err = os.path.join(self.log, "scanner_{0}.stderr")
+        self.log_index_pattern = "{0}.index"
 
         self.log_relaunch = os.path.join(self.log, "relaunch.log")
         self.log_project_progress = os.path.join(self.log, "progress.projects")
@@ -141,6 +142,8 @@ class Paths(SingeltonOneInit):
         self.experiment_grid_image_pattern = "grid___origin_plate_{0}.svg"
         self.grid_pattern = "grid_plate___{0}.npy"
         self.grid_size_pattern = "grid_size___{0}.npy"
+        self.colony_stack_pattern = "colony_stack___{0}.npy"
+        self.colony_stack_shapes_pattern = "colony_stack_shapes___{0}.npy"
         self.experiment_grid_error_image = "_no_grid_{0}.npy"
 
         self.ui_server_phenotype_state_lock = "phenotypes_state.lock"
@@ -158,17 +161,21 @@ class Paths(SingeltonOneInit):
         self.phenotypes_input_smooth = "curves_smooth.npy"
         self.phenotypes_extraction_params = "phenotype_params.npy"
         self.phenotype_times = "phenotype_times.npy"
+        self.phenotyper_state = "phenotyper_state.npz"
 
         self.phenotypes_extraction_log = "phenotypes.extraction.log"
         self.phenotypes_extraction_instructions = "phenotypes.extraction.instructions"
 
         self.image_analysis_img_data = "image_{0}_data.npy"
+        self.image_analysis_plate_data = "plate_{0}_image_data.npy"
+        self.image_analysis_features = "image_{0}_features.npz"
         self.image_analysis_time_series = "time_data.npy"
 
         self.project_compilation_from_scanning_pattern_old = "{0}.project.settings"
         self.project_compilation_from_scanning_pattern = "{0}.project.compilation.original"
         self.project_compilation_pattern = "{0}.project.compilation"
         self.project_compilation_instructions_pattern = "{0}.project.compilation.instructions"
+        self.project_compilation_index_pattern = "{0}.index"
         self.project_compilation_log_pattern = "{0}.project.compilation.log"
 
         self.scan_project_file_pattern = "{0}.scan.instructions"
@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+
+from scanomatic.io.compilation_index import CompilationIndex, load_compilation, load_compiled_image
+from scanomatic.models.factories.compile_project_factory import CompileImageAnalysisFactory, CompileImageFactory
+from scanomatic.models.factories.fixture_factories import (
+    FixtureFactory, FixturePlateFactory, GrayScaleAreaModelFactory)
+
+
+def _get_image_model(directory, index):
+
+    random = np.random.RandomState(index)
+    image_path = directory.join("project_{0:04d}.tiff".format(index))
+    image_path.ensure()
+
+    return CompileImageAnalysisFactory.create(
+        image=CompileImageFactory.create(index=index, path=str(image_path), time_stamp=1200.5 * index),
+        fixture=FixtureFactory.create(
+            name="Fixture", path="/fixtures/fixture.cfg", scale=0.5, coordinates_scale=1.0, shape=[5000, 6000],
+            orientation_marks_x=[float(v) for v in random.random_sample(3) * 5000],
+            orientation_marks_y=[float(v) for v in random.random_sample(3) * 5000],
+            grayscale=GrayScaleAreaModelFactory.create(
+                name="Kodak", values=[float(v) for v in random.random_sample(23) * 200], width=55.5,
+                section_length=101.2, x1=1, x2=2, y1=3, y2=4),
+            plates=[FixturePlateFactory.create(
+                index=plate + 1, x1=int(random.randint(0, 100)), x2=int(random.randint(1000, 2000)),
+                y1=int(random.randint(0, 100)), y2=int(random.randint(1000, 2000))) for plate in range(4)]))
+
+
+def _compile(path, image_models, mode='r+w'):
+
+    for image_model in image_models:
+        with open(path, mode) as fh:
+            CompileImageAnalysisFactory.serializer.dump_to_filehandle(image_model, fh, as_if_appending=True)
+        mode = 'r+w'
+
+
+@pytest.fixture
+def compilation(tmpdir):
+
+    path = str(tmpdir.join("test.project.compilation"))
+    _compile(path, [_get_image_model(tmpdir, index) for index in range(4)], mode='w')
+    return path
+
+
+def test_index_gives_same_models_as_parsing(compilation):
+
+    compilation_index = CompilationIndex(compilation)
+    assert compilation_index.update() == 4
+    assert compilation_index._records['complete'].all()
+
+    parsed = CompileImageAnalysisFactory.serializer.load(compilation)
+    assert load_compilation(compilation) == parsed
+    assert load_compiled_image(compilation, 2) == parsed[2]
+    np.testing.assert_equal(compilation_index.image_indices, range(4))
+
+
+def test_index_is_updated_incrementally_and_saved(compilation, tmpdir):
+
+    compilation_index = CompilationIndex(compilation)
+    compilation_index.update()
+    _compile(compilation, [_get_image_model(tmpdir, 4)])
+
+    assert not compilation_index.is_current()
+    assert compilation_index.update() == 1
+
+    reloaded = CompilationIndex(compilation)
+    assert reloaded.is_current()
+    assert len(reloaded) == 5
+    assert reloaded[4] == CompileImageAnalysisFactory.serializer.load(compilation)[4]
+
+
+def test_rewritten_compilation_is_indexed_anew(compilation, tmpdir):
+
+    CompilationIndex(compilation).update()
+    _compile(compilation, [_get_image_model(tmpdir, index) for index in (7, 8)], mode='w')
+
+    compilation_index = CompilationIndex(compilation)
+    assert compilation_index.update() == 2
+    np.testing.assert_equal(compilation_index.image_indices, [7, 8])
+
+
+def test_models_not_fitting_records_are_parsed(tmpdir):
+
+    path = str(tmpdir.join("test.project.compilation"))
+    image_model = _get_image_model(tmpdir.mkdir("a" * 200).mkdir("b" * 100), 0)
+    _compile(path, [image_model], mode='w')
+
+    compilation_index = CompilationIndex(path)
+    compilation_index.update()
+
+    assert not compilation_index._records['complete'][0]
+    assert compilation_index[0] == CompileImageAnalysisFactory.serializer.load(path)[0]
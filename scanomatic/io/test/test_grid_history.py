@@ -0,0 +1,22 @@
+import numpy as np
+
+from scanomatic.io.fixtures import FixtureSettings
+
+
+def test_gridding_history_is_reloaded(tmpdir):
+
+    history = FixtureSettings("Test", dir_path=str(tmpdir), overwrite=True).history
+    history.load()
+
+    assert history.set_gridding_parameters("a.project.compilation", (32, 48), 0, (100.5, 200.0), (54.5, 54.6))
+    assert history.set_gridding_parameters("b.project.compilation", (32, 48), 0, (101.5, 201.0), (54.4, 54.6))
+    assert history.set_gridding_parameters("b.project.compilation", (16, 24), 1, (50.0, 70.0), (108.0, 108.2))
+
+    reloaded = FixtureSettings("Test", dir_path=str(tmpdir)).history
+    reloaded.load()
+
+    np.testing.assert_allclose(
+        sorted(reloaded.get_gridding_history(0, (32, 48)).tolist()),
+        [(100.5, 200.0, 54.5, 54.6), (101.5, 201.0, 54.4, 54.6)])
+    assert reloaded.get_gridding_history(1, (32, 48)) is None
+    assert reloaded.get_history_model("b.project.compilation", 1, (16, 24)).delta_y == 108.2
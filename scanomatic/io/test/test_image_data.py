@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+
+from scanomatic.io.image_data import ImageData
+from scanomatic.models.analysis_model import COMPARTMENTS, MEASURES
+from scanomatic.models.factories.analysis_factories import (
+    AnalysisModelFactory, AnalysisFeaturesFactory)
+from scanomatic.models.factories.compile_project_factory import CompileImageAnalysisFactory, CompileImageFactory
+
+_PINNING = ((2, 3), None, (4, 6))
+_TIMES = 4
+
+
+def _get_value(plate, position, index):
+
+    return 1000.0 * plate + 100 * position[0] + 10 * position[1] + index
+
+
+def _get_features(index):
+
+    plates = []
+    for id_plate, pinning in enumerate(_PINNING):
+        if pinning is None:
+            plates.append(None)
+            continue
+
+        plates.append(AnalysisFeaturesFactory.create(index=id_plate, shape=pinning, data=set(
+            AnalysisFeaturesFactory.create(index=position, data={COMPARTMENTS.Blob: AnalysisFeaturesFactory.create(
+                data={MEASURES.Sum: _get_value(id_plate, position, index)})})
+            for position in np.ndindex(pinning[::-1]))))
+
+    return AnalysisFeaturesFactory.create(index=0, shape=(len(plates),), data=tuple(plates))
+
+
+@pytest.fixture
+def analysis_model(tmpdir):
+
+    return AnalysisModelFactory.create(
+        output_directory=str(tmpdir), image_data_output_item=COMPARTMENTS.Blob,
+        image_data_output_measure=MEASURES.Sum)
+
+
+def _write(analysis_model, index):
+
+    image_model = CompileImageAnalysisFactory.create(
+        image=CompileImageFactory.create(index=index, time_stamp=3600.0 * index))
+
+    assert ImageData.write_image(analysis_model, image_model, _get_features(index))
+    ImageData.write_times(analysis_model, image_model, overwrite=False)
+
+
+def test_partial_analysis_is_readable(analysis_model):
+
+    ImageData.create_store(analysis_model.output_directory, _TIMES)
+    _, data = ImageData.read_image_data_and_time(analysis_model.output_directory)
+    assert data is None
+
+    # Analysis runs from the last image
+    _write(analysis_model, 3)
+    _write(analysis_model, 2)
+
+    times, data = ImageData.read_image_data_and_time(analysis_model.output_directory)
+
+    np.testing.assert_array_equal(times, [2, 3])
+    assert data[1] is None
+    assert data[0].shape == (2, 3, 2)
+    assert data[2].shape == (4, 6, 2)
+    assert data[2][1, 5, 0] == _get_value(2, (5, 1), 2)
+
+
+def test_store_is_memory_mapped(analysis_model):
+
+    ImageData.create_store(analysis_model.output_directory, _TIMES)
+    for index in reversed(range(_TIMES)):
+        _write(analysis_model, index)
+
+    times, data = ImageData.read_image_data_and_time(analysis_model.output_directory)
+
+    np.testing.assert_array_equal(times, np.arange(_TIMES))
+    assert isinstance(data[0], np.memmap)
+    np.testing.assert_array_equal(data[0][1, 2], [_get_value(0, (2, 1), index) for index in range(_TIMES)])
+
+
+def test_store_grows_when_written_beyond_allocation(analysis_model):
+
+    for index in range(_TIMES):
+        _write(analysis_model, index)
+
+    times, data = ImageData.read_image_data_and_time(analysis_model.output_directory)
+
+    np.testing.assert_array_equal(times, np.arange(_TIMES))
+    np.testing.assert_array_equal(data[2][3, 0], [_get_value(2, (0, 3), index) for index in range(_TIMES)])
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from scanomatic.io import image_loading
+from scanomatic.io.paths import Paths
+from scanomatic.models.factories.compile_project_factory import CompileImageAnalysisFactory, CompileImageFactory
+from scanomatic.models.factories.fixture_factories import (
+    FixtureFactory, FixturePlateFactory, GrayScaleAreaModelFactory)
+
+_PLATES = ((10, 90, 20, 140), (110, 190, 15, 135))
+_GRID_SHAPE = (4, 6)
+_TIMES = 3
+
+
+@pytest.fixture
+def analysis_directory(tmpdir):
+
+    project = tmpdir.mkdir("project")
+    analysis = project.mkdir("analysis")
+    random = np.random.RandomState(0)
+
+    compilation = str(project.join(Paths().project_compilation_pattern.format("project")))
+    for index in range(_TIMES):
+        image_path = project.join("project_{0:04d}_{1}.tiff".format(index, 100.0 * index))
+        Image.fromarray(random.randint(0, 255, (200, 160)).astype(np.uint8)).save(str(image_path))
+
+        # Plates are detected at slightly different positions in each image
+        plates = [FixturePlateFactory.create(index=plate + 1, x1=x1 + index, x2=x2 + index, y1=y1, y2=y2)
+                  for plate, (x1, x2, y1, y2) in enumerate(_PLATES)]
+        with open(compilation, 'r+w' if index else 'w') as fh:
+            CompileImageAnalysisFactory.serializer.dump_to_filehandle(CompileImageAnalysisFactory.create(
+                image=CompileImageFactory.create(index=index, path=str(image_path), time_stamp=100.0 * index),
+                fixture=FixtureFactory.create(
+                    name="Fixture", shape=[200, 160], orientation_marks_x=[10.0, 20.0, 30.0],
+                    orientation_marks_y=[10.0, 20.0, 30.0],
+                    grayscale=GrayScaleAreaModelFactory.create(name="Kodak", values=[1.0, 2.0]),
+                    plates=plates)), fh, as_if_appending=True)
+
+    outer, inner = np.mgrid[:_GRID_SHAPE[1], :_GRID_SHAPE[0]]
+    for plate in range(len(_PLATES)):
+        grid = np.array([outer * 20. + 10.5, inner * 20. + 12]).transpose((0, 2, 1))
+        np.save(str(analysis.join(Paths().grid_pattern.format(plate + 1))), grid)
+        np.save(str(analysis.join(Paths().grid_size_pattern.format(plate + 1))), np.array([11, 13]))
+
+    return str(analysis)
+
+
+def test_colony_images_from_stacks_same_as_from_scans(analysis_directory):
+
+    def get_colony_images():
+        return [image_loading.load_colony_image((plate, outer, inner), analysis_directory=analysis_directory,
+                                                time_index=time_index)
+                for plate in range(len(_PLATES)) for time_index in range(_TIMES)
+                for outer, inner in np.ndindex(_GRID_SHAPE[1], _GRID_SHAPE[0])]
+
+    from_scans = get_colony_images()
+    assert image_loading.write_colony_stacks(analysis_directory) == 2
+    from_stacks = get_colony_images()
+
+    assert len(from_stacks) == len(from_scans)
+    for from_stack, from_scan in zip(from_stacks, from_scans):
+        np.testing.assert_array_equal(from_stack, from_scan)
+
+
+def test_animation_from_stacks(analysis_directory):
+
+    times, images, _ = image_loading.load_colony_images_for_animation(
+        analysis_directory, (1, 2, 3), positioning='detected')
+
+    image_loading.write_colony_stacks(analysis_directory)
+    stack_times, stack_images, _ = image_loading.load_colony_images_for_animation(
+        analysis_directory, (1, 2, 3), positioning='detected')
+
+    np.testing.assert_array_equal(stack_times, times)
+    np.testing.assert_array_equal(stack_images, images)
+    assert stack_images.dtype == images.dtype
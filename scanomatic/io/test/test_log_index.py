@@ -0,0 +1,84 @@
+import pytest
+
+from scanomatic.io.logger import parse_log_file
+from scanomatic.io.log_index import LogIndex
+
+_STATUSES = ('INFO', 'DEBUG', 'WARNING', 'ERROR')
+
+
+def _write_records(path, start, stop, mode='a'):
+
+    with open(str(path), mode) as fh:
+        for i in range(start, stop):
+            fh.write("2017-03-0{0} 12:{1:02d}:{2:02d} -- {3}\t**Source** Message {4}\n".format(
+                1 + i // 3600 % 9, i // 60 % 60, i % 60, _STATUSES[i % 4], i))
+            if i % 3 == 0:
+                fh.write("  continued {0}\n".format(i))
+
+
+@pytest.fixture
+def log_path(tmpdir):
+
+    path = tmpdir.join('test.log')
+    with open(str(path), 'w') as fh:
+        fh.write("Something before records\n")
+    _write_records(path, 0, 100)
+    return str(path)
+
+
+def test_index_gives_same_records_as_parsing(log_path):
+
+    log_index = LogIndex(log_path)
+    assert log_index.update() == 100
+
+    data = log_index.get_records()
+    parsed = parse_log_file(log_path)
+
+    # Parsing doesn't include the last record
+    assert data['records'][:-1] == parsed['records']
+    assert data['garbage'] == parsed['garbage'] == ["Something before records"]
+    assert data['records'][-1]['message'] == 'Message 99\n  continued 99'
+
+
+def test_paging_and_filtering(log_path):
+
+    log_index = LogIndex(log_path)
+    log_index.update()
+
+    page = log_index.get_records(start=10, count=5)
+    assert [r['message'].split('\n')[0] for r in page['records']] == ['Message {0}'.format(i) for i in range(10, 15)]
+    assert page['end_record'] == 15 and not page['end_of_file'] and page['garbage'] == []
+
+    errors = log_index.get_records(start=2, count=3, filter_status='WARNING_ERROR')
+    assert [r['message'].split('\n')[0] for r in errors['records']] == ['Message 6', 'Message 7', 'Message 10']
+    assert errors['total_records'] == 50
+
+    tail = log_index.get_records(start=-2, count=2, filter_status='ERROR')
+    assert [r['message'].split('\n')[0] for r in tail['records']] == ['Message 95', 'Message 99']
+    assert tail['end_of_file']
+
+
+def test_index_is_updated_incrementally_and_saved(log_path):
+
+    log_index = LogIndex(log_path)
+    log_index.update()
+    _write_records(log_path, 100, 110)
+
+    assert log_index.update() == 10
+    assert log_index.get_records(start=-1)['records'][0]['message'] == 'Message 109'
+
+    reloaded = LogIndex(log_path)
+    assert reloaded.total_records == 110
+    assert reloaded.update() == 0
+    assert reloaded.get_records() == log_index.get_records()
+
+
+def test_replaced_log_is_indexed_anew(log_path):
+
+    log_index = LogIndex(log_path)
+    log_index.update()
+    _write_records(log_path, 500, 505, mode='w')
+
+    assert log_index.update() == 5
+    assert log_index.total_records == 5
+    assert log_index.get_records(count=1)['records'][0]['message'] == 'Message 500'
@@ -0,0 +1,138 @@
+import os
+import signal
+import threading
+import time
+
+from scanomatic.io import logger
+from scanomatic.io.logger import Logger, _ExtendedFileObject
+
+
+def _read_lines(path):
+
+    with open(str(path)) as fh:
+        return fh.read().splitlines()
+
+
+def test_lines_are_written_in_order(tmpdir):
+
+    path = str(tmpdir.join('log.txt'))
+    log_file = _ExtendedFileObject(path, 'w')
+    for i in range(1000):
+        log_file.writelines(u"line {0}".format(i))
+    log_file.write("last line\n")
+
+    assert log_file.close() == []
+    assert _read_lines(path) == [u"line {0}".format(i) for i in range(1000)] + ["last line"]
+
+
+def test_flush_writes_queued_lines(tmpdir):
+
+    path = str(tmpdir.join('log.txt'))
+    log_file = _ExtendedFileObject(path, 'w')
+    log_file.writelines([u"first", u"second"])
+    log_file.flush()
+    assert _read_lines(path) == ["first", "second"]
+    log_file.close()
+
+
+def test_paused_lines_are_returned_on_close(tmpdir):
+
+    path = str(tmpdir.join('log.txt'))
+    log_file = _ExtendedFileObject(path, 'w')
+    log_file.writelines(u"before")
+    log_file.flush()
+    log_file.pause()
+    log_file.writelines(u"during")
+
+    assert log_file.close() == [u"during"]
+    assert _read_lines(path) == ["before"]
+
+
+def test_paused_queue_is_bounded(tmpdir):
+
+    path = str(tmpdir.join('log.txt'))
+    log_file = _ExtendedFileObject(path, 'w', max_queued=3)
+    log_file.pause()
+    log_file.writelines([u"line {0}".format(i) for i in range(5)])
+    log_file.resume()
+    log_file.close()
+
+    assert _read_lines(path) == [
+        "2 log lines were dropped while logging was paused", "line 2", "line 3", "line 4"]
+
+
+def test_writer_stops_when_idle(tmpdir, monkeypatch):
+
+    monkeypatch.setattr(logger, 'LOG_WRITER_IDLE_TIME', 0.05)
+    path = str(tmpdir.join('log.txt'))
+    log_file = _ExtendedFileObject(path, 'w')
+    log_file.writelines(u"first")
+    time.sleep(0.5)
+    assert log_file._writer is None
+
+    log_file.writelines(u"second")
+    log_file.close()
+    assert _read_lines(path) == ["first", "second"]
+
+
+def test_logger_moves_paused_lines_to_new_target(tmpdir):
+
+    first = str(tmpdir.join('first.txt'))
+    second = str(tmpdir.join('second.txt'))
+
+    log = Logger("Test")
+    log.set_output_target(first)
+    log.info("before")
+    log.pause()
+    log.info("during")
+    log.set_output_target(second)
+    log.resume()
+    log.info("after")
+    log.close_output()
+
+    assert [line.split('** ')[-1] for line in _read_lines(first) + _read_lines(second)] == [
+        "before", "during", "after"]
+    assert not any("during" in line for line in _read_lines(first))
+
+
+def test_forked_child_can_log_while_parent_thread_logs(tmpdir):
+
+    path = str(tmpdir.join('log.txt'))
+    log_file = _ExtendedFileObject(path, 'w')
+    logging = threading.Event()
+    logging.set()
+
+    def keep_logging():
+        while logging.is_set():
+            log_file.writelines(u"parent")
+
+    thread = threading.Thread(target=keep_logging)
+    thread.start()
+    hung = False
+
+    try:
+        for _ in range(50):
+
+            pid = os.fork()
+            if pid == 0:
+                log_file.writelines(u"child")
+                log_file.flush()
+                os._exit(0)
+
+            deadline = time.time() + 5
+            while os.waitpid(pid, os.WNOHANG)[0] == 0:
+                if time.time() > deadline:
+                    os.kill(pid, signal.SIGKILL)
+                    os.waitpid(pid, 0)
+                    hung = True
+                    break
+                time.sleep(0.01)
+
+            if hung:
+                break
+    finally:
+        logging.clear()
+        thread.join()
+        log_file.close()
+
+    assert not hung
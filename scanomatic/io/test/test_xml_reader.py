@@ -0,0 +1,154 @@
+import numpy as np
+import pytest
+
+from scanomatic.io import binary_features
+from scanomatic.io.xml import reader
+from scanomatic.io.xml.writer import XML_Writer
+from scanomatic.models.analysis_model import COMPARTMENTS, MEASURES
+from scanomatic.models.factories.analysis_factories import AnalysisFeaturesFactory, XMLModelFactory
+from scanomatic.models.factories.compile_project_factory import CompileImageAnalysisFactory, CompileImageFactory
+from scanomatic.models.factories.fixture_factories import FixtureFactory, FixturePlateFactory
+from scanomatic.models.factories.scanning_factory import ScanningModelFactory
+
+_PINNING = [(2, 3), None, (4, 6)]
+_SCANS = 5
+
+
+def _get_value(plate, position, index, measure):
+
+    return 1000.0 * plate + 100 * position[0] + 10 * position[1] + index + 0.1 * measure.value
+
+
+def _get_features(index):
+
+    plates = []
+    for id_plate, pinning in enumerate(_PINNING):
+        if pinning is None:
+            plates.append(None)
+            continue
+
+        plates.append(AnalysisFeaturesFactory.create(index=id_plate, shape=pinning, data=set(
+            AnalysisFeaturesFactory.create(index=position, data={
+                compartment: AnalysisFeaturesFactory.create(index=compartment, data={
+                    measure: _get_value(id_plate, position, index, measure)
+                    for measure in (MEASURES.Count, MEASURES.Sum)})
+                for compartment in (COMPARTMENTS.Blob, COMPARTMENTS.Background)})
+            for position in np.ndindex(pinning))))
+
+    return AnalysisFeaturesFactory.create(index=0, shape=(len(plates),), data=tuple(plates))
+
+
+def _write_analysis(directory, short_tags=True):
+
+    writer = XML_Writer(directory, XMLModelFactory.create(make_short_tag_version=short_tags))
+    writer.write_header(
+        ScanningModelFactory.create(pinning_formats=_PINNING, description="Test", number_of_scans=_SCANS),
+        [None] * len(_PINNING))
+    writer.write_segment_start_scans()
+
+    plates = [FixturePlateFactory.create(index=index) for index in range(len(_PINNING))]
+    # Analysis runs from the last image
+    for index in reversed(range(_SCANS)):
+        image_model = CompileImageAnalysisFactory.create(
+            image=CompileImageFactory.create(index=index, time_stamp=60. + 1800. * index),
+            fixture=FixtureFactory.create(plates=plates))
+        writer.write_image_features(image_model, _get_features(index))
+
+    writer.close()
+
+
+@pytest.fixture
+def analysis_directory(tmpdir, monkeypatch):
+
+    monkeypatch.setattr(XML_Writer, "_get_computer_ID", lambda self: "00:11:22:33:44:55")
+    return tmpdir
+
+
+@pytest.mark.parametrize("short_tags", (True, False))
+def test_read_analysis(analysis_directory, short_tags):
+
+    _write_analysis(str(analysis_directory), short_tags=short_tags)
+    xml = reader.XML_Reader(str(analysis_directory.join("analysis.xml")))
+
+    np.testing.assert_allclose(xml.get_scan_times(), np.arange(_SCANS) * 0.5)
+    assert sorted(xml.get_data()) == [0, 2]
+    assert xml.get_data()[2].shape == (4, 6, _SCANS, 4)
+    assert xml.get_meta_data()['desc'] == ["Test"]
+
+    growth_data = xml.get_growth_data(COMPARTMENTS.Background, MEASURES.Sum)
+    assert growth_data[1] is None
+    np.testing.assert_allclose(
+        growth_data[2][3, 1], [_get_value(2, (3, 1), index, MEASURES.Sum) for index in range(_SCANS)])
+
+
+def test_slimmed_analysis_has_one_measure(analysis_directory):
+
+    _write_analysis(str(analysis_directory))
+    xml = reader.XML_Reader(str(analysis_directory.join("analysis_slimmed.xml")))
+
+    assert len(xml.get_measures()) == 1
+    np.testing.assert_allclose(
+        xml.get_growth_data()[0][1, 2], [_get_value(0, (1, 2), index, MEASURES.Sum) for index in range(_SCANS)])
+
+
+def test_streaming_in_small_chunks(analysis_directory):
+
+    _write_analysis(str(analysis_directory))
+    path = str(analysis_directory.join("analysis.xml"))
+
+    for (index, time_stamp, plates), (chunked_index, chunked_time_stamp, chunked_plates) in zip(
+            reader.iter_scans(path), reader.iter_scans(path, read_size=37)):
+
+        assert index == chunked_index
+        assert time_stamp == chunked_time_stamp
+        assert sorted(plates) == sorted(chunked_plates)
+        for plate in plates:
+            np.testing.assert_array_equal(plates[plate], chunked_plates[plate])
+
+
+def test_unfinished_analysis(analysis_directory):
+
+    _write_analysis(str(analysis_directory))
+    path = analysis_directory.join("analysis.xml")
+    data = path.read()
+    # As if cut while writing the third scan
+    path.write(data[:data.index('<s i="{0}">'.format(_SCANS - 3))])
+
+    scans = list(reader.iter_scans(str(path)))
+
+    assert [scan[0] for scan in scans] == [_SCANS - 1, _SCANS - 2]
+    assert not np.isnan(scans[0][2][2]).any()
+
+
+def test_binary_features_sidecar(analysis_directory):
+
+    directory = str(analysis_directory)
+    writer = XML_Writer(directory, XMLModelFactory.create(binary_features=True))
+    writer.write_header(
+        ScanningModelFactory.create(pinning_formats=_PINNING, number_of_scans=_SCANS), [None] * len(_PINNING))
+    writer.write_segment_start_scans()
+
+    plates = [FixturePlateFactory.create(index=index) for index in range(len(_PINNING))]
+    for index in reversed(range(_SCANS)):
+        features = _get_features(index)
+        for plate_features in features.data:
+            for cell_features in (plate_features.data if plate_features else ()):
+                cell_features.data[COMPARTMENTS.Blob].data[MEASURES.IQR] = (index, index + 1)
+
+        writer.write_image_features(CompileImageAnalysisFactory.create(
+            image=CompileImageFactory.create(index=index, time_stamp=60. + 1800. * index),
+            fixture=FixtureFactory.create(plates=plates)), features)
+
+    writer.close()
+
+    times, measures, data = binary_features.read_image_features(directory)
+
+    np.testing.assert_allclose(times, (60. + 1800. * np.arange(_SCANS)) / 3600.)
+    assert sorted(data) == [0, 2]
+    assert data[2].shape == (4, 6, _SCANS, 6)
+    assert "Blob:IQR:0" in measures and "Blob:IQR:1" in measures
+    np.testing.assert_allclose(
+        data[2][3, 1, :, measures.index(binary_features.get_measure_name(COMPARTMENTS.Background, MEASURES.Sum))],
+        [_get_value(2, (3, 1), index, MEASURES.Sum) for index in range(_SCANS)])
+    np.testing.assert_allclose(data[0][1, 2, :, measures.index("Blob:IQR:1")], np.arange(_SCANS) + 1)
+    assert binary_features.remove_image_features(directory) == _SCANS
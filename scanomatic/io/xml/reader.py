@@ -16,6 +16,7 @@ __status__ = "Development"
 # DEPENDENCIES
 #
 
+import ast
 import os
 import numpy as np
 import re
@@ -25,6 +26,8 @@ import re
 #
 
 import scanomatic.io.logger as logger
+from scanomatic.io.xml.writer import XML_Writer
+from scanomatic.models.analysis_model import COMPARTMENTS, MEASURES
 
 #
 # SCANNOMATIC LIBRARIES
@@ -35,6 +38,231 @@ import scanomatic.io.logger as logger
 # FUNCTIONS
 #
 
+_READ_SIZE = 4 * 1024 ** 2
+
+# Short meta data keys used for the long tags
+_META_DATA_KEYS = {
+    'start-t': 'start-t', 'start-time': 'start-t',
+    'desc': 'desc', 'description': 'desc',
+    'n-plates': 'n-plates', 'plates-per-scan': 'n-plates',
+    'n-scans': 'n-scans', 'number-of-scans': 'n-scans',
+}
+_PINNING_KEY = 'pinning-matrices'
+_MEASURES_KEY = 'measures'
+
+_TOKENS = re.compile(
+    r'<(?:'
+    r'(?:s|scan) (?:i|index)="(?P<scan>\d+)">'
+    r'|(?:ok|scan-valid)>(?P<valid>[^<]*)</(?:ok|scan-valid)>'
+    r'|(?:t|time)>(?P<time>[^<]*)</(?:t|time)>'
+    r'|(?:p|plate) (?:i|index)="(?P<plate>\d+)">'
+    r'|(?:gc|grid-cell) x="(?P<x>\d+)" y="(?P<y>\d+)">(?P<cell>.*?)</(?:gc|grid-cell)>'
+    r'|(?:p-m|pinning-matrix) (?:i|index)="(?P<pinning_index>\d+)">(?P<pinning>[^<]*)</(?:p-m|pinning-matrix)>'
+    r'|(?P<meta_tag>' + "|".join(_META_DATA_KEYS) + r')>(?P<meta>[^<]*)</(?P=meta_tag)>'
+    r')', re.DOTALL)
+
+_CELL_VALUES = re.compile(r"<[^/<>][^<>]*>([^<>]*)</")
+_CELL_TAGS = re.compile(r"<(/?)([^<>]+)>")
+
+
+def _get_cell_measures(cell):
+
+    measures = []
+    compartment = None
+    for closing, tag in _CELL_TAGS.findall(cell):
+        if closing:
+            if tag == compartment:
+                compartment = None
+        elif compartment is None:
+            compartment = tag
+        else:
+            measures.append((compartment, tag))
+
+    return measures
+
+
+def _parse_cell_values(cell, number_of_measures):
+
+    values = _CELL_VALUES.findall(cell)
+    if len(values) != number_of_measures:
+        return np.nan
+
+    try:
+        return [float(v) for v in values]
+    except ValueError:
+        parsed = []
+        for v in values:
+            try:
+                parsed.append(float(v))
+            except ValueError:
+                parsed.append(np.nan)
+        return parsed
+
+
+def _parse_pinning(pinning):
+
+    try:
+        pinning = ast.literal_eval(pinning.strip())
+    except (ValueError, SyntaxError):
+        return None
+
+    return tuple(pinning) if pinning else None
+
+
+def get_number_of_scans(header, minimum=1):
+    """Number of scans of an xml-file according to its header
+
+    Args:
+        header (dict): As filled by `iter_scans`
+        minimum (int): The least number of scans to report
+
+    Returns: int
+    """
+    try:
+        return max(int(header['n-scans'][0]), minimum)
+    except (KeyError, IndexError, ValueError):
+        return minimum
+
+
+def get_measure_index(measures, compartment=COMPARTMENTS.Blob, measure=MEASURES.Sum):
+    """Index of a measure among the colony measures.
+
+    If there's only one measure per colony, such as in slimmed
+    xml-files, that is used.
+
+    Args:
+        measures (list): The compartment and measure tags of the
+            colony values as found by `iter_scans`
+        compartment (scanomatic.models.analysis_model.COMPARTMENTS): The compartment
+        measure (scanomatic.models.analysis_model.MEASURES): The measure
+
+    Returns: int or `None` if there is no such measure
+    """
+    if len(measures) == 1:
+        return 0
+
+    for index, (compartment_tag, measure_tag) in enumerate(measures):
+        if (compartment_tag in XML_Writer.COMPARTMENT_TAGS[compartment] and
+                measure_tag in XML_Writer.MEASURE_TAGS[measure]):
+            return index
+
+    return None
+
+
+def _grow_scans(plate, scans):
+
+    if plate.shape[2] == scans:
+        return plate
+
+    grown = np.zeros(plate.shape[:2] + (scans,) + plate.shape[3:], dtype=plate.dtype) * np.nan
+    kept = min(scans, plate.shape[2])
+    grown[:, :, :kept] = plate[:, :, :kept]
+    return grown
+
+
+def iter_scans(file_path, header=None, read_size=_READ_SIZE):
+    """Streams the valid scans of an analysis xml-file.
+
+    The file is read in chunks and only the current scan is kept in
+    memory, so also very large files and files of analyses that haven't
+    finished can be read.
+
+    Args:
+        file_path (str): Path to the xml-file
+        header (dict): Optional, filled with the meta data lists of the
+            file (e.g. `'desc'`), the `'pinning-matrices'` per plate and
+            the `'measures'`, the compartment and measure tags of each
+            colony value, as they are read.
+        read_size (int): Bytes read at a time
+
+    Returns: Generator of scan index, time stamp and a `dict` of plate
+        index to arrays with shape (rows, columns, measures) in the order
+        the scans are in the file
+
+    Raises:
+        IOError: If the file can't be read
+    """
+    if header is None:
+        header = {}
+
+    pinnings = header.setdefault(_PINNING_KEY, {})
+    scan = None
+    plate_index = None
+
+    with open(file_path, 'r') as fh:
+
+        remainder = ""
+
+        while True:
+
+            data = fh.read(read_size)
+            if not data:
+                break
+
+            data = remainder + data
+            end = 0
+
+            for match in _TOKENS.finditer(data):
+
+                end = match.end()
+                token = match.lastgroup
+
+                if token == 'cell':
+
+                    if scan is None or pinnings.get(plate_index) is None:
+                        continue
+
+                    if _MEASURES_KEY not in header:
+                        header[_MEASURES_KEY] = _get_cell_measures(match.group('cell'))
+
+                    plate = scan[2].get(plate_index)
+                    if plate is None:
+                        plate = scan[2][plate_index] = np.zeros(
+                            pinnings[plate_index] + (len(header[_MEASURES_KEY]),), dtype=np.float64) * np.nan
+
+                    x = int(match.group('x'))
+                    y = int(match.group('y'))
+                    if x < plate.shape[0] and y < plate.shape[1]:
+                        plate[x, y] = _parse_cell_values(match.group('cell'), plate.shape[2])
+
+                elif token == 'plate':
+
+                    plate_index = int(match.group('plate'))
+
+                elif token == 'scan':
+
+                    if scan is not None and scan[1] is not None:
+                        yield tuple(scan)
+                    scan = [int(match.group('scan')), None, {}]
+                    plate_index = None
+
+                elif token == 'time':
+
+                    if scan is not None:
+                        try:
+                            scan[1] = float(match.group('time'))
+                        except ValueError:
+                            scan[1] = None
+
+                elif token == 'valid':
+
+                    if scan is not None and match.group('valid').strip() == '0':
+                        scan = None
+
+                elif token == 'pinning':
+
+                    pinnings[int(match.group('pinning_index'))] = _parse_pinning(match.group('pinning'))
+
+                elif token == 'meta':
+
+                    header.setdefault(_META_DATA_KEYS[match.group('meta_tag')], []).append(match.group('meta'))
+
+            remainder = data[end:]
+
+    if scan is not None and scan[1] is not None:
+        yield tuple(scan)
+
+
 #
 # CLASSES
 #
@@ -49,6 +277,7 @@ class XML_Reader():
         self._data = data
         self._meta_data = meta_data
         self._scan_times = scan_times
+        self._measures = []
 
         if file_path:
             self._logger = logger.Logger(
@@ -68,162 +297,85 @@ class XML_Reader():
             return self._data[position[0]][position[1:]]
 
     def read(self, file_path=None):
-        """Reads the file_path file using short-format xml"""
+        """Reads the file_path file in a single pass.
+
+        Data is collected per plate in arrays with shape
+        (rows, columns, scans, measures) where scans are in
+        chronological order. Scans that weren't valid are not
+        included.
+        """
 
         if file_path is not None:
             self._file_path = file_path
 
-        try:
-            fs = open(self._file_path, 'r')
-        except:
+        if not os.path.isfile(self._file_path):
             self._logger.error("XML-file '{0}' not found".format(self._file_path))
             return False
 
         self._logger.info("Started Processing")
 
-        f = fs.read()
-        fs.close()
+        header = {}
         self._data = {}
-        self._meta_data = {}
-
-        XML_TAG_CONT = "<{0}>([^<]*)</{0}>"
-        XML_TAG_INDEX_VALUE_CONT = "<{0} {1}..(\d).>([^<]*)</{0}>"
-        XML_TAG_INDEX_VALUE = "<{0} {1}..(\d*).>"
-        #XML_TAG_2_INDEX_VALUE = "<{0} {1}..(\d*). {2}..(\d*).>"
-        XML_TAG_2_INDEX_FULL_NONGREEDY = "<{0} {1}..{3}. {2}..{4}.>(.*?)</{0}>"
-        XML_ANY_CONT_NONGREEDY = ">([^<>]+?)<"
-        #XML_TAG_2_INDEX_VALUE_CONT = "<{0} {1}..{3}. {2}..{4}.>[^\d]*([0-9.]*)<"
-        XML_BAD_SCANS = "<s i..(\d*).><ok>0"
-
-        #METADATA
-        tags = ['start-t', 'desc', 'n-plates']
-        for t in tags:
-            self._meta_data[t] = re.findall(XML_TAG_CONT.format(t), f)
-
-        #DATA
-        bad_scans = map(int, re.findall(XML_BAD_SCANS, f))
-        nscans = len(re.findall(XML_TAG_INDEX_VALUE.format('s', 'i'), f))
-        pms = re.findall(XML_TAG_INDEX_VALUE_CONT.format('p-m', 'i'), f)
-        pms = map(lambda x: map(eval, x), pms)
-        self._logger.debug("Pinning matrices: {0}".format(pms))
-        colonies = sum([p[1][0] * p[1][1] for p in pms if p[1] is not None])
-        #measures = colonies * nscans
-        max_pm = np.max(np.array([p[1] for p in pms]), 0)
-
-        #GET NUMBER OF MEASURES
-        v = re.findall(XML_TAG_2_INDEX_FULL_NONGREEDY.format(
-            'gc', 'x', 'y', 0, 0), f)[0]
-
-        m_types = len(re.findall(XML_ANY_CONT_NONGREEDY, v))
-
-        for pm in pms:
-            if pm[1] is not None:
-                self._data[pm[0]] = np.zeros((pm[1] + (nscans, m_types)),
-                                             dtype=np.float64)
-
-        #SCAN TIMES
-        self._scan_times = np.array(map(float, re.findall(XML_TAG_CONT.format('t'),
-                                                          f)))
-        self._scan_times.sort()  # Scans come in chronological order
-        self._scan_times -= self._scan_times[0]  # Make it relative
-        self._scan_times /= 3600  # Make it in hours
-
-        self._logger.debug(
-            "Ready for {0} plates ({1} scans, {2} measures per colony)".format(
-                len(self._data), nscans, m_types))
-
-        colonies_done = 0
-
-        for x in xrange(max_pm[0]):
-            for y in xrange(max_pm[1]):
-
-                #print XML_TAG_2_INDEX_FULL_NONGREEDY.format('gc', 'x', 'y', x, y)
-
-                v = re.findall(XML_TAG_2_INDEX_FULL_NONGREEDY.format(
-                    'gc', 'x', 'y', x, y), f)
-
-                v = [re.findall(XML_ANY_CONT_NONGREEDY, i) for i in v]
-
-                for pos, vals in enumerate(v):
-
-                    try:
-
-                        v[pos] = map(lambda x: (x == 'nan' or x == 'None') and
-                                     np.nan or np.float64(x), vals)
+        indices = []
+        times = []
 
-                    except ValueError:
+        for index, time_stamp, plates in iter_scans(self._file_path, header=header):
 
-                        v_list = []
-                        for i in vals:
+            for plate_index, plate in plates.iteritems():
 
-                            try:
+                if plate_index not in self._data:
+                    self._data[plate_index] = np.zeros(
+                        plate.shape[:2] + (get_number_of_scans(header, len(indices) + 1), plate.shape[2]),
+                        dtype=np.float64) * np.nan
+                elif self._data[plate_index].shape[2] <= len(indices):
+                    self._data[plate_index] = _grow_scans(self._data[plate_index], 2 * len(indices))
 
-                                v_list.append(np.float64(i))
+                self._data[plate_index][:, :, len(indices)] = plate
 
-                            except:
+            indices.append(index)
+            times.append(time_stamp)
 
-                                v_list.append(np.nan)
+            if len(indices) % 50 == 0:
+                self._logger.info("Completed {0} scans".format(len(indices)))
 
-                        v[pos] = v_list
+        self._meta_data = {key: header.get(key, []) for key in _META_DATA_KEYS.values()}
+        self._measures = header.get(_MEASURES_KEY, [])
 
-                    if len(v[pos]) != m_types:
+        # Scans are written in the order analysed, that is reversed
+        order = np.argsort(indices, kind='mergesort')
+        for plate_index, plate in self._data.items():
+            self._data[plate_index] = _grow_scans(plate, len(indices))[:, :, order]
 
-                        v[pos] = [np.nan] * m_types
-
-                """
-                try:
-
-                    v = map(lambda x: (x == 'nan' or x=='') and
-                        np.nan or np.float64(x),
-                        re.findall(
-                                XML_TAG_2_INDEX_VALUE_CONT.format(
-                                'gc','x','y',x,y), f))
-
-                except ValueError:
-                    print XML_TAG_2_INDEX_VALUE_CONT.format('gc','x','y',x,y)
-                    print re.findall(
-                                XML_TAG_2_INDEX_VALUE_CONT.format(
-                                'gc','x','y',x,y), f)
-                    #self._logger.error(re.findall(
-                                XML_TAG_2_INDEX_VALUE_CONT.format(
-                                'gc','x','y',x,y), f))
-                """
-                slicers = [False] * len(pms)
-                for i, pm in enumerate(pms):
-                    if pm[1] is not None:
-                        if x < pm[1][0] and y < pm[1][1]:
-                            slicers[i] = True
-                #print "Data should go into Plates {0}".format(slicers)
-                slice_start = 0
-                for i, pm in enumerate(slicers):
-                    if pm:
-                        well_as_list = list(
-                            (np.array(v)[range(slice_start,
-                             len(v), sum(slicers))])[-1::-1])
-
-                        for bs in bad_scans:
-                            well_as_list.insert(bs - 1, np.nan)
-
-                        d_arr = np.array(well_as_list)
-
-                        if d_arr.ndim == 1:
+        self._scan_times = np.array(times, dtype=np.float64)[order]
+        if self._scan_times.size:
+            self._scan_times -= self._scan_times[0]  # Make it relative
+        self._scan_times /= 3600  # Make it in hours
 
-                            self._data[i][x, y, :, 0] = d_arr
+        self._logger.info("Done Processing {0} plates ({1} scans, {2} measures per colony)".format(
+            len(self._data), len(indices), len(self._measures)))
 
-                        else:
+        return True
 
-                            self._data[i][x, y, :] = d_arr
+    def get_measures(self):
+        """The compartment and measure tags of the measures of each colony"""
+        return self._measures
 
-                        slice_start += 1
-                        colonies_done += 1
+    def get_growth_data(self, compartment=COMPARTMENTS.Blob, measure=MEASURES.Sum):
+        """Data of one measure, per plate, as expected by feature extraction
 
-            self._logger.info(
-                "Completed {0}%\r".format(
-                    100 * colonies_done / float(colonies)))
+        Returns: numpy array of plates with shape (rows, columns, scans)
+            or `None` if the measure isn't in the file
+        """
+        measure_index = get_measure_index(self._measures, compartment, measure)
+        if measure_index is None:
+            self._logger.error("No {0} {1} measure in the file".format(compartment, measure))
+            return None
 
-        self._logger.info("Done Processing")
+        plates = np.empty((max(self._data) + 1 if self._data else 0,), dtype=np.object)
+        for plate_index, plate in self._data.iteritems():
+            plates[plate_index] = plate[..., measure_index]
 
-        return True
+        return plates
 
     def get_scan_times(self):
 
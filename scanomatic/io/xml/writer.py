@@ -23,6 +23,7 @@ import re
 #
 
 import scanomatic.io.logger as logger
+import scanomatic.io.binary_features as binary_features
 from scanomatic.io.paths import Paths
 from scanomatic.models.analysis_model import COMPARTMENTS, MEASURES
 #
@@ -58,6 +59,24 @@ class XML_Writer(object):
         ('IQR_mean', 'IQR_m'): ('cells/pixel', 'standard')
     }
 
+    # Long and short tags
+    COMPARTMENT_TAGS = {
+        COMPARTMENTS.Background: ('background', 'bg'),
+        COMPARTMENTS.Blob: ('blob', 'bl'),
+        COMPARTMENTS.Total: ('cell', 'cl')
+    }
+
+    MEASURE_TAGS = {
+        MEASURES.Count: ('area', 'a'),
+        MEASURES.Sum: ('pixelsum', 'ps'),
+        MEASURES.Mean: ('mean', 'm'),
+        MEASURES.Median: ('median', 'md'),
+        MEASURES.Centroid: ('centroid', 'cent'),
+        MEASURES.Perimeter: ('perimeter', 'per'),
+        MEASURES.IQR: ('IRQ', 'IRQ'),
+        MEASURES.IQR_Mean: ("IQR-mean", 'IQR-m')
+    }
+
     COMPARTMENTS = ('cell', 'blob', 'background')
 
     def __init__(self, output_directory, xml_model):
@@ -77,6 +96,7 @@ class XML_Writer(object):
 
         self._file_handles = {'full': None, 'slim': None}
         self._open_tags = list()
+        self._cell_templates = {}
 
         self._initialized = self._open_outputs(file_mode='w')
 
@@ -377,7 +397,7 @@ class XML_Writer(object):
 
         self._open_tags.insert(0, 'scans')
 
-    def _write_image_head(self, image_model, features):
+    def _get_image_head(self, image_model, features):
 
         """
 
@@ -385,143 +405,158 @@ class XML_Writer(object):
         """
         tag_format = self._formatting.make_short_tag_version
 
-        for f in self._file_handles.values():
+        head = self.XML_OPEN_W_ONE_PARAM.format(
+            ['scan', 's'][tag_format],
+            ['index', 'i'][tag_format],
+            image_model.image.index)
 
-            f.write(self.XML_OPEN_W_ONE_PARAM.format(
-                ['scan', 's'][tag_format],
-                ['index', 'i'][tag_format],
-                image_model.image.index))
+        head += self.XML_OPEN_CONT_CLOSE.format(
+            ['scan-valid', 'ok'][tag_format],
+            int(features is not None))
 
-            f.write(self.XML_OPEN_CONT_CLOSE.format(
-                    ['scan-valid', 'ok'][tag_format],
-                    int(features is not None)))
+        if features is not None:
 
-            if features is not None:
+            head += self.XML_OPEN_CONT_CLOSE.format(
+                ['time', 't'][tag_format],
+                image_model.image.time_stamp)
 
-                f.write(self.XML_OPEN_CONT_CLOSE.format(
-                    ['time', 't'][tag_format],
-                    image_model.image.time_stamp))
+        return head
 
-    def write_image_features(self, image_model, features):
+    def _get_cell_templates(self, layout):
+        """Format strings of grid cells in the full and the slimmed xml.
 
+        :param layout: The compartments and their measures in the order
+            their values are given.
+        :return: The full and slimmed templates taking the grid cell
+            position followed by all values, excluded compartments and
+            measures are not included in the output.
         """
-
-        :type image_model: scanomatic.models.compile_project_model.CompileImageAnalysisModel
-        """
-        self._write_image_head(image_model, features)
-
         tag_format = self._formatting.make_short_tag_version
         omit_compartments = self._formatting.exclude_compartments
         omit_measures = self._formatting.exclude_measures
-        slimmed_compartment = self._formatting.slim_compartment
-        slimmed_measure = self._formatting.slim_measure
-
-        fh = self._file_handles['full']
-        fhs = self._file_handles['slim']
         tag_gc = ('grid-cell', 'gc')[tag_format]
-        tag_compartments = {
-            COMPARTMENTS.Background: ('background', 'bg')[tag_format],
-            COMPARTMENTS.Blob: ('blob', 'bl')[tag_format],
-            COMPARTMENTS.Total: ('cell', 'cl')[tag_format]
-        }
-
-        tag_measures = {
-            MEASURES.Count: ('area', 'a')[tag_format],
-            MEASURES.Sum: ('pixelsum', 'ps')[tag_format],
-            MEASURES.Mean: ('mean', 'm')[tag_format],
-            MEASURES.Median: ('median', 'md')[tag_format],
-            MEASURES.Centroid: ('centroid', 'cent')[tag_format],
-            MEASURES.Perimeter: ('perimeter', 'per')[tag_format],
-            MEASURES.IQR: 'IRQ',
-            MEASURES.IQR_Mean: ("IQR-mean", 'IQR-m')[tag_format]
-        }
 
-        if features is not None:
+        full = [self.XML_OPEN_W_TWO_PARAM.format(tag_gc, 'x', '{0}', 'y', '{1}')]
+        slim = [full[0]]
+        field = 2
 
-            # OPEN PLATES-tag
-            for f in self._file_handles.values():
+        for compartment, measures in layout:
 
-                f.write(self.XML_OPEN.format(
-                    ['plates', 'pls'][tag_format]))
+            if compartment in omit_compartments:
+                field += len(measures)
+                continue
 
-            # FOR EACH PLATE
-            for plate in image_model.fixture.plates:
+            compartment_tag = self.COMPARTMENT_TAGS[compartment][tag_format]
+            compartment_in_slimmed = compartment is self._formatting.slim_compartment
 
-                index = plate.index
-                for f in self._file_handles.values():
+            full.append(self.XML_OPEN.format(compartment_tag))
+            if compartment_in_slimmed:
+                slim.append(full[-1])
 
-                    f.write(self.XML_OPEN_W_ONE_PARAM.format(
-                        ['plate', 'p'][tag_format],
-                        ['index', 'i'][tag_format],
-                        index))
+            for measure in measures:
 
-                    f.write(self.XML_OPEN.format(
-                        ['grid-cells', 'gcs'][tag_format]))
+                if measure not in omit_measures:
+                    full.append(self.XML_OPEN_CONT_CLOSE.format(
+                        self.MEASURE_TAGS[measure][tag_format], "{" + str(field) + "}"))
+                    if compartment_in_slimmed and measure is self._formatting.slim_measure:
+                        slim.append(full[-1])
+                field += 1
 
-                if index < features.shape[0]:
+            full.append(self.XML_CLOSE.format(compartment_tag))
+            if compartment_in_slimmed:
+                slim.append(full[-1])
 
-                    plate_features = features.data[index]
-                    if plate_features is not None:
-                        for cell_features in plate_features.data:
-                            for f in self._file_handles.values():
+        full.append(self.XML_CLOSE.format(tag_gc))
+        slim.append(full[-1])
 
-                                f.write(self.XML_OPEN_W_TWO_PARAM.format(
-                                    tag_gc,
-                                    'x', cell_features.index[0],
-                                    'y', cell_features.index[1]))
+        return "".join(full), "".join(slim)
 
-                            for compartment_features in cell_features.data.itervalues():
+    def _format_plate(self, plate_features, full, slim):
+        """Formats the grid cells of a plate, appending them to the
+        full and slimmed buffers.
 
-                                if compartment_features.index in omit_compartments:
-                                    continue
+        Grid cells with the same compartments and measures share
+        templates so each cell is formatted with a single call.
+        """
+        layout = None
+        full_template = slim_template = None
 
-                                compartment_name = tag_compartments[compartment_features.index]
+        for cell_features in plate_features.data:
 
-                                compartment_in_slimmed = compartment_features.index is slimmed_compartment
+            compartments = cell_features.data.values()
+            cell_layout = tuple((compartment_features.index, tuple(compartment_features.data))
+                                for compartment_features in compartments)
 
-                                if compartment_in_slimmed:
+            if cell_layout != layout:
+                layout = cell_layout
+                if layout not in self._cell_templates:
+                    self._cell_templates[layout] = self._get_cell_templates(layout)
+                full_template, slim_template = self._cell_templates[layout]
 
-                                    fhs.write(self.XML_OPEN.format(compartment_name))
+            values = [value for compartment_features in compartments
+                      for value in compartment_features.data.itervalues()]
 
-                                fh.write(self.XML_OPEN.format(compartment_name))
+            full.append(full_template.format(cell_features.index[0], cell_features.index[1], *values))
+            slim.append(slim_template.format(cell_features.index[0], cell_features.index[1], *values))
 
-                                for measure, value in compartment_features.data.iteritems():
+    def write_image_features(self, image_model, features):
+        """Writes the features of an image.
 
-                                    if measure in omit_measures:
-                                        continue
+        The xml of the image is built in buffers and each file
+        is written once.
 
-                                    m_string = self.XML_OPEN_CONT_CLOSE.format(
-                                        tag_measures[measure],
-                                        value)
+        :type image_model: scanomatic.models.compile_project_model.CompileImageAnalysisModel
+        """
+        tag_format = self._formatting.make_short_tag_version
+        head = self._get_image_head(image_model, features)
+        full = [head]
+        slim = [head]
 
-                                    if compartment_in_slimmed and measure is slimmed_measure:
+        if features is not None:
 
-                                        fhs.write(m_string)
+            for buffer in (full, slim):
+                buffer.append(self.XML_OPEN.format(['plates', 'pls'][tag_format]))
 
-                                    fh.write(m_string)
+            # FOR EACH PLATE
+            for plate in image_model.fixture.plates:
 
-                                if compartment_in_slimmed:
+                index = plate.index
+                plate_head = self.XML_OPEN_W_ONE_PARAM.format(
+                    ['plate', 'p'][tag_format],
+                    ['index', 'i'][tag_format],
+                    index) + self.XML_OPEN.format(['grid-cells', 'gcs'][tag_format])
 
-                                    fhs.write(self.XML_CLOSE.format(compartment_name))
+                full.append(plate_head)
+                slim.append(plate_head)
 
-                                fh.write(self.XML_CLOSE.format(compartment_name))
+                if index < features.shape[0]:
 
-                            for f in (fh, fhs):
+                    plate_features = features.data[index]
+                    if plate_features is not None:
+                        self._format_plate(plate_features, full, slim)
 
-                                f.write(self.XML_CLOSE.format(tag_gc))
+                plate_tail = self.XML_CLOSE.format(['grid-cells', 'gcs'][tag_format]) + \
+                    self.XML_CLOSE.format(['plate', 'p'][tag_format])
 
-                for f in self._file_handles.values():
+                full.append(plate_tail)
+                slim.append(plate_tail)
 
-                    f.write(self.XML_CLOSE.format(['grid-cells', 'gcs'][tag_format]))
-                    f.write(self.XML_CLOSE.format(['plate', 'p'][tag_format]))
+            for buffer in (full, slim):
+                buffer.append(self.XML_CLOSE.format(['plates', 'pls'][tag_format]))
 
-            for f in self._file_handles.values():
+        # CLOSING THE SCAN
+        for buffer in (full, slim):
+            buffer.append(self.XML_CLOSE.format(['scan', 's'][tag_format]))
 
-                f.write(self.XML_CLOSE.format(['plates', 'pls'][tag_format]))
+        self._file_handles['full'].write("".join(full))
+        self._file_handles['slim'].write("".join(slim))
 
-        # CLOSING THE SCAN
-        for f in self._file_handles.values():
-            f.write(self.XML_CLOSE.format(['scan', 's'][tag_format]))
+        if self._formatting.binary_features:
+            try:
+                binary_features.write_image_features(self._directory, image_model, features)
+            except (IOError, OSError):
+                self._logger.exception("Could not write binary features of image {0}".format(
+                    image_model.image.index))
 
     def get_initialized(self):
 
@@ -43,6 +43,16 @@ class MEASURES(Enum):
     Centroid = 7
 
 
+class THRESHOLD_METHODS(Enum):
+    Sectioned = 0
+    Tiled = 1
+
+
+class WORKER_MODES(Enum):
+    Threads = 0
+    Processes = 1
+
+
 class VALUES(Enum):
     Pixels = 0
     Grayscale_Targets = 1
@@ -59,7 +69,8 @@ class AnalysisModel(model.Model):
                  one_time_positioning=True, one_time_grayscale=False,
                  grid_images=None, grid_model=None, xml_model=None,
                  image_data_output_item=COMPARTMENTS.Blob, image_data_output_measure=MEASURES.Sum, chain=True,
-                 plate_image_inclusion=None):
+                 plate_image_inclusion=None, workers=1, worker_mode=WORKER_MODES.Threads, prefetch_depth=2,
+                 prefetch_memory=1024, colony_stacks=False):
 
         if grid_model is None:
             grid_model = GridModel()
@@ -86,13 +97,19 @@ class AnalysisModel(model.Model):
         self.image_data_output_measure = image_data_output_measure
         self.chain = chain
         self.plate_image_inclusion = plate_image_inclusion
+        self.workers = workers
+        self.worker_mode = worker_mode
+        self.prefetch_depth = prefetch_depth
+        self.prefetch_memory = prefetch_memory
+        self.colony_stacks = colony_stacks
         super(AnalysisModel, self).__init__()
 
 
 class GridModel(model.Model):
 
     def __init__(self, use_utso=True, median_coefficient=0.99, manual_threshold=0.05, grid=None,
-                 gridding_offsets=None, reference_grid_folder=None):
+                 gridding_offsets=None, reference_grid_folder=None, threshold_method=THRESHOLD_METHODS.Sectioned,
+                 warm_start=False):
 
         self.use_utso = use_utso
         self.median_coefficient = median_coefficient
@@ -100,6 +117,8 @@ class GridModel(model.Model):
         self.grid = grid
         self.gridding_offsets = gridding_offsets
         self.reference_grid_folder = reference_grid_folder
+        self.threshold_method = threshold_method
+        self.warm_start = warm_start
 
         super(GridModel, self).__init__()
 
@@ -107,13 +126,14 @@ class GridModel(model.Model):
 class XMLModel(model.Model):
 
     def __init__(self, exclude_compartments=tuple(), exclude_measures=tuple(), make_short_tag_version=True,
-                 slim_measure=MEASURES.Sum, slim_compartment=COMPARTMENTS.Blob):
+                 slim_measure=MEASURES.Sum, slim_compartment=COMPARTMENTS.Blob, binary_features=False):
 
         self.exclude_compartments = exclude_compartments
         self.exclude_measures = exclude_measures
         self.make_short_tag_version = make_short_tag_version
         self.slim_measure = slim_measure
         self.slim_compartment = slim_compartment
+        self.binary_features = binary_features
 
         super(XMLModel, self).__init__()
 
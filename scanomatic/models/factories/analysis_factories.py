@@ -13,7 +13,9 @@ class GridModelFactory(AbstractModelFactory):
         "manual_threshold": float,
         "gridding_offsets": list,
         "reference_grid_folder": str,
-        "grid": (tuple, tuple, float)
+        "grid": (tuple, tuple, float),
+        "threshold_method": analysis_model.THRESHOLD_METHODS,
+        "warm_start": bool,
     }
 
     @classmethod
@@ -56,6 +58,20 @@ class GridModelFactory(AbstractModelFactory):
 
         return model.FIELD_TYPES.gridding_offsets
 
+    @classmethod
+    def _validate_threshold_method(cls, model):
+
+        if model.threshold_method in analysis_model.THRESHOLD_METHODS:
+            return True
+        return model.FIELD_TYPES.threshold_method
+
+    @classmethod
+    def _validate_warm_start(cls, model):
+
+        if isinstance(model.warm_start, bool):
+            return True
+        return model.FIELD_TYPES.warm_start
+
 
 class XMLModelFactory(AbstractModelFactory):
     MODEL = analysis_model.XMLModel
@@ -65,7 +81,8 @@ class XMLModelFactory(AbstractModelFactory):
         "exclude_measures": (tuple, analysis_model.MEASURES),
         "make_short_tag_version": bool,
         "slim_measure": analysis_model.MEASURES,
-        "slim_compartment": analysis_model.COMPARTMENTS
+        "slim_compartment": analysis_model.COMPARTMENTS,
+        "binary_features": bool
     }
 
     @classmethod
@@ -103,6 +120,17 @@ class XMLModelFactory(AbstractModelFactory):
             return True
         return model.FIELD_TYPES.make_short_tag_version
 
+    @classmethod
+    def _validate_binary_features(cls, model):
+        """
+
+        :type model: scanomatic.models.analysis_model.XMLModel
+        """
+
+        if isinstance(model.binary_features, bool):
+            return True
+        return model.FIELD_TYPES.binary_features
+
     @classmethod
     def _validate_slim_measure(cls, model):
         """
@@ -152,6 +180,11 @@ class AnalysisModelFactory(AbstractModelFactory):
         'image_data_output_item': analysis_model.COMPARTMENTS,
         'chain': bool,
         'plate_image_inclusion': (tuple, str),
+        'workers': int,
+        'worker_mode': analysis_model.WORKER_MODES,
+        'prefetch_depth': int,
+        'prefetch_memory': float,
+        'colony_stacks': bool,
     }
 
     @classmethod
@@ -286,6 +319,46 @@ class AnalysisModelFactory(AbstractModelFactory):
             return True
         return model.FIELD_TYPES.animate_focal
 
+    @classmethod
+    def _validate_workers(cls, model):
+        """
+
+        :type model: scanomatic.models.analysis_model.AnalysisModel
+        """
+        if isinstance(model.workers, int) and model.workers > 0:
+            return True
+        return model.FIELD_TYPES.workers
+
+    @classmethod
+    def _validate_worker_mode(cls, model):
+        """
+
+        :type model: scanomatic.models.analysis_model.AnalysisModel
+        """
+        if model.worker_mode in analysis_model.WORKER_MODES:
+            return True
+        return model.FIELD_TYPES.worker_mode
+
+    @classmethod
+    def _validate_prefetch_depth(cls, model):
+        """
+
+        :type model: scanomatic.models.analysis_model.AnalysisModel
+        """
+        if isinstance(model.prefetch_depth, int) and model.prefetch_depth >= 0:
+            return True
+        return model.FIELD_TYPES.prefetch_depth
+
+    @classmethod
+    def _validate_prefetch_memory(cls, model):
+        """
+
+        :type model: scanomatic.models.analysis_model.AnalysisModel
+        """
+        if isinstance(model.prefetch_memory, (int, float)) and model.prefetch_memory > 0:
+            return True
+        return model.FIELD_TYPES.prefetch_memory
+
     @classmethod
     def _validate_grid_images(cls, model):
         """
@@ -13,7 +13,8 @@ class FeaturesFactory(AbstractModelFactory):
         "analysis_directory": str,
         "email": email_serializer,
         "extraction_data": features_model.FeatureExtractionData,
-        "try_keep_qc": bool
+        "try_keep_qc": bool,
+        "workers": int
     }
 
     @classmethod
@@ -29,6 +30,13 @@ class FeaturesFactory(AbstractModelFactory):
             return True
         return model.FIELD_TYPES.analysis_directory
 
+    @classmethod
+    def _validate_workers(cls, model):
+
+        if isinstance(model.workers, int) and model.workers > 0:
+            return True
+        return model.FIELD_TYPES.workers
+
     @classmethod
     def create(cls, **settings):
         """:rtype : scanomatic.models.features_model.FeaturesModel"""
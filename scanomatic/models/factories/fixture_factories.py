@@ -9,7 +9,7 @@ from scanomatic.models import fixture_models
 class GridHistoryFactory(AbstractModelFactory):
 
     MODEL = fixture_models.GridHistoryModel
-    STORE_SECTION_HEAD = [('project_id',), ('plate',)]
+    STORE_SECTION_HEAD = ['project_id', 'plate']
     STORE_SECTION_SERIALIZERS = {
         'project_id': str,
         'pinning': tuple,
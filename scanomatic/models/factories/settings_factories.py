@@ -67,6 +67,7 @@ class UIServerFactory(AbstractModelFactory):
         "host": str,
         "local": bool,
         "master_key": str,
+        "state_cache_size": float,
     }
 
     @classmethod
@@ -87,7 +88,9 @@ class HardwareResourceLimitsFactory(AbstractModelFactory):
         "cpu_total_percent_free": float,
         "cpu_single_free": float,
         "cpu_free_count": int,
-        "checks_pass_needed": int
+        "checks_pass_needed": int,
+        "cores_budget": int,
+        "memory_budget": float
     }
 
     @classmethod
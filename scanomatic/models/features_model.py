@@ -11,10 +11,11 @@ class FeatureExtractionData(Enum):
 class FeaturesModel(model.Model):
 
     def __init__(self, analysis_directory="", email="", extraction_data=FeatureExtractionData.Default,
-                 try_keep_qc=False):
+                 try_keep_qc=False, workers=1):
 
         self.analysis_directory = analysis_directory
         self.email = email
         self.extraction_data = extraction_data
         self.try_keep_qc = try_keep_qc
+        self.workers = workers
         super(FeaturesModel, self).__init__()
\ No newline at end of file
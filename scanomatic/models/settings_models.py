@@ -47,24 +47,27 @@ class RPCServerModel(model.Model):
 
 class UIServerModel(model.Model):
 
-    def __init__(self, port=5000, host="0.0.0.0", master_key=None):
+    def __init__(self, port=5000, host="0.0.0.0", master_key=None, state_cache_size=512):
 
         self.port = port
         self.host = host
         self.master_key = master_key if master_key else str(uuid1())
+        self.state_cache_size = state_cache_size
         super(UIServerModel, self).__init__()
 
 
 class HardwareResourceLimitsModel(model.Model):
 
     def __init__(self, memory_minimum_percent=30, cpu_total_percent_free=30, cpu_single_free=75, cpu_free_count=1,
-                 checks_pass_needed=3):
+                 checks_pass_needed=3, cores_budget=0, memory_budget=0):
 
         self.memory_minimum_percent = memory_minimum_percent
         self.cpu_total_percent_free = cpu_total_percent_free
         self.cpu_single_free = cpu_single_free
         self.cpu_free_count = cpu_free_count
         self.checks_pass_needed = checks_pass_needed
+        self.cores_budget = cores_budget
+        self.memory_budget = memory_budget
 
         super(HardwareResourceLimitsModel, self).__init__()
 
@@ -9,7 +9,7 @@ import re
 from itertools import izip
 import time
 
-from scanomatic.models.factories.compile_project_factory import CompileImageAnalysisFactory
+from scanomatic.io.compilation_index import load_compilation
 
 _img_pattern = re.compile(r".*_[0-9]{4}_[0-9.]+\.tiff$")
 _time_pattern = re.compile(r'[0-9]+\.[0-9]*')
@@ -24,7 +24,7 @@ def _input_validate(f):
             if isinstance(args[0], StringTypes):
 
                 args = list(args)
-                args[0] = CompileImageAnalysisFactory.serializer.load(args[0])
+                args[0] = load_compilation(args[0])
 
         return f(*args, **kwargs)
 
@@ -4,6 +4,7 @@
 
 import os
 import time
+from functools import partial
 
 #
 # INTERNAL DEPENDENCIES
@@ -12,9 +13,12 @@ import time
 import proc_effector
 import scanomatic.io.xml.writer as xml_writer
 import scanomatic.io.image_data as image_data
+import scanomatic.io.image_loading as image_loading
+import scanomatic.io.binary_features as binary_features
 from scanomatic.io.paths import Paths
 from scanomatic.io.app_config import Config as AppConfig
 import scanomatic.image_analysis.analysis_image as analysis_image
+from scanomatic.image_analysis.image_prefetch import ImagePrefetcher
 from scanomatic.models.rpc_job_models import JOB_TYPE
 from scanomatic.models.factories.analysis_factories import AnalysisModelFactory, XMLModelFactory
 from scanomatic.models.factories.fixture_factories import GrayScaleAreaModelFactory, FixturePlateFactory
@@ -84,6 +88,8 @@ class AnalysisEffector(proc_effector.ProcessEffector):
         self._current_image_model = None
         """:type : scanomatic.models.compile_project_model.CompileImageAnalysisModel"""
         self._analysis_needs_init = True
+        self._prefetcher = None
+        """:type : scanomatic.image_analysis.image_prefetch.ImagePrefetcher"""
 
     @property
     def current_image_index(self):
@@ -131,6 +137,10 @@ class AnalysisEffector(proc_effector.ProcessEffector):
 
     def _finalize_analysis(self):
 
+        if self._prefetcher is not None:
+            self._prefetcher.stop()
+            self._prefetcher = None
+
         self._xmlWriter.close()
 
         self._logger.info("ANALYSIS, Full analysis took {0} minutes".format(
@@ -138,6 +148,9 @@ class AnalysisEffector(proc_effector.ProcessEffector):
 
         self._logger.info('Analysis completed at ' + str(time.time()))
 
+        if self._analysis_job.colony_stacks:
+            self._write_colony_stacks()
+
         if self._analysis_job.chain:
 
             try:
@@ -165,6 +178,20 @@ Scan-o-Matic""", self._analysis_job)
 
         self._running = False
 
+    def _write_colony_stacks(self):
+
+        start_time = time.time()
+        # noinspection PyBroadException
+        try:
+            plates = image_loading.write_colony_stacks(
+                self._analysis_job.output_directory,
+                compilation_file_name=os.path.basename(self._analysis_job.compilation))
+        except Exception:
+            self._logger.exception("Could not write colony image stacks")
+        else:
+            self._logger.info("Wrote colony image stacks of {0} plates in {1:.1f}s".format(
+                plates, time.time() - start_time))
+
     def _analyze_image(self):
 
         scan_start_time = time.time()
@@ -210,31 +237,73 @@ Scan-o-Matic""", self._analysis_job)
             image_model.fixture.plates = \
                 [FixturePlateFactory.copy(m) for m in self._reference_compilation_image_model.fixture.plates]
 
-        first_image_analysed = self._current_image_model is None
         self._current_image_model = image_model
 
         self._logger.info("ANALYSIS, Running analysis on '{0}'".format(image_model.image.path))
 
-        self._image.analyse(image_model)
+        im, load_time, wait_time = self._get_image(image_model)
+
+        analysis_start_time = time.time()
+        self._image.analyse(image_model, im=im)
+        analysis_time = time.time() - analysis_start_time
         self._logger.info("Analysis took {0}, will now write out results.".format(time.time() - scan_start_time))
 
+        write_start_time = time.time()
+
         features = self._image.features
 
         if features is None:
             self._logger.warning("Analysis features not set up correctly")
 
-        image_data.ImageData.write_times(self._analysis_job, image_model, overwrite=first_image_analysed)
+        # Times are written last as they mark the image data as complete
         if not image_data.ImageData.write_image(self._analysis_job, image_model, features):
             self._stopping = True
             self._logger.critical("Terminating analysis since output can't be stored")
             return False
+        image_data.ImageData.write_times(self._analysis_job, image_model, overwrite=False)
 
         self._xmlWriter.write_image_features(image_model, features)
 
         self._logger.info("Image took {0} seconds".format(time.time() - scan_start_time))
+        self._logger.info(
+            "ANALYSIS, Stage timings for image {0}: loading {1:.2f}s (waited {2:.2f}s), analysis {3:.2f}s,"
+            " writing {4:.2f}s".format(
+                image_model.image.index, load_time, wait_time, analysis_time, time.time() - write_start_time))
 
         return True
 
+    def _get_image(self, image_model):
+        """Gets the image of a model, prefetched if possible.
+
+        :type image_model: scanomatic.models.compile_project_model.CompileImageAnalysisModel
+        :return: The image, the seconds spent loading it and the seconds spent waiting for it
+        """
+        if self._prefetcher is not None:
+            im, load_time, wait_time = self._prefetcher.get(image_model.image.path)
+            if im is not None:
+                return im, load_time, wait_time
+
+        start_time = time.time()
+        im = analysis_image.load_analysis_image(image_model.image.path, self._analysis_job.compilation, self._logger)
+        load_time = time.time() - start_time
+        return im, load_time, load_time
+
+    def _start_prefetching(self):
+
+        if self._analysis_job.prefetch_depth < 1:
+            return
+
+        paths = [image_model.image.path for image_model in self._first_pass_results.get_upcoming_image_models()
+                 if image_model.fixture.grayscale is not None and image_model.fixture.grayscale.values is not None]
+
+        self._logger.info("Prefetching up to {0} images using at most {1} MB".format(
+            self._analysis_job.prefetch_depth, self._analysis_job.prefetch_memory))
+
+        self._prefetcher = ImagePrefetcher(
+            paths, partial(analysis_image.load_analysis_image, compilation_path=self._analysis_job.compilation),
+            depth=self._analysis_job.prefetch_depth,
+            max_memory=self._analysis_job.prefetch_memory * 1024 ** 2)
+
     def _setup_first_iteration(self):
 
         self._start_time = time.time()
@@ -271,6 +340,8 @@ Scan-o-Matic""", self._analysis_job)
 
         self._remove_files_from_previous_analysis()
 
+        image_data.ImageData.create_store(self._analysis_job.output_directory, len(self._first_pass_results))
+
         self._xmlWriter = xml_writer.XML_Writer(
             self._analysis_job.output_directory, self._analysis_job.xml_model)
 
@@ -291,6 +362,8 @@ Scan-o-Matic""", self._analysis_job)
 
         if not self._image.set_grid():
             self._stopping = True
+        else:
+            self._start_prefetching()
 
         self._analysis_needs_init = False
 
@@ -328,6 +401,10 @@ Scan-o-Matic""", self._analysis_job)
         if n:
             self._logger.info("Removed {0} pre-existing image data files".format(n))
 
+        n = binary_features.remove_image_features(self._analysis_job.output_directory)
+        if n:
+            self._logger.info("Removed {0} pre-existing binary features files".format(n))
+
         times_path = os.path.join(self._analysis_job.output_directory, Paths().image_analysis_time_series)
         try:
             os.remove(times_path)
@@ -339,6 +416,7 @@ Scan-o-Matic""", self._analysis_job)
         for i, _ in enumerate(self._analysis_job.pinning_matrices):
 
             for filename_pattern in (Paths().grid_pattern, Paths().grid_size_pattern,
+                                     Paths().colony_stack_pattern, Paths().colony_stack_shapes_pattern,
                                      Paths().experiment_grid_error_image,
                                      Paths().experiment_grid_image_pattern):
 
@@ -3,6 +3,7 @@ import time
 import proc_effector
 from scanomatic.models.compile_project_model import FIXTURE, COMPILE_ACTION
 from scanomatic.io.fixtures import Fixtures, FixtureSettings
+from scanomatic.io.compilation_index import CompilationIndex
 from scanomatic.io.paths import Paths
 from scanomatic.image_analysis import first_pass
 from scanomatic.models.factories.compile_project_factory import CompileImageAnalysisFactory, CompileProjectFactory
@@ -31,6 +32,7 @@ class CompileProjectEffector(proc_effector.ProcessEffector):
         self._image_to_analyse = 0
         self._fixture_settings = None
         self._compile_instructions_path = None
+        self._compilation_index = None
         self._has_mailed_issues = False
         self._allowed_calls['progress'] = self.progress
 
@@ -159,6 +161,20 @@ class CompileProjectEffector(proc_effector.ProcessEffector):
         except IOError:
 
             self._logger.critical("Could not write to project file {0}".format(self._compile_job.path))
+            return
+
+        self._update_compilation_index()
+
+    def _update_compilation_index(self):
+
+        if self._compilation_index is None:
+            self._compilation_index = CompilationIndex(self._compile_job.path)
+
+        # noinspection PyBroadException
+        try:
+            self._compilation_index.update()
+        except Exception:
+            self._logger.warning("Could not index project file {0}".format(self._compile_job.path))
 
     def _mail_issues(self, issues):
         self._has_mailed_issues = True
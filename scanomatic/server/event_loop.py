@@ -0,0 +1,144 @@
+import errno
+import fcntl
+import os
+import select
+import time
+from collections import defaultdict, deque
+from threading import Lock
+
+
+def wait(handles, timeout):
+    """Waits for any of the handles to become readable.
+
+    Args:
+        handles (list): Objects with a `fileno` method or file descriptors
+        timeout (float): Maximum seconds to wait
+
+    Returns (list): The readable handles
+    """
+    try:
+        readable, _, _ = select.select(handles, [], [], max(0.0, timeout))
+    except select.error as e:
+        if e.args[0] == errno.EINTR:
+            return []
+        raise
+    return readable
+
+
+class Wakeup(object):
+    """Wakes a loop waiting with `wait` from other threads.
+
+    Uses a self-pipe so it can be waited on together with other pipes.
+    """
+    def __init__(self):
+
+        self._read, self._write = os.pipe()
+        for fd in (self._read, self._write):
+            fcntl.fcntl(fd, fcntl.F_SETFL, fcntl.fcntl(fd, fcntl.F_GETFL) | os.O_NONBLOCK)
+
+        self._lock = Lock()
+        self._requested = None
+
+    def fileno(self):
+
+        return self._read
+
+    def set(self):
+
+        with self._lock:
+            if self._requested is None:
+                self._requested = time.time()
+            try:
+                os.write(self._write, b'.')
+            except OSError as e:
+                # A full pipe will wake the loop anyway
+                if e.errno != errno.EAGAIN:
+                    raise
+
+    def clear(self):
+        """Clears the wake up request.
+
+        Returns (float): When the first request was made or `None`
+        """
+        with self._lock:
+            requested = self._requested
+            self._requested = None
+            try:
+                while os.read(self._read, 4096):
+                    pass
+            except OSError as e:
+                if e.errno != errno.EAGAIN:
+                    raise
+
+        return requested
+
+
+class Timer(object):
+
+    def __init__(self, interval):
+
+        self.interval = interval
+        self._due = time.time()
+
+    def time_left(self, now):
+
+        return self._due - now
+
+    def is_due(self, now):
+
+        return now >= self._due
+
+    def restart(self, now):
+        """Schedules next time the timer is due.
+
+        Returns (float): Seconds the timer was overdue
+        """
+        lag = max(0.0, now - self._due)
+        self._due = now + self.interval
+        return lag
+
+
+class LoopMetrics(object):
+    """Latencies of the events handled by a loop.
+
+    Keeps the most recent `samples` latencies of each type of event
+    together with the number of events and the time spent handling
+    events compared to waiting for them.
+    """
+    def __init__(self, samples=100):
+
+        self._latencies = defaultdict(lambda: deque(maxlen=samples))
+        self._counts = defaultdict(int)
+        self._iterations = 0
+        self._busy = 0.0
+        self._start = time.time()
+        self._lock = Lock()
+
+    def add(self, event, latency):
+
+        with self._lock:
+            self._counts[event] += 1
+            self._latencies[event].append(latency)
+
+    def add_iteration(self, duration):
+
+        with self._lock:
+            self._iterations += 1
+            self._busy += duration
+
+    @property
+    def status(self):
+
+        with self._lock:
+            status = {
+                "Iterations": self._iterations,
+                "BusyFraction": self._busy / max(time.time() - self._start, 1e-9),
+            }
+            for event, latencies in self._latencies.iteritems():
+                status[event] = {
+                    "Count": self._counts[event],
+                    "MeanLatency": float(sum(latencies)) / len(latencies),
+                    "MaxLatency": max(latencies),
+                }
+
+        return status
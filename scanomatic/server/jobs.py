@@ -19,6 +19,7 @@ import scanomatic.server.compile_effector as compile_effector
 import scanomatic.server.rpcjob as rpc_job
 from scanomatic.generics.singleton import SingeltonOneInit
 from scanomatic.io import scanner_manager
+from scanomatic.server.resource_budget import ResourceBudget
 
 #
 # CLASSES
@@ -34,6 +35,7 @@ class Jobs(SingeltonOneInit):
 
         self._jobs = {}
         """:type : dict[scanomatic.models.rpc_job_models.RPCJobModel, scanomatic.server.rpcjob.RpcJob] """
+        self._budget = ResourceBudget()
 
         self._load_from_file()
 
@@ -71,6 +73,7 @@ class Jobs(SingeltonOneInit):
             if job.type == rpc_job_models.JOB_TYPE.Scan and self._scanner_manager.connected_to_scanners:
                 self._scanner_manager.release_scanner(job.id)
             del self._jobs[job]
+            self._budget.release(job)
             self._logger.info("Job '{0}' not active/removed".format(job))
             if not RPC_Job_Model_Factory.serializer.purge(job, self._paths.rpc_jobs):
                 self._logger.warning("Failed to remove references to job in config file")
@@ -93,6 +96,19 @@ class Jobs(SingeltonOneInit):
 
         return self._statuses
 
+    @property
+    def resources_status(self):
+
+        return self._budget.status
+
+    def may_start(self, job):
+        """If the estimated resources of a job fit what isn't reserved by running jobs.
+
+        :type job: scanomatic.models.rpc_job_models.RPCJobModel
+        :rtype : bool
+        """
+        return self._budget.fits(job)
+
     @property
     def running(self):
 
@@ -126,25 +142,40 @@ class Jobs(SingeltonOneInit):
             if job and job.content_model:
                 child_pipe, parent_pipe = Pipe()
                 self._jobs[job] = rpc_job.Fake(job, parent_pipe)
+                self._budget.reserve(job)
 
-    def sync(self):
+    @property
+    def pipes(self):
+        """The pipes of the jobs that can be waited on for communication.
+
+        :rtype : dict[scanomatic.server.pipes._PipeEffector, scanomatic.models.rpc_job_models.RPCJobModel]
+        """
+        return {self._jobs[job].pipe: job for job in self._jobs if self._jobs[job].pipe.has_contact}
+
+    def sync(self, jobs=None):
+        """Handles communications from jobs and removes jobs no longer running.
 
+        :param jobs: Optional, only sync these jobs
+        """
         self._logger.debug("Syncing jobs")
-        statuses = []
-        jobs = self._jobs.keys()
-        for job in jobs:
-            job_process = self._jobs[job]
+        statuses = {}
+        for job in (self._jobs.keys() if jobs is None else jobs):
+            job_process = self._jobs.get(job)
+            if job_process is None:
+                continue
             if not self._forcingStop:
                 job_process.pipe.poll()
                 if not job.pid:
                     job_process.update_pid()
                 if not job_process.is_alive():
                     del self[job]
-            statuses.append(job_process.status)
+            statuses[job] = job_process.status
 
-        self.handle_scanners()
+        for job in self._jobs:
+            if job not in statuses:
+                statuses[job] = self._jobs[job].status
 
-        self._statuses = statuses
+        self._statuses = statuses.values()
 
     def handle_scanners(self):
 
@@ -203,6 +234,7 @@ class Jobs(SingeltonOneInit):
     def _set_initialized_job(self, job_process, job):
 
         self._jobs[job] = job_process
+        self._budget.reserve(job)
         job.status = rpc_job_models.JOB_STATUS.Running
         RPC_Job_Model_Factory.serializer.dump(job, self._paths.rpc_jobs)
 
@@ -158,6 +158,7 @@ Scan-o-Matic""", self._feature_job)
                 raw_growth_data=self._data,
                 times_data=self._times)
 
-        self._phenotype_iterator = self._phenotyper.iterate_extraction(self._feature_job.try_keep_qc)
+        self._phenotype_iterator = self._phenotyper.iterate_extraction(
+            self._feature_job.try_keep_qc, workers=self._feature_job.workers)
         self._iteration_index = 1
         self._logger.info("Starting phenotype extraction")
@@ -42,6 +42,15 @@ class _PipeEffector(object):
 
         self._pid = os.getpid()
 
+    @property
+    def has_contact(self):
+
+        return self._hasContact
+
+    def fileno(self):
+
+        return self._pipe.fileno()
+
     def setFailVunerableCalls(self, *calls):
 
         self._failVunerableCalls = calls
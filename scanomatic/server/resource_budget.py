@@ -0,0 +1,187 @@
+import glob
+import os
+from collections import namedtuple
+from threading import Lock
+
+import psutil
+
+from scanomatic.io.app_config import Config
+from scanomatic.io.compilation_index import get_compilation_index
+from scanomatic.io.logger import Logger
+from scanomatic.io.paths import Paths
+from scanomatic.models.rpc_job_models import JOB_TYPE
+
+JobResources = namedtuple("JobResources", ["cores", "memory"])
+
+_MB = 1024 ** 2
+
+# Estimated memory (bytes) of a job process before it holds any project data
+JOB_BASE_MEMORY = 150 * _MB
+# Estimated memory of one loaded and transformed scanned image
+SCAN_IMAGE_MEMORY = 250 * _MB
+# Estimated memory per colony and image of the measures kept during analysis
+ANALYSIS_COLONY_MEMORY = 200
+# Estimated number of times the raw growth data is held by phenotype extraction,
+# (raw and smooth curves, derivatives, curve segments and vector phenotypes)
+FEATURES_DATA_COPIES = 12
+
+_DEFAULT_RESOURCES = {
+    JOB_TYPE.Scan: JobResources(0, 50 * _MB),
+    JOB_TYPE.Compile: JobResources(1, JOB_BASE_MEMORY + 2 * SCAN_IMAGE_MEMORY),
+    JOB_TYPE.Analysis: JobResources(1, JOB_BASE_MEMORY + 3 * SCAN_IMAGE_MEMORY),
+    JOB_TYPE.Features: JobResources(1, 4 * JOB_BASE_MEMORY),
+}
+
+
+def _get_number_of_colonies(pinning_matrices):
+
+    return sum(rows * columns for rows, columns in (pm for pm in pinning_matrices if pm))
+
+
+def _estimate_analysis(analysis_model):
+
+    images = len(get_compilation_index(analysis_model.compilation))
+    colonies = _get_number_of_colonies(analysis_model.pinning_matrices)
+    prefetched = min(analysis_model.prefetch_depth * SCAN_IMAGE_MEMORY, analysis_model.prefetch_memory * _MB)
+
+    return JobResources(
+        max(1, analysis_model.workers),
+        JOB_BASE_MEMORY + SCAN_IMAGE_MEMORY + prefetched + colonies * images * ANALYSIS_COLONY_MEMORY)
+
+
+def _estimate_features(features_model):
+
+    image_data_bytes = sum(
+        os.path.getsize(path) for pattern in (Paths().image_analysis_img_data, Paths().image_analysis_plate_data)
+        for path in glob.glob(os.path.join(features_model.analysis_directory, pattern.format("*"))))
+
+    if not image_data_bytes:
+        raise ValueError("No image data in '{0}'".format(features_model.analysis_directory))
+
+    return JobResources(
+        max(1, features_model.workers), JOB_BASE_MEMORY + image_data_bytes * FEATURES_DATA_COPIES)
+
+
+def estimate_job_resources(job):
+    """Estimates the cores and memory a job will use.
+
+    Analysis jobs are estimated from their workers, image prefetching,
+    pinning and the number of compiled images. Feature extractions are
+    estimated from their workers and the size of the image data, that
+    is the number of colonies times the number of images.
+
+    Args:
+        job (scanomatic.models.rpc_job_models.RPCjobModel): The job
+
+    Returns (JobResources): Cores and memory in bytes
+    """
+    default = _DEFAULT_RESOURCES.get(job.type, JobResources(1, JOB_BASE_MEMORY))
+
+    # noinspection PyBroadException
+    try:
+        if job.type is JOB_TYPE.Analysis:
+            return _estimate_analysis(job.content_model)
+        elif job.type is JOB_TYPE.Features:
+            return _estimate_features(job.content_model)
+    except Exception:
+        Logger("Resource Budget").warning(
+            "Could not estimate resources of job {0}, assuming {1}".format(job.id, default))
+
+    return default
+
+
+class ResourceBudget(object):
+    """Reservations of cores and memory for running jobs.
+
+    A job may start if its estimated resources fit what remains of the
+    budget. A job that can't ever fit is allowed to start when no
+    cores are reserved (e.g. only scanning is running) so it doesn't
+    wait forever.
+    """
+    def __init__(self, cores=None, memory=None):
+        """
+        :param cores: Optional number of cores, default is from the
+            hardware resource limits settings or the number of cores
+        :param memory: Optional bytes of memory, default is from the
+            hardware resource limits settings or the memory not kept
+            free according to them
+        """
+        self._logger = Logger("Resource Budget")
+        limits = Config().hardware_resource_limits
+
+        if cores is None:
+            cores = limits.cores_budget if limits.cores_budget > 0 else psutil.cpu_count()
+        if memory is None:
+            memory = limits.memory_budget * _MB if limits.memory_budget > 0 else \
+                psutil.virtual_memory().total * (100 - limits.memory_minimum_percent) / 100.
+
+        self._cores = cores
+        self._memory = memory
+        self._reservations = {}
+        self._estimates = {}
+        self._lock = Lock()
+
+    @property
+    def reserved(self):
+        """:rtype : JobResources"""
+        with self._lock:
+            return JobResources(
+                sum(r.cores for r in self._reservations.itervalues()),
+                sum(r.memory for r in self._reservations.itervalues()))
+
+    @property
+    def status(self):
+
+        reserved = self.reserved
+        return {
+            "Cores": self._cores,
+            "Memory": self._memory,
+            "ReservedCores": reserved.cores,
+            "ReservedMemory": reserved.memory,
+            "Reservations": len(self._reservations),
+        }
+
+    def get_estimate(self, job):
+        """Estimated resources of a job, only estimated once per job.
+
+        :type job: scanomatic.models.rpc_job_models.RPCjobModel
+        :rtype : JobResources
+        """
+        with self._lock:
+            if job.id not in self._estimates:
+                self._estimates[job.id] = estimate_job_resources(job)
+            return self._estimates[job.id]
+
+    def fits(self, job):
+        """If a job fits in what remains of the budget
+
+        :type job: scanomatic.models.rpc_job_models.RPCjobModel
+        :rtype : bool
+        """
+        estimate = self.get_estimate(job)
+        reserved = self.reserved
+        if not reserved.cores:
+            return True
+
+        return (reserved.cores + estimate.cores <= self._cores and
+                reserved.memory + estimate.memory <= self._memory)
+
+    def reserve(self, job):
+        """
+        :type job: scanomatic.models.rpc_job_models.RPCjobModel
+        """
+        estimate = self.get_estimate(job)
+        with self._lock:
+            self._reservations[job.id] = estimate
+
+        self._logger.info("Reserved {0} cores and {1:.0f} MB for job {2}".format(
+            estimate.cores, estimate.memory / _MB, job.id))
+
+    def release(self, job):
+        """
+        :type job: scanomatic.models.rpc_job_models.RPCjobModel
+        """
+        with self._lock:
+            self._estimates.pop(job.id, None)
+            if self._reservations.pop(job.id, None) is not None:
+                self._logger.info("Released resources of job {0}".format(job.id))
@@ -19,6 +19,12 @@ import scanomatic.models.rpc_job_models as rpc_job_models
 from scanomatic.models.factories.rpc_job_factory import RPC_Job_Model_Factory
 from scanomatic.io.paths import Paths
 from scanomatic.io.backup import backup_file
+from scanomatic.server import event_loop
+
+# Seconds between attempts to start queued jobs, syncing all jobs and updating scanners
+QUEUE_INTERVAL = 0.2
+JOBS_SYNC_INTERVAL = 0.5
+SCANNERS_INTERVAL = 0.25
 
 #
 # CLASSES
@@ -39,6 +45,8 @@ class Server(object):
         self._started = False
         self._waitForJobsToTerminate = False
         self._server_start_time = None
+        self._wakeup = event_loop.Wakeup()
+        self._loop_metrics = event_loop.LoopMetrics()
 
         self._jobs = jobs.Jobs()
         self._queue = queue.Queue(self._jobs)
@@ -91,11 +99,13 @@ class Server(object):
     def shutdown(self):
         self._waitForJobsToTerminate = False
         self._running = False
+        self._wakeup.set()
         return True
 
     def safe_shutdown(self):
         self._waitForJobsToTerminate = True
         self._running = False
+        self._wakeup.set()
         return True
 
     def get_server_status(self):
@@ -113,7 +123,9 @@ class Server(object):
             "QueueLength": len(self._queue),
             "NumberOfJobs": len(self._jobs),
             "ResourceMem": Resource_Status.check_mem(),
-            "ResourceCPU": Resource_Status.check_cpu()}
+            "ResourceCPU": Resource_Status.check_cpu(),
+            "ResourceBudget": self._jobs.resources_status,
+            "MainLoop": self._loop_metrics.status}
 
     def start(self):
 
@@ -136,7 +148,7 @@ class Server(object):
         elif job.type == rpc_job_models.JOB_TYPE.Scan:
             return True
         else:
-            return Resource_Status.check_resources(consume_checks=True) or len(self._jobs) == 0
+            return self._jobs.may_start(job)
 
     def _attempt_job_creation(self):
 
@@ -150,23 +162,57 @@ class Server(object):
 
         self._running = True
         self._server_start_time = time.time()
-        sleep = 0.07
-        i = 0
+
+        queue_timer = event_loop.Timer(QUEUE_INTERVAL)
+        jobs_timer = event_loop.Timer(JOBS_SYNC_INTERVAL)
+        scanners_timer = event_loop.Timer(SCANNERS_INTERVAL)
 
         while self._running:
 
-            if i == 0 and self._queue:
+            pipes = self._jobs.pipes
+            now = time.time()
+            timers = [jobs_timer]
+            if self._queue:
+                timers.append(queue_timer)
+            if self._scanner_manager.connected_to_scanners:
+                timers.append(scanners_timer)
+
+            ready = event_loop.wait(
+                [self._wakeup] + pipes.keys(), min(timer.time_left(now) for timer in timers))
+
+            start = time.time()
+            if not self._running:
+                break
+
+            if self._wakeup in ready:
+                requested = self._wakeup.clear()
+                if requested is not None:
+                    self._loop_metrics.add("Wakeup", start - requested)
+                if self._queue:
+                    self._attempt_job_creation()
+                    queue_timer.restart(time.time())
+
+            jobs_with_traffic = [pipes[pipe] for pipe in ready if pipe in pipes]
+            if jobs_with_traffic:
+                self._jobs.sync(jobs_with_traffic)
+                self._loop_metrics.add("JobPipes", time.time() - start)
+
+            now = time.time()
+            if queue_timer in timers and queue_timer.is_due(now):
+                self._loop_metrics.add("QueueTimer", queue_timer.restart(now))
                 self._attempt_job_creation()
-            elif i <= 1 and self._scanner_manager.connected_to_scanners:
-                self._scanner_manager.update()
-            else:
+
+            if scanners_timer in timers and scanners_timer.is_due(now):
+                self._loop_metrics.add("ScannersTimer", scanners_timer.restart(now))
+                self._jobs.handle_scanners()
+
+            if jobs_timer.is_due(now):
+                self._loop_metrics.add("JobsTimer", jobs_timer.restart(now))
                 self._jobs.sync()
                 if self._is_time_to_cycle_log:
                     self._init_logging()
 
-            time.sleep(sleep)
-            i += 1
-            i %= 3
+            self._loop_metrics.add_iteration(time.time() - start)
 
         self._shutdown_cleanup()
 
@@ -248,6 +294,7 @@ class Server(object):
             return False
 
         self._queue.add(rpc_job)
+        self._wakeup.set()
 
         self.logger.info("Job {0} with id {1} added to queue".format(rpc_job, rpc_job.id))
         return rpc_job.id
@@ -0,0 +1,59 @@
+import time
+from multiprocessing import Pipe
+from threading import Timer as ThreadTimer
+
+from scanomatic.server.event_loop import wait, Wakeup, Timer, LoopMetrics
+
+
+def test_wait_times_out_without_traffic():
+
+    wakeup = Wakeup()
+    start = time.time()
+    assert wait([wakeup], 0.05) == []
+    assert time.time() - start >= 0.04
+
+
+def test_wakeup_from_other_thread():
+
+    wakeup = Wakeup()
+    ThreadTimer(0.02, wakeup.set).start()
+    start = time.time()
+
+    assert wait([wakeup], 5) == [wakeup]
+    assert time.time() - start < 1
+    requested = wakeup.clear()
+    assert requested is not None and requested <= time.time()
+    assert wakeup.clear() is None
+    assert wait([wakeup], 0) == []
+
+
+def test_wait_on_pipes():
+
+    parent, child = Pipe()
+    wakeup = Wakeup()
+    assert wait([wakeup, parent], 0) == []
+
+    child.send("status")
+    assert wait([wakeup, parent], 5) == [parent]
+
+
+def test_timer():
+
+    timer = Timer(10)
+    now = time.time()
+    assert timer.is_due(now)
+    assert timer.restart(now + 1) >= 1
+    assert not timer.is_due(now + 2)
+    assert 8 < timer.time_left(now + 2) <= 9
+
+
+def test_loop_metrics():
+
+    metrics = LoopMetrics(samples=2)
+    for latency in (3, 1, 2):
+        metrics.add("Event", latency)
+    metrics.add_iteration(0.1)
+
+    status = metrics.status
+    assert status["Iterations"] == 1
+    assert status["Event"] == {"Count": 3, "MeanLatency": 1.5, "MaxLatency": 2}
@@ -0,0 +1,53 @@
+import numpy as np
+
+from scanomatic.models.factories.analysis_factories import AnalysisModelFactory
+from scanomatic.models.factories.features_factory import FeaturesFactory
+from scanomatic.models.rpc_job_models import RPCjobModel, JOB_TYPE
+from scanomatic.server.resource_budget import (
+    ResourceBudget, JobResources, estimate_job_resources, JOB_BASE_MEMORY, FEATURES_DATA_COPIES,
+    _DEFAULT_RESOURCES)
+
+
+def _get_job(job_id, job_type, content_model=None):
+
+    return RPCjobModel(id=job_id, type=job_type, content_model=content_model)
+
+
+def test_features_estimate_scales_with_image_data(tmpdir):
+
+    for index in range(3):
+        np.save(str(tmpdir.join("image_{0}_data.npy".format(index))), np.zeros((4, 6, 8)))
+    image_data_bytes = sum(p.size() for p in tmpdir.listdir())
+
+    job = _get_job("a", JOB_TYPE.Features, FeaturesFactory.create(analysis_directory=str(tmpdir), workers=2))
+
+    assert estimate_job_resources(job) == JobResources(
+        2, JOB_BASE_MEMORY + image_data_bytes * FEATURES_DATA_COPIES)
+
+
+def test_estimate_falls_back_on_defaults(tmpdir):
+
+    job = _get_job("a", JOB_TYPE.Analysis, AnalysisModelFactory.create(compilation=str(tmpdir.join("missing"))))
+    assert estimate_job_resources(job) == _DEFAULT_RESOURCES[JOB_TYPE.Analysis]
+
+
+def test_budget_reservations():
+
+    budget = ResourceBudget(cores=2, memory=3 * JOB_BASE_MEMORY)
+    compile_job = _get_job("compile", JOB_TYPE.Compile)
+    scan_job = _get_job("scan", JOB_TYPE.Scan)
+
+    # A job too large for the budget may start when no cores are reserved
+    budget.reserve(scan_job)
+    assert budget.fits(compile_job)
+    budget.reserve(compile_job)
+    assert not budget.fits(_get_job("small", JOB_TYPE.Unknown))
+
+    budget.release(compile_job)
+    for job_id in ("small", "other"):
+        assert budget.fits(_get_job(job_id, JOB_TYPE.Unknown))
+        budget.reserve(_get_job(job_id, JOB_TYPE.Unknown))
+
+    assert not budget.fits(_get_job("third", JOB_TYPE.Unknown))
+    assert budget.status["ReservedCores"] == 2
+    assert budget.status["Reservations"] == 3
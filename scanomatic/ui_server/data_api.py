@@ -1,4 +1,4 @@
-from flask import request, Flask, jsonify, send_from_directory
+from flask import request, Flask, jsonify, send_from_directory, send_file
 from types import ListType, DictType, StringTypes
 import numpy as np
 import os
@@ -6,8 +6,6 @@ import shutil
 from enum import Enum
 from ConfigParser import Error as ConfigError
 
-from scanomatic.data_processing import phenotyper
-
 from scanomatic.io.paths import Paths
 from scanomatic.io.logger import Logger
 from scanomatic.io.fixtures import Fixtures
@@ -25,6 +23,7 @@ from scanomatic.models.fixture_models import GrayScaleAreaModel
 from scanomatic.models.analysis_model import COMPARTMENTS, VALUES
 from scanomatic.models.factories.analysis_factories import AnalysisFeaturesFactory
 
+from .phenotype_jobs import PhenotypeJobs, get_phenotyper, iterate_extraction, get_results, get_results_as_npz
 from .general import get_fixture_image_by_name, usable_markers, split_areas_into_grayscale_and_plates, \
     get_area_too_large_for_grayscale, get_grayscale_is_valid, usable_plates, image_is_allowed, \
     get_fixture_image, convert_url_to_path, get_fixture_image_from_data, \
@@ -33,24 +32,7 @@ from .general import get_fixture_image_by_name, usable_markers, split_areas_into
 
 _logger = Logger("Data API")
 
-
-def _depth(arr, lvl=1):
-
-    if isinstance(arr, ListType) and len(arr) and isinstance(arr[0], ListType):
-        _depth(arr[0], lvl + 1)
-    else:
-        return lvl
-
-
-def _validate_depth(data):
-
-    depth = _depth(data)
-
-    while depth < 4:
-        data = [data]
-        depth += 1
-
-    return data
+_PHENOTYPE_JOBS = PhenotypeJobs()
 
 
 def json_data(data):
@@ -69,6 +51,31 @@ def json_data(data):
         return data
 
 
+def _get_phenotype_request_data():
+
+    data_object = request.get_json(silent=True, force=True)
+    if not data_object:
+        data_object = request.values
+
+    return data_object
+
+
+def _get_results_as_json(results):
+
+    json_results = dict(
+        smooth_growth_data=json_data(results['smooth_growth_data']),
+        phenotypes={name: [None if p is None else p.tojson() for p in plates]
+                    for name, plates in results['phenotypes'].iteritems()},
+        curve_phases=json_data(results['curve_phases']))
+
+    if 'phenotypes_normed' in results:
+        json_results['phenotypes_normed'] = {
+            name: [None if p is None else p.tojson() for p in plates]
+            for name, plates in results['phenotypes_normed'].iteritems()}
+
+    return json_results
+
+
 def add_routes(app, rpc_client, is_debug_mode):
 
     """
@@ -84,6 +91,8 @@ def add_routes(app, rpc_client, is_debug_mode):
         """Takes growth data extracts phenotypes and normalizes.
 
         _NOTE_: This API only accepts json-formatted POST calls.
+        For large data use `/api/data/phenotype/batch` which runs the
+        extraction in the background.
 
         Minimal example of request json:
         ```
@@ -127,55 +136,76 @@ def add_routes(app, rpc_client, is_debug_mode):
         :return: json-object with analyzed data
         """
 
-        data_object = request.get_json(silent=True, force=True)
+        data_object = _get_phenotype_request_data()
         if not data_object:
-            data_object = request.values
+            return jsonify(success=False, reason="No valid json or post is empty")
 
-        if len(data_object) == 0:
+        state = get_phenotyper(data_object)
+        for _ in iterate_extraction(state, data_object):
+            pass
+
+        return jsonify(success=True, **_get_results_as_json(get_results(state, data_object)))
+
+    @app.route("/api/data/phenotype/batch", methods=['POST'])
+    def data_phenotype_batch_submit():
+        """Queues growth data for phenotype extraction in the background.
+
+        Takes the same data as `/api/data/phenotype`.
+
+        :return: json-object with the "job_id" of the extraction
+        """
+        data_object = _get_phenotype_request_data()
+        if not data_object:
             return jsonify(success=False, reason="No valid json or post is empty")
-        else:
-            raw_growth_data = data_object.get("raw_growth_data", [])
-            times_data = data_object.get("times_data", [])
-            settings = data_object.get("settings", {})
-            smooth_growth_data = data_object.get("smooth_growth_data", [])
-            inclusion_level = data_object.get("inclusion_level", "Trusted")
-            normalize = data_object.get("normalize", False)
-            reference_offset = data_object.get("reference_offset", "LowerRight")
 
-        raw_growth_data = _validate_depth(raw_growth_data)
+        return jsonify(success=True, job_id=_PHENOTYPE_JOBS.submit(data_object))
 
-        state = phenotyper.Phenotyper(
-            np.array(raw_growth_data), np.array(times_data), run_extraction=False, **settings)
+    @app.route("/api/data/phenotype/batch/<job_id>")
+    def data_phenotype_batch_status(job_id):
+        """Status of a queued phenotype extraction.
 
-        if smooth_growth_data:
-            smooth_growth_data = _validate_depth(smooth_growth_data)
-            state.set("smooth_growth_data", np.array(smooth_growth_data))
+        :return: json-object with "status" (Queued, Running, Done, Failed),
+            "progress" as the fraction of curves done and the "reason" if
+            the extraction failed.
+        """
+        status = _PHENOTYPE_JOBS.get_status(job_id)
+        if status is None:
+            return jsonify(success=False, reason="Unknown job '{0}'".format(job_id))
 
-        state.set_phenotype_inclusion_level(phenotyper.PhenotypeDataType[inclusion_level])
-        state.extract_phenotypes(resmoothen=len(smooth_growth_data) == 0)
+        return jsonify(success=True, **json_data(status))
 
-        curve_segments = state.curve_segments
+    @app.route("/api/data/phenotype/batch/<job_id>/result")
+    @app.route("/api/data/phenotype/batch/<job_id>/result/<encoding>")
+    def data_phenotype_batch_result(job_id, encoding='json'):
+        """Results of a finished phenotype extraction.
 
-        if normalize:
-            state.set_control_surface_offsets(phenotyper.Offsets[reference_offset])
+        The json encoding is the same as the response of
+        `/api/data/phenotype`. The npz encoding is a numpy archive with
+        one array per plate, e.g. `phenotypes/GenerationTime/0` and its
+        filter `phenotypes/GenerationTime/0/filter`.
 
-            return jsonify(
-                success=True,
-                smooth_growth_data=json_data(state.smooth_growth_data),
-                phenotypes={
-                    pheno.name: [None if p is None else p.tojson() for p in state.get_phenotype(pheno)]
-                    for pheno in state.phenotypes},
-                phenotypes_normed={
-                    pheno.name: [p.tojson() for p in state.get_phenotype(
-                        pheno, norm_state=phenotyper.NormState.NormalizedRelative)]
-                    for pheno in state.phenotypes_that_normalize},
-                curve_phases=json_data(curve_segments))
-
-        return jsonify(smooth_growth_data=json_data(state.smooth_growth_data),
-                       phenotypes={
-                           pheno.name: [None if p is None else p.tojson() for p in state.get_phenotype(pheno)]
-                           for pheno in state.phenotypes},
-                       curve_phases=json_data(curve_segments))
+        :return: json-object or npz-file
+        """
+        results = _PHENOTYPE_JOBS.get_results(job_id)
+        if results is None:
+            return jsonify(success=False, reason="Job '{0}' is unknown or not done".format(job_id))
+
+        if encoding == 'json':
+            return jsonify(success=True, **_get_results_as_json(results))
+        elif encoding == 'npz':
+            return send_file(
+                get_results_as_npz(results), mimetype='application/octet-stream',
+                attachment_filename='phenotypes.{0}.npz'.format(job_id), as_attachment=True)
+
+        return jsonify(success=False, reason="Unknown encoding '{0}', use json or npz".format(encoding))
+
+    @app.route("/api/data/phenotype/batch/<job_id>/remove")
+    def data_phenotype_batch_remove(job_id):
+
+        if _PHENOTYPE_JOBS.remove(job_id):
+            return jsonify(success=True)
+
+        return jsonify(success=False, reason="Unknown job '{0}'".format(job_id))
 
     @app.route("/api/data/grayscales", methods=['post', 'get'])
     def _grayscales():
@@ -0,0 +1,262 @@
+import time
+import uuid
+from collections import OrderedDict
+from io import BytesIO
+from multiprocessing.pool import ThreadPool
+from threading import Lock
+from types import ListType
+
+import numpy as np
+from enum import Enum
+
+from scanomatic.data_processing import phenotyper
+from scanomatic.io.logger import Logger
+
+_logger = Logger("Phenotype Jobs")
+
+
+class JobStatus(Enum):
+    Queued = 0
+    """:type : JobStatus"""
+    Running = 1
+    """:type : JobStatus"""
+    Done = 2
+    """:type : JobStatus"""
+    Failed = 3
+    """:type : JobStatus"""
+
+
+def _depth(arr, lvl=1):
+
+    if isinstance(arr, ListType) and len(arr) and isinstance(arr[0], ListType):
+        return _depth(arr[0], lvl + 1)
+    else:
+        return lvl
+
+
+def _validate_depth(data):
+
+    depth = _depth(data)
+
+    while depth < 4:
+        data = [data]
+        depth += 1
+
+    return data
+
+
+def get_phenotyper(data_object):
+    """Sets up a phenotyper from the json data of a phenotype request.
+
+    Args:
+        data_object (dict): The request data, see `/api/data/phenotype`
+
+    Returns: scanomatic.data_processing.phenotyper.Phenotyper
+    """
+    raw_growth_data = _validate_depth(data_object.get("raw_growth_data", []))
+    times_data = data_object.get("times_data", [])
+    settings = data_object.get("settings", {})
+    smooth_growth_data = data_object.get("smooth_growth_data", [])
+    inclusion_level = data_object.get("inclusion_level", "Trusted")
+
+    state = phenotyper.Phenotyper(
+        np.array(raw_growth_data), np.array(times_data), run_extraction=False, **settings)
+
+    if smooth_growth_data:
+        state.set("smooth_growth_data", np.array(_validate_depth(smooth_growth_data)))
+
+    state.set_phenotype_inclusion_level(phenotyper.PhenotypeDataType[inclusion_level])
+    return state
+
+
+def iterate_extraction(state, data_object):
+    """Extracts the phenotypes of a phenotype request.
+
+    Args:
+        state (scanomatic.data_processing.phenotyper.Phenotyper): As made by `get_phenotyper`
+        data_object (dict): The request data, see `/api/data/phenotype`
+
+    Returns: Generator of the fraction of curves done
+    """
+    smoothing = phenotyper.Smoothing.Keep if data_object.get("smooth_growth_data") else \
+        phenotyper.Smoothing.PolynomialWeightedMulti
+
+    for progress in state.iterate_phenotype_extraction(smoothing=smoothing):
+        yield progress
+
+    if data_object.get("normalize", False):
+        state.set_control_surface_offsets(
+            phenotyper.Offsets[data_object.get("reference_offset", "LowerRight")])
+
+
+def get_results(state, data_object):
+    """The results of a phenotype request.
+
+    Args:
+        state (scanomatic.data_processing.phenotyper.Phenotyper): With extracted phenotypes
+        data_object (dict): The request data, see `/api/data/phenotype`
+
+    Returns (dict): Smooth growth data, curve phases and, per scalar
+        phenotype, plate-wise `FilterArray`s.
+    """
+    results = dict(
+        smooth_growth_data=state.smooth_growth_data,
+        phenotypes={pheno.name: state.get_phenotype(pheno) for pheno in state.phenotypes if pheno in state},
+        curve_phases=state.curve_segments)
+
+    if data_object.get("normalize", False):
+        results['phenotypes_normed'] = {
+            pheno.name: state.get_phenotype(pheno, norm_state=phenotyper.NormState.NormalizedRelative)
+            for pheno in state.phenotypes_that_normalize if pheno in state}
+
+    return results
+
+
+def get_results_as_npz(results):
+    """Encodes results as a numpy npz-archive.
+
+    Plate-wise arrays are stored with keys such as
+    `phenotypes/GenerationTime/0` and the filters of the phenotypes
+    with keys such as `phenotypes/GenerationTime/0/filter`.
+
+    Args:
+        results (dict): As returned by `get_results`
+
+    Returns (BytesIO): The archive, positioned at its start
+    """
+    arrays = {}
+
+    for key in ('smooth_growth_data', 'curve_phases'):
+        plates = results.get(key)
+        if plates is None:
+            continue
+        for id_plate, plate in enumerate(plates):
+            if plate is not None:
+                arrays["{0}/{1}".format(key, id_plate)] = np.asarray(plate)
+
+    for key in ('phenotypes', 'phenotypes_normed'):
+        for name, plates in results.get(key, {}).iteritems():
+            for id_plate, plate in enumerate(plates):
+                if plate is None:
+                    continue
+                arrays["{0}/{1}/{2}".format(key, name, id_plate)] = np.asarray(plate.data)
+                arrays["{0}/{1}/{2}/filter".format(key, name, id_plate)] = np.asarray(plate.filter)
+
+    data_buffer = BytesIO()
+    np.savez_compressed(data_buffer, **arrays)
+    data_buffer.seek(0)
+    return data_buffer
+
+
+class PhenotypeJobs(object):
+    """Runs phenotype requests in a pool of background threads.
+
+    Results of finished jobs are kept until fetched and removed, but
+    when more than `max_finished` jobs are finished the oldest are
+    dropped.
+    """
+    def __init__(self, workers=2, max_finished=10):
+
+        self._workers = workers
+        self._max_finished = max_finished
+        self._pool = None
+        self._jobs = OrderedDict()
+        self._lock = Lock()
+
+    def submit(self, data_object):
+        """Queues a phenotype request.
+
+        Args:
+            data_object (dict): The request data, see `/api/data/phenotype`
+
+        Returns (str): The job id
+        """
+        job_id = uuid.uuid4().hex
+
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPool(self._workers)
+
+            self._jobs[job_id] = dict(
+                status=JobStatus.Queued, progress=0.0, submitted=time.time(), reason=None, results=None)
+
+            self._pool.apply_async(self._run, (job_id, data_object))
+
+        return job_id
+
+    def _run(self, job_id, data_object):
+
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job['status'] = JobStatus.Running
+
+        start = time.time()
+        # noinspection PyBroadException
+        try:
+            state = get_phenotyper(data_object)
+            for progress in iterate_extraction(state, data_object):
+                job['progress'] = progress
+            results = get_results(state, data_object)
+        except Exception as e:
+            _logger.exception("Phenotype job {0} failed".format(job_id))
+            status = JobStatus.Failed
+            job['reason'] = str(e)
+        else:
+            _logger.info("Phenotype job {0} done in {1:.1f}s".format(job_id, time.time() - start))
+            status = JobStatus.Done
+            job['results'] = results
+            job['progress'] = 1.0
+
+        with self._lock:
+            job['status'] = status
+            self._drop_old_jobs()
+
+    def _drop_old_jobs(self):
+
+        finished = [job_id for job_id, job in self._jobs.iteritems()
+                    if job['status'] in (JobStatus.Done, JobStatus.Failed)]
+
+        for job_id in finished[:max(0, len(finished) - self._max_finished)]:
+            _logger.info("Dropping results of phenotype job {0}".format(job_id))
+            del self._jobs[job_id]
+
+    def get_status(self, job_id):
+        """
+        Args:
+            job_id (str): The job id
+
+        Returns (dict): Status, progress and failure reason or `None`
+            if there is no such job
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            return dict(status=job['status'], progress=job['progress'], reason=job['reason'])
+
+    def get_results(self, job_id):
+        """
+        Args:
+            job_id (str): The job id
+
+        Returns (dict): The results, see `get_results`, or `None` if
+            the job is unknown or not done
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return None if job is None else job['results']
+
+    def remove(self, job_id):
+        """Forgets a job and its results.
+
+        A running job will complete but its results are discarded.
+
+        Args:
+            job_id (str): The job id
+
+        Returns (bool): If there was such a job
+        """
+        with self._lock:
+            return self._jobs.pop(job_id, None) is not None
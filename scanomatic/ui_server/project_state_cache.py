@@ -0,0 +1,165 @@
+import os
+from collections import OrderedDict, deque
+from threading import Lock
+
+import numpy as np
+
+from scanomatic.data_processing import phenotyper
+from scanomatic.io.logger import Logger
+from scanomatic.io.paths import Paths
+
+_logger = Logger("Project State Cache")
+
+
+def get_state_signature(path):
+    """Modification times and sizes of the files of a saved phenotyper state.
+
+    Args:
+        path (str): The project directory
+
+    Returns: tuple
+    """
+    _p = Paths()
+    signature = []
+
+    for name in (_p.phenotyper_state, _p.phenotypes_raw_npy, _p.phenotypes_input_data, _p.phenotype_times,
+                 _p.phenotypes_input_smooth, _p.phenotypes_extraction_params, _p.phenotypes_filter, _p.phenotypes_filter_undo,
+                 _p.phenotypes_meta_data, _p.normalized_phenotypes, _p.vector_phenotypes_raw,
+                 _p.vector_meta_phenotypes_raw, _p.phenotypes_reference_offsets):
+
+        try:
+            stat_result = os.stat(os.path.join(path, name))
+        except OSError:
+            signature.append(None)
+        else:
+            signature.append((stat_result.st_mtime, stat_result.st_size))
+
+    return tuple(signature)
+
+
+def get_size(obj, seen=None):
+    """Estimates the memory used by the numpy data held by an object.
+
+    Memory mapped arrays are not counted since the OS may page them out.
+
+    Args:
+        obj: Any object, containers are searched recursively
+        seen: Optional set of ids of objects already counted
+
+    Returns (int): Size in bytes
+    """
+    if seen is None:
+        seen = set()
+
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    if isinstance(obj, np.memmap):
+        return 0
+    elif isinstance(obj, np.ndarray):
+        if obj.dtype.hasobject:
+            return obj.nbytes + sum(get_size(item, seen) for item in obj.flat)
+        return obj.nbytes
+    elif isinstance(obj, dict):
+        return sum(get_size(item, seen) for item in obj.itervalues())
+    elif isinstance(obj, (list, tuple, deque)):
+        return sum(get_size(item, seen) for item in obj)
+
+    return 0
+
+
+class ProjectStateCache(object):
+    """Least recently used cache of loaded project states.
+
+    States are keyed by project path and reloaded when any of the saved
+    state files have changed on disk. When the estimated memory of all
+    cached states exceeds `max_size`, the least recently used are dropped.
+    """
+    def __init__(self, max_size=512 * 1024 ** 2):
+        """
+        Args:
+            max_size (int): Memory budget in bytes
+        """
+        self.max_size = max_size
+        self._states = OrderedDict()
+        self._lock = Lock()
+
+    def __contains__(self, path):
+
+        return os.path.abspath(path) in self._states
+
+    def __len__(self):
+
+        return len(self._states)
+
+    def get(self, path):
+        """Gets the state of a project, loading it if not cached or outdated.
+
+        Args:
+            path (str): The project directory
+
+        Returns (scanomatic.data_processing.phenotyper.Phenotyper):
+            The shared state, changes to it are seen by all later users
+            of the cache.
+        """
+        path = os.path.abspath(path)
+        signature = get_state_signature(path)
+
+        with self._lock:
+            entry = self._states.pop(path, None)
+            if entry is not None and entry[0] == signature:
+                self._states[path] = entry
+                return entry[1]
+
+        _logger.info("Loading project state '{0}'".format(path))
+        state = phenotyper.Phenotyper.LoadFromState(path, lazy=True)
+
+        with self._lock:
+            self._states[path] = (signature, state)
+            self._evict()
+
+        return state
+
+    def save(self, path, state):
+        """Saves a state to its project and keeps the cached state valid.
+
+        Args:
+            path (str): The project directory
+            state (scanomatic.data_processing.phenotyper.Phenotyper): The state
+        """
+        state.save_state(path, ask_if_overwrite=False)
+        path = os.path.abspath(path)
+
+        with self._lock:
+            self._states.pop(path, None)
+            self._states[path] = (get_state_signature(path), state)
+            self._evict()
+
+    def invalidate(self, path):
+        """Drops the cached state of a project, if any.
+
+        Args:
+            path (str): The project directory
+        """
+        with self._lock:
+            self._states.pop(os.path.abspath(path), None)
+
+    def clear(self):
+
+        with self._lock:
+            self._states.clear()
+
+    def _evict(self):
+
+        sizes = OrderedDict((path, get_size(state.__dict__)) for path, (_, state) in self._states.iteritems())
+        total = sum(sizes.itervalues())
+
+        for path, size in sizes.iteritems():
+
+            if total <= self.max_size or len(self._states) == 1:
+                break
+
+            _logger.info("Dropping cached state '{0}' ({1:.1f} MB)".format(path, size / 1024. ** 2))
+            del self._states[path]
+            total -= size
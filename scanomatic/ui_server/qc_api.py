@@ -16,6 +16,7 @@ from scanomatic.data_processing.norm import infer_offset, Offsets
 from scanomatic.generics.phenotype_filter import Filter
 from scanomatic.io.paths import Paths
 from scanomatic.io.app_config import Config
+from scanomatic.ui_server.project_state_cache import ProjectStateCache
 from scanomatic.ui_server.general import convert_url_to_path, convert_path_to_url, get_search_results, \
     get_project_name, json_response, serve_zip_file
 
@@ -24,6 +25,8 @@ FILM_TYPES = {'colony': 'animate_colony_growth("{save_target}", {pos}, "{path}")
               'detection': 'animate_blob_detection("{save_target}", {pos}, "{path}")',
               '3d': 'animate_3d_colony("{save_target}", {pos}, "{path}")'}
 
+_PROJECT_STATES = ProjectStateCache()
+
 
 class LockState(Enum):
 
@@ -45,7 +48,7 @@ def owns_lock(lock_state):
 def _get_state_update_response(path, response, success=None):
 
     try:
-        state = phenotyper.Phenotyper.LoadFromState(path)
+        state = _PROJECT_STATES.get(path)
     except ImportError:
         name = None
         success = False
@@ -155,6 +158,8 @@ def _validate_lock_key(path, key="", ip="", require_claim=True):
         lock_state = LockState.LockedByMeTemporary
 
     if owns_lock(lock_state):
+        if current_key and key != current_key:
+            _PROJECT_STATES.invalidate(path)
         lock_file_path = os.path.join(path, Paths().ui_server_phenotype_state_lock)
         _update_lock(lock_file_path, key, ip)
     elif lock_state is LockState.LockedByOther:
@@ -206,6 +211,7 @@ def add_routes(app):
     Args:
         app (Flask): The flask app to decorate
     """
+    _PROJECT_STATES.max_size = int(Config().ui_server.state_cache_size * 1024 ** 2)
 
     @app.route("/api/results/browse/<path:project>")
     @app.route("/api/results/browse")
@@ -378,7 +384,7 @@ def add_routes(app):
             return jsonify(reason="Failed to save file, contact server admin.", **response)
 
         if state.load_meta_data(meta_data_path):
-            state.save_state(path, ask_if_overwrite=False)
+            _PROJECT_STATES.save(path, state)
         else:
             response['success'] = False
             response['reason'] = "Uploaded data doesn't match shapes of the plates"
@@ -598,7 +604,7 @@ def add_routes(app):
                 **response))
 
         state.remove_phenotype_from_normalization(pheno)
-        state.save_state(path, ask_if_overwrite=False)
+        _PROJECT_STATES.save(path, state)
 
         if lock_state is LockState.LockedByMeTemporary:
             _remove_lock(path)
@@ -651,7 +657,7 @@ def add_routes(app):
                 **response))
 
         state.add_phenotype_to_normalization(pheno)
-        state.save_state(path, ask_if_overwrite=False)
+        _PROJECT_STATES.save(path, state)
 
         if lock_state is LockState.LockedByMeTemporary:
             _remove_lock(path)
@@ -965,7 +971,7 @@ def add_routes(app):
             return jsonify(**json_response(["urls"], dict(urls=urls, **response)))
 
         had_effect = state.undo(plate)
-        state.save_state(path, ask_if_overwrite=False)
+        _PROJECT_STATES.save(path, state)
 
         if lock_state is LockState.LockedByMeTemporary:
             _remove_lock(path)
@@ -1133,7 +1139,7 @@ def add_routes(app):
                 reason="Setting mark refused, probably trying to set NoGrowth or Empty for individual phenotype.",
                 **response)
 
-        state.save_state(path, ask_if_overwrite=False)
+        _PROJECT_STATES.save(path, state)
 
         if lock_state is LockState.LockedByMeTemporary:
             _remove_lock(path)
@@ -1304,7 +1310,7 @@ def add_routes(app):
             return jsonify(**response)
 
         state.normalize_phenotypes()
-        state.save_state(path, ask_if_overwrite=False)
+        _PROJECT_STATES.save(path, state)
 
         if lock_state is LockState.LockedByMeTemporary:
             _remove_lock(path)
@@ -1377,7 +1383,7 @@ def add_routes(app):
                            **json_response(["urls"], dict(urls=urls, **response)))
 
         state.set_control_surface_offsets(offset, plate)
-        state.save_state(path, ask_if_overwrite=False)
+        _PROJECT_STATES.save(path, state)
 
         if lock_state is LockState.LockedByMeTemporary:
             _remove_lock(path)
@@ -0,0 +1,87 @@
+import time
+
+import numpy as np
+import pytest
+
+from scanomatic.ui_server.phenotype_jobs import (
+    PhenotypeJobs, JobStatus, get_phenotyper, iterate_extraction, get_results, get_results_as_npz)
+
+
+@pytest.fixture(scope='module')
+def data_object():
+
+    np.random.seed(0)
+    times = np.arange(45) / 3.
+    raw_growth_data = [[
+        (np.power(2, 17 + (3 + np.random.random()) / (1 + np.exp(-(times - 5 - 5 * np.random.random()))))).tolist()
+        for _ in range(3)] for _ in range(2)]
+    return {"raw_growth_data": raw_growth_data, "times_data": times.tolist()}
+
+
+def _wait_for_job(jobs, job_id, timeout=60):
+
+    end = time.time() + timeout
+    while jobs.get_status(job_id)['status'] in (JobStatus.Queued, JobStatus.Running) and time.time() < end:
+        time.sleep(0.05)
+    return jobs.get_status(job_id)
+
+
+def test_phenotyper_gets_four_dimensions(data_object):
+
+    state = get_phenotyper(data_object)
+    assert state.raw_growth_data.shape == (1, 2, 3, 45)
+
+
+def test_extraction_reports_progress(data_object):
+
+    state = get_phenotyper(data_object)
+    progress = list(iterate_extraction(state, data_object))
+    assert progress and progress[-1] == 1.0
+    assert progress == sorted(progress)
+
+
+def test_job_results_same_as_direct_extraction(data_object):
+
+    state = get_phenotyper(data_object)
+    for _ in iterate_extraction(state, data_object):
+        pass
+    expected = get_results(state, data_object)
+
+    jobs = PhenotypeJobs(workers=1)
+    job_id = jobs.submit(data_object)
+    status = _wait_for_job(jobs, job_id)
+    assert status['status'] is JobStatus.Done
+    assert status['progress'] == 1.0
+
+    results = jobs.get_results(job_id)
+    assert set(results['phenotypes']) == set(expected['phenotypes'])
+    for name, plates in expected['phenotypes'].iteritems():
+        np.testing.assert_equal(results['phenotypes'][name][0].data, plates[0].data)
+
+    archive = np.load(get_results_as_npz(results))
+    np.testing.assert_equal(archive['phenotypes/GenerationTime/0'], expected['phenotypes']['GenerationTime'][0].data)
+    np.testing.assert_equal(
+        archive['phenotypes/GenerationTime/0/filter'], expected['phenotypes']['GenerationTime'][0].filter)
+    np.testing.assert_equal(archive['smooth_growth_data/0'], expected['smooth_growth_data'][0])
+
+    assert jobs.remove(job_id)
+    assert jobs.get_status(job_id) is None
+
+
+def test_failed_job_gives_reason():
+
+    jobs = PhenotypeJobs(workers=1)
+    job_id = jobs.submit({"raw_growth_data": [1, 2, 3], "times_data": [0, 1, 2], "inclusion_level": "Bogus"})
+    status = _wait_for_job(jobs, job_id)
+    assert status['status'] is JobStatus.Failed
+    assert status['reason']
+    assert jobs.get_results(job_id) is None
+
+
+def test_old_finished_jobs_are_dropped():
+
+    jobs = PhenotypeJobs(workers=1, max_finished=1)
+    job_ids = [jobs.submit({"inclusion_level": "Bogus"}) for _ in range(3)]
+    _wait_for_job(jobs, job_ids[-1])
+    assert jobs.get_status(job_ids[0]) is None
+    assert jobs.get_status(job_ids[-1])['status'] is JobStatus.Failed
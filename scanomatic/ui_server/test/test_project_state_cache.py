@@ -0,0 +1,81 @@
+import os
+import time
+
+import numpy as np
+import pytest
+
+from scanomatic.data_processing.phenotyper import Phenotyper, Smoothing
+from scanomatic.data_processing.growth_phenotypes import Phenotypes
+from scanomatic.generics.phenotype_filter import Filter
+from scanomatic.ui_server.project_state_cache import ProjectStateCache, get_size
+
+
+def _save_project(path, seed):
+
+    np.random.seed(seed)
+    times = np.arange(45) / 3.
+    plates = np.array([[[
+        np.power(2, 17 + (3 + np.random.random()) / (1 + np.exp(-(times - 5 - 5 * np.random.random()))))
+        for _ in range(3)] for _ in range(2)]])
+
+    phenotyper = Phenotyper(plates, times)
+    phenotyper.extract_phenotypes(smoothing=Smoothing.MedianGauss)
+    phenotyper.save_state(path, ask_if_overwrite=False)
+
+
+@pytest.fixture
+def projects(tmpdir):
+
+    paths = []
+    for seed in range(2):
+        path = str(tmpdir.mkdir('project{0}'.format(seed)))
+        _save_project(path, seed)
+        paths.append(path)
+    return paths
+
+
+def test_cache_reuses_state(projects):
+
+    cache = ProjectStateCache()
+    assert cache.get(projects[0]) is cache.get(projects[0])
+    assert cache.get(projects[0]) is not cache.get(projects[1])
+
+
+def test_cache_reloads_changed_state(projects):
+
+    cache = ProjectStateCache()
+    state = cache.get(projects[0])
+
+    time.sleep(0.01)
+    other = Phenotyper.LoadFromState(projects[0])
+    other.add_position_mark(0, (1, 1), Phenotypes.GenerationTime, Filter.BadData)
+    other.save_state(projects[0], ask_if_overwrite=False)
+    os.utime(os.path.join(projects[0], 'phenotyper_state.npz'), (time.time() + 10, time.time() + 10))
+
+    reloaded = cache.get(projects[0])
+    assert reloaded is not state
+    assert reloaded.get_phenotype(Phenotypes.GenerationTime)[0].mask[1, 1]
+
+
+def test_cache_save_keeps_state(projects):
+
+    cache = ProjectStateCache()
+    state = cache.get(projects[0])
+    state.add_position_mark(0, (0, 1), Phenotypes.GenerationTime, Filter.BadData)
+    cache.save(projects[0], state)
+
+    assert cache.get(projects[0]) is state
+    assert Phenotyper.LoadFromState(projects[0]).get_phenotype(Phenotypes.GenerationTime)[0].mask[0, 1]
+
+
+def test_cache_evicts_least_recently_used(projects):
+
+    cache = ProjectStateCache()
+    state = cache.get(projects[0])
+    state.smooth_growth_data
+    cache.max_size = get_size(state.__dict__)
+
+    cache.get(projects[1])
+    assert projects[0] not in cache
+    assert projects[1] in cache
+    assert len(cache) == 1
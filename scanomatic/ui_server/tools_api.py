@@ -6,7 +6,8 @@ from urllib import unquote
 
 from scanomatic.ui_server.general import safe_directory_name
 from scanomatic.io.app_config import Config
-from scanomatic.io.logger import Logger, parse_log_file
+from scanomatic.io.logger import Logger
+from scanomatic.io.log_index import get_log_index
 from scanomatic.io.paths import Paths
 from scanomatic.data_processing.phenotyper import path_has_saved_project_state
 from .general import convert_url_to_path, json_response, serve_zip_file
@@ -56,7 +57,7 @@ def add_routes(app):
             ))
 
         try:
-            data = parse_log_file(what)
+            data = get_log_index(what).get_records()
         except IOError:
             return jsonify(success=False, is_endpoint=True, reason="No log-file found with that name")
 
@@ -68,15 +69,32 @@ def add_routes(app):
     @app.route("/api/tools/logs/<filter_status>/<int:n_records>/<path:project>")
     @app.route("/api/tools/logs/<int:start_at>/<int:n_records>/<path:project>")
     @app.route("/api/tools/logs/<filter_status>/<int:start_at>/<int:n_records>/<path:project>")
-    def log_view(project='', filter_status=None, n_records=-1, start_at=0):
+    @app.route("/api/tools/logs/tail/<int:n_records>/<path:project>", defaults={'tail': True})
+    @app.route("/api/tools/logs/<filter_status>/tail/<int:n_records>/<path:project>", defaults={'tail': True})
+    def log_view(project='', filter_status=None, n_records=-1, start_at=0, tail=False):
+        """Pages through the records of a log file.
 
+        Records are numbered from the start of the log, or if a
+        `filter_status` (e.g. `WARNING_ERROR_CRITICAL`) is given, only
+        the records with those statuses are numbered.
+
+        Args:
+            project: The path to the log file
+            filter_status: Optional statuses to include
+            n_records: Optional number of records, 0 for all
+            start_at: Optional record number to start at, to follow
+                a log start at the previous response's `end_record`.
+            tail: If the last `n_records` records should be given
+        """
         # base_url = "/api/tools/logs"
         path = convert_url_to_path(project)
         if n_records == 0:
             n_records = -1
+        if tail:
+            start_at = -n_records if n_records > 0 else 0
 
         try:
-            data = parse_log_file(path, seek=start_at, max_records=n_records, filter_status=filter_status)
+            data = get_log_index(path).get_records(start=start_at, count=n_records, filter_status=filter_status)
         except IOError:
             return jsonify(success=False, is_endpoint=True, reason="No log-file found with that name")
 
@@ -212,6 +230,7 @@ def add_routes(app):
 
             if include_state:
 
+                files += glob.glob(os.path.join(path, Paths().phenotyper_state))
                 files += glob.glob(os.path.join(path, Paths().phenotype_times))
                 files += glob.glob(os.path.join(path, Paths().phenotypes_extraction_params))
                 files += glob.glob(os.path.join(path, Paths().phenotypes_filter))
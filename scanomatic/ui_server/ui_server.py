@@ -355,7 +355,8 @@ def launch_server(host, port, debug):
                     compile_instructions=path_compile_instructions,
                     output_directory=data_object.get("output_directory"),
                     one_time_positioning=bool(data_object.get('one_time_positioning', default=1, type=int)),
-                    chain=bool(data_object.get('chain', default=1, type=int)))
+                    chain=bool(data_object.get('chain', default=1, type=int)),
+                    colony_stacks=bool(data_object.get('colony_stacks', default=0, type=int)))
 
                 if "pinning_matrices" in data_object:
                     model.pinning_matrices = get_2d_list(
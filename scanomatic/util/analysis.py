@@ -5,7 +5,7 @@ from scanomatic.io.paths import Paths
 from scanomatic.image_analysis.image_basics import load_image_to_numpy
 from scanomatic.io.logger import Logger
 from scanomatic.io.pickler import unpickle_with_unpickler
-from scanomatic.models.factories.compile_project_factory import CompileImageAnalysisFactory
+from scanomatic.io.compilation_index import load_compilation
 from scanomatic.generics.purge_importing import ExpiringModule
 
 _logger = Logger("Analysis Utils")
@@ -39,7 +39,7 @@ def produce_grid_images(path=".", plates=None, image=None, mark_position=None, c
 
     _logger.info("Using '{0}' to produce grid images".format(os.path.basename(compilation)))
 
-    compilation = CompileImageAnalysisFactory.serializer.load(compilation)
+    compilation = load_compilation(compilation)
 
     image_path = compilation[-1].image.path
     all_plates = compilation[-1].fixture.plates
@@ -35,7 +35,10 @@ scripts = [
         "scan-o-matic_analysis_skip_gs_norm",
         "scan-o-matic_analysis_xml_upgrade",
         "scan-o-matic_xml2image_data",
-        "scan-o-matic_inspect_compilation"
+        "scan-o-matic_inspect_compilation",
+        "scan-o-matic_phenotypes_state_convert",
+        "scan-o-matic_benchmark_gridding",
+        "scan-o-matic_benchmark_logger"
     ]
 ]
 